@@ -3,6 +3,32 @@
 Comprehensive Performance Benchmarking Script
 Analyzes training time, memory usage, and accuracy metrics
 across different dataset sizes.
+
+Scaling mode (--scaling) sweeps log-spaced dataset sizes up to millions of rows
+and fits power-law exponents for time and memory; --thread-sweep and
+--process-sweep measure how training and prediction scale with BLAS threads
+and with concurrent training processes.
+
+Reduction mode (--reduction) trains on coverage-aware subsets of a large dataset
+(fivedreg.data_hand.reduction) at several row budgets and reports the accuracy
+cost and the speedup against training on every row. Deduplication mode (--dedup)
+measures the effect of collapsing repeated points on a dataset with duplicates.
+Engine mode (--engines) compares the neural network with the k-NN and local RBF
+engines (fivedreg.engines), picks the cheapest one that meets an R² target, and checks
+the estimates of the automatic selection (fivedreg.engine_selection) against the
+measurements. Quantization mode (--quantization) compares float32 and int8 weights
+(fivedreg.quantization) with the float64 network: test R² delta, weight size and
+batch prediction throughput. Pruning mode (--pruning) removes hidden units of a large
+network (fivedreg.pruning) at several keep fractions and reports size, latency and R²
+before and after fine-tuning. ONNX mode (--onnx) serves the same networks with sklearn
+and with onnxruntime (fivedreg.onnx_export) and compares single-row latency, batch
+throughput and predictions. Batch mode (--batch) scores a large .npy file as a
+sharded batch prediction job (fivedreg.batch_predict) with 1, 2, 4, ... worker
+processes and compares the throughput with a single in-process predict call.
+
+Memory is measured as process RSS/USS sampled from a side thread by default
+(--memory-mode rss), which includes NumPy/BLAS buffers; --memory-mode
+tracemalloc reports Python-allocator memory only, as in earlier versions.
 """
 
 import numpy as np
@@ -13,26 +39,87 @@ import json
 from pathlib import Path
 import sys
 import os
+import argparse
+import warnings
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from fivedreg.base_fivedreg import FastNeuralNetwork
+from fivedreg.base_fivedreg import FastNeuralNetwork, measure_dedup_speedup
+from fivedreg.engines import make_engine
+from fivedreg.engine_selection import default_candidates, select_engine
+from fivedreg.quantization import QUANTIZATION_MODES, quantize_network
+from fivedreg.pruning import PRUNING_CRITERIA, prune_network
+from fivedreg.timing import predict_rows_per_second, single_row_latency_ms
+from fivedreg.data_hand.module import load_dataset
+from fivedreg.data_hand.reduction import coverage_subsample
+from fivedreg.profiling import MemorySampler
+from fivedreg.batch_predict import BatchPredictionJob
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+from sklearn.exceptions import ConvergenceWarning
+from threadpoolctl import threadpool_limits
+
+
+def fit_scaling_exponent(sizes, values) -> dict:
+    """
+    Fit values ~ c * n^k by least squares in log-log space.
+
+    Points with a non-positive value (e.g. an RSS increase of zero) are left out.
+
+    Returns:
+        Dictionary with the exponent k, the constant c and the R² of the fit,
+        or None if fewer than two positive values remain
+    """
+    sizes, values = np.asarray(sizes, dtype=float), np.asarray(values, dtype=float)
+    positive = values > 0
+    if positive.sum() < 2:
+        return None
+    log_n, log_v = np.log(sizes[positive]), np.log(values[positive])
+    slope, intercept = np.polyfit(log_n, log_v, 1)
+    residuals = log_v - (slope * log_n + intercept)
+    total = np.sum((log_v - log_v.mean())**2)
+    r_squared = 1 - np.sum(residuals**2) / total if total > 0 else 1.0
+    return {"exponent": float(slope), "constant": float(np.exp(intercept)), "r_squared": float(r_squared)}
+
+
+def _process_training_job(job: tuple) -> float:
+    """
+    Train one model in a worker process (used by the process-count sweep).
+    Returns the training time in seconds.
+    """
+    n_samples, epochs, blas_threads, seed = job
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_samples, 5))
+    y = np.sum(X**2, axis=1) + 0.1 * rng.standard_normal(n_samples)
+
+    with threadpool_limits(limits=blas_threads), warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        start_time = time.perf_counter()
+        FastNeuralNetwork(max_iterations=epochs, early_stopping=False).fit(X, y)
+        return time.perf_counter() - start_time
 
 
 class PerformanceBenchmark:
     """Comprehensive performance benchmarking for the neural network."""
 
-    def __init__(self, output_dir: str = "benchmark_results"):
+    MEMORY_MODES = ("rss", "tracemalloc")
+
+    def __init__(self, output_dir: str = "benchmark_results", memory_mode: str = "rss"):
+        if memory_mode not in self.MEMORY_MODES:
+            raise ValueError(f"memory_mode must be one of {self.MEMORY_MODES}, got '{memory_mode}'")
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.memory_mode = memory_mode
         self.results = {
             "dataset_sizes": [],
             "training_times": [],
+            "peak_memory_loading": [],
             "peak_memory_training": [],
+            "steady_memory_training": [],
             "peak_memory_prediction": [],
             "r2_scores": [],
             "mse_scores": [],
@@ -84,6 +171,15 @@ class PerformanceBenchmark:
         print("Generating dataset...")
         X, y = self.generate_dataset(n_samples)
 
+        # Measure loading memory on the same data written to disk
+        dataset_file = self.output_dir / f"benchmark_{n_samples}.pkl"
+        with open(dataset_file, 'wb') as f:
+            pickle.dump({'X': X, 'y': y}, f)
+        try:
+            _, loading_time, loading_memory = self.measure(lambda: load_dataset(str(dataset_file)))
+        finally:
+            dataset_file.unlink()
+
         # Split data (60% train, 20% val, 20% test)
         X_temp, X_test, y_temp, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42
@@ -112,20 +208,12 @@ class PerformanceBenchmark:
 
         # Measure training time and memory
         print("\nTraining model...")
-        tracemalloc.start()
-        start_time = time.time()
-
-        # Train model
-        model.model.fit(X_train_scaled, y_train)
-
-        training_time = time.time() - start_time
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-
-        peak_memory_mb = peak / 1024 / 1024
+        _, training_time, training_memory = self.measure(lambda: model.model.fit(X_train_scaled, y_train))
+        peak_memory_mb = training_memory["peak_mb"]
 
         print(f"  Training time: {training_time:.2f}s")
-        print(f"  Peak memory: {peak_memory_mb:.2f} MB")
+        print(f"  Peak memory ({self.memory_mode}): {peak_memory_mb:.2f} MB, "
+              f"steady state: {training_memory['steady_mb']:.2f} MB")
         print(f"  Samples/second: {n_samples/training_time:.0f}")
 
         # Get number of iterations completed
@@ -134,14 +222,9 @@ class PerformanceBenchmark:
 
         # Measure prediction time and memory
         print("\nMeasuring prediction performance...")
-        tracemalloc.start()
-
-        y_pred = model.model.predict(X_test_scaled)
-
-        pred_current, pred_peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-
-        pred_peak_mb = pred_peak / 1024 / 1024
+        y_pred, _, prediction_memory = self.measure(lambda: model.model.predict(X_test_scaled))
+        pred_peak_mb = prediction_memory["peak_mb"]
+        print(f"  Peak memory ({self.memory_mode}): {pred_peak_mb:.2f} MB")
 
         # Calculate metrics
         r2 = r2_score(y_test, y_pred)
@@ -164,8 +247,14 @@ class PerformanceBenchmark:
         return {
             "n_samples": n_samples,
             "training_time": training_time,
+            "memory_mode": self.memory_mode,
+            "loading_time": loading_time,
+            "peak_memory_loading_mb": loading_memory["peak_mb"],
+            "steady_memory_loading_mb": loading_memory["steady_mb"],
             "peak_memory_training_mb": peak_memory_mb,
+            "steady_memory_training_mb": training_memory["steady_mb"],
             "peak_memory_prediction_mb": pred_peak_mb,
+            "steady_memory_prediction_mb": prediction_memory["steady_mb"],
             "r2_score": r2,
             "mse": mse,
             "mae": mae,
@@ -175,6 +264,594 @@ class PerformanceBenchmark:
             "iterations": iterations
         }
 
+    @staticmethod
+    def log_spaced_sizes(min_size: int = 1_000, max_size: int = 1_000_000, points_per_decade: int = 2) -> list:
+        """Log-spaced dataset sizes rounded to two significant digits."""
+        n_points = int(round(np.log10(max_size / min_size) * points_per_decade)) + 1
+        sizes = set()
+        for value in np.logspace(np.log10(min_size), np.log10(max_size), n_points):
+            magnitude = 10 ** (int(np.floor(np.log10(value))) - 1)
+            sizes.add(int(round(value / magnitude) * magnitude))
+        return sorted(sizes)
+
+    def measure(self, func):
+        """
+        Run func and measure its duration and memory in the configured memory mode.
+
+        In 'rss' mode the peak and steady-state values are process RSS increases over the
+        baseline (sampled from a side thread); in 'tracemalloc' mode they are the peak and
+        still-allocated sizes seen by Python's allocator.
+
+        Returns:
+            Tuple of (result, seconds, {"peak_mb": ..., "steady_mb": ...})
+        """
+        if self.memory_mode == "tracemalloc":
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start_time
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        else:
+            with MemorySampler() as sampler:
+                start_time = time.perf_counter()
+                result = func()
+                elapsed = time.perf_counter() - start_time
+            peak, current = sampler.result["peak_rss_bytes"], sampler.result["steady_rss_bytes"]
+        return result, elapsed, {"peak_mb": peak / 1024 / 1024, "steady_mb": current / 1024 / 1024}
+
+    def benchmark_scaling_point(self, n_samples: int, epochs: int = 3) -> dict:
+        """
+        Measure load_dataset, a fixed number of training epochs and batch prediction at one size.
+
+        Training runs a fixed number of epochs without early stopping, so the time per
+        epoch is comparable across sizes (a full fit at millions of rows is not needed
+        to see how the cost grows).
+        """
+        print(f"\n--- {n_samples:,} samples ---")
+        X, y = self.generate_dataset(n_samples)
+        dataset_file = self.output_dir / f"scaling_{n_samples}.pkl"
+        with open(dataset_file, 'wb') as f:
+            pickle.dump({'X': X, 'y': y}, f)
+        del X, y
+
+        try:
+            splits, load_time, load_memory = self.measure(lambda: load_dataset(str(dataset_file)))
+        finally:
+            dataset_file.unlink()
+        X_train, y_train, X_val, y_val, X_test, y_test, _, _ = splits
+
+        model = FastNeuralNetwork(max_iterations=epochs, early_stopping=False)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            _, train_time, train_memory = self.measure(lambda: model.fit(X_train, y_train))
+
+        _, predict_time, predict_memory = self.measure(lambda: model.predict(X_test))
+
+        result = {
+            "n_samples": n_samples,
+            "load_time": load_time,
+            "load_memory_mb": load_memory["peak_mb"],
+            "train_time": train_time,
+            "epochs": model.n_iterations_,
+            "time_per_epoch": train_time / model.n_iterations_,
+            "train_memory_mb": train_memory["peak_mb"],
+            "predict_time": predict_time,
+            "predict_rows_per_second": len(X_test) / predict_time,
+            "predict_memory_mb": predict_memory["peak_mb"]
+        }
+        print(f"  load {load_time:.2f}s, {epochs} epochs {train_time:.2f}s "
+              f"({result['time_per_epoch']:.2f}s/epoch), predict {result['predict_rows_per_second']:,.0f} rows/s")
+        return result
+
+    def run_scaling_benchmarks(self, dataset_sizes: list = None, epochs: int = 3) -> dict:
+        """
+        Sweep log-spaced dataset sizes (1K to 1M rows by default) and fit scaling exponents
+        for the time and peak memory of loading, training (per epoch) and prediction.
+        """
+        if dataset_sizes is None:
+            dataset_sizes = self.log_spaced_sizes()
+
+        print("\n" + "="*60)
+        print("SCALING BENCHMARKS")
+        print("="*60)
+        print(f"Dataset sizes: {dataset_sizes}")
+
+        points = [self.benchmark_scaling_point(n, epochs) for n in dataset_sizes]
+
+        sizes = [point["n_samples"] for point in points]
+        exponents = {}
+        if len(points) >= 2:
+            for metric in ["load_time", "load_memory_mb", "time_per_epoch", "train_memory_mb",
+                           "predict_time", "predict_memory_mb"]:
+                exponents[metric] = fit_scaling_exponent(sizes, [point[metric] for point in points])
+
+        print("\nFitted scaling exponents (value ~ n^k):")
+        for metric, fit in exponents.items():
+            if fit is None:
+                print(f"  {metric:<20} not enough positive measurements")
+                continue
+            print(f"  {metric:<20} k = {fit['exponent']:.2f}  (R² of fit {fit['r_squared']:.3f})")
+
+        scaling = {"epochs": epochs, "points": points, "exponents": exponents}
+        self._save_json("scaling_results.json", scaling)
+        return scaling
+
+    def run_thread_sweep(self, n_samples: int = 100_000, thread_counts: list = None, epochs: int = 3) -> list:
+        """
+        Measure training and prediction with the BLAS thread pool limited to each thread count.
+        """
+        if thread_counts is None:
+            thread_counts = sorted({1, 2, 4, 8, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+
+        print("\n" + "="*60)
+        print(f"THREAD SWEEP ({n_samples:,} samples)")
+        print("="*60)
+
+        X, y = self.generate_dataset(n_samples)
+        results = []
+        for n_threads in thread_counts:
+            with threadpool_limits(limits=n_threads), warnings.catch_warnings():
+                warnings.simplefilter("ignore", ConvergenceWarning)
+                model = FastNeuralNetwork(max_iterations=epochs, early_stopping=False)
+                start_time = time.perf_counter()
+                model.fit(X, y)
+                train_time = time.perf_counter() - start_time
+
+                start_time = time.perf_counter()
+                model.predict(X)
+                predict_time = time.perf_counter() - start_time
+
+            results.append({"threads": n_threads, "train_time": train_time, "predict_time": predict_time})
+
+        for result in results:
+            result["train_speedup"] = results[0]["train_time"] / result["train_time"]
+            result["predict_speedup"] = results[0]["predict_time"] / result["predict_time"]
+            result["train_efficiency"] = result["train_speedup"] * results[0]["threads"] / result["threads"]
+            print(f"  {result['threads']:>3} threads: train {result['train_time']:.2f}s (x{result['train_speedup']:.2f}), "
+                  f"predict {result['predict_time']:.3f}s (x{result['predict_speedup']:.2f})")
+
+        self._save_json("thread_sweep.json", results)
+        return results
+
+    def run_process_sweep(self, n_samples: int = 50_000, process_counts: list = None, epochs: int = 3) -> list:
+        """
+        Train the same batch of independent models with 1..P worker processes and report
+        throughput. Each worker gets cpu_count // P BLAS threads to avoid oversubscription.
+        """
+        cpu_count = os.cpu_count() or 1
+        if process_counts is None:
+            process_counts = sorted({1, 2, 4, cpu_count} & set(range(1, cpu_count + 1)))
+        n_jobs = max(process_counts)
+
+        print("\n" + "="*60)
+        print(f"PROCESS SWEEP ({n_jobs} training jobs of {n_samples:,} samples)")
+        print("="*60)
+
+        results = []
+        for n_processes in process_counts:
+            blas_threads = max(1, cpu_count // n_processes)
+            jobs = [(n_samples, epochs, blas_threads, seed) for seed in range(n_jobs)]
+            start_time = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=n_processes) as executor:
+                job_times = list(executor.map(_process_training_job, jobs))
+            wall_time = time.perf_counter() - start_time
+            results.append({
+                "processes": n_processes,
+                "blas_threads_per_process": blas_threads,
+                "wall_time": wall_time,
+                "mean_job_time": float(np.mean(job_times)),
+                "jobs_per_second": n_jobs / wall_time
+            })
+
+        for result in results:
+            result["speedup"] = results[0]["wall_time"] / result["wall_time"]
+            print(f"  {result['processes']:>3} processes x {result['blas_threads_per_process']} threads: "
+                  f"{result['wall_time']:.2f}s, {result['jobs_per_second']:.2f} jobs/s (x{result['speedup']:.2f})")
+
+        self._save_json("process_sweep.json", results)
+        return results
+
+    def run_reduction_benchmarks(self, n_samples: int = 1_000_000, budgets: list = None,
+                                 methods: tuple = ("grid", "kmeans", "random")) -> dict:
+        """
+        Train on the full training set and on subsets of each budget selected by each method,
+        and report test R², training time, accuracy cost (R² lost) and speedup per subset.
+        All models are evaluated on the same held-out test split.
+        """
+        if budgets is None:
+            budgets = [b for b in (10_000, 30_000, 100_000) if b < n_samples]
+
+        print("\n" + "="*60)
+        print(f"REDUCTION BENCHMARKS ({n_samples:,} samples)")
+        print("="*60)
+
+        X, y = self.generate_dataset(n_samples)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        del X, y
+        scaler_X, scaler_y = StandardScaler().fit(X_train), StandardScaler().fit(y_train.reshape(-1, 1))
+        X_train, X_test = scaler_X.transform(X_train), scaler_X.transform(X_test)
+        y_train = scaler_y.transform(y_train.reshape(-1, 1)).ravel()
+
+        def train_and_score(X_fit, y_fit):
+            model = FastNeuralNetwork()
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", ConvergenceWarning)
+                start_time = time.perf_counter()
+                model.fit(X_fit, y_fit)
+                train_time = time.perf_counter() - start_time
+            y_pred = scaler_y.inverse_transform(model.predict(X_test).reshape(-1, 1)).ravel()
+            return r2_score(y_test, y_pred), train_time
+
+        full_r2, full_time = train_and_score(X_train, y_train)
+        print(f"  full ({len(X_train):,} rows): R² {full_r2:.4f}, {full_time:.2f}s")
+
+        results = []
+        for budget in budgets:
+            for method in methods:
+                indices, report = coverage_subsample(X_train, y_train, budget, method=method)
+                r2, train_time = train_and_score(X_train[indices], y_train[indices])
+                result = {
+                    **report,
+                    "r2": r2,
+                    "train_time": train_time,
+                    "r2_cost": full_r2 - r2,
+                    "speedup": full_time / (train_time + report["seconds"])}
+                results.append(result)
+                print(f"  {method:<7} {budget:>9,} rows: R² {r2:.4f} (cost {result['r2_cost']:+.4f}), "
+                      f"train {train_time:.2f}s + select {report['seconds']:.2f}s (x{result['speedup']:.1f})")
+
+        reduction = {"n_train": len(X_train), "full_r2": full_r2, "full_train_time": full_time, "subsets": results}
+        self._save_json("reduction_results.json", reduction)
+        return reduction
+
+    def run_dedup_benchmarks(self, n_unique: int = 50_000, copies: int = 4, jitter: float = 1e-4,
+                             tolerance: float = 1e-3) -> dict:
+        """
+        Train on a dataset where every point appears `copies` times (exact copies, and copies
+        moved by up to `jitter`), once as is and once after load_dataset collapses duplicates
+        (exact, then with `tolerance`). Accuracy is measured on a separate clean test set, since
+        the test split of the raw data shares points with its training split.
+        """
+        print("\n" + "="*60)
+        print(f"DEDUPLICATION BENCHMARKS ({n_unique:,} points x {copies} copies)")
+        print("="*60)
+
+        X_unique, _ = self.generate_dataset(n_unique)
+        rng = np.random.default_rng(0)
+        X_clean, _ = self.generate_dataset(20_000, seed=7)
+        y_clean = np.sum(X_clean**2, axis=1)
+
+        def target(X):
+            return np.sum(X**2, axis=1) + 0.1 * rng.standard_normal(len(X))
+
+        datasets = {
+            "exact": np.repeat(X_unique, copies, axis=0),
+            "near": np.repeat(X_unique, copies, axis=0) + rng.uniform(-jitter, jitter, (n_unique * copies, 5))}
+
+        results = []
+        for kind, X in datasets.items():
+            dataset_file = self.output_dir / f"dedup_{kind}.pkl"
+            with open(dataset_file, 'wb') as f:
+                pickle.dump({'X': X, 'y': target(X)}, f)
+            try:
+                runs = {}
+                for label, dedup_tolerance in (("raw", None), ("exact", 0.0), ("tolerance", tolerance)):
+                    start_time = time.perf_counter()
+                    X_train, y_train, X_val, y_val, _, _, scaler_X, scaler_y, report = load_dataset(
+                        str(dataset_file), dedup_tolerance=dedup_tolerance, return_dedup_report=True)
+                    load_time = time.perf_counter() - start_time
+
+                    X_fit, y_fit = np.vstack([X_train, X_val]), np.concatenate([y_train, y_val])
+                    model = FastNeuralNetwork()
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore", ConvergenceWarning)
+                        start_time = time.perf_counter()
+                        model.fit(X_fit, y_fit)
+                        train_time = time.perf_counter() - start_time
+                    # Per-epoch speedup against the raw training rows, timed on the same configuration
+                    epoch_speedup = (measure_dedup_speedup(model, X_fit, y_fit, runs["raw"]["train_rows"])["training_speedup"]
+                                     if report else 1.0)
+                    y_pred = scaler_y.inverse_transform(
+                        model.predict(scaler_X.transform(X_clean)).reshape(-1, 1)).ravel()
+
+                    runs[label] = {
+                        "rows": report["rows_after"] if report else len(X),
+                        "train_rows": len(X_fit),
+                        "epoch_speedup": epoch_speedup,
+                        "reduction_ratio": report["reduction_ratio"] if report else 1.0,
+                        "load_time": load_time,
+                        "train_time": train_time,
+                        "iterations": model.n_iterations_,
+                        "clean_test_r2": r2_score(y_clean, y_pred)}
+
+                for label, run in runs.items():
+                    run["speedup"] = (runs["raw"]["load_time"] + runs["raw"]["train_time"]) / (run["load_time"] + run["train_time"])
+                    print(f"  {kind:<5} duplicates, {label:<9}: {run['rows']:>9,} rows (x{run['reduction_ratio']:.2f}), "
+                          f"train {run['train_time']:.2f}s, R² {run['clean_test_r2']:.4f}, speedup x{run['speedup']:.2f} "
+                          f"(x{run['epoch_speedup']:.2f} per epoch)")
+                results.append({"duplicates": kind, "runs": runs})
+            finally:
+                dataset_file.unlink()
+
+        dedup = {"n_unique": n_unique, "copies": copies, "jitter": jitter, "tolerance": tolerance, "results": results}
+        self._save_json("dedup_results.json", dedup)
+        return dedup
+
+    def run_engine_benchmarks(self, dataset_sizes: list = None, engines: tuple = ("mlp", "knn", "rbf"),
+                              r2_target: float = 0.99, n_test: int = 10_000) -> dict:
+        """
+        Fit every engine on datasets of each size and report fit time, prediction
+        throughput, test R² and model size. For every size, the cheapest engine (fit plus
+        prediction time of the test set) that reaches r2_target is reported as 'choice',
+        next to the engine select_engine picks from probe fits and its estimates.
+        """
+        mlp_params = default_candidates()[0]["params"]
+        if dataset_sizes is None:
+            dataset_sizes = [1_000, 10_000, 100_000]
+
+        print("\n" + "="*60)
+        print(f"ENGINE BENCHMARKS (R² target {r2_target})")
+        print("="*60)
+
+        results = []
+        for n_samples in dataset_sizes:
+            X, y = self.generate_dataset(n_samples + n_test)
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=n_test, random_state=42)
+            scaler_X, scaler_y = StandardScaler().fit(X_train), StandardScaler().fit(y_train.reshape(-1, 1))
+            X_train, X_test = scaler_X.transform(X_train), scaler_X.transform(X_test)
+            y_train = scaler_y.transform(y_train.reshape(-1, 1)).ravel()
+
+            runs = {}
+            for engine in engines:
+                model = FastNeuralNetwork() if engine == "mlp" else make_engine(engine)
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", ConvergenceWarning)
+                    start_time = time.perf_counter()
+                    model.fit(X_train, y_train)
+                    fit_time = time.perf_counter() - start_time
+                start_time = time.perf_counter()
+                y_pred = model.predict(X_test)
+                predict_time = time.perf_counter() - start_time
+                y_pred = scaler_y.inverse_transform(y_pred.reshape(-1, 1)).ravel()
+
+                runs[engine] = {
+                    "fit_time": fit_time,
+                    "predict_time": predict_time,
+                    "predictions_per_second": n_test / predict_time,
+                    "r2": r2_score(y_test, y_pred),
+                    "model_size_kb": self.measure_model_size(model) / 1024}
+                print(f"  {n_samples:>9,} rows, {engine:<4}: fit {fit_time:.2f}s, "
+                      f"predict {runs[engine]['predictions_per_second']:,.0f} rows/s, R² {runs[engine]['r2']:.4f}, "
+                      f"{runs[engine]['model_size_kb']:.0f} KB")
+
+            eligible = [engine for engine in engines if runs[engine]["r2"] >= r2_target]
+            choice = min(eligible, key=lambda engine: runs[engine]["fit_time"] + runs[engine]["predict_time"]) if eligible else None
+            print(f"  {n_samples:>9,} rows: cheapest engine meeting R² {r2_target}: {choice or 'none'}")
+
+            candidates = [{"engine": engine, "params": mlp_params if engine == "mlp" else {}} for engine in engines]
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", ConvergenceWarning)
+                selection = select_engine(X_train, y_train, candidates, r2_target=r2_target)
+            auto = {
+                "choice": selection["engine"],
+                "reason": selection["reason"],
+                "selection_seconds": selection["selection_seconds"],
+                "estimates": {c["engine"]: {"fit_time": c["estimated_fit_seconds"], "r2": c["estimated_r2"]}
+                              for c in selection["candidates"]}}
+            print(f"  {n_samples:>9,} rows: auto selection: {auto['choice']} ({auto['reason']}, "
+                  f"{auto['selection_seconds']:.2f}s); estimated vs measured fit time / R²: "
+                  + ", ".join(f"{engine} {estimate['fit_time']:.2f}s/{runs[engine]['fit_time']:.2f}s "
+                              f"{estimate['r2']:.4f}/{runs[engine]['r2']:.4f}"
+                              for engine, estimate in auto["estimates"].items()))
+            results.append({"n_samples": n_samples, "runs": runs, "choice": choice, "auto": auto})
+
+        comparison = {"r2_target": r2_target, "n_test": n_test, "results": results}
+        self._save_json("engine_results.json", comparison)
+        return comparison
+
+    def run_quantization_benchmarks(self, n_samples: int = 50_000, architectures: tuple = ((64, 32, 16), (256, 256, 128)),
+                                    predict_rows: int = 1_000_000, n_test: int = 10_000, max_iterations: int = 100) -> dict:
+        """
+        Train one network per architecture, quantize it to every mode and report the test R²
+        delta, the weight size and the throughput gain of a predict_rows batch prediction
+        against the float64 network.
+        """
+        print("\n" + "="*60)
+        print(f"QUANTIZATION BENCHMARKS ({n_samples:,} training rows, {predict_rows:,} predictions)")
+        print("="*60)
+
+        X, y = self.generate_dataset(n_samples + n_test)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=n_test, random_state=42)
+        scaler_X, scaler_y = StandardScaler().fit(X_train), StandardScaler().fit(y_train.reshape(-1, 1))
+        X_train, X_test = scaler_X.transform(X_train), scaler_X.transform(X_test)
+        y_train = scaler_y.transform(y_train.reshape(-1, 1)).ravel()
+        y_test = scaler_y.transform(y_test.reshape(-1, 1)).ravel()
+        X_batch = scaler_X.transform(self.generate_dataset(predict_rows, seed=3)[0])
+
+        def throughput(model):
+            model.predict(X_batch[:1000])  # warm-up
+            start_time = time.perf_counter()
+            model.predict(X_batch)
+            return predict_rows / (time.perf_counter() - start_time)
+
+        results = []
+        for hidden_layers in architectures:
+            network = FastNeuralNetwork(hidden_layers=hidden_layers, max_iterations=max_iterations)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", ConvergenceWarning)
+                network.fit(X_train, y_train)
+            baseline = throughput(network)
+            print(f"  {str(hidden_layers):<16} float64: R² {network.evaluate(X_test, y_test)['r2']:.6f}, "
+                  f"{baseline:,.0f} rows/s, {self.measure_model_size(network) / 1024:.0f} KB pickled")
+
+            runs = {}
+            for mode in QUANTIZATION_MODES:
+                quantized = quantize_network(network, mode, X_test, y_test)
+                rows_per_second = throughput(quantized)
+                runs[mode] = {
+                    **quantized.quantization_,
+                    "predictions_per_second": rows_per_second,
+                    "throughput_gain": rows_per_second / baseline,
+                    "model_size_kb": self.measure_model_size(quantized) / 1024}
+                print(f"  {str(hidden_layers):<16} {mode:<7}: R² {runs[mode]['r2_after']:.6f} "
+                      f"(delta {runs[mode]['r2_delta']:+.2e}), {rows_per_second:,.0f} rows/s "
+                      f"(x{runs[mode]['throughput_gain']:.2f}), stored weights x{runs[mode]['compression']:.1f} smaller "
+                      f"(x{runs[mode]['memory_compression']:.1f} in memory), "
+                      f"{runs[mode]['model_size_kb']:.0f} KB pickled")
+            results.append({"hidden_layers": list(hidden_layers), "float64_predictions_per_second": baseline,
+                            "float64_model_size_kb": self.measure_model_size(network) / 1024, "modes": runs})
+
+        quantization = {"n_samples": n_samples, "n_test": n_test, "predict_rows": predict_rows, "results": results}
+        self._save_json("quantization_results.json", quantization)
+        return quantization
+
+    def run_pruning_benchmarks(self, n_samples: int = 50_000, hidden_layers: tuple = (256, 128, 64),
+                               keep_fractions: tuple = (0.5, 0.25), fine_tune_iterations: int = 10,
+                               n_test: int = 10_000) -> dict:
+        """
+        Train one large network, prune it with every criterion and keep fraction, and report
+        the parameters, pickled size, single-row latency, batch throughput and test R² before
+        and after pruning (with the R² before fine-tuning).
+        """
+        print("\n" + "="*60)
+        print(f"PRUNING BENCHMARKS ({hidden_layers} network, {n_samples:,} training rows)")
+        print("="*60)
+
+        X, y = self.generate_dataset(n_samples + n_test)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=n_test, random_state=42)
+        scaler_X, scaler_y = StandardScaler().fit(X_train), StandardScaler().fit(y_train.reshape(-1, 1))
+        X_train, X_test = scaler_X.transform(X_train), scaler_X.transform(X_test)
+        y_train = scaler_y.transform(y_train.reshape(-1, 1)).ravel()
+        y_test = scaler_y.transform(y_test.reshape(-1, 1)).ravel()
+
+        network = FastNeuralNetwork(hidden_layers=hidden_layers)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            network.fit(X_train, y_train)
+        network_size_kb = self.measure_model_size(network) / 1024
+
+        results = []
+        for criterion in PRUNING_CRITERIA:
+            for keep_fraction in keep_fractions:
+                pruned = prune_network(network, X_train, y_train, keep_fraction, criterion, fine_tune_iterations,
+                                       X_test, y_test)
+                report = {**pruned.pruning_, "model_size_kb_before": network_size_kb,
+                          "model_size_kb_after": self.measure_model_size(pruned) / 1024}
+                results.append(report)
+                before, after = report["before"], report["after"]
+                print(f"  {criterion:<10} keep {keep_fraction:.2f}: {tuple(report['hidden_layers_after'])}, "
+                      f"{report['parameters_before']:,} -> {report['parameters_after']:,} parameters, "
+                      f"{report['model_size_kb_before']:.0f} -> {report['model_size_kb_after']:.0f} KB, "
+                      f"latency {before['latency_ms']:.3f} -> {after['latency_ms']:.3f} ms, "
+                      f"{before['rows_per_second']:,.0f} -> {after['rows_per_second']:,.0f} rows/s, "
+                      f"R² {before['r2']:.4f} -> {report['r2_before_fine_tuning']:.4f} pruned -> {after['r2']:.4f} fine-tuned")
+
+        pruning = {"n_samples": n_samples, "n_test": n_test, "hidden_layers": list(hidden_layers),
+                   "fine_tune_iterations": fine_tune_iterations, "results": results}
+        self._save_json("pruning_results.json", pruning)
+        return pruning
+
+    def run_onnx_benchmarks(self, n_samples: int = 20_000, architectures: tuple = ((64, 32, 16), (256, 256, 128)),
+                            predict_rows: int = 1_000_000, max_iterations: int = 50) -> dict:
+        """
+        Train one network per architecture and serve it with sklearn and with onnxruntime:
+        median single-row latency, predict_rows batch throughput and the largest prediction difference.
+        """
+        from fivedreg.onnx_export import OnnxRuntimeNetwork
+
+        print("\n" + "="*60)
+        print(f"ONNX RUNTIME BENCHMARKS ({predict_rows:,} batch predictions)")
+        print("="*60)
+
+        X, y = self.generate_dataset(n_samples)
+        scaler_X = StandardScaler().fit(X)
+        X = scaler_X.transform(X)
+        y = StandardScaler().fit_transform(y.reshape(-1, 1)).ravel()
+        X_batch = scaler_X.transform(self.generate_dataset(predict_rows, seed=3)[0])
+
+        results = []
+        for hidden_layers in architectures:
+            network = FastNeuralNetwork(hidden_layers=hidden_layers, max_iterations=max_iterations)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", ConvergenceWarning)
+                network.fit(X, y)
+            served = OnnxRuntimeNetwork(network)
+
+            backends = {}
+            for name, model in (("sklearn", network), ("onnxruntime", served)):
+                model.predict(X_batch[:1000])  # warm-up
+                predictions, rows_per_second = predict_rows_per_second(model, X_batch)
+                backends[name] = {"latency_ms": single_row_latency_ms(model, X_batch, repeats=1000),
+                                  "rows_per_second": rows_per_second, "predictions": predictions}
+            max_difference = float(np.abs(backends["sklearn"].pop("predictions")
+                                          - backends["onnxruntime"].pop("predictions")).max())
+            result = {"hidden_layers": list(hidden_layers), **backends,
+                      "latency_speedup": backends["sklearn"]["latency_ms"] / backends["onnxruntime"]["latency_ms"],
+                      "throughput_gain": backends["onnxruntime"]["rows_per_second"] / backends["sklearn"]["rows_per_second"],
+                      "max_abs_prediction_difference": max_difference}
+            results.append(result)
+            print(f"  {str(hidden_layers):<16} latency {backends['sklearn']['latency_ms']:.3f} -> "
+                  f"{backends['onnxruntime']['latency_ms']:.3f} ms (x{result['latency_speedup']:.1f}), "
+                  f"{backends['sklearn']['rows_per_second']:,.0f} -> {backends['onnxruntime']['rows_per_second']:,.0f} rows/s "
+                  f"(x{result['throughput_gain']:.2f}), max difference {max_difference:.1e}")
+
+        onnx_results = {"n_samples": n_samples, "predict_rows": predict_rows, "results": results}
+        self._save_json("onnx_results.json", onnx_results)
+        return onnx_results
+
+    def run_batch_benchmarks(self, predict_rows: int = 2_000_000, shard_rows: int = 100_000,
+                             process_counts: list = None, n_samples: int = 20_000, max_iterations: int = 50) -> dict:
+        """
+        Score predict_rows rows stored as .npy with a batch prediction job per process count and
+        compare the end-to-end rows per second (worker start-up included) with one predict call.
+        """
+        if process_counts is None:
+            process_counts = [2 ** k for k in range(int(np.log2(os.cpu_count() or 1)) + 1)]
+
+        print("\n" + "="*60)
+        print(f"BATCH PREDICTION JOB BENCHMARKS ({predict_rows:,} rows, shards of {shard_rows:,})")
+        print("="*60)
+
+        X, y = self.generate_dataset(n_samples)
+        network = FastNeuralNetwork(hidden_layers=(64, 32, 16), max_iterations=max_iterations)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            network.fit(X, y)
+        X_batch = self.generate_dataset(predict_rows, seed=3)[0]
+        _, in_process = predict_rows_per_second(network, X_batch)
+        print(f"  in-process predict: {in_process:,.0f} rows/s")
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "input.npy")
+            np.save(input_path, X_batch)
+            for processes in process_counts:
+                job = BatchPredictionJob(f"p{processes}", os.path.join(directory, f"p{processes}"), network,
+                                         input_path, shard_rows=shard_rows, processes=processes)
+                job.run()
+                status = job.status()
+                max_difference = float(np.abs(np.load(job.output_path) - network.predict(X_batch)).max())
+                result = {"processes": processes, "seconds": status["elapsed_seconds"],
+                          "rows_per_second": status["rows_per_second"],
+                          "speedup_vs_in_process": status["rows_per_second"] / in_process,
+                          "max_abs_prediction_difference": max_difference}
+                results.append(result)
+                print(f"  {processes:>3} processes: {result['seconds']:.2f}s, {result['rows_per_second']:,.0f} rows/s "
+                      f"(x{result['speedup_vs_in_process']:.2f} vs in-process)")
+
+        batch_results = {"predict_rows": predict_rows, "shard_rows": shard_rows,
+                         "in_process_rows_per_second": in_process, "results": results}
+        self._save_json("batch_results.json", batch_results)
+        return batch_results
+
+    def _save_json(self, filename: str, payload):
+        output_file = self.output_dir / filename
+        with open(output_file, 'w') as f:
+            json.dump({"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "cpu_count": os.cpu_count(),
+                       "results": payload}, f, indent=2)
+        print(f"\nResults saved to: {output_file}")
+
     def run_benchmarks(self, dataset_sizes: list = None):
         """
         Run benchmarks across multiple dataset sizes.
@@ -197,7 +874,9 @@ class PerformanceBenchmark:
             # Store in aggregate results
             self.results["dataset_sizes"].append(n_samples)
             self.results["training_times"].append(result["training_time"])
+            self.results["peak_memory_loading"].append(result["peak_memory_loading_mb"])
             self.results["peak_memory_training"].append(result["peak_memory_training_mb"])
+            self.results["steady_memory_training"].append(result["steady_memory_training_mb"])
             self.results["peak_memory_prediction"].append(result["peak_memory_prediction_mb"])
             self.results["r2_scores"].append(result["r2_score"])
             self.results["mse_scores"].append(result["mse"])
@@ -252,7 +931,8 @@ class PerformanceBenchmark:
         if len(self.results["dataset_sizes"]) >= 2:
             size_ratio = self.results["dataset_sizes"][-1] / self.results["dataset_sizes"][0]
             time_ratio = self.results["training_times"][-1] / self.results["training_times"][0]
-            memory_ratio = self.results["peak_memory_training"][-1] / self.results["peak_memory_training"][0]
+            # An RSS increase can be zero when the allocator reuses already resident pages
+            memory_ratio = self.results["peak_memory_training"][-1] / max(self.results["peak_memory_training"][0], 1e-6)
 
             print(f"\nScaling from {self.results['dataset_sizes'][0]:,} to "
                   f"{self.results['dataset_sizes'][-1]:,} samples:")
@@ -268,7 +948,9 @@ class PerformanceBenchmark:
         print(f"  Range: [{min(self.results['r2_scores']):.6f}, "
               f"{max(self.results['r2_scores']):.6f}]")
 
-        print("\nMemory Efficiency:")
+        print(f"\nMemory Efficiency ({self.memory_mode}):")
+        print(f"  Loading memory: {min(self.results['peak_memory_loading']):.2f} MB - "
+              f"{max(self.results['peak_memory_loading']):.2f} MB")
         print(f"  Training memory: {min(self.results['peak_memory_training']):.2f} MB - "
               f"{max(self.results['peak_memory_training']):.2f} MB")
         print(f"  Prediction memory: {min(self.results['peak_memory_prediction']):.2f} MB - "
@@ -284,7 +966,59 @@ class PerformanceBenchmark:
 
 def main():
     """Main benchmarking entry point."""
-    benchmark = PerformanceBenchmark()
+    parser = argparse.ArgumentParser(description="Performance benchmarks for the 5D interpolator")
+    parser.add_argument("--scaling", action="store_true", help="Sweep log-spaced sizes and fit scaling exponents")
+    parser.add_argument("--min-size", type=int, default=1_000, help="Smallest dataset size for --scaling")
+    parser.add_argument("--max-size", type=int, default=1_000_000, help="Largest dataset size for --scaling")
+    parser.add_argument("--points-per-decade", type=int, default=2, help="Sizes per factor of 10 for --scaling")
+    parser.add_argument("--epochs", type=int, default=3, help="Training epochs per point in the sweeps")
+    parser.add_argument("--thread-sweep", action="store_true", help="Sweep BLAS thread counts")
+    parser.add_argument("--process-sweep", action="store_true", help="Sweep training process counts")
+    parser.add_argument("--sweep-samples", type=int, default=100_000, help="Dataset size for the thread/process sweeps")
+    parser.add_argument("--reduction", action="store_true", help="Measure the accuracy cost of training on subsets")
+    parser.add_argument("--reduction-samples", type=int, default=1_000_000, help="Dataset size for --reduction")
+    parser.add_argument("--budgets", type=int, nargs="+", default=None, help="Row budgets for --reduction")
+    parser.add_argument("--dedup", action="store_true", help="Measure collapsing duplicate points before training")
+    parser.add_argument("--dedup-points", type=int, default=50_000, help="Distinct points for --dedup")
+    parser.add_argument("--engines", action="store_true", help="Compare the mlp, knn and rbf engines")
+    parser.add_argument("--engine-sizes", type=int, nargs="+", default=None, help="Dataset sizes for --engines")
+    parser.add_argument("--r2-target", type=float, default=0.99, help="R² an engine must reach to be chosen by --engines")
+    parser.add_argument("--quantization", action="store_true", help="Measure float32 and int8 weight quantization")
+    parser.add_argument("--quantization-rows", type=int, default=1_000_000, help="Batch prediction size for --quantization")
+    parser.add_argument("--pruning", action="store_true", help="Measure structured pruning of hidden units")
+    parser.add_argument("--onnx", action="store_true", help="Compare sklearn and onnxruntime inference (needs fivedreg[onnx])")
+    parser.add_argument("--batch", action="store_true", help="Measure sharded batch prediction jobs")
+    parser.add_argument("--batch-rows", type=int, default=2_000_000, help="Rows scored by --batch")
+    parser.add_argument("--memory-mode", choices=PerformanceBenchmark.MEMORY_MODES, default="rss",
+                        help="Measure process RSS (default) or Python allocations with tracemalloc")
+    args = parser.parse_args()
+
+    benchmark = PerformanceBenchmark(memory_mode=args.memory_mode)
+
+    if args.scaling or args.thread_sweep or args.process_sweep or args.reduction or args.dedup or args.engines \
+            or args.quantization or args.pruning or args.onnx or args.batch:
+        if args.scaling:
+            benchmark.run_scaling_benchmarks(
+                benchmark.log_spaced_sizes(args.min_size, args.max_size, args.points_per_decade), epochs=args.epochs)
+        if args.thread_sweep:
+            benchmark.run_thread_sweep(args.sweep_samples, epochs=args.epochs)
+        if args.process_sweep:
+            benchmark.run_process_sweep(args.sweep_samples, epochs=args.epochs)
+        if args.reduction:
+            benchmark.run_reduction_benchmarks(args.reduction_samples, args.budgets)
+        if args.dedup:
+            benchmark.run_dedup_benchmarks(args.dedup_points)
+        if args.engines:
+            benchmark.run_engine_benchmarks(args.engine_sizes, r2_target=args.r2_target)
+        if args.quantization:
+            benchmark.run_quantization_benchmarks(predict_rows=args.quantization_rows)
+        if args.pruning:
+            benchmark.run_pruning_benchmarks()
+        if args.onnx:
+            benchmark.run_onnx_benchmarks()
+        if args.batch:
+            benchmark.run_batch_benchmarks(args.batch_rows)
+        return
 
     # Run benchmarks with 1K, 5K, and 10K samples
     results = benchmark.run_benchmarks([1000, 5000, 10000])
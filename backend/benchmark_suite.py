@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite with Stored Baselines and Regression Detection
+
+Times the hot paths of the system (training, single and batch inference,
+load_dataset and API round-trips) with warmup and repeated runs, reports
+median / p95 and a bootstrap confidence interval of the median, and compares
+the results with a baseline stored per machine.
+
+Usage:
+    python benchmark_suite.py                   # run and compare with this machine's baseline
+    python benchmark_suite.py --save-baseline   # run and store the results as the new baseline
+    python benchmark_suite.py --threshold 0.2 --cases predict_single predict_batch
+
+The exit code is 1 when at least one case is slower than its baseline median
+by more than the regression threshold.
+"""
+
+import argparse
+import io
+import json
+import os
+import pickle
+import platform
+import re
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fivedreg.base_fivedreg import FastNeuralNetwork
+from fivedreg.data_hand.module import load_dataset
+
+
+def summarize_timings(timings, confidence=0.95, n_bootstrap=2000, seed=0):
+    """
+    Summary statistics of repeated timings.
+
+    The confidence interval is a percentile bootstrap of the median, which makes
+    no normality assumption (timings are usually right-skewed).
+    """
+    timings = np.asarray(timings, dtype=float)
+    rng = np.random.default_rng(seed)
+    resampled = rng.choice(timings, size=(n_bootstrap, len(timings)), replace=True)
+    medians = np.median(resampled, axis=1)
+    alpha = (1 - confidence) / 2
+
+    return {
+        "repeats": int(len(timings)),
+        "median": float(np.median(timings)),
+        "mean": float(np.mean(timings)),
+        "std": float(np.std(timings, ddof=1)) if len(timings) > 1 else 0.0,
+        "min": float(np.min(timings)),
+        "p95": float(np.percentile(timings, 95)),
+        "ci_low": float(np.quantile(medians, alpha)),
+        "ci_high": float(np.quantile(medians, 1 - alpha)),
+        "confidence": confidence
+    }
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    Compare case medians with a baseline.
+
+    A case regresses when its median is more than `threshold` (relative) above the
+    baseline median and its confidence interval does not overlap the baseline's,
+    so run-to-run noise alone does not fail the comparison.
+
+    Returns:
+        List of comparison dicts (one per case present in both runs)
+    """
+    comparisons = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = current["median"] / reference["median"] if reference["median"] > 0 else float("inf")
+        regression = ratio > 1 + threshold and current["ci_low"] > reference["ci_high"]
+        comparisons.append({
+            "case": name,
+            "baseline_median": reference["median"],
+            "current_median": current["median"],
+            "ratio": ratio,
+            "regression": bool(regression)
+        })
+    return comparisons
+
+
+def machine_id():
+    """Identifier of the current machine used to name its baseline file."""
+    raw = f"{socket.gethostname()}-{platform.system()}-{platform.machine()}-{os.cpu_count()}cpu"
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", raw)
+
+
+class BenchmarkSuite:
+    """Repeated, warmed-up benchmarks of the training and inference hot paths."""
+
+    def __init__(self, output_dir: str = "benchmark_results", repeats: int = 10, warmup: int = 2,
+                 n_train: int = 5000, n_batch: int = 10000, seed: int = 42):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.repeats = repeats
+        self.warmup = warmup
+        self.n_train = n_train
+        self.n_batch = n_batch
+        self.rng = np.random.default_rng(seed)
+        self._model = None
+        self._dataset_path = None
+
+        # name -> (function to time, number of repeats or None for the default)
+        self.cases = {
+            "train": (self.case_train, max(3, repeats // 3)),
+            "predict_single": (self.case_predict_single, None),
+            "predict_batch": (self.case_predict_batch, None),
+            "load_dataset": (self.case_load_dataset, None),
+            "api_predict_single": (self.case_api_predict_single, None),
+            "api_upload_fit_dataset": (self.case_api_upload, None),
+        }
+
+    def generate_dataset(self, n_samples: int) -> tuple:
+        """Synthetic 5D dataset: f(x) = sum(x^2) + noise."""
+        X = self.rng.standard_normal((n_samples, 5))
+        y = np.sum(X**2, axis=1) + 0.1 * self.rng.standard_normal(n_samples)
+        return X, y
+
+    # ------------------------------------------------------------------
+    # Fixtures shared by the cases (built once, outside the timed region)
+    # ------------------------------------------------------------------
+    @property
+    def model(self) -> FastNeuralNetwork:
+        if self._model is None:
+            X, y = self.generate_dataset(self.n_train)
+            self._model = FastNeuralNetwork(hidden_layers=(64, 32, 16), max_iterations=200).fit(X, y)
+        return self._model
+
+    @property
+    def dataset_path(self) -> str:
+        if self._dataset_path is None:
+            X, y = self.generate_dataset(self.n_train)
+            handle, self._dataset_path = tempfile.mkstemp(suffix=".pkl", dir=self.output_dir)
+            with os.fdopen(handle, "wb") as f:
+                pickle.dump({"X": X, "y": y}, f)
+        return self._dataset_path
+
+    def _client(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        if not hasattr(self, "_test_client"):
+            main.model_handle.publish(self.model, {"mse": 0.0, "r2": 1.0})
+            self._test_client = TestClient(main.app)
+        return self._test_client
+
+    # ------------------------------------------------------------------
+    # Cases: each returns a zero-argument callable that is timed
+    # ------------------------------------------------------------------
+    def case_train(self):
+        X, y = self.generate_dataset(self.n_train)
+        return lambda: FastNeuralNetwork(hidden_layers=(64, 32, 16), max_iterations=200).fit(X, y)
+
+    def case_predict_single(self):
+        model, x = self.model, self.generate_dataset(1)[0]
+        return lambda: model.predict(x)
+
+    def case_predict_batch(self):
+        model, X = self.model, self.generate_dataset(self.n_batch)[0]
+        return lambda: model.predict(X)
+
+    def case_load_dataset(self):
+        path = self.dataset_path
+        return lambda: load_dataset(path)
+
+    def case_api_predict_single(self):
+        client = self._client()
+        payload = {"features": [0.1, -0.2, 0.3, -0.4, 0.5]}
+        return lambda: client.post("/predict-single/", json=payload)
+
+    def case_api_upload(self):
+        client = self._client()
+        X, y = self.generate_dataset(self.n_train)
+        payload = pickle.dumps({"X": X, "y": y})
+        return lambda: client.post(
+            "/upload-fit-dataset/",
+            files={"file": ("benchmark_suite.pkl", io.BytesIO(payload), "application/octet-stream")})
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+    def time_callable(self, func, repeats: int) -> list:
+        """Run func `warmup` times untimed, then `repeats` timed runs."""
+        for _ in range(self.warmup):
+            func()
+        timings = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start_time)
+        return timings
+
+    def run(self, case_names: list = None) -> dict:
+        """Run the selected cases (all by default) and return their summaries."""
+        case_names = case_names or list(self.cases)
+        results = {}
+
+        print("\n" + "="*60)
+        print("BENCHMARK SUITE")
+        print("="*60)
+        print(f"Cases: {case_names}")
+        print(f"Warmup runs: {self.warmup}, repeats: {self.repeats}")
+
+        for name in case_names:
+            factory, repeats = self.cases[name]
+            func = factory()
+            summary = summarize_timings(self.time_callable(func, repeats or self.repeats))
+            results[name] = summary
+            print(f"  {name:<24} median {summary['median']*1000:10.3f} ms   "
+                  f"p95 {summary['p95']*1000:10.3f} ms   "
+                  f"CI [{summary['ci_low']*1000:.3f}, {summary['ci_high']*1000:.3f}] ms")
+
+        self.cleanup()
+        return results
+
+    def cleanup(self):
+        """Remove the temporary dataset and the file uploaded by the API case."""
+        if self._dataset_path and os.path.exists(self._dataset_path):
+            os.remove(self._dataset_path)
+            self._dataset_path = None
+        if hasattr(self, "_test_client"):
+            import main
+            uploaded = os.path.join(main.UPLOAD_DIRECTORY, "benchmark_suite.pkl")
+            if os.path.exists(uploaded):
+                os.remove(uploaded)
+
+    def save_results(self, results: dict, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "machine": machine_id(),
+                "python": platform.python_version(),
+                "cases": results
+            }, f, indent=2)
+
+
+def print_comparison(comparisons: list, threshold: float):
+    print("\n" + "="*60)
+    print(f"COMPARISON WITH BASELINE (threshold: +{threshold:.0%})")
+    print("="*60)
+    print(f"{'Case':<24} {'Baseline (ms)':<15} {'Current (ms)':<15} {'Ratio':<8} Status")
+    print("-" * 72)
+    for comparison in comparisons:
+        status = "REGRESSION" if comparison["regression"] else "ok"
+        print(f"{comparison['case']:<24} {comparison['baseline_median']*1000:<15.3f} "
+              f"{comparison['current_median']*1000:<15.3f} {comparison['ratio']:<8.2f} {status}")
+
+
+def main(argv=None):
+    """Benchmark suite entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Benchmark suite with per-machine baselines")
+    parser.add_argument("--cases", nargs="+", help="Cases to run (default: all)")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed runs per case")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed warmup runs per case")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown of the median counted as a regression")
+    parser.add_argument("--output-dir", default="benchmark_results", help="Directory for results and baselines")
+    parser.add_argument("--baseline", help="Baseline file (default: <output-dir>/baselines/<machine>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(output_dir=args.output_dir, repeats=args.repeats, warmup=args.warmup)
+    unknown = set(args.cases or []) - set(suite.cases)
+    if unknown:
+        parser.error(f"Unknown cases: {sorted(unknown)}. Available: {sorted(suite.cases)}")
+
+    results = suite.run(args.cases)
+    suite.save_results(results, suite.output_dir / "benchmark_suite_results.json")
+
+    baseline_path = Path(args.baseline) if args.baseline else suite.output_dir / "baselines" / f"{machine_id()}.json"
+    if args.save_baseline:
+        suite.save_results(results, baseline_path)
+        print(f"\nBaseline saved to: {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one.")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)["cases"]
+    comparisons = compare_with_baseline(results, baseline, args.threshold)
+    print_comparison(comparisons, args.threshold)
+
+    if any(comparison["regression"] for comparison in comparisons):
+        print("\nPerformance regression detected.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
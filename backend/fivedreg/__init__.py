@@ -1,4 +1,10 @@
 # This file makes the directory a Python package
 # You can add any package-level imports or initialization here
 
-from .base_fivedreg import benchmark_training_speed, demonstrate_configurability, start_predict
\ No newline at end of file
+from .batch_predict import BatchPredictionManager
+from .base_fivedreg import benchmark_training_speed, demonstrate_configurability, distill_model, start_predict
+from .engines import KNNInterpolator, LocalRBFInterpolator
+from .model_registry import ModelRegistry
+from .onnx_export import OnnxRuntimeNetwork, export_onnx
+from .pruning import prune_network
+from .quantization import QuantizedNetwork, quantize_network
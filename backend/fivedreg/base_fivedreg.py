@@ -11,15 +11,25 @@ Key features:
 
 
 import numpy as np
+from sklearn.exceptions import ConvergenceWarning
 from sklearn.neural_network import MLPRegressor
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import time
+import warnings
 
 from .data_hand.module import load_dataset
+from .data_hand.shards import PrefetchingLoader
+from .data_hand.reduction import coverage_subsample
+from .engines import InterpolatorEngine, make_engine
+from .engine_selection import build_model, default_candidates, select_engine
+from .profiling import Profiler
+from .quantization import quantize_network
+from .distillation import distill
+from .pruning import prune_network
+from .onnx_export import INFERENCE_BACKENDS, OnnxRuntimeNetwork, export_onnx
 
 
 
-class FastNeuralNetwork:
+class FastNeuralNetwork(InterpolatorEngine):
     """
     Fast, fully configurable neural network for 5D interpolation.
 
@@ -37,6 +47,9 @@ class FastNeuralNetwork:
         Use early stopping to save time (default: True)
     verbose : bool
         Print training progress (default: True)
+    profile : bool
+        Capture a cProfile/tracemalloc profile of every fit and predict call into
+        profiles_['fit'] and profiles_['predict'] (default: False, no overhead)
 
     Example:
     --------
@@ -48,13 +61,16 @@ class FastNeuralNetwork:
     >>> predictions = model.predict(X_test)
     """
 
+    engine = "mlp"
+
     def __init__(
         self,
         hidden_layers=(64, 32, 16),
         learning_rate=0.001,
         max_iterations=500,
         early_stopping=True,
-        verbose=False):
+        verbose=False,
+        profile=False):
         """
         Initialize the fast neural network.
 
@@ -64,12 +80,15 @@ class FastNeuralNetwork:
             max_iterations: Maximum training iterations (default: 500)
             early_stopping: Enable early stopping (default: True)
             verbose: Print training progress (default: True)
+            profile: Profile fit and predict calls (default: False)
         """
         self.hidden_layers = tuple(hidden_layers)
         self.learning_rate = learning_rate
         self.max_iterations = max_iterations
         self.early_stopping = early_stopping
         self.verbose = verbose
+        self.profile = profile
+        self.profiles_ = {}
 
         # Build the model
         self.model = MLPRegressor(
@@ -91,14 +110,22 @@ class FastNeuralNetwork:
 
         self.training_time_ = None
         self.n_iterations_ = None
+        self.n_targets_ = None
+        self.reduction_ = None  # set by benchmark_training_speed when the training set was subsampled
+        self.dedup_ = None  # set by benchmark_training_speed when duplicates were collapsed
+        self.selection_ = None  # set by benchmark_training_speed when the engine was chosen automatically
+        self.quantization_ = None  # only set on a QuantizedNetwork
+        self.distillation_ = None  # set by distill on a student network
+        self.pruning_ = None  # set by prune_network on a pruned network
 
     def fit(self, X_train, y_train):
         """
         Train the neural network.
 
         Args:
-            X_train: Training features (n_samples, 5)
-            y_train: Training targets (n_samples,)
+            X_train: Training features (n_samples, n_features); any number of features
+            y_train: Training targets (n_samples,), or (n_samples, n_targets) to train one
+                network whose output layer has a unit per target (shared hidden layers)
 
         Returns:
             self
@@ -117,10 +144,16 @@ class FastNeuralNetwork:
         start_time = time.time()
 
         # Train the model
-        self.model.fit(X_train, y_train)
+        if self.profile:
+            with Profiler("fit") as profiler:
+                self.model.fit(X_train, y_train)
+            self.profiles_['fit'] = profiler.result
+        else:
+            self.model.fit(X_train, y_train)
 
         self.training_time_ = time.time() - start_time
         self.n_iterations_ = self.model.n_iter_
+        self.n_targets_ = self.model.n_outputs_
 
         if self.verbose:
             print("\n" + "="*60)
@@ -131,67 +164,162 @@ class FastNeuralNetwork:
 
         return self
 
-    def predict(self, X):
+    def fit_shards(self, train, validation=None, epochs=None, batch_size=16384, prefetch=4, n_iter_no_change=5):
         """
-        Make predictions.
+        Train on an on-disk ShardedDataset that does not have to fit in memory.
+
+        Batches of batch_size rows are read by a background prefetcher and passed to
+        partial_fit, which splits them into the usual Adam minibatches. Every epoch is one
+        pass over the shards in a new random order. With early_stopping and a validation
+        dataset, training stops once the validation MSE has not improved for
+        n_iter_no_change epochs.
 
         Args:
-            X: Features to predict (n_samples, 5)
+            train: ShardedDataset of the training split
+            validation: Optional ShardedDataset used for early stopping
+            epochs: Maximum number of epochs (default: max_iterations)
+            batch_size: Rows handed to partial_fit at a time (default: 16384)
+            prefetch: Batches prepared in advance (default: 4)
+            n_iter_no_change: Epochs without improvement before stopping (default: 5)
 
         Returns:
-            Predictions (n_samples,)
+            self
         """
-        return self.model.predict(X)
+        epochs = epochs or self.max_iterations
+        loader = PrefetchingLoader(train, batch_size=batch_size, prefetch=prefetch)
+        self.validation_scores_ = []
 
-    def evaluate(self, X, y, dataset_name="Test"):
+        start_time = time.time()
+        # partial_fit has no early stopping of its own; it is done per epoch instead
+        self.model.set_params(early_stopping=False)
+        try:
+            best_loss, stale_epochs = np.inf, 0
+            for epoch in range(1, epochs + 1):
+                for X_batch, y_batch in loader:
+                    self.model.partial_fit(X_batch, y_batch)
+
+                if validation is not None and self.early_stopping:
+                    squared_error = sum(float(np.sum((self.model.predict(X_batch) - y_batch)**2))
+                                        for X_batch, y_batch in validation.iter_batches(batch_size, shuffle=False))
+                    loss = squared_error / max(len(validation), 1)
+                    self.validation_scores_.append(loss)
+                    if self.verbose:
+                        print(f"Epoch {epoch}: validation MSE {loss:.6f}")
+                    if loss < best_loss - self.model.tol:
+                        best_loss, stale_epochs = loss, 0
+                    else:
+                        stale_epochs += 1
+                        if stale_epochs >= n_iter_no_change:
+                            break
+        finally:
+            self.model.set_params(early_stopping=self.early_stopping)
+
+        self.training_time_ = time.time() - start_time
+        self.n_iterations_ = epoch
+        self.n_targets_ = self.model.n_outputs_
+
+        if self.verbose:
+            print(f"Training on {len(train)} rows completed in {self.training_time_:.2f} seconds ({epoch} epochs)")
+
+        return self
+
+    @property
+    def n_features_(self):
+        """Input dimension seen during fit (None before fitting)."""
+        return getattr(self.model, "n_features_in_", None)
+
+    def predict(self, X):
         """
-        Evaluate the model with regression metrics.
+        Make predictions.
 
         Args:
-            X: Features
-            y: True targets
-            dataset_name: Name for printing (default: "Test")
+            X: Features to predict (n_samples, n_features), with the n_features seen in fit
 
         Returns:
-            Dictionary with MAE, MSE, RMSE, and R² score
+            Predictions (n_samples,), or (n_samples, n_targets) for a multi-target model
         """
-        y_pred = self.predict(X)
-
-        # Calculate metrics
-        mse = mean_squared_error(y, y_pred)
-        mae = mean_absolute_error(y, y_pred)
-        rmse = np.sqrt(mse)
-        r2 = r2_score(y, y_pred)
-
-        metrics = {
-            'mse': mse,
-            'mae': mae,
-            'rmse': rmse,
-            'r2': r2
-        }
-
-        if self.verbose:
-            print(f"\n{dataset_name} Set Evaluation:")
-            print(f"  MAE:  {mae:.6f}")
-            print(f"  RMSE: {rmse:.6f}")
-            print(f"  R²:   {r2:.6f}")
-
-        return metrics
+        if self.profile:
+            with Profiler("predict") as profiler:
+                predictions = self.model.predict(X)
+            self.profiles_['predict'] = profiler.result
+            return predictions
+        return self.model.predict(X)
 
     def get_params(self):
         """Get model configuration."""
         return {
+            'engine': self.engine,
             'hidden_layers': self.hidden_layers,
             'learning_rate': self.learning_rate,
             'max_iterations': self.max_iterations,
             'early_stopping': self.early_stopping,
             'training_time': self.training_time_,
-            'iterations': self.n_iterations_
+            'iterations': self.n_iterations_,
+            'n_features': self.n_features_,
+            'n_targets': self.n_targets_
         }
 
+    def to_onnx(self, scaler_X=None, scaler_y=None, path=None):
+        """
+        Export the fitted network as an ONNX graph (requires onnx).
+
+        Args:
+            scaler_X: Optional input StandardScaler folded into the first layer
+            scaler_y: Optional target StandardScaler folded into the last layer
+            path: Optional file the graph is also written to
+
+        Returns:
+            The serialized ONNX model (bytes)
+        """
+        return export_onnx(self, scaler_X, scaler_y, path)
+
+
+def _training_pass_seconds(model, X, y):
+    """Time of one training pass of model's configuration: one epoch for a network, one fit otherwise."""
+    if model.engine == "mlp":
+        params = {"hidden_layers": model.hidden_layers, "learning_rate": model.learning_rate,
+                  "max_iterations": 1, "early_stopping": model.early_stopping}
+    else:
+        params = {name: value for name, value in model.get_params().items()
+                  if name not in ("engine", "training_time", "n_features", "n_targets")}
+    probe = build_model(model.engine, params)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        start_time = time.perf_counter()
+        probe.fit(X, y)
+        return time.perf_counter() - start_time
+
+
+def measure_dedup_speedup(model, X_train, y_train, train_rows_before, seed=0):
+    """
+    Measure the training speedup of deduplication for a fitted model.
+
+    One training pass of the model's configuration (one epoch for a network, one fit for the
+    other engines) is timed on the deduplicated training rows and on train_rows_before rows,
+    the number training would have used without deduplication. The cost of a pass depends
+    on the row count rather than on the values, so those rows are drawn from the deduplicated
+    ones with replacement.
+
+    Returns:
+        Dictionary with the row counts, both pass times and their ratio 'training_speedup'
+    """
+    rows = np.random.default_rng(seed).integers(0, len(X_train), train_rows_before)
+    seconds_before = _training_pass_seconds(model, X_train[rows], y_train[rows])
+    del rows
+    seconds_after = _training_pass_seconds(model, X_train, y_train)
+    return {
+        "train_rows_before": int(train_rows_before),
+        "train_rows_after": int(len(X_train)),
+        "speedup_pass": "epoch" if model.engine == "mlp" else "fit",
+        "pass_seconds_before": seconds_before,
+        "pass_seconds_after": seconds_after,
+        "training_speedup": seconds_before / max(seconds_after, 1e-9)}
+
 
 def benchmark_training_speed(dataset_path, hidden_layers=(64, 32, 16), learning_rate=0.001,
-                            max_iterations=500, early_stopping=True):
+                            max_iterations=500, early_stopping=True, max_train_rows=None, reduction_method="grid",
+                            dedup_tolerance=None, measure_speedup=False, engine="mlp", engine_params=None, time_budget=None, r2_target=None,
+                            quantization=None, pruning=None, inference_backend=None):
     """
     Benchmark training speed on the dataset with configurable hyperparameters.
 
@@ -201,39 +329,126 @@ def benchmark_training_speed(dataset_path, hidden_layers=(64, 32, 16), learning_
         learning_rate: Learning rate for optimization (default: 0.001)
         max_iterations: Maximum training iterations (default: 500)
         early_stopping: Enable early stopping (default: True)
+        max_train_rows: Reduce the training rows to this budget with coverage_subsample before
+            fitting (default: None, use every row). The test split is never reduced.
+        reduction_method: 'grid', 'kmeans' or 'random' (default: 'grid')
+        dedup_tolerance: Collapse duplicate inputs (0) or inputs within this grid cell size
+            before splitting (default: None, keep every row)
+        measure_speedup: With dedup_tolerance, also time training passes with and without
+            deduplication and add the training speedup to model.dedup_ (see
+            measure_dedup_speedup). Off by default: it costs two extra passes, one of them
+            on the full pre-deduplication row count (default: False)
+        engine: 'mlp' (FastNeuralNetwork, configured by the arguments above), 'knn' / 'rbf'
+            (see engines.py), configured by engine_params, or 'auto' to choose between them
+            with select_engine (default: 'mlp')
+        engine_params: Keyword arguments of the 'knn' or 'rbf' engine (default: its defaults)
+        time_budget: Estimated fit time, in seconds, the 'auto' engine must stay within (default: None)
+        r2_target: R² the 'auto' engine should reach, choosing the cheapest that does (default: None)
+        quantization: Quantize the trained network's weights to 'float32' or 'int8' and return
+            the QuantizedNetwork, with the accuracy delta on the test split in its quantization_
+            (default: None). Only networks are quantized; an 'auto' choice of 'knn' or 'rbf' is kept as is.
+        pruning: Keyword arguments of prune_network (keep_fraction, criterion, fine_tune_iterations)
+            to remove hidden units after training, before any quantization (default: None). Like
+            quantization, it only applies to networks.
+        inference_backend: 'sklearn' or 'onnxruntime'; with 'onnxruntime' the trained network
+            is exported to ONNX and returned as an OnnxRuntimeNetwork (default: None, 'sklearn').
+            Other engines keep their own backend.
     """
    # print("\n" + "="*60)
     #print("FAST NEURAL NETWORK - SPEED BENCHMARK")
     #print("="*60)
 
+    if quantization is not None and engine not in ("mlp", "auto"):
+        raise ValueError(f"Quantization applies to the 'mlp' engine, not '{engine}'")
+    if pruning is not None and engine not in ("mlp", "auto"):
+        raise ValueError(f"Pruning applies to the 'mlp' engine, not '{engine}'")
+    if inference_backend is not None and inference_backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{inference_backend}'. Available: {list(INFERENCE_BACKENDS)}")
+
     # Load dataset
-    X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y = load_dataset(dataset_path)
+    X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y, dedup = load_dataset(
+        dataset_path, dedup_tolerance=dedup_tolerance, return_dedup_report=True)
 
     # Combine train and val
     X_train_full = np.vstack([X_train, X_val])
     y_train_full = np.concatenate([y_train, y_val])
+    measure_speedup = measure_speedup and dedup is not None
+    if measure_speedup:
+        # The split keeps its proportions, so without deduplication training would have had
+        # rows_before / rows_after times as many rows
+        train_rows_before = round(len(X_train_full) * dedup["rows_before"] / max(dedup["rows_after"], 1))
+
+    # Optional coverage-aware reduction of the training rows
+    reduction = None
+    if max_train_rows is not None and max_train_rows < len(X_train_full):
+        indices, reduction = coverage_subsample(X_train_full, y_train_full, max_train_rows, method=reduction_method)
+        X_train_full, y_train_full = X_train_full[indices], y_train_full[indices]
+        print(f"Training set reduced from {reduction['rows_before']} to {reduction['rows_after']} rows "
+              f"({reduction['method']}, {reduction['seconds']:.2f}s)")
+    if measure_speedup and max_train_rows is not None:
+        train_rows_before = min(train_rows_before, max_train_rows)
 
     # Create model with configurable architecture
     global model
-    model = FastNeuralNetwork(
-        hidden_layers=hidden_layers,
-        learning_rate=learning_rate,
-        max_iterations=max_iterations,
-        early_stopping=early_stopping,
-        verbose=False # Suppress output for benchmark
-    )
+    selection = None
+    if engine == "auto":
+        selection = select_engine(
+            X_train_full, y_train_full,
+            default_candidates(hidden_layers, learning_rate, max_iterations, early_stopping),
+            time_budget=time_budget, r2_target=r2_target)
+        model = build_model(selection["engine"], selection["params"])
+        print(f"Selected engine '{selection['engine']}' in {selection['selection_seconds']:.2f}s: {selection['reason']}")
+    elif engine == "mlp":
+        model = FastNeuralNetwork(
+            hidden_layers=hidden_layers,
+            learning_rate=learning_rate,
+            max_iterations=max_iterations,
+            early_stopping=early_stopping,
+            verbose=False # Suppress output for benchmark
+        )
+    else:
+        model = make_engine(engine, **(engine_params or {}))
 
     # Train
     model.fit(X_train_full, y_train_full)
+    if measure_speedup:
+        dedup = {**dedup, **measure_dedup_speedup(model, X_train_full, y_train_full, train_rows_before)}
+        print(f"Deduplication training speedup: x{dedup['training_speedup']:.2f} per {dedup['speedup_pass']} "
+              f"({dedup['train_rows_before']} -> {dedup['train_rows_after']} rows)")
+    model.reduction_ = reduction
+    model.dedup_ = dedup
+    model.selection_ = selection
+
+    # Optional structured pruning, measured on the test split
+    if pruning is not None and model.engine == "mlp":
+        model = prune_network(model, X_train_full, y_train_full, X_test=X_test, y_test=y_test, **pruning)
+        report = model.pruning_
+        print(f"Pruned hidden layers {tuple(report['hidden_layers_before'])} -> {tuple(report['hidden_layers_after'])}: "
+              f"{report['parameters_before']} -> {report['parameters_after']} parameters, "
+              f"R² {report['before']['r2']:.4f} -> {report['after']['r2']:.4f}")
+
+    # Optional post-training weight quantization, measured on the test split
+    if quantization is not None and model.engine == "mlp":
+        model = quantize_network(model, quantization, X_test, y_test)
+        report = model.quantization_
+        print(f"Quantized weights to {quantization}: {report['weight_bytes_before']} -> "
+              f"{report['weight_bytes_after']} bytes, R² delta {report['r2_delta']:+.2e}")
+
+    # Optional onnxruntime serving of the final network
+    if inference_backend == "onnxruntime" and model.engine == "mlp":
+        model = OnnxRuntimeNetwork(model)
 
     # Evaluate
     metrics = model.evaluate(X_test, y_test, "Test")
 
     print("\n" + "="*60)
-    print(f"Architecture: {hidden_layers}")
-    print(f"Learning rate: {learning_rate}")
-    print(f"Max iterations: {max_iterations}")
-    print(f"Early stopping: {early_stopping}")
+    if model.engine == "mlp":
+        print(f"Architecture: {model.hidden_layers}")
+        print(f"Learning rate: {model.learning_rate}")
+        print(f"Max iterations: {model.max_iterations}")
+        print(f"Early stopping: {model.early_stopping}")
+    else:
+        print(f"Engine: {model.engine} {model.get_params()}")
     #if params['training_time'] < 60:
        # print(f"✓ PASSED: Training time ({params['training_time']:.2f}s) < 60s")
     #else:
@@ -248,6 +463,33 @@ def benchmark_training_speed(dataset_path, hidden_layers=(64, 32, 16), learning_
 
     return model, metrics
 
+def distill_model(teacher, dataset_path, hidden_layers=(32, 16), n_synthetic=50_000, learning_rate=0.001,
+                  max_iterations=200, seed=0):
+    """
+    Distill a trained model (or a list of models) into a small student network, sampling
+    inside the bounds of the dataset's training rows.
+
+    Args:
+        teacher: Trained model, or list of trained models whose mean prediction is distilled
+        dataset_path: Path to the dataset the teacher was trained on
+        hidden_layers: Architecture of the student (default: (32, 16))
+        n_synthetic: Synthetic points labelled by the teacher (default: 50,000)
+        learning_rate: Learning rate of the student (default: 0.001)
+        max_iterations: Maximum training iterations of the student (default: 200)
+        seed: Random seed of the synthetic points
+
+    Returns:
+        Tuple of (student, metrics), the student's metrics being on the test split
+    """
+    X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y = load_dataset(dataset_path)
+    student = distill(teacher, np.vstack([X_train, X_val]), hidden_layers=hidden_layers, n_synthetic=n_synthetic,
+                      learning_rate=learning_rate, max_iterations=max_iterations, X_test=X_test, y_test=y_test,
+                      seed=seed)
+    report = student.distillation_
+    print(f"Distilled {report['teacher']} into {tuple(hidden_layers)} in {report['distill_seconds']:.2f}s: "
+          f"max |error| {report['error_bound']['max_abs_error']:.4f}, latency x{report['speedup']:.1f} lower")
+    return student, student.evaluate(X_test, y_test, "Test")
+
 def start_predict(dataset_path):
     """
     Make predictions using the trained model.
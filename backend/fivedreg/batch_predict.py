@@ -0,0 +1,496 @@
+"""
+Batch scoring of large prediction files in row shards across a process pool.
+
+The input rows are cut into shards of shard_rows rows. Every worker process loads its own
+read-only copy of the model once, reads the rows of a shard from a memory map of the
+input, predicts them and writes the predictions straight to the output:
+
+- 'npy': the output .npy file is allocated up front and every shard is written to its own
+  row range through a memory map, so the file is in input order whatever the order in
+  which the shards finish;
+- 'csv': every shard is written as a part file, and the parts are appended to the output
+  in shard order as soon as they are contiguous.
+
+Workers are spawned rather than forked, so they do not inherit the server's threads and
+locks, and each one is limited to its share of the job's native threads. A
+BatchPredictionManager runs the jobs in background threads, reports their progress and
+throughput, and keeps the finished ones for download.
+
+Everything a job needs is kept in its directory: the status (status.json, rewritten as
+shards finish), the model copy, the input and the output. The server's worker processes
+share the jobs directory, so any of them can report a job's status, serve its output or
+delete it; only the process that runs a job keeps it in memory.
+"""
+
+import json
+import os
+import pickle
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from multiprocessing import get_context
+
+import numpy as np
+
+from .thread_scheduler import set_job_threads
+
+
+OUTPUT_FORMATS = ("npy", "csv")
+JOB_STATES = ("queued", "running", "completed", "failed", "cancelled")
+FINISHED_STATES = ("completed", "failed", "cancelled")
+
+_JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def open_prediction_input(path):
+    """
+    Rows of a prediction file: a memory map of a 2D .npy array, or the array of a .pkl file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        X = np.load(path, mmap_mode="r")
+    elif extension == ".pkl":
+        with open(path, "rb") as f:
+            X = np.asarray(pickle.load(f), dtype=np.float64)
+    else:
+        raise ValueError(f"Unsupported file type '{extension}': use .npy or .pkl")
+    if X.ndim != 2 or X.shape[1] == 0 or X.shape[0] == 0:
+        raise ValueError(f"Prediction data must have shape (n, d) with n, d >= 1, got {X.shape}")
+    return X
+
+
+def prediction_input_shape(path):
+    """
+    Shape of a prediction file without loading it: read from the header of a .npy file, or
+    None for a .pkl file, whose shape is only known once it is unpickled.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        X = np.load(path, mmap_mode="r")
+        if X.ndim != 2 or X.shape[1] == 0 or X.shape[0] == 0:
+            raise ValueError(f"Prediction data must have shape (n, d) with n, d >= 1, got {X.shape}")
+        if not np.issubdtype(X.dtype, np.number):
+            raise ValueError(f"Prediction data must be numeric, got dtype {X.dtype}")
+        return X.shape
+    if extension == ".pkl":
+        return None
+    raise ValueError(f"Unsupported file type '{extension}': use .npy or .pkl")
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def plan_shards(n_rows, shard_rows):
+    """(start, stop) row ranges of consecutive shards of at most shard_rows rows."""
+    if shard_rows < 1:
+        raise ValueError(f"shard_rows must be at least 1, got {shard_rows}")
+    return [(start, min(start + shard_rows, n_rows)) for start in range(0, n_rows, shard_rows)]
+
+
+# State of a worker process, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, input_path, output_path, output_format, threads):
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(limits=threads)
+    set_job_threads(threads)  # for engines with their own threads, such as the k-NN tree queries
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    if getattr(model, "backend", None) == "onnxruntime":
+        model.set_intra_op_threads(threads)
+    _worker["model"] = model
+    _worker["X"] = np.load(input_path, mmap_mode="r")
+    _worker["output"] = np.load(output_path, mmap_mode="r+") if output_format == "npy" else None
+    _worker["output_path"] = output_path
+
+
+def _part_path(output_path, index):
+    return f"{output_path}.part{index:06d}"
+
+
+def _score_shard(index, start, stop):
+    """Predict rows [start, stop) of the input and write them to the output; returns (index, rows, seconds)."""
+    start_time = time.perf_counter()
+    predictions = _worker["model"].predict(np.asarray(_worker["X"][start:stop], dtype=np.float64))
+    output = _worker["output"]
+    if output is not None:
+        output[start:stop] = predictions
+        output.flush()
+    else:
+        np.savetxt(_part_path(_worker["output_path"], index), np.reshape(predictions, (stop - start, -1)),
+                   delimiter=",", fmt="%.17g")
+    return index, stop - start, time.perf_counter() - start_time
+
+
+class BatchPredictionJob:
+    """
+    One batch scoring job: the shards of an input file predicted by a process pool.
+
+    Creating a job only validates its settings (and the header of a .npy input) and records
+    it as queued; copying the model and converting a .pkl input happen in run().
+
+    Parameters:
+    -----------
+    job_id : str
+        Identifier of the job, also the name of its directory
+    directory : str
+        Directory holding the job's status, model copy, input and output
+    model : fitted engine
+        Model to score with; a pickled copy is loaded by every worker
+    input_path : str
+        .npy or .pkl file of shape (n, n_features)
+    shard_rows : int
+        Rows per shard (default: 100,000)
+    processes : int or None
+        Worker processes (default: the job's threads)
+    output_format : str
+        'npy' or 'csv' (default: 'npy')
+    thread_slot : callable or None
+        Called with 'inference', returns a context manager yielding the job's thread count
+        (e.g. ThreadScheduler.job); without it the job may use every core
+    """
+
+    def __init__(self, job_id, directory, model, input_path, shard_rows=100_000, processes=None,
+                 output_format="npy", thread_slot=None):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'. Available: {list(OUTPUT_FORMATS)}")
+        if processes is not None and processes < 1:
+            raise ValueError(f"processes must be at least 1, got {processes}")
+        if shard_rows < 1:
+            raise ValueError(f"shard_rows must be at least 1, got {shard_rows}")
+        shape = prediction_input_shape(input_path)
+        self._check_features(model, shape)
+
+        self.job_id = job_id
+        self.directory = directory
+        self.input_path = input_path
+        self.output_format = output_format
+        self.output_path = os.path.join(directory, f"predictions.{output_format}")
+        self.rows_total = None if shape is None else int(shape[0])
+        self.n_targets = int(getattr(model, "n_targets_", None) or 1)
+        self.shards = None if shape is None else plan_shards(self.rows_total, shard_rows)
+        self.shard_rows = shard_rows
+        self.requested_processes = processes
+        self.processes = None
+        self.threads_per_process = None
+        self.thread_slot = thread_slot
+        self.state = "queued"
+        self.error = None
+        self.rows_done = 0
+        self.shards_done = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._model = model
+        self._cancel = threading.Event()
+        self._model_path = os.path.join(directory, "model.pkl")
+        self._input_npy = input_path if shape is not None else os.path.join(directory, "input.npy")
+
+        os.makedirs(directory, exist_ok=True)
+        self.save_status()
+
+    @staticmethod
+    def _check_features(model, shape):
+        n_features = getattr(model, "n_features_", None)
+        if shape is not None and n_features is not None and shape[1] != n_features:
+            raise ValueError(f"Expected {n_features} features, got {shape[1]}")
+
+    @staticmethod
+    def cancel_marker(directory):
+        """File whose presence asks the process running the job to stop (and delete it)."""
+        return os.path.join(directory, "cancel")
+
+    def cancel(self):
+        """Stop scheduling shards; the running ones finish and the partial output is removed."""
+        self._cancel.set()
+
+    def cancel_requested(self):
+        """Whether the job was cancelled here or, through its marker file, by another process."""
+        return self._cancel.is_set() or os.path.exists(self.cancel_marker(self.directory))
+
+    @property
+    def elapsed_seconds(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def status(self):
+        """State, progress, throughput and estimated time left of the job."""
+        elapsed = self.elapsed_seconds
+        rows_per_second = self.rows_done / elapsed if elapsed > 0 and self.rows_done else None
+        remaining = self.rows_total - self.rows_done if self.rows_total is not None else None
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "rows_total": self.rows_total,
+            "rows_done": self.rows_done,
+            "shards_total": None if self.shards is None else len(self.shards),
+            "shards_done": self.shards_done,
+            "progress": self.rows_done / self.rows_total if self.rows_total else 0.0,
+            "elapsed_seconds": elapsed,
+            "rows_per_second": rows_per_second,
+            "eta_seconds": remaining / rows_per_second if rows_per_second and self.state == "running" else None,
+            "shard_rows": self.shard_rows,
+            "processes": self.processes,
+            "threads_per_process": self.threads_per_process,
+            "output_format": self.output_format,
+            "n_targets": self.n_targets,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "worker_pid": os.getpid()}
+
+    def save_status(self):
+        """Write the status to the job directory, where every server process can read it."""
+        if os.path.isdir(self.directory):
+            _write_json_atomic(os.path.join(self.directory, "status.json"), self.status())
+
+    def run(self):
+        """Copy the model, prepare the input, score every shard (blocking) and leave the ordered output in output_path."""
+        with (self.thread_slot("inference") if self.thread_slot else nullcontext(os.cpu_count() or 1)) as threads:
+            self.state = "running"
+            self.started_at = time.time()
+            self.save_status()
+            try:
+                if not self.cancel_requested():
+                    self._prepare()
+                    self.processes = min(self.requested_processes or threads, len(self.shards))
+                    self.threads_per_process = max(1, threads // self.processes)
+                    self._run_pool()
+                self.state = "cancelled" if self.cancel_requested() else "completed"
+            except Exception as e:
+                self.state = "failed"
+                self.error = f"{type(e).__name__}: {e}"
+            finally:
+                self._model = None
+                self.finished_at = time.time()
+                self._cleanup()
+                self.save_status()
+
+    def _prepare(self):
+        with open(self._model_path, "wb") as f:
+            pickle.dump(self._model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.shards is None:
+            # Workers read their shards from a memory map, so a pickled input is stored as .npy once
+            X = open_prediction_input(self.input_path)
+            self._check_features(self._model, X.shape)
+            np.save(self._input_npy, X)
+            self.rows_total = int(X.shape[0])
+            self.shards = plan_shards(self.rows_total, self.shard_rows)
+            del X
+        self.save_status()
+
+    def _run_pool(self):
+        if self.output_format == "npy":
+            shape = (self.rows_total,) if self.n_targets == 1 else (self.rows_total, self.n_targets)
+            np.lib.format.open_memmap(self.output_path, mode="w+", dtype=np.float64, shape=shape).flush()
+        else:
+            header = "prediction" if self.n_targets == 1 else ",".join(f"prediction_{k}" for k in range(self.n_targets))
+            with open(self.output_path, "w") as f:
+                f.write(header + "\n")
+
+        finished_parts, next_part = set(), 0
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(self._model_path, self._input_npy, self.output_path, self.output_format,
+                                           self.threads_per_process)) as executor:
+            pending = {executor.submit(_score_shard, index, start, stop) for index, (start, stop) in enumerate(self.shards)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        index, rows, _ = future.result()
+                    except Exception:
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    finished_parts.add(index)
+                    self.rows_done += rows
+                    self.shards_done += 1
+                if self.output_format == "csv":
+                    next_part = self._append_parts(finished_parts, next_part)
+                self.save_status()
+                if self.cancel_requested():
+                    for future in pending:
+                        future.cancel()
+                    return
+
+    def _append_parts(self, finished_parts, next_part):
+        """Append the finished CSV parts that directly follow the ones already written."""
+        with open(self.output_path, "ab") as output:
+            while next_part in finished_parts:
+                part_path = _part_path(self.output_path, next_part)
+                with open(part_path, "rb") as part:
+                    shutil.copyfileobj(part, output)
+                os.remove(part_path)
+                next_part += 1
+        return next_part
+
+    def _cleanup(self):
+        """Remove everything but the status, the cancel marker and a completed output."""
+        if not os.path.isdir(self.directory):
+            return
+        keep = {"status.json", "cancel"}
+        if self.state == "completed":
+            keep.add(os.path.basename(self.output_path))
+        for name in os.listdir(self.directory):
+            if name not in keep:
+                os.remove(os.path.join(self.directory, name))
+
+
+class BatchPredictionManager:
+    """
+    Runs batch prediction jobs in background threads and keeps the most recent ones.
+
+    The jobs directory may be shared by several server processes: status(), list_jobs(),
+    output_path() and delete() work for the jobs of every process, from their files.
+
+    Parameters:
+    -----------
+    directory : str
+        Directory under which every job gets its own subdirectory
+    thread_slot : callable or None
+        Passed to every job (see BatchPredictionJob)
+    max_jobs : int
+        Finished jobs kept, with their output; older ones are deleted (default: 20)
+    on_finish : callable or None
+        Called with every job once it has finished, e.g. to record metrics
+
+    Example:
+    --------
+    >>> manager = BatchPredictionManager("batch_predictions")
+    >>> job = manager.submit(model, "big_input.npy", shard_rows=1_000_000)
+    >>> manager.status(job.job_id)["progress"]
+    """
+
+    def __init__(self, directory, thread_slot=None, max_jobs=20, on_finish=None):
+        self.directory = directory
+        self.thread_slot = thread_slot
+        self.max_jobs = max_jobs
+        self.on_finish = on_finish
+        self._jobs = {}     # jobs run by this process
+        self._threads = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _job_directory(self, job_id):
+        if not _JOB_ID_PATTERN.match(job_id):
+            raise KeyError(job_id)
+        return os.path.join(self.directory, job_id)
+
+    def submit(self, model, input_path, shard_rows=100_000, processes=None, output_format="npy"):
+        """Start scoring input_path with model in the background; returns the job."""
+        job_id = uuid.uuid4().hex
+        job = BatchPredictionJob(job_id, self._job_directory(job_id), model, input_path, shard_rows,
+                                 processes, output_format, self.thread_slot)
+        thread = threading.Thread(target=self._run, args=(job,), name=f"batch-predict-{job_id[:8]}", daemon=True)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._threads[job_id] = thread
+        thread.start()
+        self._evict()
+        return job
+
+    def _run(self, job):
+        job.run()
+        if self.on_finish is not None:
+            self.on_finish(job)
+        if os.path.exists(job.cancel_marker(job.directory)):
+            # Deleted by another process while it was running
+            shutil.rmtree(job.directory, ignore_errors=True)
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+        self._evict()
+
+    def _read_status(self, job_id):
+        directory = self._job_directory(job_id)
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.status()
+        try:
+            with open(os.path.join(directory, "status.json")) as f:
+                status = json.load(f)
+        except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
+            raise KeyError(job_id)
+        if status["state"] in FINISHED_STATES and os.path.exists(BatchPredictionJob.cancel_marker(directory)):
+            # Deleted from another process just as the job finished
+            shutil.rmtree(directory, ignore_errors=True)
+            raise KeyError(job_id)
+        if status["state"] not in FINISHED_STATES and not _process_alive(status["worker_pid"]):
+            status.update(state="failed", error="The server process running the job exited", eta_seconds=None)
+        return status
+
+    def status(self, job_id):
+        """Status of the job with job_id, run by any process sharing the directory (KeyError if unknown)."""
+        return self._read_status(job_id)
+
+    def output_path(self, job_id):
+        """Path of the job's output file (it only exists once the job has completed)."""
+        status = self._read_status(job_id)
+        return os.path.join(self._job_directory(job_id), f"predictions.{status['output_format']}")
+
+    def list_jobs(self):
+        """Status of every kept job, oldest first."""
+        statuses = []
+        for job_id in os.listdir(self.directory):
+            try:
+                statuses.append(self._read_status(job_id))
+            except KeyError:
+                continue
+        return sorted(statuses, key=lambda status: status["created_at"])
+
+    def _evict(self):
+        finished = [status for status in self.list_jobs() if status["state"] in FINISHED_STATES]
+        for status in finished[:max(0, len(finished) - self.max_jobs)]:
+            shutil.rmtree(self._job_directory(status["job_id"]), ignore_errors=True)
+            with self._lock:
+                self._threads.pop(status["job_id"], None)
+
+    def wait(self, job_id, timeout=None):
+        """Block until a job run by this process has finished; returns its status."""
+        with self._lock:
+            thread = self._threads.get(job_id)
+        if thread is not None:
+            thread.join(timeout)
+        return self._read_status(job_id)
+
+    def delete(self, job_id):
+        """
+        Delete the job and its output. A running job is cancelled first: here, the call waits
+        for it; in another process, that process removes the job once its running shards finish.
+        """
+        status = self._read_status(job_id)
+        directory = self._job_directory(job_id)
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+            self.wait(job_id)
+        elif status["state"] not in FINISHED_STATES:
+            open(BatchPredictionJob.cancel_marker(directory), "w").close()
+            return
+        shutil.rmtree(directory, ignore_errors=True)
+        with self._lock:
+            self._threads.pop(job_id, None)
@@ -4,5 +4,11 @@ Provides dataset loading and preprocessing functionality.
 """
 
 from .module import load_dataset
+from .stats import RunningStats
+from .streaming import ingest_dataset, load_manifest
+from .shards import ShardedDataset, PrefetchingLoader
+from .dataset_profile import profile_dataset
+from .dedup import collapse_duplicates
 
-__all__ = ['load_dataset']
+__all__ = ['load_dataset', 'RunningStats', 'ingest_dataset', 'load_manifest', 'ShardedDataset', 'PrefetchingLoader', 'profile_dataset',
+           'collapse_duplicates']
@@ -0,0 +1,194 @@
+"""
+Full profile of a dataset: per-column statistics, quantiles, NaN counts, duplicate rows
+and the distribution of the target.
+
+The rows are split into chunks that are summarised in parallel threads (the NumPy
+reductions release the GIL) and the partial results are merged: moments with
+RunningStats, quantiles from a uniform sample of bounded size, and duplicates from
+64-bit row hashes.
+
+Profiles are cached next to the dataset file they describe (see save_profile), so the
+work is done once per upload.
+"""
+
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .stats import RunningStats
+from ..thread_scheduler import current_job_threads
+
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def hash_rows(array):
+    """
+    64-bit hash of every row of a 2D float array (equal rows always get equal hashes).
+    -0.0 is hashed like 0.0 and every NaN alike, so rows comparing equal collide.
+    """
+    array = np.ascontiguousarray(array, dtype=np.float64)
+    array = np.where(np.isnan(array), np.nan, array + 0.0)  # canonical NaN, -0.0 -> 0.0
+    words = array.view(np.uint64).reshape(array.shape[0], -1)
+
+    h = np.full(array.shape[0], 0xCBF29CE484222325, dtype=np.uint64)
+    for column in range(words.shape[1]):
+        h ^= words[:, column]
+        h *= np.uint64(0x100000001B3)
+        h ^= h >> np.uint64(29)
+    h ^= h >> np.uint64(32)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return h
+
+
+def count_unique(hashes):
+    """Number of distinct values of a uint64 array (sorted in place)."""
+    if len(hashes) == 0:
+        return 0
+    hashes.sort()
+    return 1 + int(np.count_nonzero(hashes[1:] != hashes[:-1]))
+
+
+def _summarise_chunk(X, y, start, sample_rate, seed):
+    """Partial profile of rows [start, start + len(X))."""
+    columns = np.column_stack([X, y])
+    nan = np.isnan(columns)
+    stats = []
+    for j in range(columns.shape[1]):
+        values = columns[~nan[:, j], j]
+        stats.append((RunningStats(1).update(values), values.min(initial=np.inf), values.max(initial=-np.inf)))
+
+    # Uniform sample for the quantiles: the same rate in every chunk, so the union is uniform
+    rng = np.random.default_rng([seed, start])
+    sample = columns[rng.random(len(columns)) < sample_rate]
+
+    return {
+        "stats": stats,
+        "nan_counts": nan.sum(axis=0),
+        "nan_rows": int(nan.any(axis=1).sum()),
+        "sample": sample,
+        "x_hashes": hash_rows(X),
+        "row_hashes": hash_rows(columns)}
+
+
+def _column_profile(stats, minimum, maximum, nan_count, sample, quantiles):
+    values = sample[~np.isnan(sample)]
+    return {
+        "count": int(stats.count),
+        "nan_count": int(nan_count),
+        "min": float(minimum) if stats.count else None,
+        "max": float(maximum) if stats.count else None,
+        "mean": float(stats.mean[0]) if stats.count else None,
+        "std": float(stats.std[0]) if stats.count else None,
+        "quantiles": {f"p{round(q * 100):02d}": float(np.quantile(values, q)) for q in quantiles} if len(values) else {}}
+
+
+def profile_dataset(X, y, chunk_rows=500_000, n_jobs=None, sample_size=200_000, histogram_bins=20,
+                    quantiles=QUANTILES, seed=0):
+    """
+    Profile a dataset in parallel chunks.
+
+    Args:
+        X: Features (n_samples, n_features)
+        y: Targets (n_samples,) or (n_samples, n_targets)
+        chunk_rows: Rows per chunk (default: 500,000)
+        n_jobs: Worker threads (default: the thread allowance of the running scheduler job,
+            or the number of CPUs outside one)
+        sample_size: Expected size of the uniform sample the quantiles are computed from;
+            quantiles are exact when the dataset has fewer rows (default: 200,000)
+        histogram_bins: Bins of the target histograms (default: 20)
+        quantiles: Quantiles reported per column
+        seed: Seed of the quantile sample
+
+    Returns:
+        JSON-serialisable dictionary with 'features' (one entry per column), 'target'
+        (or 'targets', one entry per column, for a 2D y), NaN and duplicate counts
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n_samples = X.shape[0]
+    sample_rate = min(1.0, sample_size / max(n_samples, 1))
+    starts = range(0, n_samples, chunk_rows)
+
+    n_jobs = n_jobs or current_job_threads(os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        partials = list(executor.map(
+            lambda start: _summarise_chunk(X[start:start + chunk_rows], y[start:start + chunk_rows], start, sample_rate, seed),
+            starts))
+
+    n_features = X.shape[1]
+    n_columns = n_features + (y.shape[1] if y.ndim == 2 else 1)
+    stats = [RunningStats(1) for _ in range(n_columns)]
+    minimum, maximum = np.full(n_columns, np.inf), np.full(n_columns, -np.inf)
+    nan_counts = np.zeros(n_columns, dtype=np.int64)
+    for partial in partials:
+        for j, (column_stats, column_min, column_max) in enumerate(partial["stats"]):
+            stats[j].merge(column_stats)
+            minimum[j] = min(minimum[j], column_min)
+            maximum[j] = max(maximum[j], column_max)
+        nan_counts += partial["nan_counts"]
+    sample = np.concatenate([partial["sample"] for partial in partials]) if partials else np.empty((0, n_columns))
+
+    columns = [_column_profile(stats[j], minimum[j], maximum[j], nan_counts[j], sample[:, j], quantiles)
+               for j in range(n_columns)]
+
+    # Duplicates from row hashes (64-bit, so collisions are negligible)
+    if partials:
+        unique_x = count_unique(np.concatenate([partial.pop("x_hashes") for partial in partials]))
+        unique_rows = count_unique(np.concatenate([partial.pop("row_hashes") for partial in partials]))
+    else:
+        unique_x = unique_rows = 0
+
+    for j in range(n_features, n_columns):
+        y_values = sample[:, j][~np.isnan(sample[:, j])]
+        if len(y_values) and columns[j]["min"] is not None:
+            counts, edges = np.histogram(y_values, bins=histogram_bins, range=(columns[j]["min"], columns[j]["max"]))
+            # Scale the sample counts back to the full dataset
+            columns[j]["histogram"] = {"edges": edges.tolist(), "counts": (counts / sample_rate).round().astype(int).tolist()}
+    targets = {"target": columns[-1]} if y.ndim == 1 else {"targets": columns[n_features:]}
+
+    return {
+        "n_samples": int(n_samples),
+        "n_features": int(n_features),
+        "features": columns[:n_features],
+        **targets,
+        "nan_rows": int(sum(partial["nan_rows"] for partial in partials)),
+        "duplicate_rows": int(n_samples - unique_rows),
+        "duplicate_inputs": int(n_samples - unique_x),
+        "quantile_sample_size": int(len(sample)),
+        "chunks": len(partials)}
+
+
+def profile_cache_path(dataset_path):
+    """Where the profile of a dataset file is cached: next to it, as <file>.profile.json."""
+    return f"{dataset_path}.profile.json"
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return {"size_bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def save_profile(dataset_path, profile):
+    """Cache a profile next to its dataset, tagged with the file's size and modification time."""
+    path = profile_cache_path(dataset_path)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"dataset": _file_signature(dataset_path), "profile": profile}, f)
+    os.replace(tmp_path, path)
+
+
+def load_cached_profile(dataset_path):
+    """The cached profile of a dataset file, or None if there is none or the file has changed since."""
+    try:
+        with open(profile_cache_path(dataset_path)) as f:
+            cached = json.load(f)
+        if cached.get("dataset") != _file_signature(dataset_path):
+            return None
+        return cached["profile"]
+    except (OSError, ValueError, KeyError):
+        return None
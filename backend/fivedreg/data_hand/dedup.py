@@ -0,0 +1,101 @@
+"""
+Collapsing of duplicate and near-duplicate input points.
+
+Rows with the same inputs are grouped with 64-bit row hashes (see hash_rows) and replaced
+by a single row whose target is the mean of theirs. With a tolerance, the inputs are
+first snapped to a grid of that cell size (spatial hashing), so points falling in the same
+cell are merged as well and replaced by their centroid. Doing this before the
+train/validation/test split keeps copies of a point from ending up on both sides.
+"""
+
+import time
+
+import numpy as np
+
+from .dataset_profile import hash_rows
+
+
+def duplicate_groups(X, tolerance=0.0):
+    """
+    Group label of every row: rows with equal inputs (or inputs in the same grid cell of size
+    tolerance) share a label. Labels are numbered in order of first appearance.
+
+    Returns:
+        Tuple of (labels, n_groups)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n_samples = len(X)
+    if n_samples == 0:
+        return np.empty(0, dtype=np.int64), 0
+    if tolerance < 0:
+        raise ValueError(f"tolerance must be non-negative, got {tolerance}")
+    hashes = hash_rows(np.floor(X / tolerance) if tolerance > 0 else X)
+
+    # Sort the hashes (stable, so the first row of every run is its first occurrence)
+    order = np.argsort(hashes, kind="stable")
+    sorted_hashes = hashes[order]
+    starts = np.empty(n_samples, dtype=bool)
+    starts[0] = True
+    np.not_equal(sorted_hashes[1:], sorted_hashes[:-1], out=starts[1:])
+    run = np.cumsum(starts) - 1
+
+    # Renumber the runs by first occurrence
+    first = order[starts]
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind="stable")] = np.arange(len(first))
+    labels = np.empty(n_samples, dtype=np.int64)
+    labels[order] = rank[run]
+    return labels, len(first)
+
+
+def collapse_duplicates(X, y, tolerance=0.0):
+    """
+    Merge rows with duplicate (or, with a tolerance, nearby) inputs, averaging their targets.
+
+    Args:
+        X: Features (n_samples, n_features)
+        y: Targets (n_samples,) or (n_samples, n_targets)
+        tolerance: Cell size, in the units of X, of the grid the inputs are snapped to before
+            comparing them. 0 (default) merges exact duplicates only and keeps their inputs;
+            otherwise a merged row gets the mean inputs of its group. Points closer than the
+            tolerance but on either side of a cell boundary are not merged.
+
+    Returns:
+        Tuple of (X, y, report): new arrays in order of first appearance, and a dictionary
+        with the row counts, reduction ratio and largest group
+    """
+    start_time = time.perf_counter()
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    labels, n_groups = duplicate_groups(X, tolerance)
+    counts = np.bincount(labels, minlength=n_groups)
+
+    if n_groups == len(X):
+        X_out, y_out = X.copy(), y.copy()
+    else:
+        if y.ndim == 1:
+            y_out = np.bincount(labels, weights=y, minlength=n_groups) / counts
+        else:
+            y_out = np.column_stack([np.bincount(labels, weights=y[:, k], minlength=n_groups) / counts
+                                     for k in range(y.shape[1])])
+        if tolerance > 0:
+            X_out = np.empty((n_groups, X.shape[1]))
+            for j in range(X.shape[1]):
+                X_out[:, j] = np.bincount(labels, weights=X[:, j], minlength=n_groups) / counts
+        else:
+            # Exact duplicates: any member represents the group, take the first one. Labels
+            # are numbered by first appearance, so a first occurrence exceeds all earlier labels
+            first = np.empty(len(X), dtype=bool)
+            first[0] = True
+            np.greater(labels[1:], np.maximum.accumulate(labels)[:-1], out=first[1:])
+            X_out = X[first]
+
+    report = {
+        "tolerance": tolerance,
+        "rows_before": int(len(X)),
+        "rows_after": int(n_groups),
+        "rows_removed": int(len(X) - n_groups),
+        "reduction_ratio": float(len(X) / max(n_groups, 1)),
+        "largest_group": int(counts.max()) if n_groups else 0,
+        "seconds": time.perf_counter() - start_time}
+    return X_out, y_out, report
@@ -1,57 +1,145 @@
 import pickle
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
+from .stats import scaler_from_stats
+from .dedup import collapse_duplicates
 
 
-def load_dataset(filepath):
+def split_order(n_samples, test_size=0.2, val_size=0.25, random_state=42):
     """
-    This module helps in loading and preprocessing 5D datasets. It reads data from a pickle file,
+    One ordering of the rows that lists the train, then validation, then test split.
+
+    The splits contain exactly the rows, in the same order, that two chained calls to
+    sklearn's train_test_split (test_size, then val_size of the remainder) would select
+    with the same random_state; only a single index array is built instead of copies of
+    the data.
+
+    Returns:
+        Tuple of (order, n_train, n_val)
+    """
+    n_test = int(np.ceil(test_size * n_samples))
+    n_rest = n_samples - n_test
+    n_val = int(np.ceil(val_size * n_rest))
+    n_train = n_rest - n_val
+
+    permutation = np.random.RandomState(random_state).permutation(n_samples)
+    rest_permutation = np.random.RandomState(random_state).permutation(n_rest)
+    order = np.empty(n_samples, dtype=np.intp)
+    np.take(permutation[n_test:], rest_permutation[n_val:], out=order[:n_train])
+    np.take(permutation[n_test:], rest_permutation[:n_val], out=order[n_train:n_rest])
+    order[n_rest:] = permutation[:n_test]
+
+    return order, n_train, n_val
+
+
+def _reorder_column(column, order):
+    """Move the rows listed in order to the front of a column, in place (one column-sized temporary)."""
+    column[:len(order)] = column[order]
+
+
+def _standardize_column(column, n_train):
+    """
+    Standardize a column in place with the mean and variance of its first n_train rows.
+
+    Returns:
+        Tuple of (mean, variance) of the training rows
+    """
+    train = column[:n_train]
+    mean, var = train.mean(), train.var()
+    column -= mean
+    column /= scaler_from_stats([mean], [var], n_train).scale_[0]
+    return mean, var
+
+
+def _columns(array):
+    """Column views of a 1D (single column) or 2D array."""
+    return [array] if array.ndim == 1 else [array[:, j] for j in range(array.shape[1])]
+
+
+def load_dataset(filepath, dedup_tolerance=None, return_dedup_report=False):
+    """
+    This module helps in loading and preprocessing 5D datasets (any number of input dimensions d is accepted). It reads data from a pickle file,
     removes NaN values, splits the data into training, validation, and test sets, and standardizes the features and target variable.
 
+    y can hold one target (shape (n,)) or several (shape (n, k)); each target column is
+    standardized separately and scaler_y then has k features.
+
+    The splits are the same as sklearn's train_test_split (60/20/20, random_state=42), but
+    they are produced by reordering the loaded arrays in place, one column at a time, and
+    returned as views; standardization is also done in place. Peak memory stays close to
+    the size of the raw dataset instead of several copies of it.
+
+    With dedup_tolerance set (0 for exact duplicates only), rows with duplicate or nearby
+    inputs are collapsed into one, averaging their targets (see collapse_duplicates), before
+    the split, so that copies of a point cannot land in both the training and test sets.
+
     Returns:
-        Tuple of (X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y)
+        Tuple of (X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y), followed
+        by the deduplication report (None without dedup_tolerance) if return_dedup_report is True
 
         We can notice that it returns everything needed for training and evaluating a regression model.
     """
-    data_dict = pickle.load(open(filepath, "rb"))
+    with open(filepath, "rb") as f:
+        data_dict = pickle.load(f)
 
     # Validate input shape
-    if data_dict['X'].shape[1] != 5 or data_dict['y'].ndim != 1:
-        raise ValueError(f"Expected X with 5 features and 1D y, got X: {data_dict['X'].shape}, y: {data_dict['y'].shape}")
+    if data_dict['X'].ndim != 2 or data_dict['X'].shape[1] == 0 or data_dict['y'].ndim not in (1, 2):
+        raise ValueError(f"Expected 2D X with at least one feature and 1D or 2D y, got X: {data_dict['X'].shape}, y: {data_dict['y'].shape}")
 
-    X = data_dict['X']
-    y = data_dict['y']
+    # The arrays come straight from the file, so they can be modified in place unless
+    # they are read-only or not floating point
+    X = data_dict.pop('X')
+    y = data_dict.pop('y')
+    if not (np.issubdtype(X.dtype, np.floating) and X.flags.writeable):
+        X = np.array(X, dtype=np.float64)
+    if not (np.issubdtype(y.dtype, np.floating) and y.flags.writeable):
+        y = np.array(y, dtype=np.float64)
 
-    # Remove NaN values
-    valid_mask = ~(np.isnan(X).any(axis=1) | np.isnan(y))
-    X = X[valid_mask]
-    y = y[valid_mask]
+    # Remove NaN values (by index, without copying the data)
+    invalid = np.zeros(X.shape[0], dtype=bool)
+    for column in _columns(X) + _columns(y):
+        invalid |= np.isnan(column)
+    valid_idx = np.flatnonzero(~invalid) if invalid.any() else None
+    del invalid
 
-    print(f"Dataset: {X.shape[0]} samples, 5 features")
-    print(f"Target range: [{y.min():.4f}, {y.max():.4f}]")
+    # Optionally collapse duplicates (this builds new, smaller arrays)
+    dedup_report = None
+    if dedup_tolerance is not None:
+        if valid_idx is not None:
+            X, y = X[valid_idx], y[valid_idx]
+            valid_idx = None
+        X, y, dedup_report = collapse_duplicates(X, y, dedup_tolerance)
+        print(f"Deduplication: {dedup_report['rows_before']} -> {dedup_report['rows_after']} rows "
+              f"(x{dedup_report['reduction_ratio']:.2f}, tolerance {dedup_tolerance})")
+    n_samples = X.shape[0] if valid_idx is None else len(valid_idx)
+
+    # Split: 60% train, 20% val, 20% test, as one ordering of the rows
+    order, n_train, n_val = split_order(n_samples)
+    if valid_idx is not None:
+        np.take(valid_idx, order, out=order)
+        del valid_idx
 
-    # Split: 60% train, 20% val, 20% test
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
-    X_train, X_val, y_train, y_val = train_test_split(
-        X_train, y_train, test_size=0.25, random_state=42
-    )
+    # Reorder in place, column by column, then standardize the rows that are kept
+    for column in _columns(X) + _columns(y):
+        _reorder_column(column, order)
+    del order
+    X, y = X[:n_samples], y[:n_samples]
 
-    # Standardize
-    scaler_X = StandardScaler()
-    scaler_y = StandardScaler()
+    print(f"Dataset: {n_samples} samples, {X.shape[1]} features" + (f", {y.shape[1]} targets" if y.ndim == 2 else ""))
+    print(f"Target range: [{y.min():.4f}, {y.max():.4f}]")
 
-    X_train = scaler_X.fit_transform(X_train)
-    y_train = scaler_y.fit_transform(y_train.reshape(-1, 1)).flatten()
+    X_mean, X_var = np.empty(X.shape[1]), np.empty(X.shape[1])
+    for j in range(X.shape[1]):
+        X_mean[j], X_var[j] = _standardize_column(X[:, j], n_train)
+    y_stats = [_standardize_column(column, n_train) for column in _columns(y)]
 
-    X_val = scaler_X.transform(X_val)
-    y_val = scaler_y.transform(y_val.reshape(-1, 1)).flatten()
+    scaler_X = scaler_from_stats(X_mean, X_var, n_train)
+    scaler_y = scaler_from_stats([mean for mean, _ in y_stats], [var for _, var in y_stats], n_train)
 
-    X_test = scaler_X.transform(X_test)
-    y_test = scaler_y.transform(y_test.reshape(-1, 1)).flatten()
+    X_train, X_val, X_test = X[:n_train], X[n_train:n_train + n_val], X[n_train + n_val:]
+    y_train, y_val, y_test = y[:n_train], y[n_train:n_train + n_val], y[n_train + n_val:]
 
     print(f"Split: Train={len(X_train)}, Val={len(X_val)}, Test={len(X_test)}")
 
-    return X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y
\ No newline at end of file
+    if return_dedup_report:
+        return X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y, dedup_report
+    return X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y
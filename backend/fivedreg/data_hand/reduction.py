@@ -0,0 +1,161 @@
+"""
+Coverage-aware subsampling: reduce a training set to a row budget before fitting.
+
+The input space is cut into strata, either a regular grid over the range of every
+feature or k-means clusters, and the budget is spread over the occupied strata:
+part of it evenly (so sparse regions keep as many points as dense ones, which
+preserves coverage) and part in proportion to the spread of y in each stratum (so
+regions where the function varies most are oversampled). Rows are then drawn at
+random within each stratum.
+"""
+
+import time
+
+import numpy as np
+
+
+REDUCTION_METHODS = ("grid", "kmeans", "random")
+
+
+def grid_strata(X, n_strata):
+    """
+    Stratum of every row on a regular grid with about n_strata cells, spanning the range
+    of each feature (equal-width bins, so the cells cover the space rather than the density).
+    """
+    n_features = X.shape[1]
+    bins = max(2, int(round(n_strata ** (1.0 / n_features))))
+    labels = np.zeros(len(X), dtype=np.int64)
+    for j in range(n_features):
+        low, high = X[:, j].min(), X[:, j].max()
+        width = (high - low) / bins or 1.0
+        cell = ((X[:, j] - low) / width).astype(np.int64)
+        np.minimum(cell, bins - 1, out=cell)
+        if labels.max() > np.iinfo(np.int64).max // bins:
+            # Renumber the occupied cells so bins ** n_features cannot overflow in high dimensions
+            labels = np.unique(labels, return_inverse=True)[1].astype(np.int64).ravel()
+        labels *= bins
+        labels += cell
+    return labels
+
+
+def kmeans_strata(X, n_strata, seed=0, fit_rows=50_000, chunk_rows=500_000):
+    """
+    Stratum of every row as its nearest k-means centroid. The centroids are fitted with
+    MiniBatchKMeans on a random sample of at most fit_rows rows, then rows are assigned in chunks.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    rng = np.random.default_rng(seed)
+    sample = X[rng.choice(len(X), size=min(fit_rows, len(X)), replace=False)]
+    kmeans = MiniBatchKMeans(n_clusters=min(n_strata, len(sample)), random_state=seed, n_init=1).fit(sample)
+    return np.concatenate([kmeans.predict(X[start:start + chunk_rows]) for start in range(0, len(X), chunk_rows)])
+
+
+def allocate_budget(counts, weights, budget):
+    """
+    Integer number of rows to take from every stratum: proportional to weights, capped at
+    the stratum's size (the surplus of full strata goes to the others), summing to budget.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    budget = min(int(budget), int(counts.sum()))
+    quota = np.zeros(len(counts))
+    open_ = counts > 0
+
+    # Water filling: strata that cannot absorb their share are filled, the rest is re-spread
+    while open_.any():
+        remaining = budget - quota[~open_].sum()
+        share = weights * open_
+        share = share / share.sum() * remaining if share.sum() > 0 else open_ * remaining / open_.sum()
+        full = open_ & (share >= counts)
+        if not full.any():
+            quota[open_] = share[open_]
+            break
+        quota[full] = counts[full]
+        open_ &= ~full
+
+    allocation = np.floor(quota).astype(np.int64)
+    # Largest remainders take the rows lost to rounding
+    shortfall = budget - allocation.sum()
+    if shortfall > 0:
+        candidates = np.flatnonzero(allocation < counts)
+        order = candidates[np.argsort(-(quota - allocation)[candidates], kind="stable")]
+        allocation[order[:shortfall]] += 1
+    return allocation
+
+
+def coverage_subsample(X, y, budget, method="grid", n_strata=None, variation_weight=0.5, seed=0):
+    """
+    Select a coverage-preserving subset of at most budget rows.
+
+    Args:
+        X: Features (n_samples, n_features)
+        y: Targets (n_samples,) or (n_samples, n_targets)
+        budget: Number of rows to keep
+        method: 'grid' (regular grid over the feature ranges), 'kmeans' (clusters) or
+            'random' (uniform sample, as a baseline)
+        n_strata: Number of strata (default: budget // 8, at most 512 for k-means)
+        variation_weight: Share of the budget spread in proportion to the standard deviation
+            of y in each stratum (averaged over targets after normalising each); the rest is spread evenly over occupied strata (default: 0.5)
+        seed: Random seed
+
+    Returns:
+        Tuple of (indices, report): sorted row indices and a dictionary describing the reduction
+    """
+    if method not in REDUCTION_METHODS:
+        raise ValueError(f"Unknown reduction method '{method}'. Available: {list(REDUCTION_METHODS)}")
+    if budget < 1:
+        raise ValueError(f"budget must be at least 1, got {budget}")
+    if not 0.0 <= variation_weight <= 1.0:
+        raise ValueError(f"variation_weight must be between 0 and 1, got {variation_weight}")
+
+    start_time = time.perf_counter()
+    X = np.asarray(X)
+    y = np.asarray(y, dtype=np.float64)
+    n_samples = len(X)
+    rng = np.random.default_rng(seed)
+
+    if budget >= n_samples:
+        indices, n_occupied = np.arange(n_samples), None
+    elif method == "random":
+        indices, n_occupied = np.sort(rng.choice(n_samples, size=budget, replace=False)), None
+    else:
+        if n_strata is None:
+            n_strata = max(1, budget // 8)
+            if method == "kmeans":
+                n_strata = min(n_strata, 512)
+        labels = grid_strata(X, n_strata) if method == "grid" else kmeans_strata(X, n_strata, seed)
+        _, labels = np.unique(labels, return_inverse=True)
+        counts = np.bincount(labels)
+        n_occupied = len(counts)
+
+        # Spread of every target in every stratum, from per-stratum sums
+        spread = np.zeros(n_occupied)
+        targets = y.reshape(n_samples, -1)
+        for k in range(targets.shape[1]):
+            sums = np.bincount(labels, weights=targets[:, k], minlength=n_occupied)
+            squares = np.bincount(labels, weights=targets[:, k] ** 2, minlength=n_occupied)
+            target_spread = np.sqrt(np.maximum(squares / counts - (sums / counts) ** 2, 0.0))
+            if target_spread.sum() > 0:
+                spread += target_spread / target_spread.sum()
+        weights = (1.0 - variation_weight) / n_occupied
+        if spread.sum() > 0:
+            weights = weights + variation_weight * spread / spread.sum()
+        allocation = allocate_budget(counts, weights, budget)
+
+        # Random order within each stratum, then keep the first allocation[s] rows of stratum s
+        order = np.lexsort((rng.random(n_samples), labels))
+        sorted_labels = labels[order]
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        rank = np.arange(n_samples) - starts[sorted_labels]
+        indices = np.sort(order[rank < allocation[sorted_labels]])
+
+    report = {
+        "method": method,
+        "rows_before": int(n_samples),
+        "rows_after": int(len(indices)),
+        "reduction_ratio": float(n_samples / max(len(indices), 1)),
+        "strata": n_occupied,
+        "variation_weight": variation_weight,
+        "seconds": time.perf_counter() - start_time}
+    return indices, report
@@ -0,0 +1,168 @@
+"""
+On-disk training data: memory-mapped .npy shards and a prefetching minibatch loader.
+
+A ShardedDataset reads the shards written by ingest_dataset (see streaming.py). Only one
+shard at a time is copied out of its memory map, so the resident size stays bounded by
+the shard size whatever the size of the dataset. A PrefetchingLoader produces the shuffled
+minibatches in a background thread, ahead of the consumer, through a bounded queue.
+"""
+
+import os
+import queue
+import threading
+
+import numpy as np
+
+from .streaming import load_manifest, manifest_scalers
+
+
+class ShardedDataset:
+    """
+    One split (train, val or test) of an ingested dataset.
+
+    Parameters:
+    -----------
+    directory : str
+        Directory containing manifest.json and the shards
+    split : str
+        'train', 'val' or 'test' (default: 'train')
+
+    Example:
+    --------
+    >>> train = ShardedDataset("shards/", "train")
+    >>> for X_batch, y_batch in train.iter_batches(4096, seed=0):
+    ...     model.partial_fit(X_batch, y_batch)
+    """
+
+    def __init__(self, directory, split="train"):
+        self.directory = directory
+        self.split = split
+        self.manifest = load_manifest(directory)
+        if split not in self.manifest["splits"]:
+            raise ValueError(f"Unknown split '{split}'. Available: {sorted(self.manifest['splits'])}")
+        self.shards = self.manifest["splits"][split]["shards"]
+        self.n_samples = sum(shard["rows"] for shard in self.shards)
+        self.n_features = self.manifest["n_features"]
+
+    def __len__(self):
+        return self.n_samples
+
+    def scalers(self):
+        """(scaler_X, scaler_y) the shards were standardized with."""
+        return manifest_scalers(self.manifest)
+
+    def open_shard(self, index):
+        """Memory-mapped (X, y) arrays of one shard."""
+        shard = self.shards[index]
+        return (np.load(os.path.join(self.directory, shard["X"]), mmap_mode="r"),
+                np.load(os.path.join(self.directory, shard["y"]), mmap_mode="r"))
+
+    def iter_batches(self, batch_size=4096, shuffle=True, seed=None):
+        """
+        Yield in-memory (X, y) batches covering the split once.
+
+        With shuffle, shards are visited in random order and the rows of each shard are
+        permuted after it has been copied out of its memory map (ingestion already spread
+        rows randomly over shards, so this gives a well mixed order).
+        """
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self.shards)) if shuffle else range(len(self.shards))
+        for index in order:
+            X_map, y_map = self.open_shard(index)
+            X, y = np.array(X_map), np.array(y_map)
+            del X_map, y_map  # unmap the file so its pages stop counting towards RSS
+            if shuffle:
+                permutation = rng.permutation(len(X))
+                X, y = X[permutation], y[permutation]
+            for start in range(0, len(X), batch_size):
+                yield X[start:start + batch_size], y[start:start + batch_size]
+
+    def load(self):
+        """The whole split as in-memory arrays (only for splits that fit in memory)."""
+        batches = list(self.iter_batches(batch_size=max(self.n_samples, 1), shuffle=False))
+        if not batches:
+            return np.empty((0, self.n_features)), np.empty(0)
+        return np.concatenate([X for X, _ in batches]), np.concatenate([y for _, y in batches])
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+_END = object()
+
+
+class PrefetchingLoader:
+    """
+    Iterable over shuffled minibatches prepared by a background thread.
+
+    Each iteration is one epoch with a different shuffle. At most `prefetch` batches wait
+    in the queue, so memory stays bounded if the consumer is slower than the reader.
+    Stopping the iteration early also stops the thread.
+
+    Parameters:
+    -----------
+    dataset : ShardedDataset
+        Data to iterate over
+    batch_size : int
+        Rows per batch (default: 4096)
+    shuffle : bool
+        Shuffle shards and rows every epoch (default: True)
+    seed : int
+        Seed of the first epoch; epoch k uses seed + k (default: 42)
+    prefetch : int
+        Maximum number of batches prepared in advance (default: 4)
+    """
+
+    def __init__(self, dataset, batch_size=4096, shuffle=True, seed=42, prefetch=4):
+        if prefetch < 1:
+            raise ValueError(f"prefetch must be at least 1, got {prefetch}")
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.prefetch = prefetch
+        self.epoch = 0
+
+    def __len__(self):
+        return -(-len(self.dataset) // self.batch_size)
+
+    def __iter__(self):
+        batches = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        seed = None if self.seed is None else self.seed + self.epoch
+        self.epoch += 1
+
+        def put(item):
+            # Give up when the consumer has gone away instead of blocking forever
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for batch in self.dataset.iter_batches(self.batch_size, self.shuffle, seed):
+                    if not put(batch):
+                        return
+                put(_END)
+            except BaseException as e:
+                put(_Failure(e))
+
+        thread = threading.Thread(target=produce, name="shard-prefetcher", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+            thread.join()
@@ -0,0 +1,95 @@
+"""
+Running (streaming) statistics for datasets that are processed in chunks.
+"""
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+
+def scaler_from_stats(mean, var, n_samples):
+    """StandardScaler with the attributes fit() would set, from already computed statistics."""
+    scaler = StandardScaler()
+    scaler.mean_ = np.asarray(mean, dtype=np.float64)
+    scaler.var_ = np.asarray(var, dtype=np.float64)
+    # Constant features are left unscaled, as in StandardScaler
+    scale = np.sqrt(scaler.var_)
+    scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+    scaler.scale_ = scale
+    scaler.n_features_in_ = scaler.mean_.shape[0]
+    scaler.n_samples_seen_ = int(n_samples)
+    return scaler
+
+
+class RunningStats:
+    """
+    Per-column count, mean and variance accumulated chunk by chunk.
+
+    Each chunk is summarised with NumPy and folded in with the pairwise update of
+    Chan et al. (Welford's algorithm generalised to batches), which stays numerically
+    stable for long streams. Two RunningStats built on different parts of a dataset
+    (e.g. in different workers) can be merged the same way.
+
+    Example:
+    --------
+    >>> stats = RunningStats(5)
+    >>> for chunk in chunks:
+    ...     stats.update(chunk)
+    >>> stats.mean, stats.variance
+    """
+
+    def __init__(self, n_features):
+        self.n_features = n_features
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)  # sum of squared deviations from the mean
+
+    def _combine(self, count, mean, m2):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta**2 * (self.count * count / total)
+        self.count = total
+
+    def update(self, batch):
+        """Add the rows of a (n, n_features) batch (a 1D batch is a single column)."""
+        batch = np.asarray(batch, dtype=np.float64).reshape(len(batch), -1)
+        if batch.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} columns, got {batch.shape[1]}")
+        if len(batch) == 0:
+            return self
+        mean = batch.mean(axis=0)
+        self._combine(len(batch), mean, ((batch - mean)**2).sum(axis=0))
+        return self
+
+    def merge(self, other):
+        """Fold another RunningStats (over different rows of the same columns) into this one."""
+        if other.n_features != self.n_features:
+            raise ValueError(f"Cannot merge statistics of {other.n_features} and {self.n_features} columns")
+        self._combine(other.count, other.mean, other.m2)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance (ddof=0), as used by StandardScaler."""
+        return self.m2 / self.count if self.count else np.zeros(self.n_features)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def to_scaler(self):
+        """StandardScaler fitted with these statistics."""
+        return scaler_from_stats(self.mean, self.variance, self.count)
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean.tolist(), "variance": self.variance.tolist()}
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls(len(state["mean"]))
+        stats.count = state["count"]
+        stats.mean = np.asarray(state["mean"], dtype=np.float64)
+        stats.m2 = np.asarray(state["variance"], dtype=np.float64) * state["count"]
+        return stats
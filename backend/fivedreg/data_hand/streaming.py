@@ -0,0 +1,280 @@
+"""
+Streaming ingestion of datasets that are larger than memory.
+
+The source (CSV, Parquet or NPY) is read in chunks and never materialised as a whole:
+
+1. a first pass assigns every row to train/val/test with a hash of its row index and
+   accumulates the mean and variance of the training rows (RunningStats);
+2. a second pass standardises each chunk with those statistics and scatters its rows
+   over the shards of their split, again by hash, appending to temporary files;
+3. every temporary shard (bounded by shard_rows) is then shuffled in memory and written
+   as a pair of X/y .npy files.
+
+The result is described by a manifest.json in the output directory, which lists the
+shards of each split and the scaler statistics, so training can consume the shards
+one after the other.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+from .stats import RunningStats, scaler_from_stats
+
+
+SPLITS = ("train", "val", "test")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_uniform(row_index, seed=0):
+    """
+    Deterministic pseudo-random numbers in [0, 1) for an array of row indices (SplitMix64).
+    The same row always gets the same number for the same seed, whatever the chunking.
+    """
+    offset = np.uint64((0x9E3779B97F4A7C15 * (seed + 1)) % 2**64)
+    z = np.asarray(row_index, dtype=np.uint64) + offset
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+
+def assign_splits(row_index, fractions=(0.6, 0.2, 0.2), seed=42):
+    """Split of each row (0 = train, 1 = val, 2 = test) from a hash of its index."""
+    if len(fractions) != 3 or not math.isclose(sum(fractions), 1.0) or min(fractions) < 0:
+        raise ValueError(f"fractions must be three non-negative numbers summing to 1, got {fractions}")
+    bounds = np.cumsum(fractions)[:2]
+    return np.searchsorted(bounds, hash_uniform(row_index, seed), side="right").astype(np.int8)
+
+
+def _resolve_columns(columns, feature_columns, target_column):
+    """Positions of the feature and target columns; by default the last column is the target."""
+    columns = list(columns)
+
+    def position(column):
+        if isinstance(column, (int, np.integer)):
+            return int(column) % len(columns)
+        if column not in columns:
+            raise KeyError(f"Column '{column}' not found in {columns}")
+        return columns.index(column)
+
+    target = position(target_column) if target_column is not None else len(columns) - 1
+    if feature_columns is None:
+        features = [i for i in range(len(columns)) if i != target]
+    else:
+        features = [position(column) for column in feature_columns]
+    return features, target
+
+
+def iter_chunks(source, chunk_rows=100_000, feature_columns=None, target_column=None):
+    """
+    Yield (X, y) float64 chunks of at most chunk_rows rows from a CSV, Parquet or NPY file.
+
+    Columns are selected by name (CSV/Parquet) or position (NPY, or CSV/Parquet given
+    integers). By default the last column is the target and all others are features.
+    An NPY file must hold a 2D array; it is read chunk by chunk, not loaded.
+    """
+    extension = os.path.splitext(source)[1].lower()
+
+    if extension == ".npy":
+        with open(source, "rb") as f:
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+            if len(shape) != 2:
+                raise ValueError(f"Expected a 2D array in {source}, got shape {shape}")
+            features, target = _resolve_columns(range(shape[1]), feature_columns, target_column)
+            if fortran_order:
+                # Column-major data cannot be read row chunk by row chunk from the stream
+                array = np.load(source, mmap_mode="r")
+                blocks = (array[start:start + chunk_rows] for start in range(0, shape[0], chunk_rows))
+            else:
+                # Plain reads rather than a memory map, so the file's pages do not add up in RSS
+                blocks = (np.fromfile(f, dtype=dtype, count=min(chunk_rows, shape[0] - start) * shape[1]).reshape(-1, shape[1])
+                          for start in range(0, shape[0], chunk_rows))
+            for block in blocks:
+                block = np.asarray(block, dtype=np.float64)
+                yield block[:, features], block[:, target]
+
+    elif extension in (".csv", ".parquet", ".pq"):
+        if extension == ".csv":
+            import pandas as pd
+            frames = pd.read_csv(source, chunksize=chunk_rows)
+        else:
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Reading Parquet files requires pyarrow (pip install pyarrow)") from e
+            frames = (batch.to_pandas() for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows))
+
+        resolved = None
+        for frame in frames:
+            if resolved is None:
+                resolved = _resolve_columns(frame.columns, feature_columns, target_column)
+            block = frame.to_numpy(dtype=np.float64)
+            yield block[:, resolved[0]], block[:, resolved[1]]
+
+    else:
+        raise ValueError(f"Unsupported file type '{extension}': use .csv, .parquet or .npy")
+
+
+def _valid_rows(X, y):
+    return ~(np.isnan(X).any(axis=1) | np.isnan(y))
+
+
+def _write_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _remove_previous_shards(output_dir):
+    """Delete the shards of an earlier ingestion into the same directory."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return
+    for split in load_manifest(output_dir)["splits"].values():
+        for shard in split["shards"]:
+            for filename in (shard["X"], shard["y"]):
+                file_path = os.path.join(output_dir, filename)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+    os.remove(path)
+
+
+def ingest_dataset(source, output_dir, chunk_rows=100_000, shard_rows=100_000, fractions=(0.6, 0.2, 0.2),
+                   seed=42, feature_columns=None, target_column=None):
+    """
+    Stream a dataset from disk into standardized, shuffled train/val/test shards.
+
+    Memory use is bounded by chunk_rows and shard_rows, not by the size of the source.
+    Rows with NaN values are dropped. Features and target are standardized with the
+    mean and variance of the training rows.
+
+    Args:
+        source: Path to a .csv, .parquet or .npy file
+        output_dir: Directory receiving the shards and manifest.json
+        chunk_rows: Rows read from the source at a time
+        shard_rows: Target number of rows per shard
+        fractions: Train/val/test fractions (assigned per row by hash, so approximate)
+        seed: Seed of the split assignment and of the shuffling
+        feature_columns: Feature columns (names or positions), default all but the target
+        target_column: Target column (name or position), default the last column
+
+    Returns:
+        The manifest dictionary (also written to output_dir/manifest.json)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    _remove_previous_shards(output_dir)
+
+    def chunks():
+        return iter_chunks(source, chunk_rows, feature_columns, target_column)
+
+    # Pass 1: split assignment and training statistics
+    stats_X, stats_y = None, RunningStats(1)
+    counts = np.zeros(len(SPLITS), dtype=np.int64)
+    n_rows, n_dropped = 0, 0
+    for X, y in chunks():
+        if stats_X is None:
+            if X.shape[1] == 0:
+                raise ValueError("Expected at least one feature column")
+            stats_X = RunningStats(X.shape[1])
+        row_index = np.arange(n_rows, n_rows + len(X))
+        n_rows += len(X)
+
+        valid = _valid_rows(X, y)
+        n_dropped += int((~valid).sum())
+        labels = assign_splits(row_index[valid], fractions, seed)
+        counts += np.bincount(labels, minlength=len(SPLITS))
+        train = labels == 0
+        stats_X.update(X[valid][train])
+        stats_y.update(y[valid][train])
+
+    if stats_X is None or counts[0] == 0:
+        raise ValueError(f"No training rows could be read from {source}")
+
+    scaler_X, scaler_y = stats_X.to_scaler(), stats_y.to_scaler()
+    n_shards = [max(1, math.ceil(count / shard_rows)) for count in counts]
+
+    # Pass 2: standardize and scatter rows over temporary shard files
+    def part_path(split, shard):
+        return os.path.join(output_dir, f".{SPLITS[split]}_{shard:05d}.part")
+
+    n_rows = 0
+    for X, y in chunks():
+        row_index = np.arange(n_rows, n_rows + len(X))
+        n_rows += len(X)
+
+        valid = _valid_rows(X, y)
+        X, y, row_index = X[valid], y[valid], row_index[valid]
+        labels = assign_splits(row_index, fractions, seed)
+        rows = np.empty((len(X), X.shape[1] + 1))
+        rows[:, :-1] = (X - scaler_X.mean_) / scaler_X.scale_
+        rows[:, -1] = (y - scaler_y.mean_[0]) / scaler_y.scale_[0]
+
+        for split in range(len(SPLITS)):
+            in_split = labels == split
+            if not in_split.any():
+                continue
+            shard_of_row = (hash_uniform(row_index[in_split], seed + 1) * n_shards[split]).astype(np.int64)
+            split_rows = rows[in_split]
+            for shard in np.unique(shard_of_row):
+                with open(part_path(split, shard), "ab") as f:
+                    split_rows[shard_of_row == shard].tofile(f)
+
+    # Pass 3: shuffle each shard in memory and write it as X/y .npy files
+    rng = np.random.default_rng(seed)
+    splits = {}
+    for split, name in enumerate(SPLITS):
+        shards = []
+        for shard in range(n_shards[split]):
+            path = part_path(split, shard)
+            if not os.path.exists(path):
+                continue
+            rows = np.fromfile(path, dtype=np.float64).reshape(-1, stats_X.n_features + 1)
+            rows = rows[rng.permutation(len(rows))]
+            record = {"X": f"{name}_{shard:05d}_X.npy", "y": f"{name}_{shard:05d}_y.npy", "rows": len(rows)}
+            np.save(os.path.join(output_dir, record["X"]), np.ascontiguousarray(rows[:, :-1]))
+            np.save(os.path.join(output_dir, record["y"]), np.ascontiguousarray(rows[:, -1]))
+            os.remove(path)
+            shards.append(record)
+        splits[name] = {"rows": int(counts[split]), "shards": shards}
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "source": os.path.abspath(source),
+        "n_features": stats_X.n_features,
+        "rows_read": n_rows,
+        "rows_dropped": n_dropped,
+        "fractions": list(fractions),
+        "seed": seed,
+        "scaler_X": stats_X.to_dict(),
+        "scaler_y": stats_y.to_dict(),
+        "splits": splits}
+    _write_manifest(output_dir, manifest)
+
+    print(f"Ingested {n_rows} rows ({n_dropped} dropped) into {output_dir}: "
+          + ", ".join(f"{name}={splits[name]['rows']} in {len(splits[name]['shards'])} shards" for name in SPLITS))
+
+    return manifest
+
+
+def load_manifest(output_dir):
+    """Read the manifest.json written by ingest_dataset."""
+    with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {manifest.get('version')}")
+    return manifest
+
+
+def manifest_scalers(manifest):
+    """(scaler_X, scaler_y) fitted with the training statistics recorded in a manifest."""
+    return tuple(
+        scaler_from_stats(manifest[key]["mean"], manifest[key]["variance"], manifest[key]["count"])
+        for key in ("scaler_X", "scaler_y"))
@@ -0,0 +1,122 @@
+"""
+Knowledge distillation of a trained model (or an ensemble) into a smaller student network.
+
+The teacher labels dense synthetic points drawn uniformly inside the bounding box of the
+training inputs, and a small FastNeuralNetwork is trained to reproduce those labels. The
+teacher is queried as often as needed, so the student sees far more points than the
+original training set and learns the teacher's function rather than the noise in the data.
+
+The student's error against the teacher is then measured on fresh synthetic points, which
+gives the error bound that is kept with the student, along with the latency of both models.
+"""
+
+import time
+import warnings
+
+import numpy as np
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.metrics import r2_score
+
+from .timing import predict_rows_per_second, single_row_latency_ms
+
+
+class TeacherEnsemble:
+    """
+    Mean of the predictions of several trained models, used as one teacher.
+
+    All members must take the same number of features and predict the same number of targets.
+    """
+
+    engine = "ensemble"
+
+    def __init__(self, models):
+        models = list(models)
+        if not models:
+            raise ValueError("A teacher ensemble needs at least one model")
+        if len({model.n_features_ for model in models}) > 1 or len({model.n_targets_ for model in models}) > 1:
+            raise ValueError("Teacher models must take the same features and predict the same targets")
+        self.models = models
+        self.n_features_ = models[0].n_features_
+        self.n_targets_ = models[0].n_targets_
+
+    def predict(self, X):
+        """Average prediction of the members."""
+        return np.mean([model.predict(X) for model in self.models], axis=0)
+
+
+def sample_in_bounds(lower, upper, n_samples, seed=0):
+    """Points drawn uniformly inside the box [lower, upper] (one bound per feature)."""
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    return np.random.default_rng(seed).uniform(lower, upper, size=(n_samples, len(lower)))
+
+
+def distill(teacher, X_train, hidden_layers=(32, 16), n_synthetic=50_000, learning_rate=0.001, max_iterations=200,
+            n_check=20_000, X_test=None, y_test=None, seed=0):
+    """
+    Train a small student network on the teacher's predictions at synthetic points.
+
+    Args:
+        teacher: Trained model, or list of trained models averaged as a TeacherEnsemble
+        X_train: Training inputs of the teacher, whose per-feature bounds are sampled
+        hidden_layers: Architecture of the student (default: (32, 16))
+        n_synthetic: Synthetic points labelled by the teacher for training (default: 50,000)
+        learning_rate: Learning rate of the student (default: 0.001)
+        max_iterations: Maximum training iterations of the student (default: 200)
+        n_check: Fresh synthetic points the error bound is measured on (default: 20,000)
+        X_test, y_test: Optional test split both models are scored on
+        seed: Random seed of the synthetic points
+
+    Returns:
+        The fitted student FastNeuralNetwork; its distillation_ holds the error bound
+        (max, p99, mean absolute and RMS difference from the teacher on the check points),
+        the single-row latency and batch throughput of both models and, with a test split, both R² scores
+    """
+    from .base_fivedreg import FastNeuralNetwork
+
+    start_time = time.perf_counter()
+    if isinstance(teacher, (list, tuple)):
+        teacher = teacher[0] if len(teacher) == 1 else TeacherEnsemble(teacher)
+    X_train = np.asarray(X_train, dtype=float)
+    if X_train.ndim != 2 or X_train.shape[1] != teacher.n_features_:
+        raise ValueError(f"Expected X_train with {teacher.n_features_} features, got shape {X_train.shape}")
+    lower, upper = X_train.min(axis=0), X_train.max(axis=0)
+
+    X_synthetic = sample_in_bounds(lower, upper, n_synthetic, seed)
+    y_synthetic = teacher.predict(X_synthetic)
+
+    student = FastNeuralNetwork(hidden_layers=tuple(hidden_layers), learning_rate=learning_rate,
+                                max_iterations=max_iterations)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        student.fit(X_synthetic, y_synthetic)
+
+    # Error bound against the teacher on points neither model was fitted on
+    X_check = sample_in_bounds(lower, upper, n_check, seed + 1)
+    student_predictions, student_throughput = predict_rows_per_second(student, X_check)
+    teacher_predictions, teacher_throughput = predict_rows_per_second(teacher, X_check)
+    errors = np.abs(student_predictions - teacher_predictions)
+    teacher_latency, student_latency = single_row_latency_ms(teacher, X_check), single_row_latency_ms(student, X_check)
+
+    report = {
+        "teacher": getattr(teacher, "engine", type(teacher).__name__),
+        "teacher_models": len(teacher.models) if isinstance(teacher, TeacherEnsemble) else 1,
+        "student_hidden_layers": list(hidden_layers),
+        "n_synthetic": int(n_synthetic),
+        "bounds": {"lower": lower.tolist(), "upper": upper.tolist()},
+        "error_bound": {
+            "n_check": int(n_check),
+            "max_abs_error": float(errors.max()),
+            "p99_abs_error": float(np.quantile(errors, 0.99)),
+            "mean_abs_error": float(errors.mean()),
+            "rmse": float(np.sqrt(np.mean(errors ** 2)))},
+        "teacher_latency_ms": teacher_latency,
+        "student_latency_ms": student_latency,
+        "speedup": teacher_latency / student_latency,
+        "teacher_rows_per_second": teacher_throughput,
+        "student_rows_per_second": student_throughput,
+        "distill_seconds": time.perf_counter() - start_time}
+    if X_test is not None and y_test is not None:
+        report["teacher_r2"] = float(r2_score(y_test, teacher.predict(X_test)))
+        report["student_r2"] = float(r2_score(y_test, student.predict(X_test)))
+    student.distillation_ = report
+    return student
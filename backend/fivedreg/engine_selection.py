@@ -0,0 +1,181 @@
+"""
+Automatic choice of the interpolation engine from cheap probe fits.
+
+Every candidate (an engine and its parameters) is fitted on two small random subsets of
+the training rows and scored on a validation sample held out from both. The two probes
+give power laws that are extrapolated to the full training set size:
+
+- fit time t(n) = t2 * (n / n2) ** b, with b from the two probe times, but at least 0.75:
+  an epoch costs O(n), and only early stopping (fewer epochs on more rows) makes the
+  network's fit time grow more slowly than that;
+- validation error 1 - R²(n) = e2 * (n / n2) ** -a, the usual learning-curve decay,
+  with a from the two probe errors (between 0 and 1).
+
+The candidate is then picked against a time budget and/or an R² target: the cheapest one
+meeting both, otherwise the most accurate one within the budget, otherwise the fastest.
+"""
+
+import time
+import warnings
+
+import numpy as np
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.metrics import r2_score
+
+from .engines import make_engine
+
+# Below this many held-out rows the probe R² is too noisy (and with one row undefined) to
+# choose on, so the first candidate is used without probing
+MIN_VALIDATION_ROWS = 20
+
+
+def default_candidates(hidden_layers=(64, 32, 16), learning_rate=0.001, max_iterations=500, early_stopping=True):
+    """The candidates probed by default: the requested network, a smaller one, k-NN and local RBF."""
+    mlp = {"hidden_layers": tuple(hidden_layers), "learning_rate": learning_rate,
+           "max_iterations": max_iterations, "early_stopping": early_stopping}
+    candidates = [{"engine": "mlp", "params": mlp}]
+    if tuple(hidden_layers) != (32, 16):
+        candidates.append({"engine": "mlp", "params": {**mlp, "hidden_layers": (32, 16)}})
+    candidates.append({"engine": "knn", "params": {"n_neighbors": 8, "power": 2.0}})
+    candidates.append({"engine": "rbf", "params": {"neighbors": 32}})
+    return candidates
+
+
+def build_model(engine, params):
+    """An unfitted model of the given engine ('mlp', 'knn' or 'rbf') with its parameters."""
+    if engine == "mlp":
+        from .base_fivedreg import FastNeuralNetwork
+        return FastNeuralNetwork(verbose=False, **params)
+    return make_engine(engine, **params)
+
+
+def _probe(engine, params, X_fit, y_fit, X_val, y_val):
+    model = build_model(engine, params)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        start_time = time.perf_counter()
+        model.fit(X_fit, y_fit)
+        fit_seconds = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    y_pred = model.predict(X_val)
+    predict_seconds = time.perf_counter() - start_time
+    return {"rows": len(X_fit), "fit_seconds": fit_seconds, "predict_seconds": predict_seconds,
+            "r2": float(r2_score(y_val, y_pred))}
+
+
+def extrapolate(small, large, n_samples, min_seconds=1e-3, min_time_exponent=0.75):
+    """
+    Fit time and R² at n_samples rows from the probes at two sizes (see the module docstring).
+
+    Returns:
+        Tuple of (estimated_fit_seconds, estimated_r2)
+    """
+    size_ratio = large["rows"] / small["rows"]
+    scale = n_samples / large["rows"]
+    if size_ratio <= 1:
+        # Both probes on the same rows (tiny dataset): assume linear time and no accuracy gain
+        return large["fit_seconds"] * scale, large["r2"]
+
+    # Times below a millisecond are mostly noise; floor them so the exponent stays sensible
+    t_small, t_large = max(small["fit_seconds"], min_seconds), max(large["fit_seconds"], min_seconds)
+    time_exponent = max(min_time_exponent, np.log(t_large / t_small) / np.log(size_ratio))
+
+    e_small, e_large = max(1.0 - small["r2"], 1e-12), max(1.0 - large["r2"], 1e-12)
+    error_exponent = float(np.clip(np.log(e_small / e_large) / np.log(size_ratio), 0.0, 1.0))
+
+    return large["fit_seconds"] * scale ** time_exponent, 1.0 - e_large * scale ** -error_exponent
+
+
+def select_engine(X, y, candidates=None, time_budget=None, r2_target=None, probe_rows=4000, validation_rows=2000,
+                  seed=0):
+    """
+    Probe the candidate engines and choose the one to train on all of X, y.
+
+    Args:
+        X: Training features (n_samples, n_features)
+        y: Training targets (n_samples,) or (n_samples, n_targets)
+        candidates: List of {"engine": ..., "params": ...} (default: default_candidates())
+        time_budget: Maximum acceptable estimated fit time on all rows, in seconds (default: None)
+        r2_target: Minimum acceptable estimated validation R² (default: None)
+        probe_rows: Rows of the larger probe; the smaller one uses a quarter (default: 4000)
+        validation_rows: Rows held out to score the probes, at most a fifth of X (default: 2000)
+        seed: Random seed of the probe and validation samples
+
+    Returns:
+        Dictionary with the chosen 'engine' and 'params', the 'reason' for the choice and
+        one entry per candidate with its probes and estimates. If a fifth of X is fewer
+        than MIN_VALIDATION_ROWS rows, nothing is probed and the first candidate (the
+        requested network by default) is chosen.
+    """
+    if candidates is None:
+        candidates = default_candidates()
+    start_time = time.perf_counter()
+    X = np.asarray(X)
+    y = np.asarray(y)
+    n_samples = len(X)
+
+    n_val = min(validation_rows, n_samples // 5)
+    if n_val < MIN_VALIDATION_ROWS:
+        return {
+            "engine": candidates[0]["engine"],
+            "params": candidates[0]["params"],
+            "reason": f"too few rows to probe ({n_samples}, needs {5 * MIN_VALIDATION_ROWS} to hold out "
+                      f"{MIN_VALIDATION_ROWS} validation rows); first candidate",
+            "time_budget": time_budget,
+            "r2_target": r2_target,
+            "n_samples": int(n_samples),
+            "probe_sizes": [],
+            "validation_rows": int(max(n_val, 0)),
+            "selection_seconds": time.perf_counter() - start_time,
+            "candidates": []}
+
+    order = np.random.default_rng(seed).permutation(n_samples)
+    val, pool = order[:n_val], order[n_val:]
+    large = min(probe_rows, len(pool))
+    sizes = (max(large // 4, min(large, 50)), large)
+
+    results = []
+    for candidate in candidates:
+        probes = [_probe(candidate["engine"], candidate["params"], X[pool[:size]], y[pool[:size]], X[val], y[val])
+                  for size in sizes]
+        fit_seconds, r2 = extrapolate(probes[0], probes[1], n_samples)
+        results.append({
+            "engine": candidate["engine"],
+            "params": candidate["params"],
+            "probes": probes,
+            "estimated_fit_seconds": float(fit_seconds),
+            "estimated_r2": float(r2),
+            "predict_rows_per_second": n_val / max(probes[1]["predict_seconds"], 1e-9),
+            "meets_r2_target": r2_target is None or r2 >= r2_target,
+            "within_time_budget": time_budget is None or fit_seconds <= time_budget})
+
+    def cost(result):
+        return result["estimated_fit_seconds"]
+
+    def accuracy(result):
+        return (result["estimated_r2"], -result["estimated_fit_seconds"])
+
+    feasible = [result for result in results if result["meets_r2_target"] and result["within_time_budget"]]
+    within_budget = [result for result in results if result["within_time_budget"]]
+    if feasible and r2_target is not None:
+        choice, reason = min(feasible, key=cost), "cheapest engine meeting the R² target" + (
+            " within the time budget" if time_budget is not None else "")
+    elif within_budget:
+        choice = max(within_budget, key=accuracy)
+        reason = "most accurate engine" + (" within the time budget" if time_budget is not None else "")
+        if r2_target is not None:
+            reason += "; no engine is expected to meet the R² target"
+    else:
+        choice, reason = min(results, key=cost), "no engine is expected to fit in the time budget; fastest engine"
+
+    return {
+        "engine": choice["engine"],
+        "params": choice["params"],
+        "reason": reason,
+        "time_budget": time_budget,
+        "r2_target": r2_target,
+        "n_samples": int(n_samples),
+        "probe_sizes": [int(size) for size in sizes],
+        "validation_rows": int(n_val),
+        "selection_seconds": time.perf_counter() - start_time,
+        "candidates": results}
@@ -0,0 +1,322 @@
+"""
+Interpolation engines sharing the FastNeuralNetwork fit/predict/evaluate interface.
+
+Besides the neural network (engine 'mlp', see base_fivedreg.py) two non-parametric
+engines are available, which are often cheaper to fit and as accurate on small and
+medium datasets:
+
+- 'knn': k nearest neighbours from a scipy cKDTree, averaged with inverse-distance
+  weights. Fitting only builds the tree; a prediction costs one tree query per row.
+- 'rbf': local radial basis function interpolation (scipy RBFInterpolator with
+  neighbors=), which solves a small RBF system over the neighbours of every query point.
+  Exact at the training points without smoothing, and smooth in between.
+
+Both engines take standardized inputs, like the neural network, and support 1D and 2D y.
+"""
+
+import time
+
+import numpy as np
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+from .thread_scheduler import current_job_threads
+
+
+class InterpolatorEngine:
+    """
+    Base class of the interpolation engines: evaluation and the attributes the API reads.
+
+    Subclasses implement fit(X, y) and predict(X) and set training_time_, n_targets_ and
+    n_features_ when fitted.
+    """
+
+    engine = None
+    backend = "sklearn"
+
+    def evaluate(self, X, y, dataset_name="Test"):
+        """
+        Evaluate the model with regression metrics.
+
+        Args:
+            X: Features
+            y: True targets
+            dataset_name: Name for printing (default: "Test")
+
+        Returns:
+            Dictionary with MAE, MSE, RMSE, and R² score (averaged over targets for a
+            multi-target model, which also gets one r2_target_<k> entry per target)
+        """
+        y_pred = self.predict(X)
+
+        # Calculate metrics
+        mse = mean_squared_error(y, y_pred)
+        mae = mean_absolute_error(y, y_pred)
+        rmse = np.sqrt(mse)
+        r2 = r2_score(y, y_pred)
+
+        metrics = {
+            'mse': mse,
+            'mae': mae,
+            'rmse': rmse,
+            'r2': r2
+        }
+        if np.ndim(y) == 2 and np.shape(y)[1] > 1:
+            for k, r2_k in enumerate(r2_score(y, y_pred, multioutput='raw_values')):
+                metrics[f'r2_target_{k}'] = r2_k
+
+        if self.verbose:
+            print(f"\n{dataset_name} Set Evaluation:")
+            print(f"  MAE:  {mae:.6f}")
+            print(f"  RMSE: {rmse:.6f}")
+            print(f"  R²:   {r2:.6f}")
+
+        return metrics
+
+
+class _NeighbourEngine(InterpolatorEngine):
+    """Bookkeeping shared by the engines that store the training points."""
+
+    backend = "scipy"
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.profiles_ = {}
+        self.training_time_ = None
+        self.n_iterations_ = None  # no iterative training
+        self.n_targets_ = None
+        self.n_features_ = None
+        self.reduction_ = None
+        self.dedup_ = None
+        self.selection_ = None
+        self.quantization_ = None
+        self.pruning_ = None
+
+    def _check_fit_data(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if X.ndim != 2 or y.ndim not in (1, 2) or len(X) != len(y) or len(X) == 0:
+            raise ValueError(f"Expected non-empty 2D X and 1D or 2D y with as many rows, got {X.shape} and {y.shape}")
+        self.n_features_ = X.shape[1]
+        self.n_targets_ = 1 if y.ndim == 1 else y.shape[1]
+        return X, y
+
+    def _check_predict_data(self, X):
+        if self.n_features_ is None:
+            raise ValueError(f"This {type(self).__name__} is not fitted yet")
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_:
+            raise ValueError(f"Expected X with {self.n_features_} features, got shape {X.shape}")
+        return X
+
+
+class KNNInterpolator(_NeighbourEngine):
+    """
+    k-nearest-neighbour interpolation with inverse-distance weighting over a cKDTree.
+
+    The prediction at x is sum_i w_i y_i / sum_i w_i over the k nearest training points,
+    with w_i = 1 / d(x, x_i) ** power. A query that coincides with training points gets
+    the mean of their targets.
+
+    Parameters:
+    -----------
+    n_neighbors : int
+        Number of neighbours averaged per prediction (default: 8)
+    power : float
+        Exponent of the inverse-distance weights; 0 gives the plain k-NN mean (default: 2.0)
+    leafsize : int
+        Leaf size of the KD-tree (default: 16)
+    workers : int or None
+        Threads used by the tree queries, -1 for all CPUs; None for the thread allowance of
+        the running scheduler job, or all CPUs outside one (default: None)
+    chunk_rows : int
+        Rows queried at a time, which bounds the memory of the neighbour arrays (default: 65,536)
+    verbose : bool
+        Print evaluation results (default: False)
+
+    Example:
+    --------
+    >>> model = KNNInterpolator(n_neighbors=8)
+    >>> model.fit(X_train, y_train)
+    >>> predictions = model.predict(X_test)
+    """
+
+    engine = "knn"
+
+    def __init__(self, n_neighbors=8, power=2.0, leafsize=16, workers=None, chunk_rows=65_536, verbose=False):
+        if n_neighbors < 1:
+            raise ValueError(f"n_neighbors must be at least 1, got {n_neighbors}")
+        if power < 0:
+            raise ValueError(f"power must be non-negative, got {power}")
+        super().__init__(verbose)
+        self.n_neighbors = n_neighbors
+        self.power = power
+        self.leafsize = leafsize
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+
+    def fit(self, X_train, y_train):
+        """
+        Build the KD-tree over the training points.
+
+        Args:
+            X_train: Training features (n_samples, n_features)
+            y_train: Training targets (n_samples,) or (n_samples, n_targets)
+
+        Returns:
+            self
+        """
+        from scipy.spatial import cKDTree
+
+        start_time = time.time()
+        X_train, y_train = self._check_fit_data(X_train, y_train)
+        self.tree_ = cKDTree(X_train, leafsize=self.leafsize)
+        self.y_ = y_train
+        self.training_time_ = time.time() - start_time
+        return self
+
+    def predict(self, X):
+        """
+        Inverse-distance weighted mean of the targets of the nearest training points.
+
+        Args:
+            X: Features to predict (n_samples, n_features)
+
+        Returns:
+            Predictions (n_samples,), or (n_samples, n_targets) for a multi-target model
+        """
+        X = self._check_predict_data(X)
+        k = min(self.n_neighbors, len(self.y_))
+        workers = current_job_threads(-1) if self.workers is None else self.workers
+        predictions = np.empty((len(X),) + self.y_.shape[1:])
+        for start in range(0, len(X), self.chunk_rows):
+            distances, indices = self.tree_.query(X[start:start + self.chunk_rows], k=k, workers=workers)
+            distances, indices = distances.reshape(len(distances), k), indices.reshape(len(indices), k)
+            with np.errstate(divide="ignore"):
+                weights = distances ** -self.power if self.power else np.ones_like(distances)
+            # Queries on a training point: only the points at distance 0 count
+            exact = np.isinf(weights)
+            hit_rows = exact.any(axis=1)
+            weights[hit_rows] = exact[hit_rows]
+            weights /= weights.sum(axis=1, keepdims=True)
+            predictions[start:start + self.chunk_rows] = np.einsum("nk,nk...->n...", weights, self.y_[indices])
+        return predictions
+
+    def get_params(self):
+        """Get model configuration."""
+        return {
+            'engine': self.engine,
+            'n_neighbors': self.n_neighbors,
+            'power': self.power,
+            'training_time': self.training_time_,
+            'n_features': self.n_features_,
+            'n_targets': self.n_targets_
+        }
+
+
+class LocalRBFInterpolator(_NeighbourEngine):
+    """
+    Local radial basis function interpolation (scipy.interpolate.RBFInterpolator).
+
+    Every prediction solves an RBF system over its `neighbors` nearest training points, so
+    the cost grows with the number of query points rather than cubically with the
+    training set as for a global RBF fit.
+
+    Parameters:
+    -----------
+    neighbors : int
+        Training points used per query (default: 32)
+    kernel : str
+        RBF kernel, e.g. 'thin_plate_spline', 'cubic', 'quintic', 'linear', 'gaussian'
+        or 'multiquadric' (default: 'thin_plate_spline')
+    smoothing : float
+        Smoothing parameter; 0 interpolates the training points exactly (default: 0.0)
+    epsilon : float
+        Shape parameter of the kernel, in standardized units (default: 1.0)
+    degree : int
+        Degree of the added polynomial (default: None, the kernel's minimum degree)
+    chunk_rows : int
+        Rows predicted at a time (default: 65,536)
+    verbose : bool
+        Print evaluation results (default: False)
+    """
+
+    engine = "rbf"
+    KERNELS = ("thin_plate_spline", "cubic", "quintic", "linear", "gaussian", "multiquadric",
+               "inverse_multiquadric", "inverse_quadratic")
+
+    def __init__(self, neighbors=32, kernel="thin_plate_spline", smoothing=0.0, epsilon=1.0, degree=None,
+                 chunk_rows=65_536, verbose=False):
+        if kernel not in self.KERNELS:
+            raise ValueError(f"Unknown kernel '{kernel}'. Available: {list(self.KERNELS)}")
+        if neighbors < 1:
+            raise ValueError(f"neighbors must be at least 1, got {neighbors}")
+        super().__init__(verbose)
+        self.neighbors = neighbors
+        self.kernel = kernel
+        self.smoothing = smoothing
+        self.epsilon = epsilon
+        self.degree = degree
+        self.chunk_rows = chunk_rows
+
+    def fit(self, X_train, y_train):
+        """
+        Build the RBF interpolator (a KD-tree over the training points; the local systems
+        are solved at prediction time).
+
+        Args:
+            X_train: Training features (n_samples, n_features)
+            y_train: Training targets (n_samples,) or (n_samples, n_targets)
+
+        Returns:
+            self
+        """
+        from scipy.interpolate import RBFInterpolator
+
+        start_time = time.time()
+        X_train, y_train = self._check_fit_data(X_train, y_train)
+        self.interpolator_ = RBFInterpolator(
+            X_train, y_train, neighbors=min(self.neighbors, len(X_train)), kernel=self.kernel,
+            smoothing=self.smoothing, epsilon=self.epsilon, degree=self.degree)
+        self.training_time_ = time.time() - start_time
+        return self
+
+    def predict(self, X):
+        """
+        Evaluate the local RBF interpolant.
+
+        Args:
+            X: Features to predict (n_samples, n_features)
+
+        Returns:
+            Predictions (n_samples,), or (n_samples, n_targets) for a multi-target model
+        """
+        X = self._check_predict_data(X)
+        if len(X) <= self.chunk_rows:
+            return self.interpolator_(X)
+        return np.concatenate([self.interpolator_(X[start:start + self.chunk_rows])
+                               for start in range(0, len(X), self.chunk_rows)])
+
+    def get_params(self):
+        """Get model configuration."""
+        return {
+            'engine': self.engine,
+            'neighbors': self.neighbors,
+            'kernel': self.kernel,
+            'smoothing': self.smoothing,
+            'epsilon': self.epsilon,
+            'training_time': self.training_time_,
+            'n_features': self.n_features_,
+            'n_targets': self.n_targets_
+        }
+
+
+# Non-neural engines by name; 'mlp' (FastNeuralNetwork) is built by benchmark_training_speed
+ENGINES = {"knn": KNNInterpolator, "rbf": LocalRBFInterpolator}
+ENGINE_NAMES = ("mlp",) + tuple(ENGINES)
+
+
+def make_engine(name, **params):
+    """Build a non-neural engine by name ('knn' or 'rbf') with its parameters."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}'. Available: {list(ENGINES)}")
+    return ENGINES[name](**params)
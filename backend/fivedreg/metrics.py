@@ -0,0 +1,251 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Instrumentation sits on the request hot path, so updates never take a shared lock:
+every thread writes to its own shard (registered once, the first time the thread
+records a value) and the shards are only merged when the registry is scraped.
+Gauges are single reference assignments, and values that are cheap to read on
+demand (process RSS/CPU, model registry statistics) come from collector callbacks
+evaluated at scrape time.
+"""
+
+import bisect
+import os
+import resource
+import threading
+import time
+
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    """Order-independent, hashable representation of a label set."""
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + list(extra or [])
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in items)
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _ThreadShards:
+    """Per-thread storage: a thread only ever mutates its own shard, the scraper reads them all."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def local(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._lock:  # once per thread
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def all(self):
+        with self._lock:
+            shards = list(self._shards)
+        # dict() copies in a single C call, so a concurrent writer cannot break the iteration
+        return [dict(shard) for shard in shards]
+
+
+class Counter:
+    """Monotonically increasing value, optionally labelled."""
+
+    type_name = "counter"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._shards = _ThreadShards()
+
+    def inc(self, amount=1.0, **labels):
+        shard = self._shards.local()
+        key = _label_key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def values(self):
+        """Merged values per label set."""
+        merged = {}
+        for shard in self._shards.all():
+            for key, value in shard.items():
+                merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+    def value(self, **labels):
+        return self.values().get(_label_key(labels), 0.0)
+
+    def render(self):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in sorted(self.values().items())]
+
+
+class Histogram:
+    """Distribution of observations in cumulative buckets, optionally labelled."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _ThreadShards()
+
+    def observe(self, value, **labels):
+        shard = self._shards.local()
+        key = _label_key(labels)
+        state = shard.get(key)
+        if state is None:
+            # [per-bucket counts (last one is +Inf), sum]
+            state = shard[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def snapshot(self):
+        """Merged (bucket counts, sum, count) per label set."""
+        merged = {}
+        for shard in self._shards.all():
+            for key, (counts, total) in shard.items():
+                counts = list(counts)
+                if key in merged:
+                    merged_counts, merged_total = merged[key]
+                    merged[key] = ([a + b for a, b in zip(merged_counts, counts)], merged_total + total)
+                else:
+                    merged[key] = (counts, total)
+        return {key: (counts, total, sum(counts)) for key, (counts, total) in merged.items()}
+
+    def render(self):
+        lines = []
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down; setting it is a single assignment."""
+
+    type_name = "gauge"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+
+    def set(self, value, **labels):
+        self._values[_label_key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels))
+
+    def render(self):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"
+                for key, value in sorted(dict(self._values).items()) if value is not None]
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+
+    Example:
+    --------
+    >>> registry = MetricsRegistry()
+    >>> requests = registry.counter("http_requests_total", "HTTP requests")
+    >>> requests.inc(endpoint="/health", status="200")
+    >>> print(registry.render())
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation):
+        return self._register(Counter(name, documentation))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, buckets))
+
+    def gauge(self, name, documentation):
+        return self._register(Gauge(name, documentation))
+
+    def add_collector(self, collector):
+        """
+        Register a callable evaluated at scrape time. It returns an iterable of
+        (name, type, documentation, value) tuples, or (name, type, documentation, {labels: value}).
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+
+        for collector in collectors:
+            for name, type_name, documentation, value in collector():
+                if value is None:
+                    continue
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                if isinstance(value, dict):
+                    for labels, labelled_value in sorted(value.items()):
+                        lines.append(f"{name}{_format_labels(_label_key(dict(labels)))} {_format_value(labelled_value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def process_resident_memory_bytes():
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+
+
+_PROCESS_START_TIME = time.time()
+
+
+def process_collector():
+    """Collector for process RSS, CPU time, threads and start time."""
+    times = os.times()
+    return [
+        ("process_resident_memory_bytes", "gauge", "Resident memory size in bytes.", process_resident_memory_bytes()),
+        ("process_cpu_seconds_total", "counter", "Total user and system CPU time spent in seconds.", times.user + times.system),
+        ("process_threads", "gauge", "Number of Python threads.", threading.active_count()),
+        ("process_start_time_seconds", "gauge", "Start time of the process since unix epoch in seconds.", _PROCESS_START_TIME)]
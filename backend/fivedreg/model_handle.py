@@ -0,0 +1,561 @@
+"""
+Versioned model handle with atomic hot-swap and optional shadow (canary) evaluation.
+
+Training never touches the model that is serving: a new model is built and validated
+on its holdout split first, and only then published by a single reference swap. Request
+handlers take one snapshot of the handle and use it for the whole request, so they never
+see a half-updated state.
+
+A new model can also be staged as a candidate: it keeps running in the shadow of the live
+model on a fraction of prediction traffic, and the latency and prediction deltas between
+the two are accumulated until the candidate is promoted or discarded. The candidate is
+scored on a background thread, so shadowing never adds latency to the live request.
+
+Given a ModelRegistry, the handle is shared by every worker process that uses the same
+directory. Each version is stored there as a registry model ('v<version>'), and a state
+file records which versions are live and in shadow. Before every use, a process compares
+the state file's (inode, modification time) with the state it serves, as ModelRegistry
+does with its artifacts, and loads the versions another process has published. Changes
+of the state are serialised between processes by a file lock. Every process writes its
+own shadow statistics next to the state, and the shadow report sums them.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: state changes are only serialised between threads of one process
+    fcntl = None
+
+# Shadow samples are dropped rather than queued once this many are waiting to be scored
+MAX_PENDING_SHADOW_REQUESTS = 8
+
+# Files of the shared state in the registry directory. They start with '_', which is not a
+# valid model id, so the registry never mistakes them for models
+STATE_FILE = "_handle.json"
+LOCK_FILE = "_handle.lock"
+SHADOW_STATS_PREFIX = "_shadow-"
+VERSION_ID_PATTERN = re.compile(r"^v(\d+)$")
+
+
+class ModelValidationError(ValueError):
+    """Raised when a newly trained model does not pass holdout validation."""
+
+
+class ModelVersion:
+    """
+    Immutable snapshot of a published model.
+
+    Attributes:
+        model: The trained model (anything with a predict method)
+        version: Monotonically increasing version number
+        metrics: Holdout metrics of the model (mse, mae, rmse, r2)
+        info: Extra information recorded at publish time (e.g. hyperparameters)
+        created_at: Publication timestamp
+    """
+
+    __slots__ = ("model", "version", "metrics", "info", "created_at")
+
+    def __init__(self, model, version, metrics, info=None, created_at=None):
+        self.model = model
+        self.version = version
+        self.metrics = dict(metrics or {})
+        self.info = dict(info or {})
+        self.created_at = time.time() if created_at is None else created_at
+
+    def describe(self):
+        """JSON-friendly description of this version (without the model itself)."""
+        return {
+            "version": self.version,
+            "metrics": {name: float(value) for name, value in self.metrics.items()},
+            "info": self.info,
+            "created_at": self.created_at}
+
+
+def validate_holdout_metrics(metrics, min_r2=None):
+    """
+    Check holdout metrics before a model is allowed to serve.
+
+    Args:
+        metrics: Dictionary with at least 'r2' and 'mse' computed on the holdout split
+        min_r2: Optional minimum R² score required on the holdout split
+
+    Raises:
+        ModelValidationError: If the metrics are not finite or the R² is below min_r2
+    """
+    for name in ("mse", "r2"):
+        if name not in metrics or not np.isfinite(metrics[name]):
+            raise ModelValidationError(f"Holdout metric '{name}' is missing or not finite: {metrics.get(name)}")
+    if min_r2 is not None and metrics["r2"] < min_r2:
+        raise ModelValidationError(f"Holdout R² {metrics['r2']:.4f} is below the required minimum {min_r2:.4f}")
+
+
+class ModelHandle:
+    """
+    Holds the live model (and an optional shadow candidate) behind atomic reference swaps.
+
+    Parameters:
+    -----------
+    registry : ModelRegistry, optional
+        Registry whose directory holds the versions and the shared state, for sharing the
+        handle between worker processes (default: None, the handle lives in this process)
+    on_load : callable, optional
+        Called with every model loaded from the registry (published by another process)
+
+    Example:
+    --------
+    >>> handle = ModelHandle(ModelRegistry("model_artifacts/live"))
+    >>> handle.publish(model, metrics, min_r2=0.9)
+    >>> live = handle.current          # one snapshot per request
+    >>> live.model.predict(X)
+    """
+
+    def __init__(self, registry=None, on_load=None):
+        self._lock = threading.Lock()
+        self._current = None
+        self._candidate = None
+        self._shadow_fraction = 0.0
+        self._next_version = 1
+        self._shadow_executor = None
+        self._pending_shadow = set()
+        self._reset_shadow_stats()
+
+        self._registry = registry
+        self._on_load = on_load
+        self._sync_lock = threading.Lock()    # one thread loads a new shared state at a time
+        self._state_lock = threading.Lock()   # threads of this process take the file lock in turn
+        self._state_signature = None          # (inode, mtime) of the state file the fields match
+        self._stats_path = None
+        if registry is not None:
+            self._stats_path = self._path(f"{SHADOW_STATS_PREFIX}{uuid.uuid4().hex}.json")
+            self._sync(wait=True)
+
+    @property
+    def current(self):
+        """The live ModelVersion, or None if no model has been published."""
+        self._sync()
+        return self._current
+
+    @property
+    def candidate(self):
+        """The shadow candidate ModelVersion, or None."""
+        self._sync()
+        return self._candidate
+
+    # Shared state ----------------------------------------------------------------------
+
+    def _path(self, name):
+        return os.path.join(self._registry.artifact_dir, name)
+
+    def _state_file_signature(self):
+        try:
+            stat = os.stat(self._path(STATE_FILE))
+        except FileNotFoundError:
+            return None
+        # The state is replaced by rename, so a new state always has a new inode
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _read_state(self):
+        state = {"live": None, "candidate": None, "shadow_fraction": 0.0, "next_version": 1, "pending": []}
+        try:
+            with open(self._path(STATE_FILE)) as f:
+                state.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        return state
+
+    @staticmethod
+    def _write_json_atomic(path, payload):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked_state(self):
+        """Exclusive access to the shared state, across threads and worker processes."""
+        with self._state_lock:
+            with open(self._path(LOCK_FILE), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                yield
+
+    def _load_version(self, record, known):
+        if record is None:
+            return None
+        for version in known:
+            if version is not None and version.version == record["version"]:
+                return version
+        model = self._registry.get(f"v{record['version']}")
+        if self._on_load is not None:
+            self._on_load(model)
+        return ModelVersion(model, record["version"], record["metrics"], record["info"],
+                            created_at=record["created_at"])
+
+    def _apply_state(self, state, signature, known=()):
+        """Serve the live and candidate versions of a shared state, loading the new ones."""
+        known = (self._current, self._candidate) + tuple(known)
+        live = self._load_version(state["live"], known)
+        candidate = self._load_version(state["candidate"], known)
+        with self._lock:
+            if (candidate and candidate.version) != (self._candidate and self._candidate.version):
+                self._reset_shadow_stats()
+            self._current, self._candidate = live, candidate
+            self._shadow_fraction = state["shadow_fraction"]
+            self._state_signature = signature
+
+    def _sync(self, wait=False):
+        """
+        Bring this process in line with the shared state if another process changed it.
+        While one thread loads the new versions, the others keep serving the ones they have.
+        """
+        if self._registry is None or self._state_file_signature() == self._state_signature:
+            return
+        if not self._sync_lock.acquire(blocking=wait or self._current is None):
+            return
+        try:
+            signature = self._state_file_signature()
+            if signature == self._state_signature:
+                return
+            try:
+                self._apply_state(self._read_state(), signature)
+            except KeyError:
+                # A version was deleted while loading, so the state has changed again; the
+                # next use retries
+                pass
+        finally:
+            self._sync_lock.release()
+
+    @contextmanager
+    def _transition(self, known=()):
+        """
+        Change the live and candidate versions. The caller updates the fields inside the
+        block; with a registry this happens on the latest shared state, under the file lock,
+        and the result is written back for the other processes.
+        """
+        if self._registry is None:
+            with self._lock:
+                yield
+            return
+        with self._sync_lock, self._locked_state():
+            state = self._read_state()
+            self._apply_state(state, self._state_file_signature(), known)
+            with self._lock:
+                yield
+                live, candidate = self._current, self._candidate
+                state.update({
+                    "live": live.describe() if live else None,
+                    "candidate": candidate.describe() if candidate else None,
+                    "shadow_fraction": self._shadow_fraction})
+            published = {version.version for version in (live, candidate) if version}
+            state["pending"] = [version for version in state["pending"] if version not in published]
+            self._write_json_atomic(self._path(STATE_FILE), state)
+            self._state_signature = self._state_file_signature()
+        self._prune()
+
+    def _new_version(self, model, metrics, info):
+        if self._registry is None:
+            with self._lock:
+                version = self._next_version
+                self._next_version += 1
+            return ModelVersion(model, version, metrics, info)
+
+        # Reserve the version number, then store the model without holding the lock; a
+        # reserved (pending) version is never pruned
+        with self._locked_state():
+            state = self._read_state()
+            version = state["next_version"]
+            state["next_version"] += 1
+            state["pending"].append(version)
+            self._write_json_atomic(self._path(STATE_FILE), state)
+        new_version = ModelVersion(model, version, metrics, info)
+        try:
+            self._registry.put(f"v{version}", model, new_version.describe())
+        except BaseException:
+            with self._locked_state():
+                state = self._read_state()
+                state["pending"] = [pending for pending in state["pending"] if pending != version]
+                self._write_json_atomic(self._path(STATE_FILE), state)
+            raise
+        return new_version
+
+    def _prune(self):
+        """Delete the stored versions and shadow statistics the shared state no longer refers to."""
+        with self._locked_state():
+            state = self._read_state()
+            keep = set(state["pending"])
+            keep.update(state[role]["version"] for role in ("live", "candidate") if state[role])
+            for record in self._registry.list_models():
+                match = VERSION_ID_PATTERN.match(record["model_id"])
+                if match and int(match.group(1)) not in keep:
+                    try:
+                        self._registry.delete(record["model_id"])
+                    except KeyError:
+                        pass
+            candidate_version = state["candidate"]["version"] if state["candidate"] else None
+            for path, stats in self._shadow_stats_files():
+                if stats.get("candidate_version") != candidate_version:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _shadow_stats_files(self):
+        """(path, statistics) of every process's shadow statistics file."""
+        for filename in os.listdir(self._registry.artifact_dir):
+            if not (filename.startswith(SHADOW_STATS_PREFIX) and filename.endswith(".json")):
+                continue
+            path = os.path.join(self._registry.artifact_dir, filename)
+            try:
+                with open(path) as f:
+                    yield path, json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+
+    # Publishing ------------------------------------------------------------------------
+
+    def publish(self, model, metrics, min_r2=None, info=None):
+        """
+        Validate a fully trained model and atomically make it the live model.
+        The previous model keeps serving if validation fails.
+
+        Returns:
+            The published ModelVersion
+
+        Raises:
+            ModelValidationError: If the holdout metrics do not pass validation
+        """
+        validate_holdout_metrics(metrics, min_r2)
+        new_version = self._new_version(model, metrics, info)
+        with self._transition(known=(new_version,)):
+            self._current = new_version
+            # A directly published model supersedes any pending candidate
+            self._candidate = None
+            self._reset_shadow_stats()
+        return new_version
+
+    def stage_candidate(self, model, metrics, shadow_fraction, min_r2=None, info=None):
+        """
+        Validate a model and run it in the shadow of the live model on a fraction of traffic.
+        If nothing is live yet, the model is published directly.
+
+        Returns:
+            Tuple of (ModelVersion, deployment) where deployment is 'shadow' or 'live'
+        """
+        if not 0.0 < shadow_fraction <= 1.0:
+            raise ValueError(f"shadow_fraction must be in (0, 1], got {shadow_fraction}")
+        if self.current is None:
+            return self.publish(model, metrics, min_r2=min_r2, info=info), "live"
+
+        validate_holdout_metrics(metrics, min_r2)
+        new_version = self._new_version(model, metrics, info)
+        with self._transition(known=(new_version,)):
+            self._candidate = new_version
+            self._shadow_fraction = shadow_fraction
+            self._reset_shadow_stats()
+        return new_version, "shadow"
+
+    def promote_candidate(self):
+        """
+        Make the shadow candidate the live model.
+
+        Returns:
+            The promoted ModelVersion
+
+        Raises:
+            LookupError: If there is no candidate
+        """
+        with self._transition():
+            if self._candidate is None:
+                raise LookupError("No candidate model to promote")
+            self._current, self._candidate = self._candidate, None
+            self._reset_shadow_stats()
+            promoted = self._current
+        return promoted
+
+    def discard_candidate(self):
+        """Drop the shadow candidate (raises LookupError if there is none)."""
+        with self._transition():
+            if self._candidate is None:
+                raise LookupError("No candidate model to discard")
+            self._candidate = None
+            self._reset_shadow_stats()
+
+    def clear(self):
+        """Remove the live model and any candidate."""
+        with self._transition():
+            self._current = None
+            self._candidate = None
+            self._reset_shadow_stats()
+
+    def predict(self, X):
+        """
+        Predict with the live model and, on a sampled fraction of calls, queue the same input
+        for the candidate on a background thread. The candidate's output is only recorded for
+        the shadow report, never returned.
+
+        Returns:
+            Tuple of (predictions, live ModelVersion)
+
+        Raises:
+            LookupError: If no model has been published
+        """
+        self._sync()
+        live, candidate = self._current, self._candidate
+        if live is None:
+            raise LookupError("No trained model available")
+
+        start_time = time.perf_counter()
+        predictions = live.model.predict(X)
+        live_latency = time.perf_counter() - start_time
+
+        if candidate is not None and random.random() < self._shadow_fraction:
+            self._submit_shadow(candidate, X, predictions, live_latency)
+
+        return predictions, live
+
+    def _submit_shadow(self, candidate, X, predictions, live_latency):
+        with self._lock:
+            if self._candidate is not candidate:
+                return
+            if len(self._pending_shadow) >= MAX_PENDING_SHADOW_REQUESTS:
+                # The candidate cannot keep up; skip the sample instead of building a backlog
+                self._shadow_stats["dropped"] += 1
+                return
+            if self._shadow_executor is None:
+                self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow-model")
+            future = self._shadow_executor.submit(self._score_shadow, candidate, X, predictions, live_latency)
+            self._pending_shadow.add(future)
+        future.add_done_callback(self._shadow_done)
+
+    def _shadow_done(self, future):
+        with self._lock:
+            self._pending_shadow.discard(future)
+
+    def _score_shadow(self, candidate, X, predictions, live_latency):
+        try:
+            start_time = time.perf_counter()
+            shadow_predictions = np.asarray(candidate.model.predict(X))
+            shadow_latency = time.perf_counter() - start_time
+            live_predictions = np.asarray(predictions)
+            if shadow_predictions.shape != live_predictions.shape:
+                raise ValueError(f"Candidate predicted shape {shadow_predictions.shape}, "
+                                 f"live model {live_predictions.shape}")
+            abs_diff = np.abs(shadow_predictions - live_predictions)
+        except Exception:
+            with self._lock:
+                if self._candidate is candidate:
+                    self._shadow_stats["errors"] += 1
+            self._write_shadow_stats(candidate)
+            return
+
+        with self._lock:
+            # Ignore samples from a candidate that has been replaced meanwhile
+            if self._candidate is candidate:
+                stats = self._shadow_stats
+                stats["requests"] += 1
+                stats["rows"] += abs_diff.shape[0]
+                stats["values"] += abs_diff.size
+                stats["live_latency_total"] += live_latency
+                stats["candidate_latency_total"] += shadow_latency
+                stats["abs_diff_total"] += float(abs_diff.sum())
+                stats["max_abs_diff"] = max(stats["max_abs_diff"], float(abs_diff.max(initial=0.0)))
+        self._write_shadow_stats(candidate)
+
+    def _write_shadow_stats(self, candidate):
+        """Share this process's statistics of the candidate with the other processes."""
+        if self._registry is None:
+            return
+        with self._lock:
+            if self._candidate is not candidate:
+                return
+            stats = dict(self._shadow_stats, candidate_version=candidate.version)
+        self._write_json_atomic(self._stats_path, stats)
+
+    def wait_for_shadow(self, timeout=None):
+        """
+        Block until the shadow samples queued so far have been scored.
+
+        Returns:
+            True if all of them finished within the timeout
+        """
+        with self._lock:
+            pending = list(self._pending_shadow)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                future.result(timeout=remaining)
+            except FutureTimeoutError:
+                return False
+        return True
+
+    def _reset_shadow_stats(self):
+        self._shadow_stats = {
+            "requests": 0,
+            "rows": 0,
+            "values": 0,
+            "errors": 0,
+            "dropped": 0,
+            "live_latency_total": 0.0,
+            "candidate_latency_total": 0.0,
+            "abs_diff_total": 0.0,
+            "max_abs_diff": 0.0}
+
+    def shadow_report(self):
+        """
+        Latency and prediction deltas between the candidate and the live model.
+
+        Returns:
+            Dictionary with both versions, the number of shadowed requests and the deltas
+        """
+        self._sync()
+        with self._lock:
+            live, candidate = self._current, self._candidate
+            stats = dict(self._shadow_stats)
+            shadow_fraction = self._shadow_fraction
+
+        if self._registry is not None and candidate is not None:
+            # Add the samples shadowed by the other worker processes
+            for path, other in self._shadow_stats_files():
+                if path == self._stats_path or other.get("candidate_version") != candidate.version:
+                    continue
+                for name in stats:
+                    if name == "max_abs_diff":
+                        stats[name] = max(stats[name], other.get(name, 0.0))
+                    else:
+                        stats[name] += other.get(name, 0)
+
+        report = {
+            "live": live.describe() if live else None,
+            "candidate": candidate.describe() if candidate else None,
+            "shadow_fraction": shadow_fraction if candidate else 0.0,
+            "shadowed_requests": stats["requests"],
+            "shadowed_rows": stats["rows"],
+            "candidate_errors": stats["errors"],
+            "dropped_shadow_requests": stats["dropped"]}
+
+        if stats["requests"]:
+            live_latency = stats["live_latency_total"] / stats["requests"]
+            candidate_latency = stats["candidate_latency_total"] / stats["requests"]
+            report.update({
+                "mean_live_latency_ms": live_latency * 1000,
+                "mean_candidate_latency_ms": candidate_latency * 1000,
+                "latency_delta_ms": (candidate_latency - live_latency) * 1000,
+                "mean_abs_prediction_delta": stats["abs_diff_total"] / max(stats["values"], 1),
+                "max_abs_prediction_delta": stats["max_abs_diff"]})
+        if live and candidate:
+            report["holdout_r2_delta"] = float(candidate.metrics["r2"] - live.metrics["r2"])
+            report["holdout_mse_delta"] = float(candidate.metrics["mse"] - live.metrics["mse"])
+
+        return report
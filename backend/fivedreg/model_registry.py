@@ -0,0 +1,285 @@
+"""
+Model registry for serving many named 5D interpolators from a single backend.
+
+Every model registered under an id is written to disk as a pickle artifact straight away,
+so keeping it in memory is only a cache. Resident models are kept in least-recently-used
+order and unloaded once their combined size goes over the memory budget; an unloaded model
+is reloaded lazily from its artifact the next time it is requested.
+
+The artifact directory is the source of truth, so several server worker processes can share
+it: a model registered by another process is found on disk when it is first requested, and
+a resident copy is dropped once its artifact has been replaced (its inode or modification
+time changed) or deleted.
+"""
+
+import json
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+MODEL_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class ModelRegistry:
+    """
+    Thread-safe registry of named models with LRU residency under a memory budget.
+
+    Parameters:
+    -----------
+    artifact_dir : str
+        Directory where model artifacts (.pkl) and their metadata (.json) are stored
+    memory_budget_bytes : int
+        Maximum total size of resident models; least recently used models are unloaded
+        beyond it (the most recently used model always stays resident)
+
+    Example:
+    --------
+    >>> registry = ModelRegistry("model_artifacts", memory_budget_bytes=64 * 1024 * 1024)
+    >>> registry.put("team-a", model, {"metrics": metrics})
+    >>> registry.get("team-a").predict(X)
+    """
+
+    def __init__(self, artifact_dir="model_artifacts", memory_budget_bytes=256 * 1024 * 1024):
+        self.artifact_dir = artifact_dir
+        self.memory_budget_bytes = memory_budget_bytes
+        os.makedirs(self.artifact_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._resident = OrderedDict()  # model_id -> model, in LRU order (oldest first)
+        self._metadata = {}             # model_id -> metadata for every known model
+        self._versions = {}             # model_id -> artifact version the metadata and resident copy match
+
+        # Residency statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.last_load_time_ = None
+
+        self._discover_artifacts()
+
+    @staticmethod
+    def validate_model_id(model_id):
+        """Raise ValueError unless model_id is safe to use as an artifact file name."""
+        if not isinstance(model_id, str) or not MODEL_ID_PATTERN.match(model_id):
+            raise ValueError(
+                f"Invalid model id '{model_id}': use 1-64 letters, digits, '.', '_' or '-', "
+                "starting with a letter or digit")
+
+    def _artifact_path(self, model_id):
+        return os.path.join(self.artifact_dir, f"{model_id}.pkl")
+
+    def _metadata_path(self, model_id):
+        return os.path.join(self.artifact_dir, f"{model_id}.json")
+
+    def _artifact_version(self, model_id):
+        """(inode, mtime) of the model's artifact, or None if it does not exist (any more)."""
+        try:
+            stat = os.stat(self._artifact_path(model_id))
+        except (FileNotFoundError, ValueError):
+            return None
+        # Artifacts are replaced by rename, so a new artifact always has a new inode
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _read_metadata(self, model_id):
+        try:
+            with open(self._metadata_path(model_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _forget_locked(self, model_id):
+        self._resident.pop(model_id, None)
+        self._metadata.pop(model_id, None)
+        self._versions.pop(model_id, None)
+
+    def _sync(self, model_id):
+        """
+        Bring one model in line with its artifact on disk (registered, replaced or deleted by
+        another process) and return the artifact version, or None if there is no such model.
+        """
+        if not MODEL_ID_PATTERN.match(model_id):
+            return None
+        version = self._artifact_version(model_id)
+        with self._lock:
+            if version is not None and self._versions.get(model_id) == version:
+                return version
+        # Unknown or changed artifact: read its metadata outside the lock
+        record = self._read_metadata(model_id) if version is not None else None
+        with self._lock:
+            if record is None:
+                self._forget_locked(model_id)
+                return None
+            if self._versions.get(model_id) != version:
+                self._resident.pop(model_id, None)
+                self._metadata[model_id] = record
+                self._versions[model_id] = version
+            return version
+
+    def _discover_artifacts(self):
+        """Register (without loading) the artifacts in artifact_dir and forget deleted ones."""
+        on_disk = set()
+        for filename in sorted(os.listdir(self.artifact_dir)):
+            model_id, ext = os.path.splitext(filename)
+            if ext == ".json" and MODEL_ID_PATTERN.match(model_id):
+                on_disk.add(model_id)
+        with self._lock:
+            known = set(self._metadata)
+        for model_id in sorted(on_disk | known):
+            self._sync(model_id)
+
+    @staticmethod
+    def _write_atomic(path, payload, mode="wb"):
+        """
+        Write to a temporary file and rename it, so readers never see a partial artifact. The
+        temporary name is unique, so concurrent writers (threads or worker processes) of the
+        same model never write into each other's file.
+        """
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, mode) as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def put(self, model_id, model, metadata=None):
+        """
+        Register (or replace) a model under model_id, persist it and make it resident.
+
+        Args:
+            model_id: Name of the model
+            model: Trained model (anything with a predict method that can be pickled)
+            metadata: Optional JSON-serialisable dictionary stored alongside the model
+
+        Returns:
+            Metadata dictionary recorded for the model
+        """
+        self.validate_model_id(model_id)
+
+        # Serialise outside the lock; the payload size, plus what the model rebuilds in memory
+        # once loaded (the float32 kernel of an int8 network), is our memory estimate
+        payload = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+        record = dict(metadata or {})
+        record.update({
+            "model_id": model_id,
+            "size_bytes": len(payload) + int(getattr(model, "kernel_bytes", 0)),
+            "updated_at": time.time()})
+
+        # Write outside the lock, so lookups are not blocked while a large model goes to disk.
+        # Metadata first: a process that sees the new artifact also finds its metadata
+        self._write_atomic(self._metadata_path(model_id), json.dumps(record, default=str), mode="w")
+        self._write_atomic(self._artifact_path(model_id), payload)
+        del payload
+        version = self._artifact_version(model_id)
+
+        with self._lock:
+            # A concurrent put may have replaced the artifact since; only the model that is on
+            # disk is registered, and a later get loads the other one
+            if version is not None and self._artifact_version(model_id) == version:
+                self._metadata[model_id] = record
+                self._versions[model_id] = version
+                self._resident[model_id] = model
+                self._resident.move_to_end(model_id)
+                self._evict()
+
+        return record
+
+    def get(self, model_id):
+        """
+        Return the model registered under model_id, (re)loading it from disk if it was
+        unloaded, registered by another process or replaced since it was loaded.
+
+        Raises:
+            KeyError: If no model is registered under model_id
+        """
+        version = self._sync(model_id)
+        if version is None:
+            raise KeyError(model_id)
+        with self._lock:
+            if model_id in self._resident:
+                self.hits += 1
+                self._resident.move_to_end(model_id)
+                return self._resident[model_id]
+            self.misses += 1
+
+        # Unpickling a large model must not block lookups of the other models
+        start_time = time.time()
+        try:
+            with open(self._artifact_path(model_id), "rb") as f:
+                model = pickle.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget_locked(model_id)
+            raise KeyError(model_id)
+        load_time = time.time() - start_time
+
+        with self._lock:
+            self.last_load_time_ = load_time
+            if self._versions.get(model_id) != version:
+                # Replaced or deleted while loading: answer this request, but do not cache a stale copy
+                return model
+            if model_id in self._resident:
+                # Loaded concurrently by another request
+                return self._resident[model_id]
+            self._resident[model_id] = model
+            self._resident.move_to_end(model_id)
+            self._evict()
+            return model
+
+    def delete(self, model_id):
+        """
+        Remove a model from memory and disk.
+
+        Raises:
+            KeyError: If no model is registered under model_id
+        """
+        if self._sync(model_id) is None:
+            raise KeyError(model_id)
+        with self._lock:
+            self._forget_locked(model_id)
+            for path in (self._artifact_path(model_id), self._metadata_path(model_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def metadata(self, model_id):
+        """Return the stored metadata for model_id (raises KeyError if unknown)."""
+        if self._sync(model_id) is None:
+            raise KeyError(model_id)
+        with self._lock:
+            return dict(self._metadata[model_id])
+
+    def list_models(self):
+        """List every model in the artifact directory with its metadata and whether it is resident."""
+        self._discover_artifacts()
+        with self._lock:
+            return [
+                dict(record, resident=model_id in self._resident)
+                for model_id, record in sorted(self._metadata.items())]
+
+    def resident_bytes(self):
+        """Total estimated size of the resident models."""
+        with self._lock:
+            return sum(self._metadata[model_id]["size_bytes"] for model_id in self._resident)
+
+    def _evict(self):
+        """Unload least recently used models until the resident set fits the memory budget."""
+        while len(self._resident) > 1 and self.resident_bytes() > self.memory_budget_bytes:
+            self._resident.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Residency statistics (hit rate, evictions, resident size)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "models": len(self._metadata),
+                "resident_models": len(self._resident),
+                "resident_bytes": self.resident_bytes(),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "last_load_time": self.last_load_time_}
@@ -0,0 +1,221 @@
+"""
+ONNX export of a trained network, and an onnxruntime inference backend.
+
+export_onnx builds the graph directly with onnx.helper: one Gemm per layer, with Relu (or
+the network's activation) between them, in float32. The networks are trained on
+standardized data; with the training scalers, the input standardization is folded into
+the first layer and the inverse target scaling into the last one, so the exported graph
+takes and returns raw values at no extra cost:
+
+    (x - m) / s @ W + b       == x @ (W / s[:, None]) + (b - (m / s) @ W)
+    (h @ W + b) * s_y + m_y   == h @ (W * s_y) + (b * s_y + m_y)
+
+OnnxRuntimeNetwork serves a network through an onnxruntime InferenceSession instead of
+sklearn. Both onnx and onnxruntime are optional dependencies (pip install fivedreg[onnx]).
+"""
+
+import numpy as np
+
+from .engines import InterpolatorEngine
+from .quantization import copy_network_attributes
+
+
+INFERENCE_BACKENDS = ("sklearn", "onnxruntime")
+
+_ONNX_ACTIVATIONS = {"relu": "Relu", "tanh": "Tanh", "logistic": "Sigmoid", "identity": None}
+
+
+def _import_onnx():
+    try:
+        import onnx
+    except ImportError as e:
+        raise ImportError("ONNX export requires onnx (pip install onnx)") from e
+    return onnx
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError("The onnxruntime backend requires onnxruntime (pip install onnxruntime)") from e
+    return onnxruntime
+
+
+def network_layers(model):
+    """
+    Float64 (weights, bias) of every layer and the hidden activation of a network.
+
+    Works for a fitted FastNeuralNetwork (also pruned or distilled), a QuantizedNetwork
+    (dequantized weights) and an OnnxRuntimeNetwork (the layers it was built from).
+    """
+    if isinstance(model, OnnxRuntimeNetwork):
+        return model.layers_, model.activation
+    if getattr(model, "engine", None) != "mlp":
+        raise ValueError("Only a neural network (engine 'mlp') can be exported to ONNX")
+    if hasattr(model, "weights_"):  # QuantizedNetwork
+        scales = model.scales_ or [1.0] * len(model.weights_)
+        layers = [(weights.astype(np.float64) * scale, intercept.astype(np.float64))
+                  for weights, scale, intercept in zip(model.weights_, scales, model.intercepts_)]
+        return layers, model.activation
+    mlp = model.model
+    if not hasattr(mlp, "coefs_"):
+        raise ValueError("The network is not fitted yet")
+    return list(zip(mlp.coefs_, mlp.intercepts_)), mlp.activation
+
+
+def fuse_scaling(layers, scaler_X=None, scaler_y=None):
+    """Fold StandardScaler input standardization and inverse target scaling into the layers."""
+    layers = [(np.array(weights, dtype=np.float64), np.array(bias, dtype=np.float64)) for weights, bias in layers]
+    if scaler_X is not None:
+        weights, bias = layers[0]
+        mean, scale = np.asarray(scaler_X.mean_), np.asarray(scaler_X.scale_)
+        layers[0] = (weights / scale[:, None], bias - (mean / scale) @ weights)
+    if scaler_y is not None:
+        weights, bias = layers[-1]
+        mean, scale = np.asarray(scaler_y.mean_), np.asarray(scaler_y.scale_)
+        layers[-1] = (weights * scale, bias * scale + mean)
+    return layers
+
+
+def export_onnx(model, scaler_X=None, scaler_y=None, path=None, opset=17, ir_version=8):
+    """
+    Export a network as an ONNX graph with input 'X' (n, n_features) and output 'y'
+    (n, n_targets), both float32.
+
+    Args:
+        model: Fitted FastNeuralNetwork, QuantizedNetwork or OnnxRuntimeNetwork
+        scaler_X: Optional StandardScaler of the inputs, fused into the first layer
+        scaler_y: Optional StandardScaler of the targets, fused into the last layer
+        path: Optional file the serialized graph is also written to
+        opset: ONNX opset version (default: 17)
+        ir_version: ONNX IR version (default: 8, the one opset 17 was released with)
+
+    Returns:
+        The serialized ONNX model (bytes)
+    """
+    onnx = _import_onnx()
+    from onnx import TensorProto, helper, numpy_helper
+
+    layers, activation = network_layers(model)
+    layers = fuse_scaling(layers, scaler_X, scaler_y)
+    activation_op = _ONNX_ACTIVATIONS[activation]
+
+    nodes, initializers = [], []
+    current = "X"
+    for index, (weights, bias) in enumerate(layers):
+        initializers.append(numpy_helper.from_array(weights.astype(np.float32), f"W{index}"))
+        initializers.append(numpy_helper.from_array(bias.astype(np.float32), f"b{index}"))
+        last = index == len(layers) - 1
+        output = "y" if last else f"z{index}"
+        nodes.append(helper.make_node("Gemm", [current, f"W{index}", f"b{index}"], [output], name=f"dense{index}"))
+        current = output
+        if not last and activation_op is not None:
+            nodes.append(helper.make_node(activation_op, [output], [f"h{index}"], name=f"activation{index}"))
+            current = f"h{index}"
+
+    graph = helper.make_graph(
+        nodes, "fivedreg_network",
+        [helper.make_tensor_value_info("X", TensorProto.FLOAT, [None, layers[0][0].shape[0]])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [None, layers[-1][0].shape[1]])],
+        initializers)
+    onnx_model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", opset)], producer_name="fivedreg")
+    # The oldest IR version that supports the opset, so older runtimes can load the graph
+    onnx_model.ir_version = ir_version
+    helper.set_model_props(onnx_model, {
+        "hidden_layers": ",".join(str(weights.shape[1]) for weights, _ in layers[:-1]),
+        "input_scaling_fused": str(scaler_X is not None),
+        "target_scaling_fused": str(scaler_y is not None)})
+    onnx.checker.check_model(onnx_model)
+
+    serialized = onnx_model.SerializeToString()
+    if path is not None:
+        with open(path, "wb") as f:
+            f.write(serialized)
+    return serialized
+
+
+class OnnxRuntimeNetwork(InterpolatorEngine):
+    """
+    A trained network served by onnxruntime instead of sklearn.
+
+    It keeps the network's hyperparameters and training information, so it is published,
+    registered and evaluated like the network it was built from. Only the ONNX graph and
+    the layers are pickled; the InferenceSession is rebuilt on first use.
+
+    Parameters:
+    -----------
+    network : FastNeuralNetwork or QuantizedNetwork
+        Fitted network to serve
+    intra_op_threads : int
+        Threads onnxruntime uses inside an operator, 0 for its default (default: 0)
+
+    Example:
+    --------
+    >>> served = OnnxRuntimeNetwork(model)
+    >>> predictions = served.predict(X_test)
+    """
+
+    engine = "mlp"
+    backend = "onnxruntime"
+
+    def __init__(self, network, intra_op_threads=0):
+        _import_onnxruntime()
+        self.layers_, self.activation = network_layers(network)
+        self.intra_op_threads = intra_op_threads
+        self.verbose = False
+        self.profiles_ = {}
+        copy_network_attributes(self, network)
+        self.onnx_model_ = export_onnx(network)
+        self._session = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_session"] = None
+        return state
+
+    def _get_session(self):
+        if self._session is None:
+            onnxruntime = _import_onnxruntime()
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.intra_op_threads
+            self._session = onnxruntime.InferenceSession(
+                self.onnx_model_, options, providers=["CPUExecutionProvider"])
+        return self._session
+
+    def set_intra_op_threads(self, threads):
+        """Change the threads onnxruntime uses; the session is rebuilt on the next prediction."""
+        if threads != self.intra_op_threads:
+            self.intra_op_threads = threads
+            self._session = None
+
+    def predict(self, X):
+        """
+        Predict with the onnxruntime session (in float32).
+
+        Args:
+            X: Features to predict (n_samples, n_features)
+
+        Returns:
+            Predictions (n_samples,), or (n_samples, n_targets) for a multi-target model
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_:
+            raise ValueError(f"Expected X with {self.n_features_} features, got shape {np.shape(X)}")
+        (predictions,) = self._get_session().run(["y"], {"X": np.ascontiguousarray(X, dtype=np.float32)})
+        predictions = predictions.astype(np.float64)
+        return predictions.ravel() if predictions.shape[1] == 1 else predictions
+
+    def get_params(self):
+        """Get model configuration."""
+        return {
+            'engine': self.engine,
+            'backend': self.backend,
+            'hidden_layers': self.hidden_layers,
+            'learning_rate': self.learning_rate,
+            'max_iterations': self.max_iterations,
+            'early_stopping': self.early_stopping,
+            'training_time': self.training_time_,
+            'iterations': self.n_iterations_,
+            'n_features': self.n_features_,
+            'n_targets': self.n_targets_
+        }
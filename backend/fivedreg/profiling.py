@@ -0,0 +1,405 @@
+"""
+Opt-in profiling of training and inference.
+
+A Profiler captures a deterministic cProfile trace of the calling thread and, optionally,
+a tracemalloc snapshot of the allocations made while it was active. The result can be
+exported as a pstats file (for pstats/snakeviz) or as speedscope JSON. Nothing here is
+imported or run on the hot path unless profiling is explicitly requested.
+
+A ProfileStore keeps the most recent results on disk, so every worker process of the API
+serves the same profiles.
+
+A MemorySampler measures process memory as the operating system sees it (RSS and USS),
+which includes NumPy/BLAS buffers that tracemalloc cannot see.
+"""
+
+import cProfile
+import gc
+import io
+import json
+import marshal
+import os
+import pickle
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+
+from .metrics import process_resident_memory_bytes
+
+
+# cProfile can only be active once per process on recent Python versions
+_profiling_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is being captured."""
+
+
+def _frame_name(func):
+    filename, line, name = func
+    return f"{name} ({os.path.basename(filename)}:{line})" if line else name
+
+
+class ProfileResult:
+    """
+    Captured profile of a single job.
+
+    Attributes:
+        name: Label of the profiled job (e.g. 'fit')
+        wall_time: Wall-clock duration of the profiled block in seconds
+        stats: pstats.Stats of the cProfile trace
+        memory: Top allocation sites (list of dicts) if memory tracing was enabled
+        peak_memory_bytes: Peak traced memory if memory tracing was enabled
+    """
+
+    def __init__(self, name, wall_time, stats, memory=None, peak_memory_bytes=None):
+        self.name = name
+        self.wall_time = wall_time
+        self.stats = stats
+        self.memory = memory
+        self.peak_memory_bytes = peak_memory_bytes
+        self.created_at = time.time()
+
+    def __getstate__(self):
+        # pstats.Stats holds a stream; keep only the raw (picklable) stats dictionary
+        state = dict(self.__dict__)
+        state["stats"] = self.stats.stats
+        return state
+
+    def __setstate__(self, state):
+        raw_stats = state.pop("stats")
+        self.__dict__.update(state)
+        self.stats = pstats.Stats(_RawStats(raw_stats))
+
+    def to_pstats_bytes(self):
+        """Serialise in the pstats file format (load with pstats.Stats(path))."""
+        return marshal.dumps(self.stats.stats)
+
+    def top_functions(self, limit=20, sort="cumulative"):
+        """Top functions as dicts sorted by 'cumulative' or 'tottime'."""
+        key = {"cumulative": 3, "tottime": 2}[sort]
+        rows = sorted(self.stats.stats.items(), key=lambda item: item[1][key], reverse=True)[:limit]
+        return [{
+            "function": _frame_name(func),
+            "calls": nc,
+            "tottime": tt,
+            "cumtime": ct} for func, (cc, nc, tt, ct, callers) in rows]
+
+    def summary(self, limit=20):
+        """JSON-friendly summary of the profile."""
+        return {
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "total_calls": self.stats.total_calls,
+            "top_functions": self.top_functions(limit),
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "top_allocations": self.memory}
+
+    def to_speedscope(self):
+        """
+        Convert to a speedscope 'sampled' profile.
+
+        cProfile aggregates per function rather than recording timelines, so every function
+        becomes one weighted sample (its own time) whose stack follows the most expensive
+        caller at each level up to a root.
+        """
+        raw = self.stats.stats
+        frames, frame_index = [], {}
+
+        def index_of(func):
+            if func not in frame_index:
+                filename, line, name = func
+                frame_index[func] = len(frames)
+                frames.append({"name": name, "file": filename, "line": line})
+            return frame_index[func]
+
+        samples, weights = [], []
+        for func, (cc, nc, tt, ct, callers) in raw.items():
+            if tt <= 0:
+                continue
+            stack, seen = [func], {func}
+            while len(stack) < 128:
+                callers_of_top = raw.get(stack[-1], (0, 0, 0, 0, {}))[4]
+                candidates = [caller for caller in callers_of_top if caller not in seen]
+                if not candidates:
+                    break
+                caller = max(candidates, key=lambda c: raw.get(c, (0, 0, 0, 0))[3])
+                stack.append(caller)
+                seen.add(caller)
+            samples.append([index_of(f) for f in reversed(stack)])
+            weights.append(tt)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights}],
+            "name": self.name,
+            "activeProfileIndex": 0,
+            "exporter": "fivedreg.profiling"}
+
+
+class _RawStats:
+    """Adapter so pstats.Stats can be built from an in-memory stats dictionary."""
+
+    def __init__(self, raw_stats):
+        self.stats = raw_stats
+
+    def create_stats(self):
+        pass
+
+
+class Profiler:
+    """
+    Context manager profiling the enclosed block.
+
+    Args:
+        name: Label stored with the result
+        trace_memory: Also capture a tracemalloc snapshot (default: True)
+        memory_top: Number of allocation sites kept from the snapshot
+
+    Example:
+    --------
+    >>> with Profiler("fit") as profiler:
+    ...     model.fit(X_train, y_train)
+    >>> profiler.result.summary()
+    """
+
+    def __init__(self, name="profile", trace_memory=True, memory_top=25):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.memory_top = memory_top
+        self.result = None
+        self._profiler = None
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        if not _profiling_lock.acquire(blocking=False):
+            raise ProfilerBusyError("Another profile is already being captured")
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._start_time = time.perf_counter()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._profiler.disable()
+            wall_time = time.perf_counter() - self._start_time
+
+            memory, peak = None, None
+            if self.trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+                memory = [{
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_bytes": stat.size,
+                    "count": stat.count} for stat in snapshot.statistics("lineno")[:self.memory_top]]
+
+            stats = pstats.Stats(self._profiler, stream=io.StringIO())
+            self.result = ProfileResult(self.name, wall_time, stats, memory, peak)
+        finally:
+            _profiling_lock.release()
+        return False
+
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfileStore:
+    """
+    Most recent profile results stored in a directory.
+
+    Every profile is kept as '<id>.pkl' (the pickled ProfileResult) plus '<id>.json' with
+    its name, wall time and creation time, so listing never unpickles the traces. The json
+    file is written last: a listed profile can always be downloaded.
+
+    Args:
+        directory: Directory holding the profiles (created if missing)
+        max_profiles: Number of profiles kept; the oldest ones are deleted
+
+    Example:
+    --------
+    >>> store = ProfileStore("profiles")
+    >>> profile_id = store.put(profiler.result)
+    >>> store.get(profile_id).summary()
+    """
+
+    def __init__(self, directory, max_profiles=20):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id, ext):
+        return os.path.join(self.directory, f"{profile_id}{ext}")
+
+    def _write_atomic(self, path, payload, mode="wb"):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode) as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def put(self, result):
+        """
+        Store a ProfileResult and delete the oldest profiles beyond max_profiles.
+
+        Returns:
+            The id of the stored profile
+        """
+        profile_id = uuid.uuid4().hex
+        self._write_atomic(self._path(profile_id, ".pkl"), pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        info = {"profile_id": profile_id, "name": result.name, "wall_time": result.wall_time, "created_at": result.created_at}
+        self._write_atomic(self._path(profile_id, ".json"), json.dumps(info), mode="w")
+        self._evict()
+        return profile_id
+
+    def get(self, profile_id):
+        """The stored ProfileResult, or None if there is no such profile."""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id, ".pkl"), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self):
+        """Descriptions of the stored profiles, oldest first."""
+        entries = []
+        for filename in os.listdir(self.directory):
+            profile_id, ext = os.path.splitext(filename)
+            if ext != ".json" or not PROFILE_ID_PATTERN.match(profile_id):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    entries.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                # Deleted (or evicted by another process) while listing
+                continue
+        return sorted(entries, key=lambda entry: entry["created_at"])
+
+    def _evict(self):
+        entries = self.list()
+        for entry in entries[:max(len(entries) - self.max_profiles, 0)]:
+            for ext in (".json", ".pkl"):
+                try:
+                    os.remove(self._path(entry["profile_id"], ext))
+                except FileNotFoundError:
+                    pass
+
+
+def process_memory_bytes():
+    """
+    Current memory of this process as seen by the operating system.
+
+    Returns:
+        Dictionary with 'rss' (resident set size) and 'uss' (unique set size: private
+        pages only, i.e. what would be freed if the process exited; None where
+        /proc/self/smaps_rollup is unavailable)
+    """
+    uss = None
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            uss = sum(int(line.split()[1]) * 1024 for line in f
+                      if line.startswith(("Private_Clean:", "Private_Dirty:")))
+    except (OSError, ValueError, IndexError):
+        pass
+    return {"rss": process_resident_memory_bytes(), "uss": uss}
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS (VmHWM) counter; returns False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _kernel_peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class MemorySampler:
+    """
+    Context manager sampling process RSS/USS from a background thread.
+
+    The peak is the highest sampled value, raised to the kernel's exact peak RSS (VmHWM)
+    where it can be reset at the start of the block, so short spikes between samples are
+    not missed. The steady state is the memory still held once the block has finished
+    and garbage has been collected. All values are reported relative to the baseline
+    measured on entry.
+
+    Args:
+        interval: Seconds between samples (default: 0.005)
+
+    Example:
+    --------
+    >>> with MemorySampler() as sampler:
+    ...     model.fit(X_train, y_train)
+    >>> sampler.result["peak_rss_bytes"]
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.result = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._record(process_memory_bytes())
+
+    def _record(self, memory):
+        self._peak_rss = max(self._peak_rss, memory["rss"])
+        if memory["uss"] is not None:
+            self._peak_uss = max(self._peak_uss or 0, memory["uss"])
+
+    def __enter__(self):
+        gc.collect()
+        self._baseline = process_memory_bytes()
+        self._peak_rss, self._peak_uss = self._baseline["rss"], self._baseline["uss"]
+        self._kernel_peak = _reset_peak_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="memory-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self._record(process_memory_bytes())
+        if self._kernel_peak:
+            self._peak_rss = max(self._peak_rss, _kernel_peak_rss() or 0)
+        gc.collect()
+        steady = process_memory_bytes()
+
+        baseline_rss, baseline_uss = self._baseline["rss"], self._baseline["uss"]
+        self.result = {
+            "baseline_rss_bytes": baseline_rss,
+            "peak_rss_bytes": self._peak_rss - baseline_rss,
+            "steady_rss_bytes": steady["rss"] - baseline_rss,
+            "peak_uss_bytes": self._peak_uss - baseline_uss if baseline_uss is not None else None,
+            "steady_uss_bytes": steady["uss"] - baseline_uss if baseline_uss is not None else None}
+        return False
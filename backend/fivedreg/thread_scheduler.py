@@ -0,0 +1,164 @@
+"""
+Native thread budgeting for concurrent training and inference jobs.
+
+NumPy, SciPy and sklearn call into BLAS and OpenMP libraries that start one thread per
+core. With several server workers and concurrent requests, every job does so at the same
+time and the CPU is oversubscribed. ThreadScheduler gives a worker process a budget of
+cores (by default the machine's cores divided by the number of workers) and hands every
+job a thread count according to a policy:
+
+- 'split': a share of the budget (training_share) is reserved for training jobs and the
+  rest for inference; concurrent jobs of one kind divide their pool;
+- 'fair': all running jobs divide the whole budget equally, whatever their kind;
+- 'single': every job runs single-threaded, for many small concurrent requests.
+
+The limits are set through threadpoolctl. OpenBLAS keeps a single limit for the whole
+process, so while jobs overlap the smallest of their thread counts is applied, which keeps
+every job within its share. The full budget is restored once no job is running.
+
+Code that starts its own threads (KD-tree queries, chunked profiling) is not covered by
+those limits; it asks current_job_threads() for the allowance of the job it runs in.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from threadpoolctl import ThreadpoolController
+
+
+THREAD_POLICIES = ("split", "fair", "single")
+JOB_KINDS = ("training", "inference")
+
+
+_job_threads = ContextVar("fivedreg_job_threads", default=None)
+
+
+def current_job_threads(default=None):
+    """Threads allowed to the scheduler job running in this context, or default outside a job."""
+    threads = _job_threads.get()
+    return default if threads is None else threads
+
+
+def set_job_threads(threads):
+    """Set the allowance current_job_threads() reports from now on in this context, e.g. in a worker process."""
+    _job_threads.set(threads)
+
+
+@contextmanager
+def job_thread_allowance(threads):
+    """Make threads the allowance current_job_threads() reports within the block."""
+    token = _job_threads.set(threads)
+    try:
+        yield threads
+    finally:
+        _job_threads.reset(token)
+
+
+def default_thread_budget(workers=1):
+    """Cores of the machine divided between the server's worker processes (at least one)."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+class ThreadScheduler:
+    """
+    Assigns native thread counts to training and inference jobs within a core budget.
+
+    Parameters:
+    -----------
+    policy : str
+        'split', 'fair' or 'single' (default: 'split')
+    cores : int or None
+        Threads this process may use in total (default: all cores)
+    training_share : float
+        Fraction of the cores reserved for training with the 'split' policy (default: 0.5)
+
+    Example:
+    --------
+    >>> scheduler = ThreadScheduler("split", cores=8)
+    >>> with scheduler.job("training") as threads:
+    ...     model.fit(X, y)  # BLAS limited to 4 threads
+    """
+
+    def __init__(self, policy="split", cores=None, training_share=0.5):
+        if policy not in THREAD_POLICIES:
+            raise ValueError(f"Unknown thread policy '{policy}'. Available: {list(THREAD_POLICIES)}")
+        if not 0.0 < training_share < 1.0:
+            raise ValueError(f"training_share must be in (0, 1), got {training_share}")
+        self.policy = policy
+        self.cores = max(1, int(cores or default_thread_budget()))
+        self.training_share = training_share
+        self._lock = threading.Lock()
+        self._active = {}  # job id -> (kind, threads)
+        self._next_job_id = 0
+        self._controller = None
+        self._applied_threads = None
+        self.jobs_total = {kind: 0 for kind in JOB_KINDS}
+        self.last_threads = {kind: None for kind in JOB_KINDS}
+
+    def pool_threads(self, kind):
+        """Threads available to all running jobs of one kind under the policy."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'. Available: {list(JOB_KINDS)}")
+        if self.policy == "single":
+            return 1
+        if self.policy == "fair" or self.cores == 1:
+            return self.cores
+        training = min(self.cores - 1, max(1, round(self.cores * self.training_share)))
+        return training if kind == "training" else self.cores - training
+
+    def _threads_for(self, kind):
+        pool = self.pool_threads(kind)
+        running = sum(1 for running_kind, _ in self._active.values()
+                      if self.policy == "fair" or running_kind == kind)
+        return max(1, pool // (running + 1))
+
+    def _apply_locked(self):
+        threads = min((threads for _, threads in self._active.values()), default=self.cores)
+        if threads == self._applied_threads:
+            return
+        if self._controller is None:
+            self._controller = ThreadpoolController()
+        # Setting the libraries directly takes microseconds; threadpool_limits rescans them on every call
+        for library in self._controller.lib_controllers:
+            library.set_num_threads(threads)
+        self._applied_threads = threads
+
+    @contextmanager
+    def job(self, kind):
+        """
+        Run a training or inference job within its share of the cores.
+
+        Yields:
+            The number of threads assigned to the job
+        """
+        with self._lock:
+            threads = self._threads_for(kind)
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._active[job_id] = (kind, threads)
+            self.jobs_total[kind] += 1
+            self.last_threads[kind] = threads
+            self._apply_locked()
+        try:
+            with job_thread_allowance(threads):
+                yield threads
+        finally:
+            with self._lock:
+                del self._active[job_id]
+                self._apply_locked()
+
+    def stats(self):
+        """Policy, budget, pools, running jobs and the thread limit currently applied."""
+        with self._lock:
+            running = [kind for kind, _ in self._active.values()]
+            return {
+                "policy": self.policy,
+                "cores": self.cores,
+                "training_share": self.training_share if self.policy == "split" else None,
+                "pool_threads": {kind: self.pool_threads(kind) for kind in JOB_KINDS},
+                "active_jobs": {kind: running.count(kind) for kind in JOB_KINDS},
+                "applied_threads": self._applied_threads,
+                "jobs_total": dict(self.jobs_total),
+                "last_job_threads": dict(self.last_threads)}
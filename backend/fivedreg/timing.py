@@ -0,0 +1,34 @@
+"""
+Prediction timing shared by the distillation and pruning reports and the benchmarks.
+
+Both helpers time the model's own predict call, so they measure whatever backend the model
+serves with (scikit-learn, the int8 kernel, onnxruntime, ...).
+"""
+
+import time
+
+import numpy as np
+
+
+def predict_rows_per_second(model, X):
+    """
+    Predict X once and measure the throughput.
+
+    Returns:
+        Tuple of (predictions, rows predicted per second)
+    """
+    start_time = time.perf_counter()
+    predictions = model.predict(X)
+    return predictions, len(X) / max(time.perf_counter() - start_time, 1e-9)
+
+
+def single_row_latency_ms(model, X, repeats=200):
+    """Median latency of a single-row prediction over rows of X, in milliseconds."""
+    model.predict(X[:1])  # warm-up
+    timings = []
+    for i in range(repeats):
+        row = X[i % len(X):i % len(X) + 1]
+        start_time = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - start_time)
+    return float(np.median(timings) * 1000)
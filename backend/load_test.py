@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+HTTP Load Testing Harness for the FastAPI Backend
+
+Drives /predict-single/, /start-predict/ or dataset uploads against either a running
+server (--url, e.g. a local uvicorn) or the in-process ASGI app (--in-process, no server
+needed), and reports throughput and latency percentiles per load step.
+
+Two load models are supported:
+  * open loop (--rates): requests are issued on a fixed schedule at each target rate, and
+    latency is measured from the scheduled send time, so a slow server cannot hide its
+    queueing delay by slowing the generator down (coordinated omission);
+  * closed loop (no --rates): --concurrency workers send requests back to back.
+
+Usage:
+    uvicorn main:app --port 8000 &
+    python load_test.py --url http://127.0.0.1:8000 --scenario predict_single --rates 50 100 200
+    python load_test.py --in-process --scenario start_predict --concurrency 1 4 16 --duration 5
+    python load_test.py --in-process --rates 100 --slo-p99-ms 50 --slo-error-rate 0.01
+
+The exit code is 1 when a step violates one of the given SLOs.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+SCENARIOS = ("predict_single", "start_predict", "upload")
+SETUP_TRAINING = {"hyperparameters": {"max_iterations": 100}}
+
+
+def latency_percentiles(latencies) -> dict:
+    """p50/p90/p99/p999, mean and max of latencies given in seconds, reported in milliseconds."""
+    if len(latencies) == 0:
+        return {key: None for key in ("p50_ms", "p90_ms", "p99_ms", "p999_ms", "mean_ms", "max_ms")}
+    latencies_ms = np.asarray(latencies, dtype=float) * 1000
+    p50, p90, p99, p999 = np.percentile(latencies_ms, [50, 90, 99, 99.9])
+    return {
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+        "p999_ms": float(p999),
+        "mean_ms": float(latencies_ms.mean()),
+        "max_ms": float(latencies_ms.max())
+    }
+
+
+def check_slos(steps, p99_ms=None, p999_ms=None, error_rate=None, min_rps=None) -> list:
+    """
+    Check every load step against the given SLOs (None disables a check).
+
+    Returns:
+        List of human-readable violations (empty if all SLOs hold)
+    """
+    violations = []
+    for step in steps:
+        label = step["label"]
+        if p99_ms is not None and (step["p99_ms"] is None or step["p99_ms"] > p99_ms):
+            violations.append(f"{label}: p99 {step['p99_ms'] or float('nan'):.2f} ms exceeds {p99_ms} ms")
+        if p999_ms is not None and (step["p999_ms"] is None or step["p999_ms"] > p999_ms):
+            violations.append(f"{label}: p999 {step['p999_ms'] or float('nan'):.2f} ms exceeds {p999_ms} ms")
+        if error_rate is not None and step["error_rate"] > error_rate:
+            violations.append(f"{label}: error rate {step['error_rate']:.4f} exceeds {error_rate}")
+        if min_rps is not None and step["achieved_rps"] < min_rps:
+            violations.append(f"{label}: throughput {step['achieved_rps']:.1f} rps is below {min_rps} rps")
+    return violations
+
+
+class LoadTester:
+    """
+    Load generator for one scenario against an httpx.AsyncClient.
+
+    Parameters:
+    -----------
+    client : httpx.AsyncClient
+        Client bound to the server URL or to the in-process ASGI app
+    scenario : str
+        One of 'predict_single', 'start_predict' or 'upload'
+    batch_rows : int
+        Rows in the prediction dataset used by 'start_predict'
+    upload_rows : int
+        Rows in the dataset posted by 'upload'
+    """
+
+    def __init__(self, client: httpx.AsyncClient, scenario: str = "predict_single",
+                 batch_rows: int = 1000, upload_rows: int = 5000, seed: int = 42):
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{scenario}'. Available: {SCENARIOS}")
+        self.client = client
+        self.scenario = scenario
+        self.batch_rows = batch_rows
+        self.upload_rows = upload_rows
+        self.rng = np.random.default_rng(seed)
+
+    def _dataset(self, n_samples: int, with_target: bool = True) -> bytes:
+        X = self.rng.standard_normal((n_samples, 5))
+        if not with_target:
+            return pickle.dumps(X)
+        y = np.sum(X**2, axis=1) + 0.1 * self.rng.standard_normal(n_samples)
+        return pickle.dumps({"X": X, "y": y})
+
+    async def _upload(self, endpoint: str, filename: str, payload: bytes) -> httpx.Response:
+        return await self.client.post(endpoint, files={"file": (filename, payload, "application/octet-stream")})
+
+    async def setup(self):
+        """Train a small model if none is live, and upload the prediction dataset if needed."""
+        status = (await self.client.get("/status")).json()
+        if not status.get("model_trained"):
+            print("No live model: uploading a dataset and training a small one...")
+            response = await self._upload("/upload-fit-dataset/", "load_test_fit.pkl", self._dataset(2000))
+            response.raise_for_status()
+            response = await self.client.post("/start-training/", json=SETUP_TRAINING)
+            response.raise_for_status()
+
+        if self.scenario == "start_predict":
+            response = await self._upload(
+                "/upload-predict-dataset/", "load_test_predict.pkl", self._dataset(self.batch_rows, with_target=False))
+            response.raise_for_status()
+
+        if self.scenario == "upload":
+            self._upload_payload = self._dataset(self.upload_rows)
+
+    async def send(self) -> httpx.Response:
+        """Send one request of the scenario."""
+        if self.scenario == "predict_single":
+            features = self.rng.standard_normal(5).tolist()
+            return await self.client.post("/predict-single/", json={"features": features})
+        if self.scenario == "start_predict":
+            return await self.client.post("/start-predict/")
+        return await self._upload("/upload-fit-dataset/", "load_test_upload.pkl", self._upload_payload)
+
+    async def _timed_send(self, scheduled_at: float, latencies: list, errors: list):
+        try:
+            response = await self.send()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latencies.append(time.perf_counter() - scheduled_at)
+        if not ok:
+            errors.append(1)
+
+    async def run_open_loop(self, rate: float, duration: float, max_in_flight: int = 256) -> dict:
+        """Issue requests on a fixed schedule at `rate` requests/second for `duration` seconds."""
+        latencies, errors = [], []
+        semaphore = asyncio.Semaphore(max_in_flight)
+        tasks = []
+        n_requests = max(1, int(rate * duration))
+        start_time = time.perf_counter()
+
+        async def scheduled(scheduled_at):
+            async with semaphore:
+                await self._timed_send(scheduled_at, latencies, errors)
+
+        for i in range(n_requests):
+            scheduled_at = start_time + i / rate
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(scheduled(scheduled_at)))
+        await asyncio.gather(*tasks)
+
+        return self._step_result(f"rate={rate:g}", latencies, errors, time.perf_counter() - start_time,
+                                 target_rps=rate, concurrency=max_in_flight)
+
+    async def run_closed_loop(self, concurrency: int, duration: float) -> dict:
+        """Run `concurrency` workers sending requests back to back for `duration` seconds."""
+        latencies, errors = [], []
+        start_time = time.perf_counter()
+        deadline = start_time + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self._timed_send(time.perf_counter(), latencies, errors)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        return self._step_result(f"concurrency={concurrency}", latencies, errors, time.perf_counter() - start_time,
+                                 target_rps=None, concurrency=concurrency)
+
+    def _step_result(self, label, latencies, errors, elapsed, target_rps, concurrency) -> dict:
+        result = {
+            "label": label,
+            "scenario": self.scenario,
+            "target_rps": target_rps,
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": len(errors),
+            "error_rate": len(errors) / len(latencies) if latencies else 0.0,
+            "duration": elapsed,
+            "achieved_rps": len(latencies) / elapsed if elapsed > 0 else 0.0
+        }
+        result.update(latency_percentiles(latencies))
+        return result
+
+
+def print_curve(steps: list):
+    print("\n" + "="*60)
+    print("THROUGHPUT VS LATENCY")
+    print("="*60)
+    print(f"{'Step':<18} {'RPS':<9} {'p50 (ms)':<10} {'p99 (ms)':<10} {'p999 (ms)':<10} {'Errors':<7}")
+    print("-" * 68)
+    for step in steps:
+        def fmt(value):
+            return f"{value:<10.2f}" if value is not None else f"{'-':<10}"
+        print(f"{step['label']:<18} {step['achieved_rps']:<9.1f} {fmt(step['p50_ms'])} {fmt(step['p99_ms'])} "
+              f"{fmt(step['p999_ms'])} {step['errors']:<7}")
+
+
+async def run_load_test(client: httpx.AsyncClient, scenario: str, rates=None, concurrency=(1,),
+                        duration: float = 10.0, warmup: float = 1.0, max_in_flight: int = 256,
+                        batch_rows: int = 1000) -> list:
+    """Set up the scenario, warm up, then run one step per rate (open loop) or concurrency (closed loop)."""
+    tester = LoadTester(client, scenario, batch_rows=batch_rows)
+    await tester.setup()
+    if warmup > 0:
+        await tester.run_closed_loop(1, warmup)
+
+    steps = []
+    for value in (rates or concurrency):
+        if rates:
+            step = await tester.run_open_loop(value, duration, max_in_flight)
+        else:
+            step = await tester.run_closed_loop(value, duration)
+        print(f"  {step['label']:<18} {step['achieved_rps']:8.1f} rps   p99 {step['p99_ms'] or 0:8.2f} ms   "
+              f"errors {step['errors']}")
+        steps.append(step)
+    return steps
+
+
+def make_client(url: str = None, timeout: float = 30.0) -> httpx.AsyncClient:
+    """Client for a running server, or for the in-process ASGI app when url is None."""
+    if url:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        return httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+    import main
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://load-test", timeout=timeout)
+
+
+def main(argv=None):
+    """Load test entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="HTTP load test for the 5D interpolator backend")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+    target.add_argument("--in-process", action="store_true", help="Drive the ASGI app in this process")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="predict_single")
+    parser.add_argument("--rates", type=float, nargs="+", help="Open-loop target rates (requests/second)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1],
+                        help="Closed-loop worker counts (used when --rates is not given)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Cap on outstanding requests in open loop")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per load step")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of untimed warmup")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="Rows per /start-predict/ request")
+    parser.add_argument("--slo-p99-ms", type=float, help="Fail if any step's p99 latency exceeds this")
+    parser.add_argument("--slo-p999-ms", type=float, help="Fail if any step's p999 latency exceeds this")
+    parser.add_argument("--slo-error-rate", type=float, help="Fail if any step's error rate exceeds this")
+    parser.add_argument("--slo-min-rps", type=float, help="Fail if any step's throughput is below this")
+    parser.add_argument("--output", default="benchmark_results/load_test_results.json", help="JSON results file")
+    args = parser.parse_args(argv)
+
+    async def run():
+        async with make_client(args.url) as client:
+            return await run_load_test(client, args.scenario, rates=args.rates, concurrency=args.concurrency,
+                                       duration=args.duration, warmup=args.warmup,
+                                       max_in_flight=args.max_in_flight, batch_rows=args.batch_rows)
+
+    print("\n" + "="*60)
+    print(f"LOAD TEST: {args.scenario} against {args.url or 'in-process app'}")
+    print("="*60)
+    steps = asyncio.run(run())
+    print_curve(steps)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "target": args.url or "in-process",
+                   "steps": steps}, f, indent=2)
+    print(f"\nResults saved to: {output}")
+
+    violations = check_slos(steps, args.slo_p99_ms, args.slo_p999_ms, args.slo_error_rate, args.slo_min_rps)
+    if violations:
+        print("\nSLO violations:")
+        for violation in violations:
+            print(f"  {violation}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,18 +3,28 @@
 
 import pickle
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel, Field
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')  # The use 'Agg' backend is recommended for non-GUI environments
 import os
-import shutil
-from typing import Dict, List, Optional, Any
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Annotated, Dict, List, Optional, Any
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import UploadFile, File
-from fivedreg import benchmark_training_speed
+from fastapi.concurrency import run_in_threadpool
+from fivedreg import benchmark_training_speed, distill_model, export_onnx, ModelRegistry
+from fivedreg.data_hand.module import load_dataset
+from fivedreg.model_handle import ModelHandle, ModelValidationError
+from fivedreg.metrics import MetricsRegistry, process_collector
+from fivedreg.profiling import Profiler, ProfilerBusyError, ProfileStore
+from fivedreg.thread_scheduler import ThreadScheduler, default_thread_budget
+from fivedreg.batch_predict import BatchPredictionManager, prediction_input_shape
+from fivedreg.data_hand.dataset_profile import profile_dataset, save_profile, load_cached_profile
 
 
 
@@ -34,6 +44,124 @@ app.add_middleware(
     allow_headers=["*"],)
 
 
+# Metrics exposed on /metrics. Updates go to per-thread shards, so recording them costs no lock contention.
+metrics_registry = MetricsRegistry()
+REQUEST_COUNT = metrics_registry.counter("http_requests_total", "HTTP requests by method, endpoint and status code.")
+REQUEST_LATENCY = metrics_registry.histogram("http_request_duration_seconds", "HTTP request latency in seconds by method and endpoint.")
+PREDICTION_ROWS = metrics_registry.counter("fivedreg_prediction_rows_total", "Rows scored by prediction endpoints.")
+PREDICTION_SECONDS = metrics_registry.counter("fivedreg_prediction_seconds_total", "Time spent in model prediction in seconds.")
+PREDICTION_THROUGHPUT = metrics_registry.gauge("fivedreg_prediction_rows_per_second", "Rows per second of the most recent prediction call.")
+TRAINING_DURATION = metrics_registry.histogram(
+    "fivedreg_training_duration_seconds", "Model training duration in seconds.",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+TRAINING_EPOCHS_PER_SECOND = metrics_registry.gauge("fivedreg_training_epochs_per_second", "Epochs per second of the most recent training run.")
+UPLOAD_BYTES = metrics_registry.counter("fivedreg_upload_bytes_total", "Bytes received by the upload endpoints.")
+JOB_THREADS = metrics_registry.histogram(
+    "fivedreg_job_threads", "Native threads assigned to each training or inference job.",
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_JOBS = metrics_registry.counter("fivedreg_batch_prediction_jobs_total", "Finished batch prediction jobs by final state.")
+metrics_registry.add_collector(process_collector)
+
+# Native (BLAS/OpenMP) threads of this worker process. Each of the WORKERS processes gets its
+# share of the cores, which THREAD_POLICY divides between training and inference jobs.
+THREAD_POLICY = os.environ.get("THREAD_POLICY", "split")
+THREAD_BUDGET = int(os.environ.get("THREAD_BUDGET", 0)) or default_thread_budget(int(os.environ.get("WORKERS", 1)))
+TRAINING_THREAD_SHARE = float(os.environ.get("TRAINING_THREAD_SHARE", 0.5))
+thread_scheduler = ThreadScheduler(THREAD_POLICY, cores=THREAD_BUDGET, training_share=TRAINING_THREAD_SHARE)
+
+
+@contextmanager
+def scheduled(kind: str):
+    """Run a training or inference job within its thread share, recording the threads it got."""
+    with thread_scheduler.job(kind) as threads:
+        JOB_THREADS.observe(threads, kind=kind)
+        yield threads
+
+
+def thread_scheduler_collector():
+    """Scrape-time metrics for the thread scheduler."""
+    stats = thread_scheduler.stats()
+    pool_threads = {(("kind", kind),): threads for kind, threads in stats["pool_threads"].items()}
+    active_jobs = {(("kind", kind),): count for kind, count in stats["active_jobs"].items()}
+    return [
+        ("fivedreg_thread_budget", "gauge", "Native threads this process hands out to jobs.", stats["cores"]),
+        ("fivedreg_thread_pool_threads", "gauge", "Threads available to each kind of job under the thread policy.", pool_threads),
+        ("fivedreg_active_jobs", "gauge", "Training and inference jobs currently running.", active_jobs),
+        ("fivedreg_applied_threads", "gauge", "BLAS/OpenMP thread limit currently applied.", stats["applied_threads"])]
+
+
+metrics_registry.add_collector(thread_scheduler_collector)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware recording the count and latency of every HTTP request.
+    Requests are labelled with the route template (e.g. /models/{model_id}/predict) to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            endpoint = route.path if route is not None else "unmatched"
+            REQUEST_COUNT.inc(method=scope["method"], endpoint=endpoint, status=str(status_code))
+            REQUEST_LATENCY.observe(time.perf_counter() - start_time, method=scope["method"], endpoint=endpoint)
+
+
+app.add_middleware(MetricsMiddleware)
+
+
+def record_prediction(n_rows: int, seconds: float):
+    """Record the size and duration of a prediction call."""
+    PREDICTION_ROWS.inc(n_rows)
+    PREDICTION_SECONDS.inc(seconds)
+    if seconds > 0:
+        PREDICTION_THROUGHPUT.set(n_rows / seconds)
+
+
+def prediction_value(row):
+    """JSON value of one prediction: a number, or a list with one value per target for a multi-target model."""
+    return float(row) if np.ndim(row) == 0 else [float(value) for value in row]
+
+
+def require_input_dim(model, n_features: int):
+    """Raise a 400 error unless the model was trained on inputs with n_features dimensions."""
+    expected = getattr(model, "n_features_", None)
+    if expected is not None and n_features != expected:
+        raise HTTPException(status_code=400, detail=f"Expected {expected} features, got {n_features}")
+
+
+def limit_inference_threads(model):
+    """Cap the thread pool of an onnxruntime-served model, which threadpoolctl does not manage, at the inference pool."""
+    if model.backend == "onnxruntime":
+        model.set_intra_op_threads(thread_scheduler.pool_threads("inference"))
+
+
+def record_training(model):
+    """Record the duration and epoch throughput of a finished training run."""
+    if model.training_time_:
+        TRAINING_DURATION.observe(model.training_time_)
+        if model.n_iterations_:  # the knn and rbf engines have no epochs
+            TRAINING_EPOCHS_PER_SECOND.set(model.n_iterations_ / model.training_time_)
+
+
 class Item(BaseModel):
 
     """
@@ -52,12 +180,89 @@ def health_check():
     """Health check endpoint for Docker containers"""
     return {"status": "healthy", "service": "5D Interpolator Backend by bamk3"}
 
+# Profiles captured by requests made with ?profile=true. Only the most recent ones are kept,
+# in PROFILE_DIRECTORY so that every worker process serves the same profiles.
+PROFILE_DIRECTORY = os.environ.get("PROFILE_DIRECTORY", "profiles")
+MAX_STORED_PROFILES = int(os.environ.get("MAX_STORED_PROFILES", 20))
+profile_store = ProfileStore(PROFILE_DIRECTORY, max_profiles=MAX_STORED_PROFILES)
+
+
+def run_with_optional_profile(profile: bool, name: str, func, *args, **kwargs):
+    """
+    Call func, profiling it with cProfile and tracemalloc when profile is true.
+    Without profiling this is a plain call, so unprofiled requests pay nothing.
+
+    Returns:
+        Tuple of (func result, profile id or None)
+    """
+    if not profile:
+        return func(*args, **kwargs), None
+
+    profiler = Profiler(name)
+    try:
+        with profiler:
+            result = func(*args, **kwargs)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return result, profile_store.put(profiler.result)
+
+
+@app.get("/profiles", response_model=Dict[str, Any])
+def list_profiles():
+    """
+    List the stored request profiles, oldest first.
+    """
+    return {"profiles": profile_store.list()}
+
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, format: str = "summary"):
+    """
+    Download a stored profile as a JSON summary (default), a pstats file or speedscope JSON.
+    """
+    result = profile_store.get(profile_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+
+    if format == "summary":
+        return result.summary()
+    if format == "speedscope":
+        return JSONResponse(
+            result.to_speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'})
+    if format == "pstats":
+        return Response(
+            result.to_pstats_bytes(), media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'})
+    raise HTTPException(status_code=400, detail="Invalid format. Use 'summary', 'pstats' or 'speedscope'.")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus scrape endpoint: request counts and latency histograms per endpoint,
+    prediction/training throughput, upload bytes, model cache statistics and process RSS/CPU.
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/thread-scheduler", response_model=Dict[str, Any])
+def get_thread_scheduler():
+    """
+    The thread policy, the core budget of this process and how it is divided between running jobs.
+    """
+    return thread_scheduler.stats()
+
+
 @app.get("/status")
 def get_status():
     """Get the current status of the system"""
     return {
         "training_data_uploaded": 'processing_result' in globals() and processing_result is not None,
-        "model_trained": 'train_result' in globals() and train_result is not None,
+        "model_trained": model_handle.current is not None,
+        "model_version": model_handle.current.version if model_handle.current else None,
+        "input_dim": model_handle.current.model.n_features_ if model_handle.current else None,
+        "candidate_version": model_handle.candidate.version if model_handle.candidate else None,
         "prediction_data_uploaded": 'predict_input' in globals() and predict_input is not None
     }
 
@@ -67,12 +272,12 @@ def reset_state():
     Reset all global state (trained model and uploaded datasets).
     This allows users to start fresh with a new dataset.
     """
-    global processing_result, train_result, predict_input
+    global processing_result, predict_input
 
     # Clear global variables
     processing_result = None
-    train_result = None
     predict_input = None
+    model_handle.clear()
 
     # Optionally clear uploaded files
     if os.path.exists(UPLOAD_DIRECTORY):
@@ -94,68 +299,174 @@ def reset_state():
 UPLOAD_DIRECTORY = "uploaded_datasets"
 os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
 
+# Upload limits. MAX_UPLOAD_SIZE is set by docker-compose (default 10 MB) and uploads are
+# streamed to disk in UPLOAD_CHUNK_SIZE pieces so memory use stays bounded whatever the file size.
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Backend that serves trained networks unless a training request picks one: 'sklearn', or
+# 'onnxruntime' to export each network to ONNX and predict with an onnxruntime session.
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "sklearn")
+
+
+async def stream_upload_to_disk(file: UploadFile, file_path: str, max_size: Optional[int] = None) -> int:
+    """
+    Stream an uploaded file to disk chunk by chunk without blocking the event loop.
+    Reads are awaited on the UploadFile and every blocking write runs in the thread pool.
+    Raises a 413 error as soon as more than max_size (default: MAX_UPLOAD_SIZE) bytes have been received.
+
+    The data goes to a temporary file that is renamed over file_path once complete, so
+    concurrent uploads of the same file name never read each other's partial writes.
+
+    Returns:
+        Number of bytes written to file_path
+    """
+    max_size = MAX_UPLOAD_SIZE if max_size is None else max_size
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=413, detail=f"File too large: {file.size} bytes exceeds the limit of {max_size} bytes")
+
+    bytes_written = 0
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    buffer = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        try:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                bytes_written += len(chunk)
+                if bytes_written > max_size:
+                    raise HTTPException(status_code=413, detail=f"File too large: upload exceeds the limit of {max_size} bytes")
+                await run_in_threadpool(buffer.write, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.replace, tmp_path, file_path)
+    except BaseException:
+        await run_in_threadpool(remove_file, tmp_path)
+        raise
+
+    return bytes_written
+
+
+def validate_fit_dataset(file_path: str) -> Dict[str, Any]:
+    """
+    Load and validate a training dataset saved on disk. This is blocking (pickle parsing),
+    so the upload endpoint runs it in the thread pool rather than on the event loop.
+    Expected format: Dict with 'X' (n,d) and 'y' (n,) or (n,k) arrays, for any number d >= 1 of features
+
+    The full data profile (see profile_dataset) is computed here as well and cached next
+    to the file, so GET /dataset-profile does not have to load the dataset again.
+
+    Returns:
+        Preview dictionary for the upload response, with the profile under 'profile'
+    """
+    with open(file_path, "rb") as f:
+        data = pickle.load(f)
+
+    # Check if data is a dictionary with 'X' and 'y' keys
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Invalid format: Data must be a dictionary with 'X' and 'y' keys")
+
+    if 'X' not in data or 'y' not in data:
+        raise HTTPException(status_code=400, detail="Invalid format: Dictionary must contain 'X' and 'y' keys")
+
+    X = np.asarray(data['X'])
+    y = np.asarray(data['y'])
+
+    # Check dimensions
+    if len(X.shape) != 2 or X.shape[1] == 0:
+        raise HTTPException(status_code=400, detail=f"Invalid format: X must have shape (n, d) with d >= 1 features, got {X.shape}")
+
+    if len(y.shape) not in (1, 2) or (len(y.shape) == 2 and y.shape[1] == 0):
+        raise HTTPException(status_code=400, detail=f"Invalid format: y must have shape (n,) or (n, k) for k targets, got shape {y.shape}")
+
+    if X.shape[0] != y.shape[0]:
+        raise HTTPException(status_code=400, detail=f"Invalid format: X and y must have same number of samples. X: {X.shape[0]}, y: {y.shape[0]}")
+
+    # Profiling runs chunks in parallel threads: within the training pool, like the fits it prepares
+    with scheduled("training"):
+        profile = profile_dataset(X, y)
+    save_profile(file_path, profile)
+
+    # Create preview (first 5 rows)
+    preview_size = min(5, X.shape[0])
+    return {
+        "X_preview": X[:preview_size].tolist(),
+        "y_preview": y[:preview_size].tolist(),
+        "total_samples": X.shape[0],
+        "X_shape": X.shape,
+        "y_shape": y.shape,
+        "n_features": X.shape[1],
+        "n_targets": 1 if y.ndim == 1 else y.shape[1],
+        "profile": profile
+    }
+
+
+def validate_predict_dataset(file_path: str) -> Dict[str, Any]:
+    """
+    Load and validate a prediction dataset saved on disk (run in the thread pool, like validate_fit_dataset).
+    Expected format: Array with shape (n, d); d is checked against the model when predicting
+
+    Returns:
+        Preview dictionary for the upload response
+    """
+    with open(file_path, "rb") as f:
+        data = pickle.load(f)
+
+    # Convert to numpy array
+    X_pred = np.asarray(data)
+
+    # Check dimensions
+    if len(X_pred.shape) != 2 or X_pred.shape[1] == 0:
+        raise HTTPException(status_code=400, detail=f"Invalid format: Prediction data must have shape (n, d) with d >= 1 features, got {X_pred.shape}")
+
+    # Create preview (first 5 rows)
+    preview_size = min(5, X_pred.shape[0])
+    return {
+        "X_preview": X_pred[:preview_size].tolist(),
+        "total_samples": X_pred.shape[0],
+        "X_shape": X_pred.shape,
+        "n_features": X_pred.shape[1]
+    }
+
+
+def remove_file(file_path: str):
+    """Remove a (partially) written upload if it exists."""
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
 @app.post("/upload-fit-dataset/")
 async def upload_fit_dataset(
     
     file: UploadFile = File(..., description="The dataset file to upload (.pkl format).")):
     """
     This Post endpoint accepts a training dataset file upload, validates format, and saves it to the specified directory.
-    Expected format: Dict with 'X' (n,5) and 'y' (n,) arrays
+    Expected format: Dict with 'X' (n,d) and 'y' (n,) or (n,k) arrays, for any number d >= 1 of features
     """
 
     # Here, I define the path where the file will be saved.
     # The 'filename' attribute will come from the client's submitted form data.
     file_path = os.path.join(UPLOAD_DIRECTORY, file.filename)
 
-    # Use a context manager and shutil.copyfileobj for efficient file streaming
-  
+    # The upload is streamed to disk and validated off the event loop, so a large file never stalls other requests
     if str(file_path)[-3:] == 'pkl':
         global processing_result
-        processing_result = './' + str(file_path)
         try:
-            with open(file_path, "wb") as buffer:
-            # This copies the file content in chunks, suitable for large files
-                shutil.copyfileobj(file.file, buffer)
+            size_bytes = await stream_upload_to_disk(file, file_path)
+            UPLOAD_BYTES.inc(size_bytes, kind="fit")
 
             # Validate the uploaded data
             try:
-                data = pickle.load(open(file_path, "rb"))
-
-                # Check if data is a dictionary with 'X' and 'y' keys
-                if not isinstance(data, dict):
-                    raise HTTPException(status_code=400, detail="Invalid format: Data must be a dictionary with 'X' and 'y' keys")
-
-                if 'X' not in data or 'y' not in data:
-                    raise HTTPException(status_code=400, detail="Invalid format: Dictionary must contain 'X' and 'y' keys")
-
-                X = np.array(data['X'])
-                y = np.array(data['y'])
-
-                # Check dimensions
-                if len(X.shape) != 2 or X.shape[1] != 5:
-                    raise HTTPException(status_code=400, detail=f"Invalid format: X must have shape (n, 5), got {X.shape}")
-
-                if len(y.shape) != 1:
-                    raise HTTPException(status_code=400, detail=f"Invalid format: y must be 1-dimensional, got shape {y.shape}")
-
-                if X.shape[0] != y.shape[0]:
-                    raise HTTPException(status_code=400, detail=f"Invalid format: X and y must have same number of samples. X: {X.shape[0]}, y: {y.shape[0]}")
-
-                # Create preview (first 5 rows)
-                preview_size = min(5, X.shape[0])
-                preview_data = {
-                    "X_preview": X[:preview_size].tolist(),
-                    "y_preview": y[:preview_size].tolist(),
-                    "total_samples": X.shape[0],
-                    "X_shape": X.shape,
-                    "y_shape": y.shape
-                }
+                preview_data = await run_in_threadpool(validate_fit_dataset, file_path)
+                # Only a validated upload becomes the current dataset
+                processing_result = './' + str(file_path)
 
                 return {
                     "message": "Training dataset uploaded and validated successfully",
                     "filename": file.filename,
                     "content_type": file.content_type,
                     "filepath": file_path,
+                    "size_bytes": size_bytes,
                     "processing_result": processing_result,
                     "preview": preview_data,
                     "valid": True
@@ -163,16 +474,16 @@ async def upload_fit_dataset(
 
             except HTTPException as he:
                 # Remove invalid file
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                await run_in_threadpool(remove_file, file_path)
                 raise he
             except Exception as e:
                 # Remove file if validation fails
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                await run_in_threadpool(remove_file, file_path)
                 raise HTTPException(status_code=400, detail=f"Error validating file: {str(e)}")
 
         except HTTPException:
+            # stream_upload_to_disk has already removed its partial file; file_path may be an
+            # earlier, valid upload of the same name and is left alone
             raise
         except Exception as e:
             # Handle potential errors during file handling
@@ -184,6 +495,26 @@ async def upload_fit_dataset(
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a .pkl file.")
 
 
+@app.get("/dataset-profile", response_model=Dict[str, Any])
+def get_dataset_profile():
+    """
+    Profile of the uploaded training dataset: per-feature min/max/mean/std, quantiles and
+    NaN counts, duplicate rows and the target distribution.
+    The profile cached at upload time is returned; it is recomputed only if the file changed.
+    """
+    require_training_dataset()
+    profile = load_cached_profile(processing_result)
+    cached = profile is not None
+    if profile is None:
+        with open(processing_result, "rb") as f:
+            data = pickle.load(f)
+        with scheduled("training"):
+            profile = profile_dataset(data['X'], data['y'])
+        save_profile(processing_result, profile)
+
+    return {"dataset": processing_result, "cached": cached, "profile": profile}
+
+
 # Define the Pydantic input model (Schema)
 class HyperparametersConfig(BaseModel):
     """
@@ -196,11 +527,41 @@ class HyperparametersConfig(BaseModel):
     max_iterations: int = Field(default=500, ge=100, le=2000, description="Maximum training iterations")
     early_stopping: bool = Field(default=True, description="Enable early stopping")
 
+class EngineConfig(BaseModel):
+    """
+    Schema for the parameters of the non-neural engines ('knn' and 'rbf').
+    """
+    neighbors: Optional[int] = Field(default=None, ge=1, le=1024, description="Training points used per prediction (default: 8 for knn, 32 for rbf)")
+    power: float = Field(default=2.0, ge=0.0, le=8.0, description="Inverse-distance weighting exponent (knn)")
+    kernel: str = Field(default="thin_plate_spline", pattern="^(thin_plate_spline|cubic|quintic|linear|gaussian|multiquadric|inverse_multiquadric|inverse_quadratic)$", description="RBF kernel (rbf)")
+    smoothing: float = Field(default=0.0, ge=0.0, description="RBF smoothing, 0 interpolates the training points exactly (rbf)")
+    epsilon: float = Field(default=1.0, gt=0.0, description="RBF shape parameter in standardized units (rbf)")
+
+class PruningConfig(BaseModel):
+    """
+    Schema for structured pruning of the trained network's hidden units.
+    """
+    keep_fraction: float = Field(default=0.5, gt=0.0, le=1.0, description="Fraction of the units kept in every hidden layer")
+    criterion: str = Field(default="magnitude", pattern="^(magnitude|activation)$", description="Remove the units with the smallest weights (magnitude) or mean contribution (activation)")
+    fine_tune_iterations: int = Field(default=10, ge=0, le=200, description="Epochs of fine-tuning after pruning")
+
 class TrainRequest(BaseModel):
     """
      This is a schema for the POST request body with hyperparameters.
     """
+    engine: str = Field(default="mlp", pattern="^(mlp|knn|rbf|auto)$", description="Interpolation engine: neural network (mlp), inverse-distance k-NN (knn), local RBF (rbf), or auto to choose from probe fits")
+    time_budget: Optional[float] = Field(default=None, gt=0.0, description="With engine=auto: estimated fit time, in seconds, the chosen engine must stay within")
+    r2_target: Optional[float] = Field(default=None, le=1.0, description="With engine=auto: choose the cheapest engine expected to reach this R²")
     hyperparameters: Optional[HyperparametersConfig] = Field(default=None, description="Model hyperparameters")
+    engine_config: Optional[EngineConfig] = Field(default=None, description="Parameters of the knn or rbf engine")
+    pruning: Optional[PruningConfig] = Field(default=None, description="Remove hidden units after training, then fine-tune")
+    quantization: Optional[str] = Field(default=None, pattern="^(float32|int8)$", description="Quantize the trained network's weights to float32 or int8 (per-channel scales) for faster, smaller inference")
+    inference_backend: Optional[str] = Field(default=None, pattern="^(sklearn|onnxruntime)$", description="Serve a trained network with sklearn or through onnxruntime (default: the server's INFERENCE_BACKEND)")
+    min_r2: Optional[float] = Field(default=None, le=1.0, description="Minimum holdout R² required before the new model replaces the live one")
+    shadow_fraction: Optional[float] = Field(default=None, gt=0.0, le=1.0, description="Serve the new model in shadow on this fraction of prediction traffic instead of swapping it in")
+    max_train_rows: Optional[int] = Field(default=None, ge=100, description="Subsample the training rows to this budget, preserving coverage of the input space")
+    reduction_method: str = Field(default="grid", pattern="^(grid|kmeans|random)$", description="Subsampling strategy used with max_train_rows")
+    dedup_tolerance: Optional[float] = Field(default=None, ge=0.0, description="Collapse duplicate inputs (0) or inputs closer than this grid cell size, averaging their targets")
 
 
 @app.get("/hyperparameters/defaults")
@@ -218,29 +579,13 @@ def get_default_hyperparameters():
     }
 
 
-# Training Endpoint
-@app.post("/start-training/", response_model=Dict[str, Any])
-def start_training(request: TrainRequest = TrainRequest()):
+def resolve_hyperparameters(request: TrainRequest):
     """
-    Trigger model training with configurable hyperparameters.
-    Accept optional hyperparameters in the request body.
-    """
-
-    # Check if training data has been uploaded
-    if 'processing_result' not in globals() or processing_result is None:
-        raise HTTPException(
-            status_code=400,
-            detail="No training dataset uploaded. Please upload a training dataset first using /upload-fit-dataset/"
-        )
-
-    # Verify the dataset file still exists
-    if not os.path.exists(processing_result):
-        raise HTTPException(
-            status_code=400,
-            detail=f"Training dataset file not found at {processing_result}. Please upload the dataset again."
-        )
+    Extract the hyperparameters from a training request, falling back to the defaults.
 
-    # Extract hyperparameters or use defaults
+    Returns:
+        Tuple of (hidden_layers, learning_rate, max_iterations, early_stopping)
+    """
     if request.hyperparameters:
         hyperparams = request.hyperparameters
         hidden_layers = (
@@ -258,79 +603,526 @@ def start_training(request: TrainRequest = TrainRequest()):
         max_iterations = 500
         early_stopping = True
 
-    # Call training function with hyperparameters
-    try:
-        global train_result
-        train_result = benchmark_training_speed(
-            processing_result,
-            hidden_layers=hidden_layers,
-            learning_rate=learning_rate,
-            max_iterations=max_iterations,
-            early_stopping=early_stopping
+    return hidden_layers, learning_rate, max_iterations, early_stopping
+
+
+def hyperparameters_of(model) -> Dict[str, Any]:
+    """The hyperparameters a trained model was built with, as reported in training responses."""
+    params = model.get_params()
+    if model.engine == "mlp":
+        keys = ("hidden_layers", "learning_rate", "max_iterations", "early_stopping")
+    else:
+        keys = [key for key in params if key not in ("engine", "training_time", "n_features", "n_targets")]
+    return {key: params[key] for key in keys}
+
+
+def resolve_engine_params(request: TrainRequest) -> Dict[str, Any]:
+    """
+    Keyword arguments of the requested non-neural engine (empty for 'mlp'), falling back to the defaults.
+    """
+    for option, requested in (("Quantization", request.quantization), ("Pruning", request.pruning)):
+        if requested and request.engine not in ("mlp", "auto"):
+            raise HTTPException(
+                status_code=400,
+                detail=f"{option} applies to the mlp engine, not '{request.engine}'"
+            )
+    config = request.engine_config or EngineConfig()
+    if request.engine == "knn":
+        return {"n_neighbors": config.neighbors or 8, "power": config.power}
+    if request.engine == "rbf":
+        return {"neighbors": config.neighbors or 32, "kernel": config.kernel,
+                "smoothing": config.smoothing, "epsilon": config.epsilon}
+    return {}
+
+
+def require_training_dataset():
+    """Raise a 400 error unless a training dataset has been uploaded and is still on disk."""
+    # Check if training data has been uploaded
+    if 'processing_result' not in globals() or processing_result is None:
+        raise HTTPException(
+            status_code=400,
+            detail="No training dataset uploaded. Please upload a training dataset first using /upload-fit-dataset/"
         )
 
-        # Return the result with hyperparameters used
+    # Verify the dataset file still exists
+    if not os.path.exists(processing_result):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Training dataset file not found at {processing_result}. Please upload the dataset again."
+        )
+
+
+# Training Endpoint
+@app.post("/start-training/", response_model=Dict[str, Any])
+def start_training(request: TrainRequest = TrainRequest(), profile: bool = False):
+    """
+    Trigger model training with configurable hyperparameters.
+    Accept optional hyperparameters in the request body, or engine='knn'/'rbf' with an
+    engine_config to train a non-neural interpolator instead. With engine='auto' the
+    engine is chosen from probe fits against time_budget and/or r2_target.
+    With ?profile=true the training job is profiled and a profile_id is returned.
+    """
+
+    require_training_dataset()
+
+    hidden_layers, learning_rate, max_iterations, early_stopping = resolve_hyperparameters(request)
+    engine_params = resolve_engine_params(request)
+
+    # Call training function with hyperparameters. The live model keeps serving meanwhile.
+    try:
+        with scheduled("training") as threads:
+            (model, metrics), profile_id = run_with_optional_profile(
+                profile, "start-training",
+                benchmark_training_speed,
+                processing_result,
+                hidden_layers=hidden_layers,
+                learning_rate=learning_rate,
+                max_iterations=max_iterations,
+                early_stopping=early_stopping,
+                max_train_rows=request.max_train_rows,
+                reduction_method=request.reduction_method,
+                dedup_tolerance=request.dedup_tolerance,
+                engine=request.engine,
+                engine_params=engine_params,
+                time_budget=request.time_budget,
+                r2_target=request.r2_target,
+                quantization=request.quantization,
+                pruning=request.pruning.model_dump() if request.pruning else None,
+                inference_backend=request.inference_backend or INFERENCE_BACKEND
+            )
+    except HTTPException:
+        raise
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
+    record_training(model)
+    limit_inference_threads(model)
+
+    hyperparameters_used = hyperparameters_of(model)
+    info = {"engine": model.engine, "hyperparameters": hyperparameters_used,
+            "n_features": model.n_features_, "n_targets": model.n_targets_,
+            "quantization": request.quantization if model.quantization_ else None,
+            "inference_backend": model.backend, "dataset": processing_result}
+
+    # Validate against the holdout split, then swap (or stage as shadow candidate)
+    try:
+        if request.shadow_fraction:
+            version, deployment = model_handle.stage_candidate(
+                model, metrics, request.shadow_fraction, min_r2=request.min_r2, info=info)
+        else:
+            version = model_handle.publish(model, metrics, min_r2=request.min_r2, info=info)
+            deployment = "live"
+    except ModelValidationError as e:
+        raise HTTPException(status_code=422, detail=f"New model rejected, previous model kept: {str(e)}")
+
+    # Return the result with hyperparameters used
+    return {
+        "message": "Training job initiated and completed successfully.",
+        "function_result": metrics,
+        "model_version": version.version,
+        "engine": model.engine,
+        "engine_selection": model.selection_,
+        "quantization": model.quantization_,
+        "pruning": model.pruning_,
+        "inference_backend": model.backend,
+        "n_features": model.n_features_,
+        "n_targets": model.n_targets_,
+        "deployment": deployment,
+        "profile_id": profile_id,
+        "threads": threads,
+        "hyperparameters_used": hyperparameters_used,
+        "reduction": model.reduction_,
+        "deduplication": model.dedup_
+    }
+
+
+@app.get("/model/shadow-report", response_model=Dict[str, Any])
+def get_shadow_report():
+    """
+    Compare the shadow candidate with the live model: latency and prediction deltas
+    on the shadowed traffic, plus the difference of their holdout metrics.
+    """
+    return model_handle.shadow_report()
+
+
+@app.post("/model/promote", response_model=Dict[str, Any])
+def promote_candidate():
+    """
+    Atomically make the shadow candidate the live model.
+    """
+    try:
+        version = model_handle.promote_candidate()
+    except LookupError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"message": f"Model version {version.version} is now live.", "model_version": version.version}
+
+
+@app.post("/model/discard-candidate", response_model=Dict[str, Any])
+def discard_candidate():
+    """
+    Drop the shadow candidate; the live model is unaffected.
+    """
+    try:
+        model_handle.discard_candidate()
+    except LookupError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"message": "Candidate model discarded."}
+
+
+def onnx_response(model, dataset, fuse_scaling, filename):
+    """
+    Serialize a trained network as an ONNX file download. With fuse_scaling, the scalers of the
+    dataset the model was trained on are folded in, so the graph takes and returns raw values.
+    """
+    scaler_X = scaler_y = None
+    if fuse_scaling:
+        if not dataset or not os.path.exists(dataset):
+            raise HTTPException(
+                status_code=400,
+                detail="The model's training dataset is no longer available to fuse its scaling. Use fuse_scaling=false."
+            )
+        _, _, _, _, _, _, scaler_X, scaler_y = load_dataset(dataset)
+
+    try:
+        content = export_onnx(model, scaler_X, scaler_y)
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Response(content=content, media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@app.get("/model/onnx")
+def download_live_model_onnx(fuse_scaling: bool = False):
+    """
+    Download the live network as an ONNX graph (input 'X', output 'y', float32).
+    By default the graph works on standardized values like the model; with ?fuse_scaling=true
+    the training dataset's scaling is folded into it.
+    """
+    current = model_handle.current
+    if current is None:
+        raise HTTPException(status_code=400, detail="No live model to export. Please train a model first.")
+    return onnx_response(current.model, current.info.get("dataset"), fuse_scaling,
+                         f"model_v{current.version}.onnx")
+
+
+# Named models. Each team trains and queries its own model id; resident models are capped by
+# MODEL_MEMORY_BUDGET and the least recently used ones are unloaded to MODEL_DIRECTORY.
+MODEL_DIRECTORY = os.environ.get("MODEL_DIRECTORY", "model_artifacts")
+MODEL_MEMORY_BUDGET = int(os.environ.get("MODEL_MEMORY_BUDGET", 256 * 1024 * 1024))
+model_registry = ModelRegistry(MODEL_DIRECTORY, memory_budget_bytes=MODEL_MEMORY_BUDGET)
+
+# The live model sits behind a versioned handle: retraining builds and validates a new model
+# first and then swaps the reference atomically, so in-flight requests keep using their snapshot.
+# Its versions and state are kept in MODEL_DIRECTORY/live, so that every worker process serves
+# the same live model and shadow candidate.
+model_handle = ModelHandle(ModelRegistry(os.path.join(MODEL_DIRECTORY, "live")), on_load=limit_inference_threads)
+
+
+def model_registry_collector():
+    """Scrape-time metrics for the named model cache."""
+    stats = model_registry.stats()
+    return [
+        ("fivedreg_model_cache_hits_total", "counter", "Named model lookups served from memory.", stats["hits"]),
+        ("fivedreg_model_cache_misses_total", "counter", "Named model lookups that reloaded the model from disk.", stats["misses"]),
+        ("fivedreg_model_cache_hit_ratio", "gauge", "Fraction of named model lookups served from memory.", stats["hit_rate"]),
+        ("fivedreg_model_cache_evictions_total", "counter", "Named models unloaded to stay within the memory budget.", stats["evictions"]),
+        ("fivedreg_model_cache_resident_bytes", "gauge", "Estimated size of the named models held in memory.", stats["resident_bytes"]),
+        ("fivedreg_model_load_seconds", "gauge", "Time taken by the most recent model reload from disk.", stats["last_load_time"])]
+
+
+metrics_registry.add_collector(model_registry_collector)
+
+
+class ModelPredictionRequest(BaseModel):
+    """
+    Schema for predictions with a named model: one or more rows with as many features as the model was trained on.
+    """
+    features: List[List[float]]
+
+
+@app.get("/models", response_model=Dict[str, Any])
+def list_models():
+    """
+    List every named model with its metadata and whether it is currently loaded in memory.
+    """
+    return {
+        "models": model_registry.list_models(),
+        "registry": model_registry.stats()
+    }
+
+
+@app.post("/models/{model_id}/train", response_model=Dict[str, Any])
+def train_named_model(model_id: str, request: TrainRequest = TrainRequest(), profile: bool = False):
+    """
+    Train a model on the uploaded training dataset and register it under model_id.
+    An existing model with the same id is replaced.
+    """
+    try:
+        ModelRegistry.validate_model_id(model_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    require_training_dataset()
+    hidden_layers, learning_rate, max_iterations, early_stopping = resolve_hyperparameters(request)
+    engine_params = resolve_engine_params(request)
+
+    try:
+        with scheduled("training") as threads:
+            (model, metrics), profile_id = run_with_optional_profile(
+                profile, f"models/{model_id}/train",
+                benchmark_training_speed,
+                processing_result,
+                hidden_layers=hidden_layers,
+                learning_rate=learning_rate,
+                max_iterations=max_iterations,
+                early_stopping=early_stopping,
+                max_train_rows=request.max_train_rows,
+                reduction_method=request.reduction_method,
+                dedup_tolerance=request.dedup_tolerance,
+                engine=request.engine,
+                engine_params=engine_params,
+                time_budget=request.time_budget,
+                r2_target=request.r2_target,
+                quantization=request.quantization,
+                pruning=request.pruning.model_dump() if request.pruning else None,
+                inference_backend=request.inference_backend or INFERENCE_BACKEND
+            )
+        record_training(model)
+        limit_inference_threads(model)
+        hyperparameters_used = hyperparameters_of(model)
+        record = model_registry.put(model_id, model, {
+            "engine": model.engine,
+            "quantization": request.quantization if model.quantization_ else None,
+            "inference_backend": model.backend,
+            "metrics": {name: float(value) for name, value in metrics.items()},
+            "hyperparameters": hyperparameters_used,
+            "n_features": model.n_features_,
+            "n_targets": model.n_targets_,
+            "training_time": model.training_time_,
+            "deduplication": model.dedup_,
+            "dataset": processing_result
+        })
+
         return {
-            "message": "Training job initiated and completed successfully.",
-            "function_result": train_result[1],
-            "hyperparameters_used": {
-                "hidden_layers": hidden_layers,
-                "learning_rate": learning_rate,
-                "max_iterations": max_iterations,
-                "early_stopping": early_stopping
-            }
+            "message": f"Model '{model_id}' trained and registered successfully.",
+            "model": record,
+            "function_result": metrics,
+            "profile_id": profile_id,
+            "threads": threads,
+            "hyperparameters_used": hyperparameters_used,
+            "engine_selection": model.selection_,
+            "quantization": model.quantization_,
+            "pruning": model.pruning_,
+            "inference_backend": model.backend,
+            "reduction": model.reduction_,
+            "deduplication": model.dedup_
         }
+    except HTTPException:
+        raise
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
 
 
+@app.post("/models/{model_id}/predict", response_model=Dict[str, Any])
+def predict_named_model(model_id: str, request: ModelPredictionRequest, profile: bool = False):
+    """
+    Predict one or more rows with the model registered under model_id (each row needs the model's number of features).
+    The model is reloaded from disk if it had been unloaded.
+    """
+    try:
+        model = model_registry.get(model_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Model '{model_id}' not found")
+
+    input_array = np.asarray(request.features, dtype=float)
+    if input_array.ndim != 2 or input_array.shape[0] == 0:
+        raise HTTPException(status_code=400, detail=f"Expected a non-empty list of feature rows, got shape {input_array.shape}")
+    require_input_dim(model, input_array.shape[1])
+
+    try:
+        start_time = time.perf_counter()
+        with scheduled("inference") as threads:
+            predictions, profile_id = run_with_optional_profile(profile, f"models/{model_id}/predict", model.predict, input_array)
+        record_prediction(input_array.shape[0], time.perf_counter() - start_time)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error during prediction: {str(e)}")
+
+    return {
+        "message": "Prediction completed successfully.",
+        "model_id": model_id,
+        "predictions": predictions.tolist(),
+        "n_samples": int(input_array.shape[0]),
+        "profile_id": profile_id,
+        "threads": threads
+    }
+
+
+@app.get("/models/{model_id}/onnx")
+def download_named_model_onnx(model_id: str, fuse_scaling: bool = False):
+    """
+    Download the network registered under model_id as an ONNX graph (see /model/onnx).
+    """
+    try:
+        model = model_registry.get(model_id)
+        metadata = model_registry.metadata(model_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Model '{model_id}' not found")
+    return onnx_response(model, metadata.get("dataset"), fuse_scaling, f"{model_id}.onnx")
+
+
+@app.delete("/models/{model_id}", response_model=Dict[str, Any])
+def delete_named_model(model_id: str):
+    """
+    Remove a named model from memory and delete its artifact.
+    """
+    try:
+        model_registry.delete(model_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Model '{model_id}' not found")
+
+    return {"message": f"Model '{model_id}' deleted.", "model_id": model_id}
+
+
+class DistillRequest(BaseModel):
+    """
+    Schema for distilling the live model, or an ensemble of named models, into a small student network.
+    """
+    teacher_models: Optional[List[str]] = Field(default=None, min_length=1, max_length=16, description="Named models whose mean prediction is distilled (default: the live model)")
+    hidden_layers: List[Annotated[int, Field(ge=2, le=256)]] = Field(default=[32, 16], min_length=1, max_length=4, description="Neurons per hidden layer of the student")
+    n_synthetic: int = Field(default=50_000, ge=1_000, le=2_000_000, description="Synthetic points inside the training bounds labelled by the teacher")
+    learning_rate: float = Field(default=0.001, ge=0.0001, le=0.01, description="Learning rate of the student")
+    max_iterations: int = Field(default=200, ge=10, le=2000, description="Maximum training iterations of the student")
+    model_id: Optional[str] = Field(default=None, description="Register the student under this named model id instead of publishing it")
+    min_r2: Optional[float] = Field(default=None, le=1.0, description="Minimum holdout R² required before the student replaces the live model")
+    shadow_fraction: Optional[float] = Field(default=None, gt=0.0, le=1.0, description="Serve the student in shadow on this fraction of prediction traffic instead of swapping it in")
+
+
+@app.post("/model/distill", response_model=Dict[str, Any])
+def distill_live_model(request: DistillRequest = DistillRequest(), profile: bool = False):
+    """
+    Distill the live model (or the mean of teacher_models) into a small student network trained
+    on dense synthetic points inside the bounds of the uploaded training dataset.
+    The student is published like a newly trained model (live, or in shadow with shadow_fraction),
+    or registered under model_id, and keeps the measured error bound against its teacher.
+    """
+    if request.model_id is not None:
+        try:
+            ModelRegistry.validate_model_id(request.model_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    require_training_dataset()
+    if request.teacher_models:
+        try:
+            teacher = [model_registry.get(model_id) for model_id in request.teacher_models]
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=f"Model {str(e)} not found")
+    elif model_handle.current is not None:
+        teacher = model_handle.current.model
+    else:
+        raise HTTPException(status_code=400, detail="No live model to distill. Train a model or give teacher_models.")
+
+    try:
+        with scheduled("training") as threads:
+            (student, metrics), profile_id = run_with_optional_profile(
+                profile, "model/distill",
+                distill_model,
+                teacher,
+                processing_result,
+                hidden_layers=tuple(request.hidden_layers),
+                n_synthetic=request.n_synthetic,
+                learning_rate=request.learning_rate,
+                max_iterations=request.max_iterations
+            )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Distillation failed: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Distillation failed: {str(e)}")
+    record_training(student)
+
+    report = student.distillation_
+    hyperparameters_used = hyperparameters_of(student)
+    info = {"engine": student.engine, "hyperparameters": hyperparameters_used,
+            "n_features": student.n_features_, "n_targets": student.n_targets_,
+            "distilled_from": request.teacher_models or "live", "error_bound": report["error_bound"],
+            "inference_backend": student.backend, "dataset": processing_result}
+
+    response = {
+        "function_result": metrics,
+        "profile_id": profile_id,
+        "threads": threads,
+        "hyperparameters_used": hyperparameters_used,
+        "distillation": report
+    }
+    if request.model_id is not None:
+        record = model_registry.put(request.model_id, student, {
+            **info,
+            "metrics": {name: float(value) for name, value in metrics.items()},
+            "training_time": student.training_time_,
+            "dataset": processing_result
+        })
+        return {"message": f"Student model registered as '{request.model_id}'.", "model": record, **response}
+
+    try:
+        if request.shadow_fraction:
+            version, deployment = model_handle.stage_candidate(
+                student, metrics, request.shadow_fraction, min_r2=request.min_r2, info=info)
+        else:
+            version = model_handle.publish(student, metrics, min_r2=request.min_r2, info=info)
+            deployment = "live"
+    except ModelValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Student model rejected, previous model kept: {str(e)}")
+
+    return {"message": "Student model distilled and published.", "model_version": version.version,
+            "deployment": deployment, **response}
+
+
+
 @app.post("/upload-predict-dataset/")
 async def upload_predict_dataset(
    
     file: UploadFile = File(..., description="The dataset file to upload (.pkl format).")):
     """
     This function accepts a prediction dataset file upload, validates format, and saves it to the specified directory.
-    Expected format: Array with shape (n, 5)
+    Expected format: Array with shape (n, d), d matching the trained model
     """
 
     # The path where the file will be saved
     # The 'filename' attribute comes from the client's submitted form data
     file_path = os.path.join(UPLOAD_DIRECTORY, file.filename)
 
-    # Here we use a context manager and shutil.copyfileobj for efficient file streaming
-    # 'file.file' is the SpooledTemporaryFile object
+    # Here we stream the upload to disk in chunks and validate it in the thread pool
+    # 'file' is read asynchronously, so the event loop keeps serving other requests
     if str(file_path)[-3:] == 'pkl':
         global predict_input
-        predict_input = './' + str(file_path)
         try:
-            with open(file_path, "wb") as buffer:
-            # This copies the file content in chunks, suitable for large files
-                shutil.copyfileobj(file.file, buffer)
+            size_bytes = await stream_upload_to_disk(file, file_path)
+            UPLOAD_BYTES.inc(size_bytes, kind="predict")
 
             # Validate the uploaded data
             try:
-                data = pickle.load(open(file_path, "rb"))
-
-                # Convert to numpy array
-                X_pred = np.array(data)
-
-                # Check dimensions
-                if len(X_pred.shape) != 2 or X_pred.shape[1] != 5:
-                    raise HTTPException(status_code=400, detail=f"Invalid format: Prediction data must have shape (n, 5), got {X_pred.shape}")
-
-                # Create preview (first 5 rows)
-                preview_size = min(5, X_pred.shape[0])
-                preview_data = {
-                    "X_preview": X_pred[:preview_size].tolist(),
-                    "total_samples": X_pred.shape[0],
-                    "X_shape": X_pred.shape
-                }
+                preview_data = await run_in_threadpool(validate_predict_dataset, file_path)
+                # Only a validated upload becomes the current dataset
+                predict_input = './' + str(file_path)
 
                 return {
                     "message": "Prediction dataset uploaded and validated successfully",
                     "filename": file.filename,
                     "content_type": file.content_type,
                     "filepath": file_path,
+                    "size_bytes": size_bytes,
                     "predict_input": predict_input,
                     "preview": preview_data,
                     "valid": True
@@ -338,16 +1130,16 @@ async def upload_predict_dataset(
 
             except HTTPException as he:
                 # Remove invalid file
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                await run_in_threadpool(remove_file, file_path)
                 raise he
             except Exception as e:
                 # Remove file if validation fails
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                await run_in_threadpool(remove_file, file_path)
                 raise HTTPException(status_code=400, detail=f"Error validating file: {str(e)}")
 
         except HTTPException:
+            # stream_upload_to_disk has already removed its partial file; file_path may be an
+            # earlier, valid upload of the same name and is left alone
             raise
         except Exception as e:
         # Handle potential errors during file handling
@@ -369,30 +1161,39 @@ class TrainRequest(BaseModel):
 
 class SinglePredictionRequest(BaseModel):
     """
-    Schema for single prediction request with 5 features.
+    Schema for single prediction request: one value per feature of the trained model.
     """
     features: List[float]
 
 @app.post("/start-predict/", response_model=Dict[str, Any])
-def predict_batch():
+def predict_batch(profile: bool = False):
     """
     Perform batch prediction using uploaded dataset.
     For this, the user only needs to send a simple POST request (e.g., via a button click) and no request body data is required.
     """
 
     try:
-        if 'train_result' not in globals() or train_result is None:
+        if model_handle.current is None:
             raise HTTPException(status_code=400, detail="No trained model available. Please train a model first.")
 
         if 'predict_input' not in globals() or predict_input is None:
             raise HTTPException(status_code=400, detail="No prediction data uploaded. Please upload a prediction dataset first.")
 
-        predicted_result = train_result[0].predict(pickle.load(open(predict_input, "rb")))
+        with open(predict_input, "rb") as f:
+            X_pred = pickle.load(f)
+        require_input_dim(model_handle.current.model, np.shape(X_pred)[1])
+        start_time = time.perf_counter()
+        with scheduled("inference") as threads:
+            (predicted_result, version), profile_id = run_with_optional_profile(profile, "start-predict", model_handle.predict, X_pred)
+        record_prediction(len(predicted_result), time.perf_counter() - start_time)
 
         # Return the result of the function call
         return {
             "message": "Batch prediction completed successfully.",
             "function_result": str(predicted_result),
+            "model_version": version.version,
+            "profile_id": profile_id,
+            "threads": threads,
             "prediction_type": "batch"
         }
     except HTTPException:
@@ -401,32 +1202,208 @@ def predict_batch():
         raise HTTPException(status_code=500, detail=f"Error during prediction: {str(e)}")
 
 @app.post("/predict-single/", response_model=Dict[str, Any])
-def predict_single(request: SinglePredictionRequest):
+def predict_single(request: SinglePredictionRequest, profile: bool = False):
     """
-    Performs single prediction with 5 input features.
+    Performs single prediction with one value per input feature of the trained model.
     """
 
     try:
-        if 'train_result' not in globals() or train_result is None:
+        if model_handle.current is None:
             raise HTTPException(status_code=400, detail="No trained model available. Please train a model first.")
 
-        # Validate that we have exactly 5 features
-        if len(request.features) != 5:
-            raise HTTPException(status_code=400, detail=f"Expected 5 features, got {len(request.features)}")
+        # Validate the number of features against the model's input dimension
+        require_input_dim(model_handle.current.model, len(request.features))
 
         # Convert to numpy array and reshape for prediction
         input_array = np.array([request.features])
 
         # Make prediction
-        predicted_result = train_result[0].predict(input_array)
+        start_time = time.perf_counter()
+        with scheduled("inference") as threads:
+            (predicted_result, version), profile_id = run_with_optional_profile(profile, "predict-single", model_handle.predict, input_array)
+        record_prediction(1, time.perf_counter() - start_time)
 
         return {
             "message": "Single prediction completed successfully.",
             "input_features": request.features,
-            "prediction": float(predicted_result[0]),
+            "prediction": prediction_value(predicted_result[0]),
+            "model_version": version.version,
+            "profile_id": profile_id,
+            "threads": threads,
             "prediction_type": "single"
         }
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error during prediction: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error during prediction: {str(e)}")
+
+
+# Batch prediction jobs. Large files are scored in row shards by a pool of worker processes in
+# the background; clients poll the job's progress and download the ordered output when it is done.
+# Jobs and their inputs live in BATCH_PREDICTION_DIRECTORY, shared by all worker processes, and
+# inputs are uploaded as .npy files of up to MAX_BATCH_INPUT_SIZE bytes (default 10 GB).
+BATCH_PREDICTION_DIRECTORY = os.environ.get("BATCH_PREDICTION_DIRECTORY", "batch_predictions")
+BATCH_INPUT_DIRECTORY = os.path.join(BATCH_PREDICTION_DIRECTORY, "inputs")
+MAX_BATCH_INPUT_SIZE = int(os.environ.get("MAX_BATCH_INPUT_SIZE", 10 * 1024 ** 3))
+os.makedirs(BATCH_INPUT_DIRECTORY, exist_ok=True)
+
+
+def record_batch_job(job):
+    """Record a finished batch prediction job; its scored rows count as predictions."""
+    BATCH_JOBS.inc(state=job.state)
+    if job.state == "completed":
+        record_prediction(job.rows_done, job.elapsed_seconds)
+
+
+batch_predictions = BatchPredictionManager(BATCH_PREDICTION_DIRECTORY, thread_slot=scheduled, on_finish=record_batch_job)
+
+
+def batch_input_path(name: str) -> str:
+    """Path of an input file name in the batch input or upload directory, or a 400/404 error."""
+    if not name or os.path.basename(name) != name or name.startswith("."):
+        raise HTTPException(status_code=400, detail="input_file must be a file name, not a path")
+    for directory in (BATCH_INPUT_DIRECTORY, UPLOAD_DIRECTORY):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    raise HTTPException(status_code=404, detail=f"Input file '{name}' not found")
+
+
+@app.post("/batch-predictions/inputs", status_code=201)
+async def upload_batch_input(file: UploadFile = File(..., description="A 2D .npy array of feature rows to score.")):
+    """
+    Upload a .npy input for batch prediction jobs, up to MAX_BATCH_INPUT_SIZE bytes. It is streamed
+    to disk and only its header is checked, so the file need not fit in memory; jobs memory-map it.
+    """
+    name = os.path.basename(file.filename or "")
+    if not name.endswith(".npy") or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a .npy file.")
+    file_path = os.path.join(BATCH_INPUT_DIRECTORY, name)
+    try:
+        size_bytes = await stream_upload_to_disk(file, file_path, max_size=MAX_BATCH_INPUT_SIZE)
+    finally:
+        await file.close()
+    UPLOAD_BYTES.inc(size_bytes, kind="batch")
+
+    try:
+        shape = await run_in_threadpool(prediction_input_shape, file_path)
+    except Exception as e:
+        await run_in_threadpool(remove_file, file_path)
+        raise HTTPException(status_code=400, detail=f"Invalid .npy file: {str(e)}")
+
+    return {"message": "Batch prediction input uploaded.", "input_file": name, "size_bytes": size_bytes,
+            "total_samples": shape[0], "n_features": shape[1]}
+
+
+@app.delete("/batch-predictions/inputs/{name}", response_model=Dict[str, Any])
+def delete_batch_input(name: str):
+    """
+    Delete an uploaded batch prediction input. Jobs that already started scoring it are not affected
+    until they finish reading it.
+    """
+    path = os.path.join(BATCH_INPUT_DIRECTORY, os.path.basename(name))
+    if os.path.basename(name) != name or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Input file '{name}' not found")
+    remove_file(path)
+    return {"message": f"Batch prediction input '{name}' deleted.", "input_file": name}
+
+
+class BatchPredictionRequest(BaseModel):
+    """
+    Schema for a batch prediction job.
+    """
+    model_id: Optional[str] = Field(default=None, description="Named model to score with (default: the live model)")
+    input_file: Optional[str] = Field(default=None, description="A .npy input uploaded to /batch-predictions/inputs, or a .npy/.pkl file of the upload directory (default: the uploaded prediction dataset)")
+    shard_rows: int = Field(default=100_000, ge=1, le=10_000_000, description="Rows scored per shard")
+    processes: Optional[int] = Field(default=None, ge=1, le=64, description="Worker processes (default: the job's share of the inference threads)")
+    output_format: str = Field(default="npy", pattern="^(npy|csv)$", description="Write the predictions as a .npy array or a CSV file")
+
+
+def get_batch_status(job_id: str) -> Dict[str, Any]:
+    """Status of the batch prediction job with job_id, from whichever worker process runs it, or a 404 error."""
+    try:
+        return batch_predictions.status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Batch prediction job '{job_id}' not found")
+
+
+@app.post("/batch-predictions", response_model=Dict[str, Any], status_code=202)
+def start_batch_prediction(request: BatchPredictionRequest = BatchPredictionRequest()):
+    """
+    Start scoring a whole file in the background: its rows are split into shards of shard_rows rows,
+    predicted across worker processes that each hold a copy of the model, and written to one output
+    file in input order. Poll GET /batch-predictions/{job_id} and download the result when completed.
+    The request only checks the input's header; the model copy and any .pkl conversion are made by the job.
+    """
+    if request.model_id is not None:
+        try:
+            model = model_registry.get(request.model_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Model '{request.model_id}' not found")
+        model_version = None
+    elif model_handle.current is not None:
+        model, model_version = model_handle.current.model, model_handle.current.version
+    else:
+        raise HTTPException(status_code=400, detail="No trained model available. Please train a model first.")
+
+    if request.input_file is not None:
+        input_path = batch_input_path(request.input_file)
+    elif 'predict_input' in globals() and predict_input is not None:
+        input_path = predict_input
+    else:
+        raise HTTPException(status_code=400, detail="No prediction data uploaded. Please upload a batch input or a prediction dataset.")
+
+    try:
+        job = batch_predictions.submit(model, input_path, shard_rows=request.shard_rows,
+                                       processes=request.processes, output_format=request.output_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "message": "Batch prediction job started.",
+        "model_id": request.model_id,
+        "model_version": model_version,
+        **job.status()
+    }
+
+
+@app.get("/batch-predictions", response_model=Dict[str, Any])
+def list_batch_predictions():
+    """
+    Status of the running and most recent batch prediction jobs of all worker processes.
+    """
+    return {"jobs": batch_predictions.list_jobs()}
+
+
+@app.get("/batch-predictions/{job_id}", response_model=Dict[str, Any])
+def get_batch_prediction(job_id: str):
+    """
+    Progress (rows and shards done), throughput and estimated time left of a batch prediction job.
+    """
+    return get_batch_status(job_id)
+
+
+@app.get("/batch-predictions/{job_id}/result")
+def download_batch_prediction(job_id: str):
+    """
+    Download the predictions of a completed job, one row (or one value) per input row, in input order.
+    """
+    status = get_batch_status(job_id)
+    if status["state"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Batch prediction job '{job_id}' is {status['state']}, not completed")
+    output_format = status["output_format"]
+    media_type = "text/csv" if output_format == "csv" else "application/octet-stream"
+    return FileResponse(batch_predictions.output_path(job_id), media_type=media_type,
+                        filename=f"predictions_{job_id}.{output_format}")
+
+
+@app.delete("/batch-predictions/{job_id}", response_model=Dict[str, Any])
+def delete_batch_prediction(job_id: str):
+    """
+    Cancel a running batch prediction job (its running shards finish first) or delete a finished one with its output.
+    """
+    try:
+        batch_predictions.delete(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Batch prediction job '{job_id}' not found")
+    return {"message": f"Batch prediction job '{job_id}' deleted.", "job_id": job_id}
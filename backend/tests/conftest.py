@@ -161,32 +161,36 @@ def uploaded_datasets_dir():
 
 
 @pytest.fixture
-def reset_global_state():
+def reset_global_state(tmp_path, monkeypatch):
     """Reset global state variables before/after tests"""
     # Import main to access globals
     import main
+    from fivedreg.model_handle import ModelHandle
+    from fivedreg.model_registry import ModelRegistry
+
+    # The live model handle is shared through disk; give every test its own directory
+    monkeypatch.setattr(main, "model_handle", ModelHandle(
+        ModelRegistry(str(tmp_path / "live_model")), on_load=main.limit_inference_threads))
 
     # Store original values
     original_values = {}
     if hasattr(main, 'processing_result'):
         original_values['processing_result'] = main.processing_result
-    if hasattr(main, 'train_result'):
-        original_values['train_result'] = main.train_result
     if hasattr(main, 'predict_input'):
         original_values['predict_input'] = main.predict_input
 
     # Reset to None
     main.processing_result = None
-    main.train_result = None
     main.predict_input = None
+    main.model_handle.clear()
 
     yield
 
     # Restore or keep reset
     # For tests, we'll keep them reset
     main.processing_result = None
-    main.train_result = None
     main.predict_input = None
+    main.model_handle.clear()
 
 
 @pytest.fixture(scope="session")
@@ -218,3 +222,43 @@ def mock_trained_model():
     model.fit(X_dummy, y_dummy)
 
     return model
+
+
+@pytest.fixture
+def isolated_model_registry(tmp_path, monkeypatch):
+    """Point the API at an empty model registry stored in a temporary directory"""
+    import main
+    from fivedreg.model_registry import ModelRegistry
+
+    registry = ModelRegistry(str(tmp_path / "model_artifacts"))
+    monkeypatch.setattr(main, "model_registry", registry)
+
+    return registry
+
+
+@pytest.fixture
+def isolated_profile_store(tmp_path, monkeypatch):
+    """Point the API at an empty profile store in a temporary directory"""
+    import main
+    from fivedreg.profiling import ProfileStore
+
+    store = ProfileStore(str(tmp_path / "profiles"), max_profiles=main.MAX_STORED_PROFILES)
+    monkeypatch.setattr(main, "profile_store", store)
+
+    return store
+
+
+@pytest.fixture
+def isolated_batch_predictions(tmp_path, monkeypatch):
+    """Point the API at a batch prediction manager storing its jobs in a temporary directory"""
+    import main
+    from fivedreg.batch_predict import BatchPredictionManager
+
+    manager = BatchPredictionManager(str(tmp_path / "batch_predictions"), thread_slot=main.scheduled,
+                                     on_finish=main.record_batch_job)
+    input_directory = tmp_path / "batch_predictions" / "inputs"
+    input_directory.mkdir()
+    monkeypatch.setattr(main, "batch_predictions", manager)
+    monkeypatch.setattr(main, "BATCH_INPUT_DIRECTORY", str(input_directory))
+
+    return manager
@@ -49,6 +49,31 @@ class TestHealthEndpoints:
         assert data["model_trained"] is False
         assert data["prediction_data_uploaded"] is False
 
+    def test_metrics_endpoint(self, test_client):
+        """Test GET /metrics exposes request counters and latency histograms"""
+        test_client.get("/health")
+        response = test_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert 'http_requests_total{endpoint="/health",method="GET",status="200"}' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="/health",method="GET",le="+Inf"}' in text
+        assert "process_resident_memory_bytes" in text
+        assert "process_cpu_seconds_total" in text
+
+    def test_metrics_record_uploads(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state):
+        """Test that uploaded bytes are counted"""
+        import main
+        before = main.UPLOAD_BYTES.value(kind="fit")
+
+        pkl_data = pickle.dumps(sample_data_small)
+        files = {"file": ("metrics_upload.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        assert main.UPLOAD_BYTES.value(kind="fit") - before == len(pkl_data)
+        assert 'fivedreg_upload_bytes_total{kind="fit"}' in test_client.get("/metrics").text
+
 
 @pytest.mark.integration
 @pytest.mark.api
@@ -85,8 +110,8 @@ class TestUploadFitDataset:
         assert "Invalid file type" in response.json()["detail"]
 
     def test_upload_invalid_X_shape(self, test_client, reset_global_state):
-        """Test uploading dataset with wrong X shape"""
-        invalid_data = {'X': np.random.randn(10, 3), 'y': np.random.randn(10)}
+        """Test uploading dataset with wrong X shape (1D, no feature axis)"""
+        invalid_data = {'X': np.random.randn(10), 'y': np.random.randn(10)}
         pkl_data = pickle.dumps(invalid_data)
         files = {"file": ("invalid.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
 
@@ -94,11 +119,11 @@ class TestUploadFitDataset:
 
         assert response.status_code == 400
         assert "Invalid format" in response.json()["detail"]
-        assert "shape (n, 5)" in response.json()["detail"]
+        assert "shape (n, d)" in response.json()["detail"]
 
     def test_upload_invalid_y_shape(self, test_client, reset_global_state):
         """Test uploading dataset with wrong y shape"""
-        invalid_data = {'X': np.random.randn(10, 5), 'y': np.random.randn(10, 2)}
+        invalid_data = {'X': np.random.randn(10, 5), 'y': np.random.randn(10, 2, 2)}
         pkl_data = pickle.dumps(invalid_data)
         files = {"file": ("invalid.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
 
@@ -106,7 +131,7 @@ class TestUploadFitDataset:
 
         assert response.status_code == 400
         assert "Invalid format" in response.json()["detail"]
-        assert "1-dimensional" in response.json()["detail"]
+        assert "(n,) or (n, k)" in response.json()["detail"]
 
     def test_upload_mismatched_samples(self, test_client, reset_global_state):
         """Test uploading dataset with mismatched X and y samples"""
@@ -156,7 +181,7 @@ class TestUploadFitDataset:
 
     def test_upload_invalid_removes_file(self, test_client, uploaded_datasets_dir, reset_global_state):
         """Test that invalid upload removes the created file"""
-        invalid_data = {'X': np.random.randn(10, 3), 'y': np.random.randn(10)}
+        invalid_data = {'X': np.random.randn(10), 'y': np.random.randn(10)}
         pkl_data = pickle.dumps(invalid_data)
         files = {"file": ("test_invalid.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
 
@@ -168,6 +193,131 @@ class TestUploadFitDataset:
         file_path = os.path.join(uploaded_datasets_dir, "test_invalid.pkl")
         assert not os.path.exists(file_path)
 
+    def test_upload_too_large(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state, monkeypatch):
+        """Test that uploads over MAX_UPLOAD_SIZE are rejected and not kept on disk"""
+        import main
+        monkeypatch.setattr(main, "MAX_UPLOAD_SIZE", 1024)
+
+        pkl_data = pickle.dumps(sample_data_small)
+        files = {"file": ("test_too_large.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+
+        response = test_client.post("/upload-fit-dataset/", files=files)
+
+        assert response.status_code == 413
+        assert "too large" in response.json()["detail"]
+        assert not os.path.exists(os.path.join(uploaded_datasets_dir, "test_too_large.pkl"))
+
+    def test_upload_too_large_keeps_existing_dataset(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state, monkeypatch):
+        """Test that an oversized upload does not delete or replace a valid dataset of the same name"""
+        import main
+
+        pkl_data = pickle.dumps(sample_data_small)
+        files = {"file": ("test_keep.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        assert test_client.post("/upload-fit-dataset/", files=files).status_code == 200
+        assert test_client.post("/upload-predict-dataset/", files={
+            "file": ("test_keep_predict.pkl", io.BytesIO(pickle.dumps(sample_data_small['X'])), "application/octet-stream")}).status_code == 200
+        fit_dataset, predict_dataset = main.processing_result, main.predict_input
+
+        monkeypatch.setattr(main, "MAX_UPLOAD_SIZE", 1024)
+        files = {"file": ("test_keep.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        assert test_client.post("/upload-fit-dataset/", files=files).status_code == 413
+        files = {"file": ("test_other_predict.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        assert test_client.post("/upload-predict-dataset/", files=files).status_code == 413
+
+        assert os.path.getsize(os.path.join(uploaded_datasets_dir, "test_keep.pkl")) == len(pkl_data)
+        assert main.processing_result == fit_dataset
+        assert main.predict_input == predict_dataset
+
+    def test_upload_reports_size(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state, monkeypatch):
+        """Test that a multi-chunk upload is streamed completely to disk"""
+        import main
+        monkeypatch.setattr(main, "UPLOAD_CHUNK_SIZE", 1000)
+
+        pkl_data = pickle.dumps(sample_data_small)
+        files = {"file": ("test_chunks.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+
+        response = test_client.post("/upload-fit-dataset/", files=files)
+
+        assert response.status_code == 200
+        assert response.json()["size_bytes"] == len(pkl_data)
+        assert os.path.getsize(os.path.join(uploaded_datasets_dir, "test_chunks.pkl")) == len(pkl_data)
+
+    def test_concurrent_uploads_same_name(self, sample_data_small, uploaded_datasets_dir, reset_global_state):
+        """Test that concurrent uploads of the same file name never see each other's partial writes"""
+        import asyncio
+        import httpx
+        import main
+
+        pkl_data = pickle.dumps(sample_data_small)
+
+        async def upload_many():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(
+                    client.post("/upload-fit-dataset/",
+                                files={"file": ("test_concurrent.pkl", pkl_data, "application/octet-stream")})
+                    for _ in range(16)))
+
+        responses = asyncio.run(upload_many())
+
+        assert [response.status_code for response in responses] == [200] * 16
+        assert os.path.getsize(os.path.join(uploaded_datasets_dir, "test_concurrent.pkl")) == len(pkl_data)
+        assert not [name for name in os.listdir(uploaded_datasets_dir) if name.endswith(".part")]
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestDatasetProfile:
+    """Test the data profile computed on upload and GET /dataset-profile"""
+
+    def test_upload_returns_profile(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state):
+        """Test that the upload response contains the full profile"""
+        pkl_data = pickle.dumps(sample_data_small)
+        files = {"file": ("test_profile.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+
+        response = test_client.post("/upload-fit-dataset/", files=files)
+
+        assert response.status_code == 200
+        profile = response.json()["preview"]["profile"]
+        X = np.asarray(sample_data_small["X"])
+        assert profile["n_samples"] == 100
+        assert len(profile["features"]) == 5
+        np.testing.assert_allclose(profile["features"][0]["mean"], X[:, 0].mean())
+        assert "histogram" in profile["target"]
+        assert os.path.exists(os.path.join(uploaded_datasets_dir, "test_profile.pkl.profile.json"))
+
+    def test_get_profile_uses_cache(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state):
+        """Test that the profile endpoint serves the profile cached at upload time"""
+        pkl_data = pickle.dumps(sample_data_small)
+        files = {"file": ("test_profile.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        upload = test_client.post("/upload-fit-dataset/", files=files).json()
+
+        response = test_client.get("/dataset-profile")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cached"] is True
+        assert data["profile"] == upload["preview"]["profile"]
+
+    def test_get_profile_recomputes_without_cache(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state):
+        """Test that a missing cache file is rebuilt"""
+        pkl_data = pickle.dumps(sample_data_small)
+        files = {"file": ("test_profile.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        os.remove(os.path.join(uploaded_datasets_dir, "test_profile.pkl.profile.json"))
+
+        response = test_client.get("/dataset-profile")
+
+        assert response.status_code == 200
+        assert response.json()["cached"] is False
+        assert response.json()["profile"]["n_samples"] == 100
+        assert test_client.get("/dataset-profile").json()["cached"] is True
+
+    def test_get_profile_without_dataset(self, test_client, reset_global_state):
+        """Test that the profile endpoint requires an uploaded dataset"""
+        response = test_client.get("/dataset-profile")
+        assert response.status_code == 400
+
 
 @pytest.mark.integration
 @pytest.mark.api
@@ -217,6 +367,554 @@ class TestTraining:
         assert data["training_data_uploaded"] is True
         assert data["model_trained"] is True
 
+    def test_rejected_model_keeps_previous(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that a model failing the holdout R² gate does not replace the live model"""
+        pkl_data = pickle.dumps(sample_data_medium)
+        files = {"file": ("train_gate.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        first = test_client.post("/start-training/").json()
+        assert first["deployment"] == "live"
+
+        response = test_client.post("/start-training/", json={"min_r2": 1.0})
+
+        assert response.status_code == 422
+        assert "previous model kept" in response.json()["detail"]
+        assert test_client.get("/status").json()["model_version"] == first["model_version"]
+
+    def test_shadow_training_and_promotion(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test staging a retrained model in shadow, reporting on it and promoting it"""
+        pkl_data = pickle.dumps(sample_data_medium)
+        files = {"file": ("train_shadow.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        live_version = test_client.post("/start-training/").json()["model_version"]
+
+        small = {"hyperparameters": {"hidden_layer_1": 16, "hidden_layer_2": 8, "hidden_layer_3": 4}, "shadow_fraction": 1.0}
+        staged = test_client.post("/start-training/", json=small).json()
+        assert staged["deployment"] == "shadow"
+
+        response = test_client.post("/predict-single/", json={"features": [0.5, -0.5, 1.0, -1.0, 0.0]})
+        assert response.json()["model_version"] == live_version
+
+        # The candidate is scored in the background
+        import main
+        assert main.model_handle.wait_for_shadow(timeout=30)
+        report = test_client.get("/model/shadow-report").json()
+        assert report["shadowed_requests"] == 1
+        assert report["candidate"]["version"] == staged["model_version"]
+        assert "latency_delta_ms" in report
+
+        assert test_client.post("/model/promote").status_code == 200
+        status = test_client.get("/status").json()
+        assert status["model_version"] == staged["model_version"]
+        assert status["candidate_version"] is None
+
+    def test_shadow_candidate_shared_between_workers(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state, monkeypatch, tmp_path):
+        """Test that a candidate staged through one worker process is served and promoted through another"""
+        import main
+        from fivedreg.model_handle import ModelHandle
+        from fivedreg.model_registry import ModelRegistry
+
+        pkl_data = pickle.dumps(sample_data_medium)
+        files = {"file": ("train_shared.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        live_version = test_client.post("/start-training/").json()["model_version"]
+        small = {"hyperparameters": {"hidden_layer_1": 16, "hidden_layer_2": 8, "hidden_layer_3": 4}, "shadow_fraction": 1.0}
+        staged = test_client.post("/start-training/", json=small).json()
+
+        # A second worker process sees the same directory through its own handle
+        first = main.model_handle
+        monkeypatch.setattr(main, "model_handle", ModelHandle(ModelRegistry(str(tmp_path / "live_model"))))
+        status = test_client.get("/status").json()
+        assert status["model_version"] == live_version
+        assert status["candidate_version"] == staged["model_version"]
+
+        response = test_client.post("/predict-single/", json={"features": [0.5, -0.5, 1.0, -1.0, 0.0]})
+        assert response.json()["model_version"] == live_version
+        assert main.model_handle.wait_for_shadow(timeout=30)
+        assert first.shadow_report()["shadowed_requests"] == 1
+
+        assert test_client.post("/model/promote").status_code == 200
+        assert first.current.version == staged["model_version"]
+        assert first.candidate is None
+
+    def test_training_with_row_budget(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that max_train_rows subsamples the training rows and reports the reduction"""
+        pkl_data = pickle.dumps(sample_data_medium)
+        files = {"file": ("train_budget.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        response = test_client.post("/start-training/", json={"max_train_rows": 200, "reduction_method": "kmeans"})
+
+        assert response.status_code == 200
+        reduction = response.json()["reduction"]
+        assert reduction["rows_after"] == 200
+        assert reduction["method"] == "kmeans"
+
+    def test_training_with_dedup(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that dedup_tolerance collapses repeated points and reports it"""
+        data = {'X': np.repeat(sample_data_medium['X'][:250], 2, axis=0),
+                'y': np.repeat(sample_data_medium['y'][:250], 2)}
+        files = {"file": ("train_dedup.pkl", io.BytesIO(pickle.dumps(data)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        response = test_client.post("/start-training/", json={"dedup_tolerance": 0.0})
+
+        assert response.status_code == 200
+        deduplication = response.json()["deduplication"]
+        assert deduplication["rows_before"] == 500
+        assert deduplication["rows_after"] == 250
+        assert "training_speedup" not in deduplication
+        assert response.json()["reduction"] is None
+
+    def test_training_rejects_unknown_reduction_method(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that an unknown reduction method is a validation error"""
+        response = test_client.post("/start-training/", json={"max_train_rows": 200, "reduction_method": "median"})
+        assert response.status_code == 422
+
+
+@pytest.mark.integration
+@pytest.mark.api
+@pytest.mark.slow
+class TestMultiTarget:
+    """Test training and predicting several targets with one model"""
+
+    def test_multi_target_end_to_end(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state,
+                                     isolated_model_registry):
+        """Test upload, training and vector-valued predictions with a 2D y"""
+        X = sample_data_medium['X']
+        data = {'X': X, 'y': np.column_stack([sample_data_medium['y'], X[:, 0] - X[:, 1], X[:, 2]])}
+        files = {"file": ("train_multi.pkl", io.BytesIO(pickle.dumps(data)), "application/octet-stream")}
+
+        upload = test_client.post("/upload-fit-dataset/", files=files).json()
+        assert upload["preview"]["y_shape"] == [1000, 3]
+        assert upload["preview"]["n_targets"] == 3
+        assert len(upload["preview"]["profile"]["targets"]) == 3
+
+        training = test_client.post("/start-training/")
+        assert training.status_code == 200
+        assert training.json()["n_targets"] == 3
+        assert "r2_target_2" in training.json()["function_result"]
+
+        single = test_client.post("/predict-single/", json={"features": [0.5, -0.5, 1.0, -1.0, 0.0]})
+        assert single.status_code == 200
+        assert len(single.json()["prediction"]) == 3
+
+        assert test_client.post("/models/multi/train").status_code == 200
+        named = test_client.post("/models/multi/predict", json={"features": [[0.0] * 5, [1.0] * 5]})
+        assert np.asarray(named.json()["predictions"]).shape == (2, 3)
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestEngines:
+    """Test training the non-neural engines through the API"""
+
+    def test_train_rbf_and_predict(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that the rbf engine is trained, published and served"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_medium)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        response = test_client.post("/start-training/", json={"engine": "rbf", "engine_config": {"neighbors": 16}})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["engine"] == "rbf"
+        assert data["hyperparameters_used"]["neighbors"] == 16
+        assert data["function_result"]["r2"] > 0.9
+
+        single = test_client.post("/predict-single/", json={"features": [0.1, 0.2, 0.3, 0.4, 0.5]})
+        assert single.status_code == 200
+        assert isinstance(single.json()["prediction"], float)
+
+    def test_train_named_knn(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state,
+                             isolated_model_registry):
+        """Test that a named model can use the knn engine"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        response = test_client.post("/models/nn-free/train", json={"engine": "knn", "engine_config": {"neighbors": 4, "power": 1.0}})
+        assert response.status_code == 200
+        assert response.json()["model"]["engine"] == "knn"
+        assert response.json()["hyperparameters_used"] == {"n_neighbors": 4, "power": 1.0}
+
+        predictions = test_client.post("/models/nn-free/predict", json={"features": [[0.0] * 5, [0.5] * 5]})
+        assert len(predictions.json()["predictions"]) == 2
+
+    @pytest.mark.slow
+    def test_auto_engine(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that engine=auto reports its decision and estimates with the trained model"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_medium)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        params = {"engine": "auto", "r2_target": 0.9, "time_budget": 30.0,
+                  "hyperparameters": {"hidden_layer_1": 16, "hidden_layer_2": 8, "hidden_layer_3": 4, "max_iterations": 100}}
+        response = test_client.post("/start-training/", json=params)
+        assert response.status_code == 200
+        data = response.json()
+        selection = data["engine_selection"]
+        assert data["engine"] == selection["engine"]
+        assert selection["r2_target"] == 0.9 and selection["time_budget"] == 30.0
+        assert {"estimated_fit_seconds", "estimated_r2", "probes"} <= set(selection["candidates"][0])
+        assert test_client.post("/predict-single/", json={"features": [0.0] * 5}).status_code == 200
+
+    def test_invalid_engine(self, test_client, reset_global_state):
+        """Test that unknown engines and kernels are rejected by validation"""
+        assert test_client.post("/start-training/", json={"engine": "svm"}).status_code == 422
+        assert test_client.post("/start-training/", json={"engine": "auto", "time_budget": 0}).status_code == 422
+        response = test_client.post("/start-training/", json={"engine": "rbf", "engine_config": {"kernel": "sinc"}})
+        assert response.status_code == 422
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestQuantization:
+    """Test training quantized networks through the API"""
+
+    def test_train_int8_and_predict(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state,
+                                    isolated_model_registry):
+        """Test that the int8 network is published, reported, registered and served"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_medium)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        params = {"quantization": "int8",
+                  "hyperparameters": {"hidden_layer_1": 32, "hidden_layer_2": 16, "hidden_layer_3": 8, "max_iterations": 100}}
+
+        response = test_client.post("/start-training/", json=params)
+        assert response.status_code == 200
+        data = response.json()
+        report = data["quantization"]
+        assert report["mode"] == "int8"
+        assert report["weight_bytes_after"] < report["weight_bytes_before"]
+        assert data["function_result"]["r2"] == pytest.approx(report["r2_after"])
+        assert data["hyperparameters_used"]["hidden_layers"] == [32, 16, 8]
+        assert test_client.post("/predict-single/", json={"features": [0.1] * 5}).status_code == 200
+
+        response = test_client.post("/models/small/train", json={**params, "quantization": "float32"})
+        assert response.status_code == 200
+        assert response.json()["model"]["quantization"] == "float32"
+        predictions = test_client.post("/models/small/predict", json={"features": [[0.0] * 5]})
+        assert len(predictions.json()["predictions"]) == 1
+
+    def test_invalid_quantization(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state):
+        """Test that unknown modes and non-neural engines are rejected"""
+        assert test_client.post("/start-training/", json={"quantization": "int4"}).status_code == 422
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        response = test_client.post("/start-training/", json={"engine": "knn", "quantization": "int8"})
+        assert response.status_code == 400
+        assert "mlp engine" in response.json()["detail"]
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestPruning:
+    """Test pruning the trained network through the API"""
+
+    def test_train_with_pruning(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that the pruned network is served and its size, latency and R² are reported"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_medium)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        params = {"pruning": {"keep_fraction": 0.5, "fine_tune_iterations": 5},
+                  "hyperparameters": {"hidden_layer_1": 64, "hidden_layer_2": 32, "hidden_layer_3": 16, "max_iterations": 100}}
+
+        response = test_client.post("/start-training/", json=params)
+        assert response.status_code == 200
+        data = response.json()
+        report = data["pruning"]
+        assert report["hidden_layers_after"] == [32, 16, 8]
+        assert data["hyperparameters_used"]["hidden_layers"] == [32, 16, 8]
+        assert report["parameters_after"] < report["parameters_before"]
+        assert {"latency_ms", "rows_per_second", "r2"} <= set(report["after"])
+        assert data["function_result"]["r2"] == pytest.approx(report["after"]["r2"])
+        assert test_client.post("/predict-single/", json={"features": [0.1] * 5}).status_code == 200
+
+    def test_invalid_pruning(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state):
+        """Test that bad settings and non-neural engines are rejected"""
+        assert test_client.post("/start-training/", json={"pruning": {"keep_fraction": 0}}).status_code == 422
+        assert test_client.post("/start-training/", json={"pruning": {"criterion": "random"}}).status_code == 422
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        response = test_client.post("/start-training/", json={"engine": "rbf", "pruning": {}})
+        assert response.status_code == 400
+        assert "Pruning applies" in response.json()["detail"]
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestDistillation:
+    """Test distilling models into student networks through the API"""
+
+    def test_distill_live_model(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that the student replaces the live model and reports its error bound"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_medium)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        test_client.post("/start-training/", json={"engine": "rbf"})
+
+        response = test_client.post("/model/distill", json={"hidden_layers": [16, 8], "n_synthetic": 5000})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["deployment"] == "live"
+        assert data["distillation"]["teacher"] == "rbf"
+        assert data["distillation"]["error_bound"]["max_abs_error"] >= 0
+        assert data["hyperparameters_used"]["hidden_layers"] == [16, 8]
+        assert test_client.post("/predict-single/", json={"features": [0.1] * 5}).status_code == 200
+
+    def test_distill_ensemble_to_named_model(self, test_client, sample_data_small, uploaded_datasets_dir,
+                                             reset_global_state, isolated_model_registry):
+        """Test distilling the mean of named models into a registered student"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        test_client.post("/models/knn/train", json={"engine": "knn"})
+        test_client.post("/models/rbf/train", json={"engine": "rbf"})
+
+        response = test_client.post("/model/distill", json={
+            "teacher_models": ["knn", "rbf"], "hidden_layers": [8], "n_synthetic": 2000, "max_iterations": 20,
+            "model_id": "student"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["model"]["distilled_from"] == ["knn", "rbf"]
+        assert data["distillation"]["teacher_models"] == 2
+        predictions = test_client.post("/models/student/predict", json={"features": [[0.0] * 5]})
+        assert len(predictions.json()["predictions"]) == 1
+
+    def test_distill_errors(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state,
+                            isolated_model_registry):
+        """Test the missing teacher, unknown model and validation errors"""
+        assert test_client.post("/model/distill", json={"hidden_layers": []}).status_code == 422
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        response = test_client.post("/model/distill", json={})
+        assert response.status_code == 400
+        assert "No live model" in response.json()["detail"]
+        assert test_client.post("/model/distill", json={"teacher_models": ["missing"]}).status_code == 404
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestOnnx:
+    """Test ONNX export and the onnxruntime backend through the API"""
+
+    def test_train_with_onnxruntime_backend(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state):
+        """Test that the network is served by onnxruntime and the downloaded graph gives the same predictions"""
+        onnxruntime = pytest.importorskip("onnxruntime")
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_medium)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        params = {"inference_backend": "onnxruntime",
+                  "hyperparameters": {"hidden_layer_1": 32, "hidden_layer_2": 16, "hidden_layer_3": 8, "max_iterations": 100}}
+
+        response = test_client.post("/start-training/", json=params)
+        assert response.status_code == 200
+        assert response.json()["inference_backend"] == "onnxruntime"
+        prediction = test_client.post("/predict-single/", json={"features": [0.1] * 5}).json()["prediction"]
+
+        download = test_client.get("/model/onnx")
+        assert download.status_code == 200
+        assert download.headers["content-type"] == "application/octet-stream"
+        session = onnxruntime.InferenceSession(download.content, providers=["CPUExecutionProvider"])
+        (output,) = session.run(["y"], {"X": np.full((1, 5), 0.1, dtype=np.float32)})
+        assert output[0, 0] == pytest.approx(prediction, abs=1e-5)
+
+        fused = test_client.get("/model/onnx", params={"fuse_scaling": True})
+        assert fused.status_code == 200 and fused.content != download.content
+
+    def test_named_model_download(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state,
+                                  isolated_model_registry):
+        """Test downloading a named network and the errors for other engines and unknown models"""
+        pytest.importorskip("onnx")
+        assert test_client.get("/model/onnx").status_code == 400
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        test_client.post("/models/net/train", json={"hyperparameters": {"hidden_layer_1": 16, "hidden_layer_2": 8, "hidden_layer_3": 4, "max_iterations": 100}})
+        test_client.post("/models/knn/train", json={"engine": "knn"})
+
+        assert test_client.get("/models/net/onnx", params={"fuse_scaling": True}).status_code == 200
+        response = test_client.get("/models/knn/onnx")
+        assert response.status_code == 400
+        assert "Only a neural network" in response.json()["detail"]
+        assert test_client.get("/models/missing/onnx").status_code == 404
+        assert test_client.post("/start-training/", json={"inference_backend": "tensorrt"}).status_code == 422
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestThreadScheduler:
+    """Test the native thread budget of training and prediction requests"""
+
+    def test_jobs_report_their_threads(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state,
+                                       monkeypatch):
+        """Test that training and predictions get their pool's threads and are recorded in the metrics"""
+        import main
+        from fivedreg.thread_scheduler import ThreadScheduler
+        monkeypatch.setattr(main, "thread_scheduler", ThreadScheduler("split", cores=4, training_share=0.75))
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        assert test_client.post("/start-training/", json={"engine": "knn"}).json()["threads"] == 3
+        assert test_client.post("/predict-single/", json={"features": [0.1] * 5}).json()["threads"] == 1
+
+        stats = test_client.get("/thread-scheduler").json()
+        assert stats["policy"] == "split" and stats["cores"] == 4
+        assert stats["pool_threads"] == {"training": 3, "inference": 1}
+        # Profiling the upload runs as a training job too
+        assert stats["jobs_total"] == {"training": 2, "inference": 1}
+        assert stats["active_jobs"] == {"training": 0, "inference": 0}
+        text = test_client.get("/metrics").text
+        assert 'fivedreg_job_threads_bucket{kind="training",le="4.0"}' in text
+        assert 'fivedreg_thread_pool_threads{kind="inference"} 1.0' in text
+        assert "fivedreg_thread_budget 4.0" in text
+
+
+@pytest.mark.integration
+@pytest.mark.api
+@pytest.mark.slow
+class TestBatchPredictions:
+    """Test sharded batch prediction jobs through the API"""
+
+    def test_job_lifecycle(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state,
+                           isolated_batch_predictions):
+        """Test scoring the uploaded prediction file, polling the job and downloading the ordered output"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_medium)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        test_client.post("/start-training/", json={"engine": "knn"})
+        X_pred = np.random.default_rng(0).normal(size=(500, 5))
+        pred_files = {"file": ("predict.pkl", io.BytesIO(pickle.dumps(X_pred)), "application/octet-stream")}
+        test_client.post("/upload-predict-dataset/", files=pred_files)
+
+        response = test_client.post("/batch-predictions", json={"shard_rows": 128, "processes": 2})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.json()["state"] in ("queued", "running", "completed")
+        isolated_batch_predictions.wait(job_id, timeout=120)
+
+        status = test_client.get(f"/batch-predictions/{job_id}").json()
+        assert status["state"] == "completed" and status["rows_done"] == 500 and status["shards_total"] == 4
+        assert [job["job_id"] for job in test_client.get("/batch-predictions").json()["jobs"]] == [job_id]
+        download = test_client.get(f"/batch-predictions/{job_id}/result")
+        assert download.status_code == 200
+        import main
+        expected = main.model_handle.current.model.predict(X_pred)
+        np.testing.assert_array_equal(np.load(io.BytesIO(download.content)), expected)
+        assert 'fivedreg_batch_prediction_jobs_total{state="completed"} 1.0' in test_client.get("/metrics").text
+
+        assert test_client.delete(f"/batch-predictions/{job_id}").status_code == 200
+        assert test_client.get(f"/batch-predictions/{job_id}").status_code == 404
+
+    def test_named_model_csv_and_errors(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state,
+                                        isolated_model_registry, isolated_batch_predictions):
+        """Test a named model scoring an uploaded file to CSV, and the request errors"""
+        assert test_client.post("/batch-predictions", json={}).status_code == 400
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        test_client.post("/models/knn/train", json={"engine": "knn"})
+        X_pred = np.random.default_rng(1).normal(size=(40, 5))
+        for name, rows in (("rows.npy", X_pred), ("narrow.npy", X_pred[:, :3])):
+            buffer = io.BytesIO()
+            np.save(buffer, rows)
+            files = {"file": (name, io.BytesIO(buffer.getvalue()), "application/octet-stream")}
+            upload = test_client.post("/batch-predictions/inputs", files=files)
+            assert upload.status_code == 201 and upload.json()["total_samples"] == 40
+
+        response = test_client.post("/batch-predictions", json={"model_id": "knn", "input_file": "rows.npy",
+                                                                "output_format": "csv", "processes": 1})
+        assert response.status_code == 202 and response.json()["model_id"] == "knn"
+        job_id = response.json()["job_id"]
+        isolated_batch_predictions.wait(job_id, timeout=120)
+        download = test_client.get(f"/batch-predictions/{job_id}/result")
+        assert download.headers["content-type"].startswith("text/csv")
+        np.testing.assert_allclose(np.loadtxt(io.StringIO(download.text), skiprows=1),
+                                   isolated_model_registry.get("knn").predict(X_pred))
+
+        request = {"model_id": "knn", "input_file": "narrow.npy"}
+        assert "Expected 5 features" in test_client.post("/batch-predictions", json=request).json()["detail"]
+        assert test_client.post("/batch-predictions", json={"model_id": "missing", "input_file": "rows.npy"}).status_code == 404
+        assert test_client.post("/batch-predictions", json={"model_id": "knn", "input_file": "gone.npy"}).status_code == 404
+        assert test_client.post("/batch-predictions", json={"model_id": "knn", "input_file": "../main.py"}).status_code == 400
+        assert test_client.post("/batch-predictions", json={"model_id": "knn", "output_format": "xml"}).status_code == 422
+        assert test_client.get("/batch-predictions/missing/result").status_code == 404
+
+        files = {"file": ("rows.pkl", io.BytesIO(pickle.dumps(X_pred)), "application/octet-stream")}
+        assert test_client.post("/batch-predictions/inputs", files=files).status_code == 400
+        files = {"file": ("bad.npy", io.BytesIO(b"not an array"), "application/octet-stream")}
+        assert test_client.post("/batch-predictions/inputs", files=files).status_code == 400
+        assert test_client.delete("/batch-predictions/inputs/rows.npy").status_code == 200
+        assert test_client.delete("/batch-predictions/inputs/rows.npy").status_code == 404
+
+    def test_jobs_are_shared_between_workers(self, test_client, sample_data_small, uploaded_datasets_dir,
+                                             reset_global_state, isolated_batch_predictions, monkeypatch):
+        """Test that another worker process, with its own manager on the same directory, serves the job"""
+        import main
+        from fivedreg.batch_predict import BatchPredictionManager
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        test_client.post("/start-training/", json={"engine": "knn"})
+        pred_files = {"file": ("predict.pkl", io.BytesIO(pickle.dumps(np.zeros((30, 5)))), "application/octet-stream")}
+        test_client.post("/upload-predict-dataset/", files=pred_files)
+
+        job_id = test_client.post("/batch-predictions", json={"processes": 1}).json()["job_id"]
+        isolated_batch_predictions.wait(job_id, timeout=120)
+        monkeypatch.setattr(main, "batch_predictions", BatchPredictionManager(isolated_batch_predictions.directory))
+
+        assert test_client.get(f"/batch-predictions/{job_id}").json()["state"] == "completed"
+        assert np.load(io.BytesIO(test_client.get(f"/batch-predictions/{job_id}/result").content)).shape == (30,)
+        assert test_client.delete(f"/batch-predictions/{job_id}").status_code == 200
+        assert test_client.get(f"/batch-predictions/{job_id}").status_code == 404
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestInputDimensions:
+    """Test the pipeline with inputs of other dimensions than 5"""
+
+    @pytest.mark.parametrize("n_features", [3, 7, 12])
+    def test_train_and_predict(self, n_features, test_client, uploaded_datasets_dir, reset_global_state,
+                               isolated_model_registry):
+        """Test upload, training, single, batch and named-model prediction with d features"""
+        rng = np.random.default_rng(n_features)
+        X = rng.uniform(-1, 1, size=(400, n_features))
+        data = {'X': X, 'y': np.sin(X).sum(axis=1)}
+        files = {"file": (f"train_{n_features}d.pkl", io.BytesIO(pickle.dumps(data)), "application/octet-stream")}
+
+        upload = test_client.post("/upload-fit-dataset/", files=files).json()
+        assert upload["preview"]["n_features"] == n_features
+        assert len(upload["preview"]["profile"]["features"]) == n_features
+
+        params = {"hyperparameters": {"hidden_layer_1": 16, "hidden_layer_2": 8, "hidden_layer_3": 4, "max_iterations": 100}}
+        training = test_client.post("/start-training/", json=params)
+        assert training.status_code == 200
+        assert training.json()["n_features"] == n_features
+        assert test_client.get("/status").json()["input_dim"] == n_features
+
+        single = test_client.post("/predict-single/", json={"features": [0.1] * n_features})
+        assert single.status_code == 200
+        assert isinstance(single.json()["prediction"], float)
+
+        wrong = test_client.post("/predict-single/", json={"features": [0.1] * (n_features + 1)})
+        assert wrong.status_code == 400
+        assert f"Expected {n_features} features, got {n_features + 1}" in wrong.json()["detail"]
+
+        files = {"file": ("predict_d.pkl", io.BytesIO(pickle.dumps(X[:10])), "application/octet-stream")}
+        assert test_client.post("/upload-predict-dataset/", files=files).status_code == 200
+        assert test_client.post("/start-predict/").status_code == 200
+
+        named = test_client.post(f"/models/dim{n_features}/train", json=params)
+        assert named.status_code == 200
+        assert named.json()["model"]["n_features"] == n_features
+        predictions = test_client.post(f"/models/dim{n_features}/predict", json={"features": X[:3].tolist()})
+        assert len(predictions.json()["predictions"]) == 3
+
+    def test_batch_prediction_dimension_mismatch(self, test_client, sample_data_small, uploaded_datasets_dir, reset_global_state):
+        """Test that a prediction dataset with the wrong number of features is rejected at prediction time"""
+        files = {"file": ("train.pkl", io.BytesIO(pickle.dumps(sample_data_small)), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+        test_client.post("/start-training/")
+
+        files = {"file": ("predict_3d.pkl", io.BytesIO(pickle.dumps(np.zeros((4, 3)))), "application/octet-stream")}
+        assert test_client.post("/upload-predict-dataset/", files=files).status_code == 200
+
+        response = test_client.post("/start-predict/")
+        assert response.status_code == 400
+        assert "Expected 5 features, got 3" in response.json()["detail"]
+
 
 @pytest.mark.integration
 @pytest.mark.api
@@ -240,14 +938,14 @@ class TestUploadPredictDataset:
 
     def test_upload_invalid_predict_shape(self, test_client, reset_global_state):
         """Test uploading prediction data with wrong shape"""
-        X_pred = np.random.randn(20, 3)  # Wrong number of features
+        X_pred = np.random.randn(20, 0)  # No features
         pkl_data = pickle.dumps(X_pred)
         files = {"file": ("predict_invalid.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
 
         response = test_client.post("/upload-predict-dataset/", files=files)
 
         assert response.status_code == 400
-        assert "shape (n, 5)" in response.json()["detail"]
+        assert "shape (n, d)" in response.json()["detail"]
 
     def test_upload_predict_non_pkl(self, test_client, reset_global_state):
         """Test uploading non-.pkl file for prediction"""
@@ -423,3 +1121,152 @@ class TestEndToEndWorkflow:
         )
         assert single_pred_response.status_code == 200
         assert isinstance(single_pred_response.json()["prediction"], float)
+
+
+@pytest.mark.integration
+@pytest.mark.api
+@pytest.mark.slow
+class TestNamedModels:
+    """Test the /models endpoints for serving several named models"""
+
+    def test_train_and_predict_named_models(self, test_client, sample_data_medium, uploaded_datasets_dir,
+                                            reset_global_state, isolated_model_registry):
+        """Test that two named models can be trained and queried independently"""
+        pkl_data = pickle.dumps(sample_data_medium)
+        files = {"file": ("named_train.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        small = {"hyperparameters": {"hidden_layer_1": 16, "hidden_layer_2": 8, "hidden_layer_3": 4, "max_iterations": 100}}
+        assert test_client.post("/models/team-a/train", json=small).status_code == 200
+        assert test_client.post("/models/team-b/train").status_code == 200
+
+        listing = test_client.get("/models").json()
+        assert [record["model_id"] for record in listing["models"]] == ["team-a", "team-b"]
+        assert listing["models"][0]["hyperparameters"]["hidden_layers"] == [16, 8, 4]
+
+        rows = [[0.5, -0.5, 1.0, -1.0, 0.0], [0.1, 0.2, 0.3, 0.4, 0.5]]
+        for model_id in ["team-a", "team-b"]:
+            response = test_client.post(f"/models/{model_id}/predict", json={"features": rows})
+            assert response.status_code == 200
+            assert len(response.json()["predictions"]) == 2
+
+    def test_predict_unknown_model(self, test_client, isolated_model_registry):
+        """Test that predicting with an unknown model returns 404"""
+        response = test_client.post("/models/unknown/predict", json={"features": [[1.0, 2.0, 3.0, 4.0, 5.0]]})
+
+        assert response.status_code == 404
+
+    def test_train_invalid_model_id(self, test_client, isolated_model_registry):
+        """Test that unsafe model ids are rejected"""
+        response = test_client.post("/models/.hidden/train")
+
+        assert response.status_code == 400
+        assert "Invalid model id" in response.json()["detail"]
+
+    def test_predict_wrong_feature_count(self, test_client, isolated_model_registry, mock_trained_model):
+        """Test that rows with the wrong number of features are rejected"""
+        isolated_model_registry.put("team-a", mock_trained_model)
+
+        response = test_client.post("/models/team-a/predict", json={"features": [[1.0, 2.0, 3.0]]})
+
+        assert response.status_code == 400
+        assert "5 features" in response.json()["detail"]
+
+    def test_delete_named_model(self, test_client, isolated_model_registry, mock_trained_model):
+        """Test deleting a named model"""
+        isolated_model_registry.put("team-a", mock_trained_model)
+
+        assert test_client.delete("/models/team-a").status_code == 200
+        assert test_client.get("/models").json()["models"] == []
+        assert test_client.delete("/models/team-a").status_code == 404
+
+
+@pytest.mark.integration
+@pytest.mark.api
+@pytest.mark.slow
+class TestProfiling:
+    """Test opt-in request profiling"""
+
+    def test_profile_training_and_prediction(self, test_client, sample_data_medium, uploaded_datasets_dir, reset_global_state, isolated_profile_store):
+        """Test that ?profile=true returns a downloadable profile"""
+        pkl_data = pickle.dumps(sample_data_medium)
+        files = {"file": ("train_profile.pkl", io.BytesIO(pkl_data), "application/octet-stream")}
+        test_client.post("/upload-fit-dataset/", files=files)
+
+        train_response = test_client.post("/start-training/?profile=true")
+        assert train_response.status_code == 200
+        profile_id = train_response.json()["profile_id"]
+        assert profile_id is not None
+
+        summary = test_client.get(f"/profiles/{profile_id}").json()
+        assert summary["name"] == "start-training"
+        assert len(summary["top_functions"]) > 0
+
+        pstats_response = test_client.get(f"/profiles/{profile_id}?format=pstats")
+        assert pstats_response.status_code == 200
+        assert pstats_response.headers["content-type"] == "application/octet-stream"
+
+        speedscope = test_client.get(f"/profiles/{profile_id}?format=speedscope").json()
+        assert speedscope["profiles"][0]["type"] == "sampled"
+
+        predict_response = test_client.post("/predict-single/?profile=true", json={"features": [0.1, 0.2, 0.3, 0.4, 0.5]})
+        assert predict_response.json()["profile_id"] is not None
+        ids = [entry["profile_id"] for entry in test_client.get("/profiles").json()["profiles"]]
+        assert ids == [profile_id, predict_response.json()["profile_id"]]
+
+    def test_profiles_shared_between_workers(self, test_client, mock_trained_model, reset_global_state, isolated_profile_store):
+        """Test that a profile captured by one worker process is served by another"""
+        import main
+        from fivedreg.profiling import ProfileStore
+
+        main.model_handle.publish(mock_trained_model, {'mse': 0.1, 'r2': 0.9})
+        profile_id = test_client.post("/predict-single/?profile=true", json={"features": [0.1, 0.2, 0.3, 0.4, 0.5]}).json()["profile_id"]
+
+        # A second worker sees the same directory through its own store
+        main.profile_store = ProfileStore(isolated_profile_store.directory)
+        assert test_client.get(f"/profiles/{profile_id}").json()["name"] == "predict-single"
+        assert [entry["profile_id"] for entry in test_client.get("/profiles").json()["profiles"]] == [profile_id]
+
+    def test_unprofiled_request_has_no_profile(self, test_client, mock_trained_model, reset_global_state):
+        """Test that profiling is off by default"""
+        import main
+        main.model_handle.publish(mock_trained_model, {'mse': 0.1, 'r2': 0.9})
+
+        response = test_client.post("/predict-single/", json={"features": [0.1, 0.2, 0.3, 0.4, 0.5]})
+
+        assert response.json()["profile_id"] is None
+
+    def test_unknown_profile(self, test_client):
+        """Test downloading an unknown profile or format"""
+        assert test_client.get("/profiles/missing").status_code == 404
+        assert test_client.get("/profiles/..%2Fsecret").status_code == 404
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestLoadHarness:
+    """Test the load-testing harness against the in-process app"""
+
+    def test_closed_and_open_loop_steps(self, mock_trained_model, reset_global_state):
+        """Test that both load models report latency percentiles without errors"""
+        import asyncio
+        import main
+        from load_test import make_client, run_load_test, check_slos
+
+        main.model_handle.publish(mock_trained_model, {"mse": 0.1, "r2": 0.9})
+
+        async def run():
+            async with make_client() as client:
+                closed = await run_load_test(client, "predict_single", concurrency=[2], duration=0.3, warmup=0)
+                opened = await run_load_test(client, "predict_single", rates=[50], duration=0.3, warmup=0)
+                return closed + opened
+
+        steps = asyncio.run(run())
+
+        assert [step["label"] for step in steps] == ["concurrency=2", "rate=50"]
+        for step in steps:
+            assert step["requests"] > 0
+            assert step["errors"] == 0
+            assert step["p50_ms"] <= step["p99_ms"] <= step["p999_ms"]
+        assert check_slos(steps, p99_ms=60_000, error_rate=0.0) == []
+        assert len(check_slos(steps, p99_ms=0.0)) == 2
@@ -0,0 +1,238 @@
+"""
+Unit tests for sharded batch prediction jobs
+"""
+
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+from fivedreg.base_fivedreg import FastNeuralNetwork
+from fivedreg.batch_predict import (BatchPredictionJob, BatchPredictionManager, open_prediction_input, plan_shards,
+                                     prediction_input_shape)
+from fivedreg.engines import KNNInterpolator
+
+
+@pytest.fixture(scope="module")
+def network():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-1, 1, size=(300, 5))
+    return FastNeuralNetwork(hidden_layers=(16, 8), max_iterations=50).fit(X, np.sin(X).sum(axis=1))
+
+
+@pytest.fixture
+def input_npy(tmp_path):
+    path = tmp_path / "input.npy"
+    np.save(path, np.random.default_rng(1).uniform(-1, 1, size=(1000, 5)))
+    return str(path)
+
+
+class BrokenModel:
+    """A model that fails in the worker processes"""
+    n_features_ = 5
+
+    def predict(self, X):
+        raise RuntimeError("broken model")
+
+
+@pytest.mark.unit
+@pytest.mark.fast
+class TestPlanning:
+    """Test suite for shard planning and input loading"""
+
+    def test_plan_shards(self):
+        """Test that the shards cover every row once, in order"""
+        assert plan_shards(10, 4) == [(0, 4), (4, 8), (8, 10)]
+        assert plan_shards(3, 100) == [(0, 3)]
+        with pytest.raises(ValueError, match="shard_rows"):
+            plan_shards(10, 0)
+
+    def test_open_prediction_input(self, tmp_path, input_npy):
+        """Test that .npy files are memory-mapped, .pkl files loaded and others rejected"""
+        assert isinstance(open_prediction_input(input_npy), np.memmap)
+        pkl = tmp_path / "input.pkl"
+        pkl.write_bytes(pickle.dumps(np.ones((3, 5)).tolist()))
+        assert open_prediction_input(str(pkl)).shape == (3, 5)
+
+        with pytest.raises(ValueError, match="Unsupported file type"):
+            open_prediction_input(str(tmp_path / "input.csv"))
+        np.save(tmp_path / "flat.npy", np.ones(5))
+        with pytest.raises(ValueError, match="shape"):
+            open_prediction_input(str(tmp_path / "flat.npy"))
+
+    def test_prediction_input_shape(self, tmp_path, input_npy):
+        """Test that the shape is read from a .npy header and left unknown for a .pkl file"""
+        assert prediction_input_shape(input_npy) == (1000, 5)
+        assert prediction_input_shape(str(tmp_path / "rows.pkl")) is None
+        np.save(tmp_path / "text.npy", np.array([["a", "b"]]))
+        with pytest.raises(ValueError, match="numeric"):
+            prediction_input_shape(str(tmp_path / "text.npy"))
+
+    def test_job_validation(self, network, tmp_path, input_npy):
+        """Test that formats, process counts and feature counts are checked before the job starts"""
+        with pytest.raises(ValueError, match="Unknown output format"):
+            BatchPredictionJob("a", str(tmp_path / "a"), network, input_npy, output_format="parquet")
+        with pytest.raises(ValueError, match="processes"):
+            BatchPredictionJob("b", str(tmp_path / "b"), network, input_npy, processes=0)
+        np.save(tmp_path / "narrow.npy", np.ones((10, 3)))
+        with pytest.raises(ValueError, match="Expected 5 features, got 3"):
+            BatchPredictionJob("c", str(tmp_path / "c"), network, str(tmp_path / "narrow.npy"))
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.slow
+class TestBatchPredictionJob:
+    """Test suite for BatchPredictionJob"""
+
+    def test_npy_output_in_input_order(self, network, tmp_path, input_npy):
+        """Test that the shards of two workers are written back in input order"""
+        job = BatchPredictionJob("npy", str(tmp_path / "npy"), network, input_npy, shard_rows=128, processes=2)
+        job.run()
+
+        status = job.status()
+        assert status["state"] == "completed" and status["error"] is None
+        assert (status["rows_done"], status["shards_done"], status["shards_total"]) == (1000, 8, 8)
+        assert status["progress"] == 1.0 and status["processes"] == 2 and status["rows_per_second"] > 0
+        np.testing.assert_array_equal(np.load(job.output_path), network.predict(np.load(input_npy)))
+        # Only the output and the status are kept
+        assert sorted(os.listdir(job.directory)) == ["predictions.npy", "status.json"]
+
+    def test_csv_output_from_pickle(self, tmp_path):
+        """Test CSV output of a multi-target model scored from a pickled input"""
+        rng = np.random.default_rng(2)
+        X = rng.uniform(size=(250, 5))
+        model = KNNInterpolator().fit(X, np.column_stack([X.sum(axis=1), X[:, 0]]))
+        pkl = tmp_path / "input.pkl"
+        pkl.write_bytes(pickle.dumps(X))
+
+        job = BatchPredictionJob("csv", str(tmp_path / "csv"), model, str(pkl), shard_rows=60, processes=1,
+                                 output_format="csv")
+        # The pickled input is converted and the model copied by run(), not when the job is created
+        assert job.status()["rows_total"] is None and job.status()["shards_total"] is None
+        assert os.listdir(job.directory) == ["status.json"]
+        job.run()
+
+        assert job.state == "completed" and job.n_targets == 2
+        assert (job.rows_total, len(job.shards)) == (250, 5)
+        with open(job.output_path) as f:
+            assert f.readline().strip() == "prediction_0,prediction_1"
+        np.testing.assert_allclose(np.loadtxt(job.output_path, delimiter=",", skiprows=1), model.predict(X))
+
+    def test_failure_is_reported(self, tmp_path, input_npy):
+        """Test that a failing worker fails the job and removes its partial output"""
+        job = BatchPredictionJob("broken", str(tmp_path / "broken"), BrokenModel(), input_npy, shard_rows=500, processes=1)
+        job.run()
+
+        assert job.state == "failed"
+        assert "broken model" in job.error
+        assert os.listdir(job.directory) == ["status.json"]
+
+    def test_pickle_feature_mismatch_fails_the_job(self, network, tmp_path):
+        """Test that a .pkl input with the wrong number of features is reported by the job"""
+        pkl = tmp_path / "narrow.pkl"
+        pkl.write_bytes(pickle.dumps(np.ones((10, 3))))
+        job = BatchPredictionJob("narrow", str(tmp_path / "narrow"), network, str(pkl))
+        job.run()
+
+        assert job.state == "failed"
+        assert "Expected 5 features, got 3" in job.error
+
+    def test_cancel_before_start(self, network, tmp_path, input_npy):
+        """Test that a cancelled job scores no shard and keeps no output"""
+        job = BatchPredictionJob("cancel", str(tmp_path / "cancel"), network, input_npy, shard_rows=100, processes=1)
+        job.cancel()
+        job.run()
+
+        assert job.state == "cancelled" and job.rows_done == 0
+        assert not os.path.exists(job.output_path)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.slow
+class TestBatchPredictionManager:
+    """Test suite for BatchPredictionManager"""
+
+    def test_submit_wait_and_delete(self, network, tmp_path, input_npy):
+        """Test a background job from submission to deletion and the thread slot it runs in"""
+        slots, finished = [], []
+
+        def thread_slot(kind):
+            slots.append(kind)
+            from contextlib import nullcontext
+            return nullcontext(3)
+
+        manager = BatchPredictionManager(str(tmp_path / "jobs"), thread_slot=thread_slot, on_finish=finished.append)
+        job = manager.submit(network, input_npy, shard_rows=400)
+
+        status = manager.wait(job.job_id, timeout=120)
+        assert status["state"] == "completed"
+        assert (status["processes"], status["threads_per_process"]) == (3, 1)
+        assert slots == ["inference"] and finished == [job]
+        assert [s["job_id"] for s in manager.list_jobs()] == [job.job_id]
+        assert manager.output_path(job.job_id) == job.output_path
+
+        manager.delete(job.job_id)
+        assert manager.list_jobs() == []
+        assert not os.path.exists(job.directory)
+        with pytest.raises(KeyError):
+            manager.status(job.job_id)
+        with pytest.raises(KeyError):
+            manager.status("../escape")
+
+    def test_jobs_of_other_processes(self, network, tmp_path, input_npy):
+        """Test that a manager sharing the directory reports, serves and deletes another process's jobs"""
+        directory = str(tmp_path / "jobs")
+        owner, other = BatchPredictionManager(directory), BatchPredictionManager(directory)
+        job = owner.submit(network, input_npy, shard_rows=500, processes=1)
+        owner.wait(job.job_id, timeout=120)
+
+        status = other.status(job.job_id)
+        assert status["state"] == "completed" and status["rows_done"] == 1000
+        assert [s["job_id"] for s in other.list_jobs()] == [job.job_id]
+        np.testing.assert_array_equal(np.load(other.output_path(job.job_id)), network.predict(np.load(input_npy)))
+        other.delete(job.job_id)
+        with pytest.raises(KeyError):
+            owner.status(job.job_id)
+
+    def test_cancel_from_another_process(self, network, tmp_path, input_npy):
+        """Test that deleting a job still running elsewhere cancels it and its process removes it"""
+        directory = str(tmp_path / "jobs")
+        queued = BatchPredictionJob("a" * 32, os.path.join(directory, "a" * 32), network, input_npy)
+        manager = BatchPredictionManager(directory)
+
+        assert manager.status(queued.job_id)["state"] == "queued"
+        manager.delete(queued.job_id)
+        assert queued.cancel_requested()
+        queued.run()
+        assert queued.state == "cancelled" and queued.rows_done == 0
+        with pytest.raises(KeyError):
+            manager.status(queued.job_id)
+
+    def test_job_of_an_exited_process_is_failed(self, network, tmp_path, input_npy):
+        """Test that a job whose process is gone is reported as failed and can be deleted"""
+        directory = str(tmp_path / "jobs")
+        job = BatchPredictionJob("b" * 32, os.path.join(directory, "b" * 32), network, input_npy)
+        status_path = os.path.join(job.directory, "status.json")
+        with open(status_path) as f:
+            status = json.load(f)
+        with open(status_path, "w") as f:
+            json.dump(dict(status, state="running", worker_pid=2 ** 22 + 1), f)
+
+        manager = BatchPredictionManager(directory)
+        assert manager.status(job.job_id)["state"] == "failed"
+        manager.delete(job.job_id)
+        assert not os.path.exists(job.directory)
+
+    def test_old_jobs_are_evicted(self, network, tmp_path, input_npy):
+        """Test that only max_jobs finished jobs are kept"""
+        manager = BatchPredictionManager(str(tmp_path / "jobs"), max_jobs=2)
+        jobs = []
+        for _ in range(3):
+            jobs.append(manager.submit(network, input_npy, shard_rows=1000, processes=1))
+            manager.wait(jobs[-1].job_id, timeout=120)
+
+        assert [s["job_id"] for s in manager.list_jobs()] == [job.job_id for job in jobs[1:]]
+        assert not os.path.exists(jobs[0].directory)
@@ -7,7 +7,7 @@ import numpy as np
 import pickle
 import tempfile
 import os
-from fivedreg.data_hand.module import load_dataset
+from fivedreg.data_hand.module import load_dataset, split_order
 
 
 @pytest.mark.unit
@@ -78,9 +78,9 @@ class TestLoadDataset:
 
     def test_load_invalid_shape_X(self):
         """Test that loading dataset with invalid X shape raises error"""
-        # Create invalid dataset (X has 3 features instead of 5)
+        # Create invalid dataset (X is 1D instead of (n, d))
         invalid_data = {
-            'X': np.random.randn(100, 3),
+            'X': np.random.randn(100),
             'y': np.random.randn(100)
         }
 
@@ -89,17 +89,17 @@ class TestLoadDataset:
             temp_path = f.name
 
         try:
-            with pytest.raises(ValueError, match="Expected X with 5 features"):
+            with pytest.raises(ValueError, match="Expected 2D X"):
                 load_dataset(temp_path)
         finally:
             os.remove(temp_path)
 
     def test_load_invalid_shape_y(self):
         """Test that loading dataset with invalid y shape raises error"""
-        # Create invalid dataset (y is 2D instead of 1D)
+        # Create invalid dataset (y is 3D instead of 1D or 2D)
         invalid_data = {
             'X': np.random.randn(100, 5),
-            'y': np.random.randn(100, 2)
+            'y': np.random.randn(100, 2, 2)
         }
 
         with tempfile.NamedTemporaryFile(mode='wb', suffix='.pkl', delete=False) as f:
@@ -107,7 +107,7 @@ class TestLoadDataset:
             temp_path = f.name
 
         try:
-            with pytest.raises(ValueError, match="1D y"):
+            with pytest.raises(ValueError, match="1D or 2D y"):
                 load_dataset(temp_path)
         finally:
             os.remove(temp_path)
@@ -206,3 +206,108 @@ class TestLoadDataset:
         # scaler_y should have learned mean and std for target
         assert scaler_y.mean_.shape == (1,)
         assert scaler_y.scale_.shape == (1,)
+
+    @pytest.mark.parametrize("n_features", [1, 3, 7, 12])
+    def test_any_input_dimension(self, n_features, tmp_path):
+        """Test that datasets with any number of features are split and scaled per feature"""
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, n_features))
+        path = tmp_path / "data.pkl"
+        with open(path, "wb") as f:
+            pickle.dump({'X': X, 'y': X.sum(axis=1)}, f)
+
+        X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y = load_dataset(str(path))
+
+        assert X_train.shape[1] == X_val.shape[1] == X_test.shape[1] == n_features
+        assert scaler_X.mean_.shape == (n_features,)
+        assert len(X_train) + len(X_val) + len(X_test) == 200
+
+    def test_matches_train_test_split(self, sample_data_with_nans):
+        """Test that the in-place pipeline gives the same splits and scalers as sklearn"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+
+        X, y = sample_data_with_nans['X'], sample_data_with_nans['y']
+        valid = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+        X_rest, X_test, y_rest, y_test = train_test_split(X[valid], y[valid], test_size=0.2, random_state=42)
+        X_train, X_val, y_train, y_val = train_test_split(X_rest, y_rest, test_size=0.25, random_state=42)
+        reference_X = StandardScaler().fit(X_train)
+        reference_y = StandardScaler().fit(y_train.reshape(-1, 1))
+
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.pkl', delete=False) as f:
+            pickle.dump(sample_data_with_nans, f)
+            temp_path = f.name
+
+        try:
+            result = load_dataset(temp_path)
+        finally:
+            os.remove(temp_path)
+
+        for actual, expected in zip(result[0:6:2], [X_train, X_val, X_test]):
+            np.testing.assert_allclose(actual, reference_X.transform(expected), atol=1e-12)
+        for actual, expected in zip(result[1:6:2], [y_train, y_val, y_test]):
+            np.testing.assert_allclose(actual, reference_y.transform(expected.reshape(-1, 1)).ravel(), atol=1e-12)
+        np.testing.assert_allclose(result[6].scale_, reference_X.scale_)
+        np.testing.assert_allclose(result[7].mean_, reference_y.mean_)
+        assert result[6].n_samples_seen_ == len(X_train)
+
+    def test_splits_share_one_buffer(self, temp_dataset_file):
+        """Test that the splits are views of a single reordered buffer, not copies"""
+        X_train, y_train, X_val, y_val, X_test, y_test, _, _ = load_dataset(temp_dataset_file)
+
+        assert X_train.base is not None
+        assert X_train.base is X_val.base is X_test.base
+        assert y_train.base is y_val.base is y_test.base
+
+    def test_split_order_is_a_permutation(self):
+        """Test that split_order lists every row once with the expected split sizes"""
+        order, n_train, n_val = split_order(1003)
+
+        assert sorted(order.tolist()) == list(range(1003))
+        assert (n_train, n_val, 1003 - n_train - n_val) == (601, 201, 201)
+
+    def test_dedup_collapses_before_split(self, tmp_path):
+        """Test that duplicates are collapsed before splitting, so no point is in two splits"""
+        rng = np.random.default_rng(0)
+        X = np.repeat(rng.standard_normal((200, 5)), 3, axis=0)
+        y = X.sum(axis=1) + rng.standard_normal(600)
+        path = tmp_path / "duplicates.pkl"
+        with open(path, "wb") as f:
+            pickle.dump({'X': X, 'y': y}, f)
+
+        *splits, scaler_X, _, report = load_dataset(str(path), dedup_tolerance=0.0, return_dedup_report=True)
+        X_train, _, X_val, _, X_test, _ = splits
+
+        assert report["rows_before"] == 600
+        assert report["rows_after"] == 200
+        assert len(X_train) + len(X_val) + len(X_test) == 200
+        train_rows = {tuple(row) for row in scaler_X.inverse_transform(X_train).round(8)}
+        test_rows = {tuple(row) for row in scaler_X.inverse_transform(X_test).round(8)}
+        assert not train_rows & test_rows
+
+    def test_dedup_report_without_dedup(self, temp_dataset_file):
+        """Test that the report is None when deduplication is off"""
+        result = load_dataset(temp_dataset_file, return_dedup_report=True)
+        assert len(result) == 9
+        assert result[-1] is None
+
+    def test_multi_target(self, tmp_path):
+        """Test that a 2D y is split with its rows and standardized column by column"""
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal((500, 5))
+        y = np.column_stack([X.sum(axis=1), 100 + 10 * X[:, 0]])
+        y[7, 1] = np.nan
+        path = tmp_path / "multi.pkl"
+        with open(path, "wb") as f:
+            pickle.dump({'X': X, 'y': y}, f)
+
+        X_train, y_train, X_val, y_val, X_test, y_test, scaler_X, scaler_y = load_dataset(str(path))
+
+        assert y_train.shape == (len(X_train), 2)
+        assert len(X_train) + len(X_val) + len(X_test) == 499
+        assert scaler_y.n_features_in_ == 2
+        np.testing.assert_allclose(y_train.mean(axis=0), 0, atol=1e-12)
+        np.testing.assert_allclose(y_train.std(axis=0), 1)
+        # Rows stay aligned: the second target is still a function of the first feature
+        raw_X, raw_y = scaler_X.inverse_transform(X_test), scaler_y.inverse_transform(y_test)
+        np.testing.assert_allclose(raw_y[:, 1], 100 + 10 * raw_X[:, 0])
@@ -0,0 +1,164 @@
+"""
+Unit tests for the parallel dataset profile
+"""
+
+import json
+import os
+import numpy as np
+import pytest
+from fivedreg.data_hand.dataset_profile import (
+    count_unique, hash_rows, load_cached_profile, profile_cache_path, profile_dataset, save_profile)
+
+
+def make_table(n_samples=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_samples, 5)) * [1, 2, 3, 4, 5] + [1, 0, -1, 2, 3]
+    y = X.sum(axis=1)
+    return X, y
+
+
+@pytest.mark.unit
+@pytest.mark.data
+@pytest.mark.fast
+class TestRowHashing:
+    """Test suite for hash_rows and count_unique"""
+
+    def test_equal_rows_collide(self):
+        """Test that equal rows, including -0.0 vs 0.0 and NaNs, get the same hash"""
+        rows = np.array([[1.0, 0.0, np.nan], [1.0, -0.0, np.nan], [1.0, 0.0, 2.0]])
+        h = hash_rows(rows)
+        assert h[0] == h[1]
+        assert h[0] != h[2]
+
+    def test_distinct_rows_do_not_collide(self):
+        """Test that random rows hash to distinct values"""
+        X, _ = make_table(10000)
+        assert count_unique(hash_rows(X)) == 10000
+
+    def test_count_unique_empty(self):
+        """Test counting the distinct values of an empty array"""
+        assert count_unique(np.empty(0, dtype=np.uint64)) == 0
+
+
+@pytest.mark.unit
+@pytest.mark.data
+@pytest.mark.fast
+class TestProfileDataset:
+    """Test suite for profile_dataset"""
+
+    def test_statistics_match_numpy(self):
+        """Test that chunked, parallel statistics equal the full-array statistics"""
+        X, y = make_table()
+        profile = profile_dataset(X, y, chunk_rows=300, n_jobs=4)
+
+        assert profile["n_samples"] == 2000
+        assert profile["n_features"] == 5
+        assert profile["chunks"] == 7
+        for j, feature in enumerate(profile["features"]):
+            assert feature["count"] == 2000
+            assert feature["min"] == X[:, j].min()
+            assert feature["max"] == X[:, j].max()
+            np.testing.assert_allclose(feature["mean"], X[:, j].mean())
+            np.testing.assert_allclose(feature["std"], X[:, j].std())
+        np.testing.assert_allclose(profile["target"]["mean"], y.mean())
+
+    def test_quantiles_exact_below_sample_size(self):
+        """Test that quantiles are exact when the whole dataset fits in the sample"""
+        X, y = make_table()
+        profile = profile_dataset(X, y, chunk_rows=300)
+
+        assert profile["quantile_sample_size"] == 2000
+        np.testing.assert_allclose(profile["features"][2]["quantiles"]["p50"], np.median(X[:, 2]))
+        np.testing.assert_allclose(profile["target"]["quantiles"]["p99"], np.quantile(y, 0.99))
+
+    def test_quantiles_from_sample(self):
+        """Test that sampled quantiles stay close to the exact ones"""
+        X, y = make_table(50000)
+        profile = profile_dataset(X, y, chunk_rows=5000, sample_size=10000)
+
+        assert 8000 < profile["quantile_sample_size"] < 12000
+        for name, q in (("p05", 0.05), ("p50", 0.5), ("p95", 0.95)):
+            rank = np.mean(y <= profile["target"]["quantiles"][name])
+            assert abs(rank - q) < 0.02
+
+    def test_nan_and_duplicate_counts(self):
+        """Test NaN counts and duplicate rows/inputs"""
+        X, y = make_table(1000)
+        X[10], y[10] = X[11], y[11]  # duplicate row
+        X[20] = X[21]                # same inputs, different target
+        X[30, 1] = np.nan
+        X[31, 1] = np.nan
+        y[32] = np.nan
+        profile = profile_dataset(X, y, chunk_rows=100)
+
+        assert profile["features"][1]["nan_count"] == 2
+        assert profile["features"][1]["count"] == 998
+        assert profile["target"]["nan_count"] == 1
+        assert profile["nan_rows"] == 3
+        assert profile["duplicate_rows"] == 1
+        assert profile["duplicate_inputs"] == 2
+        assert np.isfinite(profile["features"][1]["mean"])
+
+    def test_target_histogram(self):
+        """Test that the target histogram covers every row"""
+        X, y = make_table()
+        histogram = profile_dataset(X, y, histogram_bins=10)["target"]["histogram"]
+
+        assert len(histogram["edges"]) == 11
+        assert sum(histogram["counts"]) == 2000
+        assert histogram["edges"][0] == y.min()
+        assert histogram["edges"][-1] == y.max()
+
+    def test_multi_target(self):
+        """Test that a 2D y gets one profile and histogram per target"""
+        X, y = make_table(500)
+        Y = np.column_stack([y, 2 * y])
+        profile = profile_dataset(X, Y)
+
+        assert "target" not in profile
+        assert len(profile["targets"]) == 2
+        np.testing.assert_allclose(profile["targets"][1]["mean"], 2 * y.mean())
+        assert sum(profile["targets"][1]["histogram"]["counts"]) == 500
+
+    def test_profile_is_json_serialisable(self):
+        """Test that the profile can be returned by the API as is"""
+        X, y = make_table(100)
+        json.dumps(profile_dataset(X, y))
+
+    def test_empty_dataset(self):
+        """Test profiling a dataset without rows"""
+        profile = profile_dataset(np.empty((0, 5)), np.empty(0))
+        assert profile["n_samples"] == 0
+        assert profile["features"][0]["mean"] is None
+        assert profile["duplicate_rows"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.data
+@pytest.mark.fast
+class TestProfileCache:
+    """Test suite for caching a profile next to its dataset"""
+
+    def test_round_trip(self, tmp_path):
+        """Test that a saved profile is found again while the file is unchanged"""
+        dataset = tmp_path / "data.pkl"
+        dataset.write_bytes(b"abc")
+        save_profile(str(dataset), {"n_samples": 3})
+
+        assert os.path.exists(profile_cache_path(str(dataset)))
+        assert load_cached_profile(str(dataset)) == {"n_samples": 3}
+
+    def test_stale_when_dataset_changes(self, tmp_path):
+        """Test that the cache is ignored once the dataset file has been replaced"""
+        dataset = tmp_path / "data.pkl"
+        dataset.write_bytes(b"abc")
+        save_profile(str(dataset), {"n_samples": 3})
+        dataset.write_bytes(b"abcdef")
+
+        assert load_cached_profile(str(dataset)) is None
+
+    def test_missing_cache(self, tmp_path):
+        """Test that a dataset without cached profile returns None"""
+        dataset = tmp_path / "data.pkl"
+        dataset.write_bytes(b"abc")
+        assert load_cached_profile(str(dataset)) is None
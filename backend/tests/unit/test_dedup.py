@@ -0,0 +1,99 @@
+"""
+Unit tests for duplicate and near-duplicate collapsing
+"""
+
+import numpy as np
+import pytest
+from fivedreg.data_hand.dedup import collapse_duplicates, duplicate_groups
+
+
+@pytest.mark.unit
+@pytest.mark.data
+@pytest.mark.fast
+class TestDuplicateGroups:
+    """Test suite for duplicate_groups"""
+
+    def test_labels_in_order_of_first_appearance(self):
+        """Test that equal rows share a label and labels follow first appearance"""
+        X = np.array([[1.0, 2.0], [3.0, 4.0], [1.0, 2.0], [5.0, 6.0], [3.0, 4.0]])
+        labels, n_groups = duplicate_groups(X)
+
+        assert labels.tolist() == [0, 1, 0, 2, 1]
+        assert n_groups == 3
+
+    def test_tolerance_groups_nearby_points(self):
+        """Test that points in the same grid cell are grouped"""
+        X = np.array([[0.101, 0.5], [0.104, 0.502], [0.3, 0.5]])
+        labels, n_groups = duplicate_groups(X, tolerance=0.01)
+        assert labels.tolist() == [0, 0, 1]
+        assert n_groups == 2
+
+    def test_empty_and_negative_tolerance(self):
+        """Test empty input and invalid tolerance"""
+        labels, n_groups = duplicate_groups(np.empty((0, 5)))
+        assert len(labels) == 0 and n_groups == 0
+        with pytest.raises(ValueError, match="tolerance"):
+            duplicate_groups(np.ones((3, 5)), tolerance=-1.0)
+
+
+@pytest.mark.unit
+@pytest.mark.data
+@pytest.mark.fast
+class TestCollapseDuplicates:
+    """Test suite for collapse_duplicates"""
+
+    def test_exact_duplicates_average_targets(self):
+        """Test that exact duplicates are merged and their targets averaged"""
+        X = np.array([[1.0, 2.0], [3.0, 4.0], [1.0, 2.0], [5.0, 6.0], [3.0, 4.0]])
+        y = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+        X_out, y_out, report = collapse_duplicates(X, y)
+
+        np.testing.assert_array_equal(X_out, [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+        np.testing.assert_allclose(y_out, [2.0, 3.5, 4.0])
+        assert report["rows_removed"] == 2
+        assert report["largest_group"] == 2
+        np.testing.assert_allclose(report["reduction_ratio"], 5 / 3)
+
+    def test_near_duplicates_use_centroid(self):
+        """Test that near-duplicates are replaced by the mean of their inputs"""
+        X = np.array([[1.0001, 2.0], [1.0003, 2.0], [5.0, 6.0]])
+        y = np.array([1.0, 3.0, 4.0])
+        X_out, y_out, report = collapse_duplicates(X, y, tolerance=0.01)
+
+        np.testing.assert_allclose(X_out, [[1.0002, 2.0], [5.0, 6.0]])
+        np.testing.assert_allclose(y_out, [2.0, 4.0])
+        assert report["tolerance"] == 0.01
+
+    def test_multi_target_averages_each_column(self):
+        """Test that every target column is averaged over a group"""
+        X = np.array([[1.0, 2.0], [1.0, 2.0], [5.0, 6.0]])
+        y = np.array([[1.0, 10.0], [3.0, 30.0], [4.0, 40.0]])
+        _, y_out, _ = collapse_duplicates(X, y)
+        np.testing.assert_allclose(y_out, [[2.0, 20.0], [4.0, 40.0]])
+
+    def test_no_duplicates_is_identity(self):
+        """Test that a dataset without duplicates comes back unchanged"""
+        rng = np.random.default_rng(0)
+        X, y = rng.standard_normal((1000, 5)), rng.standard_normal(1000)
+        X_out, y_out, report = collapse_duplicates(X, y)
+
+        np.testing.assert_array_equal(X_out, X)
+        np.testing.assert_array_equal(y_out, y)
+        assert report["reduction_ratio"] == 1.0
+
+    def test_negative_zero_is_a_duplicate(self):
+        """Test that -0.0 and 0.0 are treated as the same coordinate"""
+        X = np.array([[0.0, 1.0], [-0.0, 1.0]])
+        _, _, report = collapse_duplicates(X, np.array([1.0, 2.0]))
+        assert report["rows_after"] == 1
+
+    def test_large_repeated_dataset(self):
+        """Test the reduction ratio on a dataset where every point appears four times"""
+        rng = np.random.default_rng(1)
+        X = np.repeat(rng.standard_normal((25000, 5)), 4, axis=0)
+        X = X[rng.permutation(len(X))]
+        X_out, _, report = collapse_duplicates(X, X.sum(axis=1))
+
+        assert report["rows_after"] == 25000
+        assert report["reduction_ratio"] == 4.0
+        assert len(np.unique(X_out, axis=0)) == 25000
@@ -0,0 +1,105 @@
+"""
+Unit tests for knowledge distillation into a student network
+"""
+
+import numpy as np
+import pytest
+from fivedreg.base_fivedreg import FastNeuralNetwork, distill_model
+from fivedreg.data_hand.module import load_dataset
+from fivedreg.distillation import TeacherEnsemble, distill, sample_in_bounds
+from fivedreg.engines import KNNInterpolator, LocalRBFInterpolator
+
+
+def smooth_data(n_samples=2000, n_features=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(-1, 1, size=(n_samples, n_features))
+    return X, np.sin(X).sum(axis=1)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestTeacherEnsemble:
+    """Test suite for TeacherEnsemble and sample_in_bounds"""
+
+    def test_mean_of_members(self):
+        """Test that the ensemble averages its members"""
+        X, y = smooth_data(300)
+        members = [KNNInterpolator().fit(X, y), LocalRBFInterpolator().fit(X, y)]
+        ensemble = TeacherEnsemble(members)
+
+        X_query = X[:10] + 0.01
+        expected = (members[0].predict(X_query) + members[1].predict(X_query)) / 2
+        np.testing.assert_allclose(ensemble.predict(X_query), expected)
+        assert ensemble.n_features_ == 5 and ensemble.n_targets_ == 1
+
+    def test_incompatible_members(self):
+        """Test that members must agree on the features and be non-empty"""
+        X, y = smooth_data(100)
+        with pytest.raises(ValueError, match="same features"):
+            TeacherEnsemble([KNNInterpolator().fit(X, y), KNNInterpolator().fit(X[:, :3], y)])
+        with pytest.raises(ValueError, match="at least one model"):
+            TeacherEnsemble([])
+
+    def test_sample_in_bounds(self):
+        """Test that synthetic points stay inside the box and are reproducible"""
+        points = sample_in_bounds([-1.0, 0.0], [1.0, 10.0], 1000, seed=3)
+        assert points.shape == (1000, 2)
+        assert points[:, 0].min() >= -1.0 and points[:, 1].max() <= 10.0
+        np.testing.assert_array_equal(points, sample_in_bounds([-1.0, 0.0], [1.0, 10.0], 1000, seed=3))
+
+
+@pytest.mark.unit
+@pytest.mark.model
+class TestDistill:
+    """Test suite for distill"""
+
+    @pytest.mark.fast
+    def test_student_matches_teacher(self):
+        """Test that a small student tracks an RBF teacher within its reported error bound"""
+        X, y = smooth_data(2000)
+        X_test, y_test = smooth_data(500, seed=1)
+        teacher = LocalRBFInterpolator().fit(X, y)
+
+        student = distill(teacher, X, hidden_layers=(16, 8), n_synthetic=10_000, n_check=2000,
+                          X_test=X_test, y_test=y_test)
+        report = student.distillation_
+
+        assert isinstance(student, FastNeuralNetwork) and student.hidden_layers == (16, 8)
+        assert report["teacher"] == "rbf" and report["teacher_models"] == 1
+        bound = report["error_bound"]
+        assert bound["mean_abs_error"] <= bound["p99_abs_error"] <= bound["max_abs_error"]
+        in_bounds = (X_test >= report["bounds"]["lower"]).all(axis=1) & (X_test <= report["bounds"]["upper"]).all(axis=1)
+        assert np.abs(student.predict(X_test[in_bounds]) - teacher.predict(X_test[in_bounds])).mean() < 2 * bound["rmse"]
+        assert report["student_r2"] > 0.95
+        assert report["teacher_latency_ms"] > 0 and report["student_rows_per_second"] > 0
+
+    @pytest.mark.fast
+    def test_ensemble_and_multi_target(self):
+        """Test distilling a list of teachers that predict two targets"""
+        X, y = smooth_data(500)
+        Y = np.column_stack([y, -y])
+        teachers = [KNNInterpolator().fit(X, Y), LocalRBFInterpolator().fit(X, Y)]
+
+        student = distill(teachers, X, hidden_layers=(8,), n_synthetic=2000, n_check=500, max_iterations=20)
+        assert student.distillation_["teacher"] == "ensemble"
+        assert student.distillation_["teacher_models"] == 2
+        assert student.predict(X[:5]).shape == (5, 2)
+
+    @pytest.mark.fast
+    def test_dimension_mismatch(self):
+        """Test that the bounds must come from inputs the teacher accepts"""
+        X, y = smooth_data(100)
+        with pytest.raises(ValueError, match="Expected X_train with 5 features"):
+            distill(KNNInterpolator().fit(X, y), X[:, :3], n_synthetic=100)
+
+    @pytest.mark.slow
+    def test_distill_model_from_dataset(self, temp_dataset_file_medium):
+        """Test distilling a trained network with the bounds and test split of its dataset"""
+        X_train, y_train, _, _, _, _, _, _ = load_dataset(temp_dataset_file_medium)
+        teacher = FastNeuralNetwork(hidden_layers=(64, 32), max_iterations=100).fit(X_train, y_train)
+
+        student, metrics = distill_model(teacher, temp_dataset_file_medium, hidden_layers=(8,), n_synthetic=5000,
+                                         max_iterations=50)
+        assert metrics['r2'] == pytest.approx(student.distillation_['student_r2'])
+        assert student.distillation_["n_synthetic"] == 5000
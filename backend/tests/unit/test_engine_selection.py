@@ -0,0 +1,163 @@
+"""
+Unit tests for automatic engine selection
+"""
+
+import numpy as np
+import pytest
+import fivedreg.engine_selection as engine_selection
+from fivedreg.base_fivedreg import benchmark_training_speed
+from fivedreg.engine_selection import default_candidates, extrapolate, select_engine
+
+
+def probe(rows, fit_seconds, r2):
+    return {"rows": rows, "fit_seconds": fit_seconds, "predict_seconds": 0.01, "r2": r2}
+
+
+@pytest.fixture
+def fake_probes(monkeypatch):
+    """Deterministic probes: per engine, fit time ~ n ** time_exponent and error ~ n ** -0.5"""
+    profiles = {"mlp": (1.0, 1.0, 0.02), "knn": (0.001, 1.0, 0.3), "rbf": (0.002, 1.2, 0.05)}
+
+    def fake_probe(engine, params, X_fit, y_fit, X_val, y_val):
+        seconds, time_exponent, error = profiles[engine]
+        n = len(X_fit) / 1000
+        return probe(len(X_fit), seconds * n ** time_exponent, 1.0 - error * n ** -0.5)
+
+    monkeypatch.setattr(engine_selection, "_probe", fake_probe)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestExtrapolate:
+    """Test suite for extrapolate"""
+
+    def test_power_laws(self):
+        """Test that exact power laws are extrapolated exactly"""
+        small, large = probe(1000, 1.0, 1.0 - 0.04), probe(4000, 8.0, 1.0 - 0.02)
+        fit_seconds, r2 = extrapolate(small, large, 16000)
+
+        assert fit_seconds == pytest.approx(64.0)  # t ~ n^1.5
+        assert r2 == pytest.approx(1.0 - 0.01)  # error ~ n^-0.5
+
+    def test_exponents_are_bounded(self):
+        """Test that fit time grows at least as n^0.75 and that accuracy never degrades"""
+        small, large = probe(1000, 2.0, 0.95), probe(4000, 2.0, 0.90)
+        fit_seconds, r2 = extrapolate(small, large, 16000)
+
+        assert fit_seconds == pytest.approx(2.0 * 4 ** 0.75)
+        assert r2 == pytest.approx(0.90)
+
+    def test_single_probe_size(self):
+        """Test the tiny-dataset case where both probes use the same rows"""
+        fit_seconds, r2 = extrapolate(probe(40, 0.1, 0.8), probe(40, 0.1, 0.8), 50)
+        assert fit_seconds == pytest.approx(0.125)
+        assert r2 == 0.8
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestSelectEngine:
+    """Test suite for select_engine"""
+
+    X = np.zeros((20000, 5))
+    y = np.zeros(20000)
+
+    def test_r2_target_picks_cheapest(self, fake_probes):
+        """Test that the cheapest engine meeting the R² target is chosen"""
+        selection = select_engine(self.X, self.y, r2_target=0.98)
+
+        assert selection["engine"] == "rbf"
+        assert selection["reason"].startswith("cheapest engine meeting the R² target")
+        estimates = {c["engine"]: c for c in selection["candidates"]}
+        assert not estimates["knn"]["meets_r2_target"]
+        assert estimates["mlp"]["estimated_fit_seconds"] > estimates["rbf"]["estimated_fit_seconds"]
+
+    def test_time_budget_picks_most_accurate(self, fake_probes):
+        """Test that without an R² target the most accurate engine within the budget wins"""
+        assert select_engine(self.X, self.y)["engine"] == "mlp"
+
+        selection = select_engine(self.X, self.y, time_budget=1.0)
+        assert selection["engine"] == "rbf"
+        assert "within the time budget" in selection["reason"]
+
+    def test_unreachable_constraints(self, fake_probes):
+        """Test the fallbacks when no engine meets the target or fits the budget"""
+        selection = select_engine(self.X, self.y, time_budget=1.0, r2_target=0.9999)
+        assert selection["engine"] == "rbf"
+        assert "no engine is expected to meet the R² target" in selection["reason"]
+
+        selection = select_engine(self.X, self.y, time_budget=1e-6)
+        assert selection["engine"] == "knn"
+        assert selection["reason"].startswith("no engine is expected to fit in the time budget")
+
+    def test_report(self, fake_probes):
+        """Test the probe sizes and validation sample recorded in the report"""
+        selection = select_engine(self.X, self.y, probe_rows=4000, validation_rows=2000)
+
+        assert selection["probe_sizes"] == [1000, 4000]
+        assert selection["validation_rows"] == 2000
+        assert selection["n_samples"] == 20000
+        assert len(selection["candidates"]) == len(default_candidates())
+        assert all(len(c["probes"]) == 2 for c in selection["candidates"])
+
+    def test_real_probes(self):
+        """Test a real selection between the knn and rbf engines on a smooth function"""
+        rng = np.random.default_rng(0)
+        X = rng.uniform(-1, 1, size=(3000, 5))
+        candidates = [{"engine": "knn", "params": {}}, {"engine": "rbf", "params": {}}]
+        selection = select_engine(X, np.sin(X).sum(axis=1), candidates, r2_target=0.99)
+
+        assert selection["engine"] == "rbf"
+        assert selection["probe_sizes"] == [600, 2400]
+
+    def test_tiny_dataset_skips_probing(self, monkeypatch):
+        """Test that too few rows for a validation sample fall back to the first candidate"""
+        def no_probe(*args):
+            raise AssertionError("nothing should be probed")
+
+        monkeypatch.setattr(engine_selection, "_probe", no_probe)
+        rng = np.random.default_rng(0)
+        X = rng.uniform(-1, 1, size=(8, 5))
+        selection = select_engine(X, X.sum(axis=1), r2_target=0.99)
+
+        assert selection["engine"] == "mlp"
+        assert selection["params"] == default_candidates()[0]["params"]
+        assert selection["candidates"] == []
+        assert selection["validation_rows"] == 1
+        assert "too few rows" in selection["reason"]
+
+    def test_smallest_probed_dataset(self, fake_probes):
+        """Test that probing starts once the validation sample reaches MIN_VALIDATION_ROWS"""
+        n_samples = 5 * engine_selection.MIN_VALIDATION_ROWS
+        X = np.random.default_rng(0).uniform(-1, 1, size=(n_samples, 5))
+        selection = select_engine(X, X.sum(axis=1))
+
+        assert selection["validation_rows"] == engine_selection.MIN_VALIDATION_ROWS
+        assert len(selection["candidates"]) == len(default_candidates())
+
+    def test_default_candidates(self):
+        """Test that the requested network is probed along with the alternatives"""
+        candidates = default_candidates(hidden_layers=(128, 64), learning_rate=0.01)
+        assert candidates[0] == {"engine": "mlp", "params": {"hidden_layers": (128, 64), "learning_rate": 0.01,
+                                                             "max_iterations": 500, "early_stopping": True}}
+        assert [c["engine"] for c in candidates] == ["mlp", "mlp", "knn", "rbf"]
+        assert len(default_candidates(hidden_layers=(32, 16))) == 3
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.slow
+class TestAutoTraining:
+    """Test benchmark_training_speed with engine='auto'"""
+
+    def test_auto_engine(self, temp_dataset_file_medium):
+        """Test that the chosen engine is trained and the selection report attached"""
+        model, metrics = benchmark_training_speed(temp_dataset_file_medium, max_iterations=100, engine="auto",
+                                                  r2_target=0.9)
+
+        assert model.selection_ is not None
+        assert model.engine == model.selection_["engine"]
+        assert model.selection_["r2_target"] == 0.9
+        assert 'r2' in metrics
@@ -0,0 +1,154 @@
+"""
+Unit tests for the k-NN and local RBF interpolation engines
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+from fivedreg.base_fivedreg import FastNeuralNetwork, benchmark_training_speed
+from fivedreg.engines import KNNInterpolator, LocalRBFInterpolator, make_engine
+
+
+def smooth_data(n_samples=2000, n_features=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(-1, 1, size=(n_samples, n_features))
+    return X, np.sin(X).sum(axis=1)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestKNNInterpolator:
+    """Test suite for KNNInterpolator"""
+
+    def test_exact_at_training_points(self):
+        """Test that a query on a training point returns its target"""
+        X, y = smooth_data(500)
+        model = KNNInterpolator().fit(X, y)
+        np.testing.assert_allclose(model.predict(X[:50]), y[:50])
+
+    def test_inverse_distance_weights(self):
+        """Test the weighting against a hand-computed example"""
+        X = np.array([[0.0], [1.0], [3.0]])
+        y = np.array([0.0, 1.0, 3.0])
+        model = KNNInterpolator(n_neighbors=2, power=1.0).fit(X, y)
+        # Neighbours of 0.5 are 0 and 1 at equal distance; of 2.0 are 1 and 3 at distance 1
+        np.testing.assert_allclose(model.predict(np.array([[0.5], [2.0]])), [0.5, 2.0])
+        # Neighbours of 0.75 are 1 (distance 0.25) and 0 (distance 0.75)
+        np.testing.assert_allclose(model.predict(np.array([[0.75]])), [(1 / 0.25) / (1 / 0.25 + 1 / 0.75)])
+
+    def test_power_zero_is_plain_mean(self):
+        """Test that power 0 averages the neighbours uniformly"""
+        X, y = smooth_data(300)
+        model = KNNInterpolator(n_neighbors=4, power=0.0).fit(X, y)
+        _, indices = model.tree_.query(X[:5] + 0.01, k=4)
+        np.testing.assert_allclose(model.predict(X[:5] + 0.01), y[indices].mean(axis=1))
+
+    def test_accuracy_and_chunking(self):
+        """Test accuracy on a smooth function, and that chunked queries give the same result"""
+        X, y = smooth_data(5000)
+        X_test, y_test = smooth_data(1000, seed=1)
+        model = KNNInterpolator().fit(X, y)
+        assert model.evaluate(X_test, y_test)['r2'] > 0.95
+
+        chunked = KNNInterpolator(chunk_rows=64).fit(X, y)
+        np.testing.assert_allclose(chunked.predict(X_test), model.predict(X_test))
+
+    def test_multi_target_and_small_training_set(self):
+        """Test 2D y, and more neighbours requested than training points"""
+        X, y = smooth_data(5)
+        Y = np.column_stack([y, -y])
+        model = KNNInterpolator(n_neighbors=8).fit(X, Y)
+        predictions = model.predict(X + 0.01)
+        assert predictions.shape == (5, 2)
+        np.testing.assert_allclose(predictions[:, 1], -predictions[:, 0])
+        assert model.n_targets_ == 2
+
+    def test_invalid_inputs(self):
+        """Test parameter, unfitted-model and dimension checks"""
+        with pytest.raises(ValueError, match="n_neighbors"):
+            KNNInterpolator(n_neighbors=0)
+        with pytest.raises(ValueError, match="power"):
+            KNNInterpolator(power=-1.0)
+        with pytest.raises(ValueError, match="not fitted"):
+            KNNInterpolator().predict(np.zeros((1, 5)))
+        X, y = smooth_data(100)
+        with pytest.raises(ValueError, match="Expected X with 5 features"):
+            KNNInterpolator().fit(X, y).predict(np.zeros((1, 3)))
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestLocalRBFInterpolator:
+    """Test suite for LocalRBFInterpolator"""
+
+    def test_interpolates_training_points(self):
+        """Test that, without smoothing, the interpolant passes through the training points"""
+        X, y = smooth_data(500)
+        model = LocalRBFInterpolator().fit(X, y)
+        np.testing.assert_allclose(model.predict(X[:50]), y[:50], atol=1e-6)
+
+    def test_accuracy(self):
+        """Test that a smooth function is recovered closely"""
+        X, y = smooth_data(3000)
+        X_test, y_test = smooth_data(500, seed=1)
+        metrics = LocalRBFInterpolator().fit(X, y).evaluate(X_test, y_test)
+        assert metrics['r2'] > 0.999
+
+    def test_chunked_prediction_and_multi_target(self):
+        """Test that chunked prediction matches and that 2D y is supported"""
+        X, y = smooth_data(300)
+        Y = np.column_stack([y, 2 * y])
+        X_test, _ = smooth_data(50, seed=1)
+        model = LocalRBFInterpolator(neighbors=16).fit(X, Y)
+        chunked = LocalRBFInterpolator(neighbors=16, chunk_rows=7).fit(X, Y)
+
+        predictions = model.predict(X_test)
+        assert predictions.shape == (50, 2)
+        np.testing.assert_allclose(chunked.predict(X_test), predictions)
+        metrics = model.evaluate(X_test, np.column_stack([np.sin(X_test).sum(axis=1)] * 2) * [1, 2])
+        assert 'r2_target_1' in metrics
+
+    def test_invalid_kernel(self):
+        """Test that an unknown kernel is rejected"""
+        with pytest.raises(ValueError, match="Unknown kernel"):
+            LocalRBFInterpolator(kernel="sinc")
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestEngineSelection:
+    """Test building engines by name and training them through benchmark_training_speed"""
+
+    def test_make_engine(self):
+        """Test that engines are built by name with their parameters"""
+        model = make_engine("knn", n_neighbors=3)
+        assert isinstance(model, KNNInterpolator) and model.n_neighbors == 3
+        assert isinstance(make_engine("rbf"), LocalRBFInterpolator)
+        with pytest.raises(ValueError, match="Unknown engine"):
+            make_engine("svm")
+
+    def test_engines_share_the_interface(self):
+        """Test the attributes the API relies on, and pickling for the model registry"""
+        X, y = smooth_data(200)
+        for model in (FastNeuralNetwork(max_iterations=20), KNNInterpolator(), LocalRBFInterpolator()):
+            model.fit(X, y)
+            restored = pickle.loads(pickle.dumps(model))
+            np.testing.assert_allclose(restored.predict(X[:5]), model.predict(X[:5]))
+            assert model.n_features_ == 5
+            assert model.n_targets_ == 1
+            assert model.training_time_ is not None
+            assert model.get_params()['engine'] == model.engine
+
+    @pytest.mark.parametrize("engine", ["knn", "rbf"])
+    def test_benchmark_training_speed_with_engine(self, engine, temp_dataset_file_medium):
+        """Test training a non-neural engine on a dataset file"""
+        model, metrics = benchmark_training_speed(temp_dataset_file_medium, engine=engine,
+                                                  engine_params={"chunk_rows": 1000})
+        assert model.engine == engine
+        assert model.chunk_rows == 1000
+        assert set(metrics) >= {'mse', 'mae', 'rmse', 'r2'}
+        assert model.dedup_ is None
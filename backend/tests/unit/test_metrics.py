@@ -0,0 +1,89 @@
+"""
+Unit tests for the in-process metrics registry
+"""
+
+import threading
+import pytest
+from fivedreg.metrics import MetricsRegistry, process_collector, process_resident_memory_bytes
+
+
+@pytest.mark.unit
+@pytest.mark.fast
+class TestMetricsRegistry:
+    """Test suite for MetricsRegistry and its metric types"""
+
+    def test_counter_labels(self):
+        """Test that counters accumulate per label set"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests")
+
+        counter.inc(endpoint="/a")
+        counter.inc(2, endpoint="/a")
+        counter.inc(endpoint="/b")
+
+        assert counter.value(endpoint="/a") == 3
+        assert counter.value(endpoint="/b") == 1
+        assert counter.value(endpoint="/c") == 0
+
+    def test_counter_merges_thread_shards(self):
+        """Test that increments from many threads are all counted"""
+        registry = MetricsRegistry()
+        counter = registry.counter("events_total", "Events")
+
+        def work():
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value() == 8000
+
+    def test_histogram_buckets(self):
+        """Test that histogram buckets are cumulative in the exposition"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+        for value in [0.05, 0.5, 0.5, 5.0]:
+            histogram.observe(value, endpoint="/a")
+
+        text = registry.render()
+        assert '# TYPE latency_seconds histogram' in text
+        assert 'latency_seconds_bucket{endpoint="/a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{endpoint="/a",le="1.0"} 3' in text
+        assert 'latency_seconds_bucket{endpoint="/a",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{endpoint="/a"} 4' in text
+        assert 'latency_seconds_sum{endpoint="/a"} 6.05' in text
+
+    def test_gauge_and_collector(self):
+        """Test gauges and scrape-time collectors"""
+        registry = MetricsRegistry()
+        gauge = registry.gauge("throughput", "Throughput")
+        gauge.set(12.5)
+        registry.add_collector(lambda: [
+            ("cache_hit_ratio", "gauge", "Hit ratio", 0.75),
+            ("unset_value", "gauge", "Skipped when None", None)])
+
+        text = registry.render()
+        assert "throughput 12.5" in text
+        assert "cache_hit_ratio 0.75" in text
+        assert "unset_value" not in text
+
+    def test_duplicate_metric_name(self):
+        """Test that registering the same name twice is an error"""
+        registry = MetricsRegistry()
+        registry.counter("dup_total", "Duplicate")
+
+        with pytest.raises(ValueError):
+            registry.gauge("dup_total", "Duplicate")
+
+    def test_process_collector(self):
+        """Test process resource metrics"""
+        names = {name for name, _, _, _ in process_collector()}
+
+        assert "process_resident_memory_bytes" in names
+        assert "process_cpu_seconds_total" in names
+        assert process_resident_memory_bytes() > 0
@@ -0,0 +1,352 @@
+"""
+Unit tests for the ModelHandle hot-swap and shadow evaluation
+"""
+
+import threading
+
+import pytest
+import numpy as np
+from fivedreg.model_handle import ModelHandle, ModelValidationError, validate_holdout_metrics
+from fivedreg.model_registry import ModelRegistry
+
+
+GOOD_METRICS = {'mse': 0.01, 'mae': 0.05, 'rmse': 0.1, 'r2': 0.99}
+
+
+class ConstantModel:
+    """Minimal model predicting a constant value"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def predict(self, X):
+        return np.full(len(X), self.value, dtype=float)
+
+
+class BlockingModel:
+    """Model whose predict waits until it is released"""
+
+    def __init__(self, value):
+        self.value = value
+        self.release = threading.Event()
+
+    def predict(self, X):
+        self.release.wait(timeout=10)
+        return np.full(len(X), self.value, dtype=float)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestModelHandle:
+    """Test suite for ModelHandle"""
+
+    def test_initially_empty(self):
+        """Test that a new handle has no live model"""
+        handle = ModelHandle()
+
+        assert handle.current is None
+        with pytest.raises(LookupError):
+            handle.predict(np.zeros((1, 5)))
+
+    def test_publish_swaps_and_versions(self):
+        """Test that publishing replaces the live model with an increasing version"""
+        handle = ModelHandle()
+        first = handle.publish(ConstantModel(1.0), GOOD_METRICS)
+        snapshot = handle.current
+        second = handle.publish(ConstantModel(2.0), GOOD_METRICS)
+
+        assert second.version == first.version + 1
+        assert handle.current is second
+        # A snapshot taken before the swap keeps serving the old model
+        assert snapshot.model.predict(np.zeros((1, 5)))[0] == 1.0
+        predictions, version = handle.predict(np.zeros((3, 5)))
+        assert version is second
+        np.testing.assert_array_equal(predictions, [2.0, 2.0, 2.0])
+
+    def test_failed_validation_keeps_previous_model(self):
+        """Test that a model failing holdout validation is not published"""
+        handle = ModelHandle()
+        live = handle.publish(ConstantModel(1.0), GOOD_METRICS)
+
+        with pytest.raises(ModelValidationError):
+            handle.publish(ConstantModel(2.0), dict(GOOD_METRICS, r2=0.5), min_r2=0.9)
+        with pytest.raises(ModelValidationError):
+            handle.publish(ConstantModel(2.0), dict(GOOD_METRICS, mse=float('nan')))
+
+        assert handle.current is live
+
+    def test_validate_holdout_metrics(self):
+        """Test holdout metric validation rules"""
+        validate_holdout_metrics(GOOD_METRICS, min_r2=0.9)
+
+        with pytest.raises(ModelValidationError, match="r2"):
+            validate_holdout_metrics({'mse': 0.1})
+
+    def test_shadow_candidate_report(self):
+        """Test that shadowed traffic reports latency and prediction deltas"""
+        handle = ModelHandle()
+        handle.publish(ConstantModel(1.0), GOOD_METRICS)
+        candidate, deployment = handle.stage_candidate(
+            ConstantModel(1.5), dict(GOOD_METRICS, r2=0.98), shadow_fraction=1.0)
+
+        assert deployment == "shadow"
+        assert handle.candidate is candidate
+
+        for _ in range(4):
+            predictions, version = handle.predict(np.zeros((2, 5)))
+            # The live model's output is returned, never the candidate's
+            np.testing.assert_array_equal(predictions, [1.0, 1.0])
+
+        assert handle.wait_for_shadow(timeout=10)
+        report = handle.shadow_report()
+        assert report["shadowed_requests"] == 4
+        assert report["shadowed_rows"] == 8
+        assert report["mean_abs_prediction_delta"] == pytest.approx(0.5)
+        assert report["max_abs_prediction_delta"] == pytest.approx(0.5)
+        assert report["holdout_r2_delta"] == pytest.approx(-0.01)
+        assert "latency_delta_ms" in report
+
+    def test_stage_without_live_model_publishes(self):
+        """Test that staging with nothing live publishes directly"""
+        handle = ModelHandle()
+        version, deployment = handle.stage_candidate(ConstantModel(1.0), GOOD_METRICS, shadow_fraction=0.5)
+
+        assert deployment == "live"
+        assert handle.current is version
+        assert handle.candidate is None
+
+    def test_promote_and_discard(self):
+        """Test promoting and discarding the shadow candidate"""
+        handle = ModelHandle()
+        handle.publish(ConstantModel(1.0), GOOD_METRICS)
+        candidate, _ = handle.stage_candidate(ConstantModel(2.0), GOOD_METRICS, shadow_fraction=0.1)
+
+        assert handle.promote_candidate() is candidate
+        assert handle.current is candidate
+        assert handle.candidate is None
+
+        with pytest.raises(LookupError):
+            handle.promote_candidate()
+        with pytest.raises(LookupError):
+            handle.discard_candidate()
+
+        handle.stage_candidate(ConstantModel(3.0), GOOD_METRICS, shadow_fraction=0.1)
+        handle.discard_candidate()
+        assert handle.current is candidate
+
+    def test_invalid_shadow_fraction(self):
+        """Test that shadow fractions outside (0, 1] are rejected"""
+        handle = ModelHandle()
+
+        with pytest.raises(ValueError):
+            handle.stage_candidate(ConstantModel(1.0), GOOD_METRICS, shadow_fraction=0.0)
+
+    def test_shadow_scoring_does_not_block_live_predictions(self):
+        """Test that a slow candidate is scored off the request path"""
+        handle = ModelHandle()
+        handle.publish(ConstantModel(1.0), GOOD_METRICS)
+        slow = BlockingModel(2.0)
+        handle.stage_candidate(slow, GOOD_METRICS, shadow_fraction=1.0)
+
+        predictions, _ = handle.predict(np.zeros((3, 5)))
+        np.testing.assert_array_equal(predictions, [1.0, 1.0, 1.0])
+        assert handle.shadow_report()["shadowed_requests"] == 0
+        assert not handle.wait_for_shadow(timeout=0.05)
+
+        slow.release.set()
+        assert handle.wait_for_shadow(timeout=10)
+        assert handle.shadow_report()["shadowed_requests"] == 1
+
+    def test_shadow_backlog_is_bounded(self):
+        """Test that shadow samples are dropped once the candidate falls behind"""
+        from fivedreg.model_handle import MAX_PENDING_SHADOW_REQUESTS
+
+        handle = ModelHandle()
+        handle.publish(ConstantModel(1.0), GOOD_METRICS)
+        slow = BlockingModel(2.0)
+        handle.stage_candidate(slow, GOOD_METRICS, shadow_fraction=1.0)
+
+        for _ in range(MAX_PENDING_SHADOW_REQUESTS + 3):
+            handle.predict(np.zeros((1, 5)))
+
+        slow.release.set()
+        assert handle.wait_for_shadow(timeout=10)
+        report = handle.shadow_report()
+        assert report["shadowed_requests"] == MAX_PENDING_SHADOW_REQUESTS
+        assert report["dropped_shadow_requests"] == 3
+
+    def test_multi_target_prediction_delta(self):
+        """Test that the mean prediction delta is averaged over every output value"""
+        class TwoTargetModel:
+            def __init__(self, values):
+                self.values = values
+
+            def predict(self, X):
+                return np.tile(self.values, (len(X), 1))
+
+        handle = ModelHandle()
+        handle.publish(TwoTargetModel([0.0, 0.0]), GOOD_METRICS)
+        handle.stage_candidate(TwoTargetModel([1.0, 3.0]), GOOD_METRICS, shadow_fraction=1.0)
+
+        handle.predict(np.zeros((4, 5)))
+        assert handle.wait_for_shadow(timeout=10)
+
+        report = handle.shadow_report()
+        assert report["shadowed_rows"] == 4
+        assert report["mean_abs_prediction_delta"] == pytest.approx(2.0)
+        assert report["max_abs_prediction_delta"] == pytest.approx(3.0)
+
+    def test_promotion_resets_shadow_stats(self):
+        """Test that the promoted candidate's shadow stats are not reported afterwards"""
+        handle = ModelHandle()
+        handle.publish(ConstantModel(1.0), GOOD_METRICS)
+        handle.stage_candidate(ConstantModel(2.0), GOOD_METRICS, shadow_fraction=1.0)
+        handle.predict(np.zeros((2, 5)))
+        assert handle.wait_for_shadow(timeout=10)
+        assert handle.shadow_report()["shadowed_requests"] == 1
+
+        handle.promote_candidate()
+
+        report = handle.shadow_report()
+        assert report["shadowed_requests"] == 0
+        assert report["shadowed_rows"] == 0
+        assert "mean_abs_prediction_delta" not in report
+
+    def test_candidate_with_other_output_shape_counts_as_error(self):
+        """Test that a candidate whose predictions do not match the live shape is counted as an error"""
+        class TwoTargetModel:
+            def predict(self, X):
+                return np.zeros((len(X), 2))
+
+        handle = ModelHandle()
+        handle.publish(ConstantModel(1.0), GOOD_METRICS)
+        handle.stage_candidate(TwoTargetModel(), GOOD_METRICS, shadow_fraction=1.0)
+
+        handle.predict(np.zeros((3, 5)))
+        assert handle.wait_for_shadow(timeout=10)
+
+        report = handle.shadow_report()
+        assert report["candidate_errors"] == 1
+        assert report["shadowed_requests"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestSharedModelHandle:
+    """Test a handle shared by several worker processes through a registry directory"""
+
+    def workers(self, tmp_path, count=2, **kwargs):
+        # Separate registries and handles over one directory, as in separate processes
+        return [ModelHandle(ModelRegistry(str(tmp_path)), **kwargs) for _ in range(count)]
+
+    def test_publish_is_seen_by_other_workers(self, tmp_path):
+        """Test that a model published by one worker is served by the others"""
+        first, second = self.workers(tmp_path)
+        version = first.publish(ConstantModel(2.0), GOOD_METRICS, info={"engine": "mlp"})
+
+        assert second.current.version == version.version
+        assert second.current.info == {"engine": "mlp"}
+        predictions, served = second.predict(np.zeros((2, 5)))
+        np.testing.assert_array_equal(predictions, [2.0, 2.0])
+        assert served.version == version.version
+
+        newer = second.publish(ConstantModel(3.0), GOOD_METRICS)
+        assert newer.version == version.version + 1
+        assert first.current.version == newer.version
+
+    def test_new_worker_restores_state(self, tmp_path):
+        """Test that a worker started later serves the live model and candidate"""
+        first, = self.workers(tmp_path, count=1)
+        first.publish(ConstantModel(1.0), GOOD_METRICS)
+        candidate, _ = first.stage_candidate(ConstantModel(2.0), GOOD_METRICS, shadow_fraction=0.5)
+
+        later, = self.workers(tmp_path, count=1)
+        assert later.current.version == first.current.version
+        assert later.candidate.version == candidate.version
+        assert later.shadow_report()["shadow_fraction"] == 0.5
+
+    def test_promote_and_discard_from_another_worker(self, tmp_path):
+        """Test that a candidate staged on one worker can be promoted or discarded on another"""
+        first, second = self.workers(tmp_path)
+        first.publish(ConstantModel(1.0), GOOD_METRICS)
+        candidate, deployment = first.stage_candidate(ConstantModel(2.0), GOOD_METRICS, shadow_fraction=0.1)
+        assert deployment == "shadow"
+
+        assert second.promote_candidate().version == candidate.version
+        assert first.current is candidate
+        assert first.candidate is None
+
+        first.stage_candidate(ConstantModel(3.0), GOOD_METRICS, shadow_fraction=0.1)
+        second.discard_candidate()
+        assert first.candidate is None
+        with pytest.raises(LookupError):
+            first.promote_candidate()
+
+    def test_superseded_versions_are_deleted(self, tmp_path):
+        """Test that only the live and candidate versions are kept on disk"""
+        first, second = self.workers(tmp_path)
+        first.publish(ConstantModel(1.0), GOOD_METRICS)
+        live = first.publish(ConstantModel(2.0), GOOD_METRICS)
+        candidate, _ = second.stage_candidate(ConstantModel(3.0), GOOD_METRICS, shadow_fraction=0.1)
+
+        stored = {record["model_id"] for record in ModelRegistry(str(tmp_path)).list_models()}
+        assert stored == {f"v{live.version}", f"v{candidate.version}"}
+
+        second.clear()
+        assert ModelRegistry(str(tmp_path)).list_models() == []
+        assert first.current is None
+
+    def test_shadow_report_sums_all_workers(self, tmp_path):
+        """Test that the shadow report covers the samples of every worker"""
+        first, second = self.workers(tmp_path)
+        first.publish(ConstantModel(1.0), GOOD_METRICS)
+        first.stage_candidate(ConstantModel(1.5), GOOD_METRICS, shadow_fraction=1.0)
+
+        for handle, calls in ((first, 2), (second, 3)):
+            for _ in range(calls):
+                handle.predict(np.zeros((2, 5)))
+            assert handle.wait_for_shadow(timeout=10)
+
+        report = first.shadow_report()
+        assert report["shadowed_requests"] == 5
+        assert report["shadowed_rows"] == 10
+        assert report["mean_abs_prediction_delta"] == pytest.approx(0.5)
+        assert second.shadow_report()["shadowed_requests"] == 5
+
+        # The statistics of a promoted candidate are not reported for the next one
+        second.promote_candidate()
+        first.stage_candidate(ConstantModel(2.0), GOOD_METRICS, shadow_fraction=1.0)
+        assert second.shadow_report()["shadowed_requests"] == 0
+
+    def test_models_from_other_workers_pass_through_on_load(self, tmp_path):
+        """Test that on_load is applied to models loaded from the registry only"""
+        loaded = []
+        first, second = self.workers(tmp_path, on_load=loaded.append)
+        model = ConstantModel(1.0)
+        first.publish(model, GOOD_METRICS)
+
+        assert first.current.model is model
+        assert second.current.model is not model
+        assert loaded == [second.current.model]
+
+    def test_concurrent_publishes_get_distinct_versions(self, tmp_path):
+        """Test that workers publishing at the same time never reuse a version number"""
+        handles = self.workers(tmp_path, count=4)
+        versions = []
+
+        def publish(handle):
+            for _ in range(3):
+                versions.append(handle.publish(ConstantModel(1.0), GOOD_METRICS).version)
+
+        threads = [threading.Thread(target=publish, args=(handle,)) for handle in handles]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(versions) == list(range(1, 13))
+        live = handles[0].current.version
+        assert all(handle.current.version == live for handle in handles)
+        assert [record["model_id"] for record in ModelRegistry(str(tmp_path)).list_models()] == [f"v{live}"]
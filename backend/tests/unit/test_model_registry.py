@@ -0,0 +1,211 @@
+"""
+Unit tests for the ModelRegistry class
+"""
+
+import pytest
+import numpy as np
+from fivedreg.model_registry import ModelRegistry
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestModelRegistry:
+    """Test suite for ModelRegistry"""
+
+    def test_put_and_get(self, tmp_path, mock_trained_model):
+        """Test that a registered model is served back and persisted"""
+        registry = ModelRegistry(str(tmp_path))
+        record = registry.put("team-a", mock_trained_model, {"owner": "a"})
+
+        assert record["model_id"] == "team-a"
+        assert record["size_bytes"] > 0
+        assert registry.get("team-a") is mock_trained_model
+        assert (tmp_path / "team-a.pkl").exists()
+        assert (tmp_path / "team-a.json").exists()
+
+    def test_get_unknown_model(self, tmp_path):
+        """Test that requesting an unknown model raises KeyError"""
+        registry = ModelRegistry(str(tmp_path))
+
+        with pytest.raises(KeyError):
+            registry.get("missing")
+
+    def test_invalid_model_id(self, tmp_path, mock_trained_model):
+        """Test that unsafe model ids are rejected"""
+        registry = ModelRegistry(str(tmp_path))
+
+        for model_id in ["../escape", "", "a/b", "-leading"]:
+            with pytest.raises(ValueError):
+                registry.put(model_id, mock_trained_model)
+
+    def test_lru_eviction_and_lazy_reload(self, tmp_path, mock_trained_model):
+        """Test that models over the memory budget are unloaded and reloaded on demand"""
+        registry = ModelRegistry(str(tmp_path))
+        size = registry.put("first", mock_trained_model)["size_bytes"]
+
+        # Budget for a single model: registering a second one unloads the first
+        registry.memory_budget_bytes = size
+        registry.put("second", mock_trained_model)
+
+        listing = {record["model_id"]: record["resident"] for record in registry.list_models()}
+        assert listing == {"first": False, "second": True}
+        assert registry.evictions == 1
+
+        # Lazy reload gives an equivalent model and unloads the other one
+        X = np.random.randn(5, 5)
+        reloaded = registry.get("first")
+        np.testing.assert_array_almost_equal(reloaded.predict(X), mock_trained_model.predict(X))
+        assert registry.misses == 1
+        assert registry.last_load_time_ is not None
+
+        listing = {record["model_id"]: record["resident"] for record in registry.list_models()}
+        assert listing == {"first": True, "second": False}
+
+    def test_recently_used_model_stays_resident(self, tmp_path, mock_trained_model):
+        """Test that the least recently used model is the one unloaded"""
+        registry = ModelRegistry(str(tmp_path))
+        size = registry.put("a", mock_trained_model)["size_bytes"]
+        registry.put("b", mock_trained_model)
+        registry.memory_budget_bytes = 2 * size + size // 2
+
+        registry.get("a")  # "b" becomes least recently used
+        registry.put("c", mock_trained_model)
+
+        listing = {record["model_id"]: record["resident"] for record in registry.list_models()}
+        assert listing == {"a": True, "b": False, "c": True}
+
+    def test_discovers_existing_artifacts(self, tmp_path, mock_trained_model):
+        """Test that a new registry finds models persisted by a previous one"""
+        ModelRegistry(str(tmp_path)).put("persisted", mock_trained_model, {"owner": "a"})
+
+        registry = ModelRegistry(str(tmp_path))
+
+        assert registry.list_models()[0]["model_id"] == "persisted"
+        assert registry.list_models()[0]["resident"] is False
+        assert registry.metadata("persisted")["owner"] == "a"
+        assert registry.get("persisted") is not None
+
+    def test_delete(self, tmp_path, mock_trained_model):
+        """Test that deleting a model removes it from memory and disk"""
+        registry = ModelRegistry(str(tmp_path))
+        registry.put("gone", mock_trained_model)
+
+        registry.delete("gone")
+
+        assert registry.list_models() == []
+        assert not (tmp_path / "gone.pkl").exists()
+        with pytest.raises(KeyError):
+            registry.delete("gone")
+
+    def test_shared_artifact_directory(self, tmp_path, mock_trained_model):
+        """Test that registries of different worker processes see each other's models"""
+        first = ModelRegistry(str(tmp_path))
+        second = ModelRegistry(str(tmp_path))
+
+        first.put("shared", mock_trained_model, {"owner": "a"})
+        assert second.get("shared") is not None
+        assert second.metadata("shared")["owner"] == "a"
+        assert [record["model_id"] for record in second.list_models()] == ["shared"]
+
+        first.delete("shared")
+        with pytest.raises(KeyError):
+            second.get("shared")
+        assert second.list_models() == []
+
+    def test_replaced_artifact_is_reloaded(self, tmp_path, mock_trained_model):
+        """Test that a resident copy is dropped once another process replaces the artifact"""
+        first = ModelRegistry(str(tmp_path))
+        second = ModelRegistry(str(tmp_path))
+        first.put("prod", mock_trained_model, {"generation": 1})
+        stale = second.get("prod")
+
+        first.put("prod", mock_trained_model, {"generation": 2})
+
+        assert second.get("prod") is not stale
+        assert second.metadata("prod")["generation"] == 2
+        assert second.misses == 2
+
+    def test_load_does_not_hold_the_lock(self, tmp_path, mock_trained_model, monkeypatch):
+        """Test that other models are served while one is being unpickled"""
+        import threading
+        import fivedreg.model_registry as module
+
+        registry = ModelRegistry(str(tmp_path))
+        registry.put("resident", mock_trained_model)
+        ModelRegistry(str(tmp_path)).put("cold", mock_trained_model)
+        loading, release = threading.Event(), threading.Event()
+        original_load = module.pickle.load
+
+        def slow_load(f):
+            loading.set()
+            release.wait(5)
+            return original_load(f)
+
+        monkeypatch.setattr(module.pickle, "load", slow_load)
+        loader = threading.Thread(target=registry.get, args=("cold",))
+        loader.start()
+        assert loading.wait(5)
+        try:
+            assert registry.get("resident") is mock_trained_model
+        finally:
+            release.set()
+            loader.join()
+        assert registry.list_models()[0]["resident"] is True
+
+    def test_put_does_not_hold_the_lock(self, tmp_path, mock_trained_model, monkeypatch):
+        """Test that other models are served while one is being written to disk"""
+        import threading
+
+        registry = ModelRegistry(str(tmp_path))
+        registry.put("resident", mock_trained_model)
+        writing, release = threading.Event(), threading.Event()
+        original_write = ModelRegistry._write_atomic
+
+        def slow_write(path, payload, mode="wb"):
+            writing.set()
+            release.wait(5)
+            original_write(path, payload, mode)
+
+        monkeypatch.setattr(registry, "_write_atomic", slow_write)
+        writer = threading.Thread(target=registry.put, args=("new", mock_trained_model))
+        writer.start()
+        assert writing.wait(5)
+        try:
+            assert registry.get("resident") is mock_trained_model
+        finally:
+            release.set()
+            writer.join()
+        assert registry.get("new") is mock_trained_model
+
+    def test_concurrent_puts_of_one_model(self, tmp_path, sample_data_small):
+        """Test that concurrent puts of the same id leave one complete artifact and no temporary files"""
+        import threading
+        from fivedreg.engines import KNNInterpolator
+
+        X, y = sample_data_small['X'], sample_data_small['y']
+        models = [KNNInterpolator(n_neighbors=k).fit(X, y) for k in range(2, 10)]
+        registries = [ModelRegistry(str(tmp_path)) for _ in models]
+        threads = [threading.Thread(target=registry.put, args=("shared", model, {"n_neighbors": model.n_neighbors}))
+                   for registry, model in zip(registries, models)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["shared.json", "shared.pkl"]
+        model = ModelRegistry(str(tmp_path)).get("shared")
+        assert model.n_neighbors in range(2, 10)
+        assert model.predict(X[:5]).shape == (5,)
+
+    def test_size_counts_the_int8_kernel(self, tmp_path):
+        """Test that an int8 network is accounted with the float32 kernel it rebuilds after loading"""
+        import pickle
+        from fivedreg.base_fivedreg import FastNeuralNetwork
+        from fivedreg.quantization import QuantizedNetwork
+
+        X = np.random.default_rng(0).normal(size=(100, 5))
+        int8 = QuantizedNetwork(FastNeuralNetwork(hidden_layers=(16, 8), max_iterations=10).fit(X, X.sum(axis=1)))
+        record = ModelRegistry(str(tmp_path)).put("int8", int8)
+
+        assert record["size_bytes"] == len(pickle.dumps(int8, protocol=pickle.HIGHEST_PROTOCOL)) + int8.kernel_bytes
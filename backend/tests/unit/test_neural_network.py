@@ -273,6 +273,31 @@ class TestFastNeuralNetwork:
         # Results should be identical (same random state)
         np.testing.assert_array_almost_equal(predictions1, predictions2, decimal=5)
 
+    def test_multi_target(self, sample_data_medium):
+        """Test that one network fits and predicts several targets at once"""
+        X = sample_data_medium['X']
+        Y = np.column_stack([sample_data_medium['y'], X[:, 0] - X[:, 1]])
+        model = FastNeuralNetwork(hidden_layers=(64, 32), max_iterations=200, verbose=False)
+
+        model.fit(X, Y)
+        predictions = model.predict(X[:10])
+        metrics = model.evaluate(X, Y)
+
+        assert model.n_targets_ == 2
+        assert predictions.shape == (10, 2)
+        assert metrics['r2'] > 0.9
+        assert metrics['r2_target_0'] > 0.9
+        assert metrics['r2_target_1'] > 0.9
+
+    def test_single_target_reports_one_target(self, sample_data_small):
+        """Test that a 1D target keeps 1D predictions and no per-target metrics"""
+        model = FastNeuralNetwork(max_iterations=20, early_stopping=False, verbose=False)
+        model.fit(sample_data_small['X'], sample_data_small['y'])
+
+        assert model.n_targets_ == 1
+        assert model.predict(sample_data_small['X'][:3]).shape == (3,)
+        assert 'r2_target_0' not in model.evaluate(sample_data_small['X'], sample_data_small['y'])
+
 
 @pytest.mark.unit
 @pytest.mark.model
@@ -306,6 +331,53 @@ class TestBenchmarkTraining:
         # Should achieve good accuracy on synthetic linear data
         assert metrics['r2'] > 0.9
 
+    def test_benchmark_with_row_budget(self, temp_dataset_file_medium):
+        """Test that max_train_rows trains on a reduced set and reports the reduction"""
+        model, metrics = benchmark_training_speed(temp_dataset_file_medium, max_train_rows=300)
+
+        assert model.reduction_["rows_after"] == 300
+        assert model.reduction_["rows_before"] > 300
+        assert model.reduction_["method"] == "grid"
+        assert metrics['r2'] <= 1
+
+    def test_benchmark_with_dedup(self, temp_dataset_file):
+        """Test that dedup_tolerance reports the collapsed rows"""
+        model, _ = benchmark_training_speed(temp_dataset_file, dedup_tolerance=0.0)
+
+        assert model.dedup_["rows_before"] == model.dedup_["rows_after"]
+        assert model.dedup_["tolerance"] == 0.0
+        # The speedup costs extra training passes and is only measured on request
+        assert "training_speedup" not in model.dedup_
+
+    def test_benchmark_with_dedup_speedup(self, temp_dataset_file):
+        """Test that measure_speedup adds the measured training speedup to the report"""
+        model, _ = benchmark_training_speed(temp_dataset_file, dedup_tolerance=0.0, measure_speedup=True)
+
+        assert model.dedup_["train_rows_before"] == model.dedup_["train_rows_after"]
+        assert model.dedup_["speedup_pass"] == "epoch"
+        assert model.dedup_["training_speedup"] > 0
+
+    def test_dedup_speedup_is_measured(self, sample_data_small):
+        """Test that the speedup is timed on as many rows as training would have had without dedup"""
+        from fivedreg.base_fivedreg import measure_dedup_speedup
+
+        X, y = sample_data_small['X'], sample_data_small['y']
+        model = FastNeuralNetwork(hidden_layers=(16, 8), max_iterations=5, verbose=False)
+        model.fit(X, y)
+
+        report = measure_dedup_speedup(model, X, y, train_rows_before=4 * len(X))
+
+        assert report["train_rows_before"] == 4 * len(X)
+        assert report["train_rows_after"] == len(X)
+        assert report["pass_seconds_before"] > 0
+        assert report["training_speedup"] == pytest.approx(report["pass_seconds_before"] / report["pass_seconds_after"])
+
+    def test_benchmark_without_budget_has_no_reduction(self, temp_dataset_file):
+        """Test that no reduction is reported when every row is used"""
+        model, _ = benchmark_training_speed(temp_dataset_file)
+        assert model.reduction_ is None
+        assert model.dedup_ is None
+
     def test_benchmark_with_small_dataset(self, temp_dataset_file):
         """Test benchmark with small dataset"""
         model, metrics = benchmark_training_speed(temp_dataset_file)
@@ -0,0 +1,162 @@
+"""
+Unit tests for ONNX export and the onnxruntime inference backend
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+import onnxruntime
+from fivedreg.base_fivedreg import FastNeuralNetwork, benchmark_training_speed
+from fivedreg.engines import KNNInterpolator
+from fivedreg.onnx_export import OnnxRuntimeNetwork, export_onnx, fuse_scaling, network_layers
+from fivedreg.pruning import prune_network
+from fivedreg.quantization import QuantizedNetwork
+
+
+def smooth_data(n_samples=1000, n_features=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(-1, 1, size=(n_samples, n_features))
+    return X, np.sin(X).sum(axis=1)
+
+
+def run_onnx(serialized, X):
+    session = onnxruntime.InferenceSession(serialized, providers=["CPUExecutionProvider"])
+    return session.run(["y"], {"X": X.astype(np.float32)})[0]
+
+
+@pytest.fixture(scope="module")
+def network():
+    X, y = smooth_data()
+    return FastNeuralNetwork(hidden_layers=(32, 16), max_iterations=100).fit(X, y)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestExportOnnx:
+    """Test suite for export_onnx"""
+
+    def test_matches_sklearn(self, network, tmp_path):
+        """Test that the exported graph reproduces the network in float32 and is written to path"""
+        X, _ = smooth_data(200, seed=1)
+        path = tmp_path / "model.onnx"
+        serialized = network.to_onnx(path=str(path))
+
+        assert path.read_bytes() == serialized
+        np.testing.assert_allclose(run_onnx(serialized, X).ravel(), network.predict(X), atol=1e-5)
+
+    def test_fused_scaling_takes_raw_values(self, network):
+        """Test that folding the scalers equals scaling the inputs and unscaling the outputs"""
+        X, _ = smooth_data(200, seed=2)
+        X_raw = X * [1.0, 10.0, 100.0, 0.5, 2.0] + [3.0, -1.0, 50.0, 0.0, 7.0]
+        scaler_X = StandardScaler().fit(X_raw)
+        scaler_y = StandardScaler().fit(np.random.default_rng(0).normal(5.0, 3.0, size=(100, 1)))
+
+        expected = scaler_y.inverse_transform(network.predict(scaler_X.transform(X_raw)).reshape(-1, 1))
+        fused = run_onnx(export_onnx(network, scaler_X, scaler_y), X_raw)
+        np.testing.assert_allclose(fused, expected, rtol=1e-4, atol=1e-4)
+
+    def test_fuse_scaling_is_exact_in_float64(self, network):
+        """Test the algebra of the folded first and last layers"""
+        X, _ = smooth_data(50, seed=3)
+        scaler_X = StandardScaler().fit(X * 4 + 1)
+        layers, _ = network_layers(network)
+        fused = fuse_scaling(layers, scaler_X)
+
+        h_fused = (X * 4 + 1) @ fused[0][0] + fused[0][1]
+        h_plain = scaler_X.transform(X * 4 + 1) @ layers[0][0] + layers[0][1]
+        np.testing.assert_allclose(h_fused, h_plain, atol=1e-10)
+        np.testing.assert_array_equal(fused[1][0], layers[1][0])
+
+    def test_pruned_quantized_and_multi_target(self, network):
+        """Test export of pruned and quantized networks and of two targets"""
+        X, y = smooth_data(200, seed=4)
+        pruned = prune_network(network, keep_fraction=0.5)
+        np.testing.assert_allclose(run_onnx(export_onnx(pruned), X).ravel(), pruned.predict(X), atol=1e-5)
+        quantized = QuantizedNetwork(network, "int8")
+        np.testing.assert_allclose(run_onnx(export_onnx(quantized), X).ravel(), quantized.predict(X), atol=1e-5)
+
+        multi = FastNeuralNetwork(hidden_layers=(8,), max_iterations=20).fit(X, np.column_stack([y, -y]))
+        assert run_onnx(export_onnx(multi), X[:3]).shape == (3, 2)
+
+    def test_only_fitted_networks(self):
+        """Test that other engines and unfitted networks are rejected"""
+        X, y = smooth_data(100)
+        with pytest.raises(ValueError, match="Only a neural network"):
+            export_onnx(KNNInterpolator().fit(X, y))
+        with pytest.raises(ValueError, match="not fitted"):
+            export_onnx(FastNeuralNetwork())
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestOnnxRuntimeNetwork:
+    """Test suite for OnnxRuntimeNetwork"""
+
+    def test_serves_like_the_network(self, network):
+        """Test predictions, attributes, evaluation and parameters"""
+        X, y = smooth_data(300, seed=5)
+        served = OnnxRuntimeNetwork(network)
+
+        np.testing.assert_allclose(served.predict(X), network.predict(X), atol=1e-5)
+        assert served.predict(X).shape == (300,)
+        assert served.engine == "mlp" and served.backend == "onnxruntime"
+        assert served.hidden_layers == (32, 16) and served.n_features_ == 5
+        assert served.evaluate(X, y)["r2"] == pytest.approx(network.evaluate(X, y)["r2"], abs=1e-5)
+        assert served.get_params()["backend"] == "onnxruntime"
+        with pytest.raises(ValueError, match="Expected X with 5 features"):
+            served.predict(X[:, :3])
+
+    def test_set_intra_op_threads(self, network):
+        """Test that changing the thread count rebuilds the session with it"""
+        X, _ = smooth_data(5, seed=7)
+        served = OnnxRuntimeNetwork(network)
+        served.predict(X)
+        session = served._session
+
+        served.set_intra_op_threads(0)
+        assert served._session is session
+        served.set_intra_op_threads(1)
+        assert served._session is None
+        np.testing.assert_allclose(served.predict(X), network.predict(X), atol=1e-5)
+        assert served._get_session().get_session_options().intra_op_num_threads == 1
+
+    def test_pickle_drops_the_session(self, network):
+        """Test that the session is rebuilt after unpickling and can be exported again"""
+        X, _ = smooth_data(20, seed=6)
+        served = OnnxRuntimeNetwork(network)
+        served.predict(X)
+
+        state = served.__getstate__()
+        assert state["_session"] is None
+        restored = pickle.loads(pickle.dumps(served))
+        np.testing.assert_allclose(restored.predict(X), served.predict(X))
+        np.testing.assert_allclose(run_onnx(export_onnx(restored), X).ravel(), served.predict(X), atol=1e-6)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.slow
+class TestOnnxRuntimeTraining:
+    """Test benchmark_training_speed with the onnxruntime backend"""
+
+    def test_network_is_served_by_onnxruntime(self, temp_dataset_file_medium):
+        """Test that the final (quantized) network is wrapped and other engines are kept"""
+        model, metrics = benchmark_training_speed(
+            temp_dataset_file_medium, hidden_layers=(16, 8), max_iterations=50,
+            quantization="float32", inference_backend="onnxruntime")
+        assert isinstance(model, OnnxRuntimeNetwork)
+        assert model.quantization_["mode"] == "float32"
+        assert metrics["r2"] == pytest.approx(model.quantization_["r2_after"], abs=1e-4)
+
+        knn, _ = benchmark_training_speed(temp_dataset_file_medium, engine="knn", inference_backend="onnxruntime")
+        assert knn.backend == "scipy"
+        with pytest.raises(ValueError, match="Unknown inference backend"):
+            benchmark_training_speed(temp_dataset_file_medium, inference_backend="tensorrt")
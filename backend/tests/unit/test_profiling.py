@@ -0,0 +1,158 @@
+"""
+Unit tests for the profiling hooks
+"""
+
+import pickle
+import pstats
+import pytest
+import numpy as np
+from fivedreg.base_fivedreg import FastNeuralNetwork
+from fivedreg.profiling import MemorySampler, Profiler, ProfilerBusyError, ProfileStore, process_memory_bytes
+
+
+def busy_work():
+    return sum(np.sum(np.random.randn(200, 200) @ np.random.randn(200, 5)) for _ in range(5))
+
+
+@pytest.mark.unit
+@pytest.mark.fast
+class TestProfiler:
+    """Test suite for Profiler and ProfileResult"""
+
+    def test_profile_captures_calls_and_memory(self):
+        """Test that a profile records functions and allocations"""
+        with Profiler("work") as profiler:
+            busy_work()
+
+        result = profiler.result
+        assert result.name == "work"
+        assert result.wall_time > 0
+        assert any("busy_work" in row["function"] for row in result.top_functions(50))
+        assert result.peak_memory_bytes > 0
+        assert len(result.memory) > 0
+
+    def test_pstats_export(self, tmp_path):
+        """Test that the pstats export can be loaded by pstats"""
+        with Profiler("work", trace_memory=False) as profiler:
+            busy_work()
+
+        path = tmp_path / "work.pstats"
+        path.write_bytes(profiler.result.to_pstats_bytes())
+
+        stats = pstats.Stats(str(path))
+        assert stats.total_calls > 0
+        assert profiler.result.memory is None
+
+    def test_speedscope_export(self):
+        """Test the structure of the speedscope export"""
+        with Profiler("work", trace_memory=False) as profiler:
+            busy_work()
+
+        document = profiler.result.to_speedscope()
+        profile = document["profiles"][0]
+        assert profile["type"] == "sampled"
+        assert len(profile["samples"]) == len(profile["weights"]) > 0
+        n_frames = len(document["shared"]["frames"])
+        assert all(0 <= index < n_frames for sample in profile["samples"] for index in sample)
+
+    def test_result_is_picklable(self):
+        """Test that profile results survive pickling (e.g. stored with a model)"""
+        with Profiler("work", trace_memory=False) as profiler:
+            busy_work()
+
+        restored = pickle.loads(pickle.dumps(profiler.result))
+        assert restored.stats.total_calls == profiler.result.stats.total_calls
+
+    def test_nested_profiles_rejected(self):
+        """Test that only one profile can be captured at a time"""
+        with Profiler("outer", trace_memory=False):
+            with pytest.raises(ProfilerBusyError):
+                with Profiler("inner", trace_memory=False):
+                    pass
+
+    def test_model_profiling_opt_in(self, sample_data_small):
+        """Test that FastNeuralNetwork only profiles when asked to"""
+        X, y = sample_data_small['X'], sample_data_small['y']
+
+        model = FastNeuralNetwork(hidden_layers=(8, 4), max_iterations=10)
+        model.fit(X, y)
+        model.predict(X)
+        assert model.profiles_ == {}
+
+        profiled = FastNeuralNetwork(hidden_layers=(8, 4), max_iterations=10, profile=True)
+        profiled.fit(X, y)
+        profiled.predict(X)
+        assert set(profiled.profiles_) == {'fit', 'predict'}
+        assert profiled.profiles_['fit'].stats.total_calls > 0
+
+
+@pytest.mark.unit
+@pytest.mark.fast
+class TestProfileStore:
+    """Test the on-disk store of profile results"""
+
+    def capture(self, name):
+        with Profiler(name, trace_memory=False) as profiler:
+            busy_work()
+        return profiler.result
+
+    def test_put_get_and_list(self, tmp_path):
+        """Test that stored profiles are listed and loaded from disk"""
+        store = ProfileStore(str(tmp_path))
+        first = store.put(self.capture("first"))
+        second = store.put(self.capture("second"))
+
+        # A store over the same directory (another worker process) sees both
+        other = ProfileStore(str(tmp_path))
+        assert [entry["profile_id"] for entry in other.list()] == [first, second]
+        assert other.get(second).name == "second"
+        assert other.get(second).stats.total_calls > 0
+
+    def test_keeps_most_recent(self, tmp_path):
+        """Test that only the max_profiles newest profiles are kept"""
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        ids = [store.put(self.capture(f"run{i}")) for i in range(4)]
+
+        assert [entry["profile_id"] for entry in store.list()] == ids[2:]
+        assert store.get(ids[0]) is None
+        assert len(list(tmp_path.iterdir())) == 4
+
+    def test_unknown_or_invalid_id(self, tmp_path):
+        """Test that unknown ids and ids that are not plain hex return None"""
+        store = ProfileStore(str(tmp_path))
+
+        assert store.get("0" * 32) is None
+        assert store.get("../etc/passwd") is None
+
+
+@pytest.mark.unit
+@pytest.mark.fast
+class TestMemorySampler:
+    """Test suite for process memory sampling"""
+
+    def test_process_memory_bytes(self):
+        """Test that the current RSS is reported"""
+        memory = process_memory_bytes()
+        assert memory["rss"] > 0
+        assert memory["uss"] is None or memory["uss"] > 0
+
+    def test_peak_includes_numpy_buffers(self):
+        """Test that a freed NumPy buffer shows up in the peak but not in the steady state"""
+        size = 64 * 1024 * 1024
+        with MemorySampler() as sampler:
+            buffer = np.ones(size // 8)
+            buffer += 1
+            del buffer
+
+        result = sampler.result
+        assert result["peak_rss_bytes"] >= size * 0.9
+        assert result["steady_rss_bytes"] < size * 0.5
+
+    def test_steady_state_keeps_retained_memory(self):
+        """Test that memory still held after the block counts towards the steady state"""
+        size = 32 * 1024 * 1024
+        with MemorySampler() as sampler:
+            kept = np.ones(size // 8)
+
+        assert sampler.result["steady_rss_bytes"] >= size * 0.9
+        del kept
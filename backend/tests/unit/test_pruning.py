@@ -0,0 +1,119 @@
+"""
+Unit tests for structured pruning of hidden units
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+from fivedreg.base_fivedreg import FastNeuralNetwork, benchmark_training_speed
+from fivedreg.engines import KNNInterpolator
+from fivedreg.pruning import prune_network, unit_scores
+from fivedreg.quantization import QuantizedNetwork
+
+
+def smooth_data(n_samples=2000, n_features=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(-1, 1, size=(n_samples, n_features))
+    return X, np.sin(X).sum(axis=1)
+
+
+@pytest.fixture(scope="module")
+def network():
+    X, y = smooth_data()
+    return FastNeuralNetwork(hidden_layers=(32, 16), max_iterations=200).fit(X, y)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestPruneNetwork:
+    """Test suite for prune_network"""
+
+    def test_unused_units_are_removed_without_effect(self):
+        """Test that units with zero outgoing weights score 0 and are removed first, losslessly"""
+        X, y = smooth_data(500)
+        network = FastNeuralNetwork(hidden_layers=(32,), max_iterations=50).fit(X, y)
+        network.model.coefs_[1][:8] = 0.0  # the first 8 units no longer feed the output
+
+        scores, _ = unit_scores(network.model, 0)
+        assert np.all(scores[:8] == 0) and np.all(scores[8:] > 0)
+        pruned = prune_network(network, keep_fraction=0.75)
+        assert pruned.hidden_layers == (24,)
+        np.testing.assert_allclose(pruned.predict(X), network.predict(X))
+
+    def test_shapes_and_original_untouched(self, network):
+        """Test that the adjacent weight matrices are cut consistently and the input network is kept"""
+        pruned = prune_network(network, keep_fraction=0.5)
+        shapes = [w.shape for w in pruned.model.coefs_]
+
+        assert shapes == [(5, 16), (16, 8), (8, 1)]
+        assert [b.shape for b in pruned.model.intercepts_] == [(16,), (8,), (1,)]
+        assert network.hidden_layers == (32, 16) and network.model.coefs_[0].shape == (5, 32)
+        report = pruned.pruning_
+        assert report["hidden_layers_after"] == [16, 8]
+        assert report["parameters_after"] == 5 * 16 + 16 + 16 * 8 + 8 + 8 + 1 < report["parameters_before"]
+
+    def test_activation_criterion_keeps_mean_output(self):
+        """Test that folding removed units into the bias preserves the mean prediction"""
+        X, y = smooth_data(2000)
+        network = FastNeuralNetwork(hidden_layers=(64,), max_iterations=200).fit(X, y)
+        pruned = prune_network(network, X, keep_fraction=0.5, criterion="activation", sample_rows=len(X))
+        assert pruned.predict(X).mean() == pytest.approx(network.predict(X).mean(), abs=1e-9)
+
+    def test_fine_tuning_recovers_accuracy(self, network):
+        """Test that a few epochs of fine-tuning bring the R² back up and are reported"""
+        X, y = smooth_data()
+        X_test, y_test = smooth_data(500, seed=1)
+        pruned = prune_network(network, X, y, keep_fraction=0.5, fine_tune_iterations=10, X_test=X_test, y_test=y_test)
+        report = pruned.pruning_
+
+        assert report["after"]["r2"] > report["r2_before_fine_tuning"]
+        assert report["after"]["r2"] > 0.95
+        assert set(report["before"]) == {"latency_ms", "rows_per_second", "r2"}
+        assert pruned.n_iterations_ == network.n_iterations_ + 10
+
+    def test_pruned_network_serves_like_a_network(self, network):
+        """Test pickling, quantization and the multi-target case"""
+        X, y = smooth_data(300)
+        pruned = prune_network(network, keep_fraction=0.5)
+        restored = pickle.loads(pickle.dumps(pruned))
+        np.testing.assert_allclose(restored.predict(X[:5]), pruned.predict(X[:5]))
+        assert QuantizedNetwork(pruned, "float32").pruning_ is pruned.pruning_
+
+        multi = FastNeuralNetwork(hidden_layers=(16,), max_iterations=20).fit(X, np.column_stack([y, -y]))
+        assert prune_network(multi, X, np.column_stack([y, -y]), fine_tune_iterations=2).predict(X[:3]).shape == (3, 2)
+
+    def test_invalid_inputs(self, network):
+        """Test criterion, fraction, engine and data checks"""
+        X, y = smooth_data(100)
+        with pytest.raises(ValueError, match="Unknown pruning criterion"):
+            prune_network(network, criterion="random")
+        with pytest.raises(ValueError, match="keep_fraction"):
+            prune_network(network, keep_fraction=0.0)
+        with pytest.raises(ValueError, match="Only a fitted neural network"):
+            prune_network(KNNInterpolator().fit(X, y))
+        with pytest.raises(ValueError, match="needs sample inputs"):
+            prune_network(network, criterion="activation")
+        with pytest.raises(ValueError, match="Fine-tuning needs"):
+            prune_network(network, X, fine_tune_iterations=5)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.slow
+class TestPrunedTraining:
+    """Test benchmark_training_speed with pruning"""
+
+    def test_prune_then_quantize(self, temp_dataset_file_medium):
+        """Test that pruning runs after training and before quantization"""
+        model, metrics = benchmark_training_speed(
+            temp_dataset_file_medium, hidden_layers=(32, 16, 8), max_iterations=100,
+            pruning={"keep_fraction": 0.5, "fine_tune_iterations": 5}, quantization="int8")
+
+        assert isinstance(model, QuantizedNetwork)
+        assert model.hidden_layers == (16, 8, 4)
+        assert model.pruning_["hidden_layers_before"] == [32, 16, 8]
+        assert metrics['r2'] == pytest.approx(model.quantization_['r2_after'])
+        with pytest.raises(ValueError, match="Pruning applies to the 'mlp' engine"):
+            benchmark_training_speed(temp_dataset_file_medium, engine="rbf", pruning={})
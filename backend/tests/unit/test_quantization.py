@@ -0,0 +1,135 @@
+"""
+Unit tests for post-training weight quantization
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+from fivedreg.base_fivedreg import FastNeuralNetwork, benchmark_training_speed
+from fivedreg.engines import KNNInterpolator
+from fivedreg.quantization import QuantizedNetwork, quantize_network, quantize_per_channel
+
+
+def smooth_data(n_samples=2000, n_features=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(-1, 1, size=(n_samples, n_features))
+    return X, np.sin(X).sum(axis=1)
+
+
+@pytest.fixture(scope="module")
+def network():
+    X, y = smooth_data()
+    return FastNeuralNetwork(hidden_layers=(32, 16), max_iterations=200).fit(X, y)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestQuantizePerChannel:
+    """Test suite for quantize_per_channel"""
+
+    def test_round_trip_error(self):
+        """Test that each column is reconstructed within half a quantization step"""
+        weights = np.random.default_rng(0).normal(size=(16, 8)) * np.arange(1, 9)
+        quantized, scales = quantize_per_channel(weights)
+
+        assert quantized.dtype == np.int8 and scales.shape == (8,)
+        assert np.abs(quantized).max() == 127
+        assert np.all(np.abs(quantized * scales - weights) <= scales / 2 + 1e-6)
+
+    def test_zero_column(self):
+        """Test that an all-zero column quantizes to zeros instead of dividing by zero"""
+        quantized, scales = quantize_per_channel(np.zeros((4, 2)))
+        assert not quantized.any()
+        assert np.all(scales == 1.0)
+
+
+@pytest.mark.unit
+@pytest.mark.model
+@pytest.mark.fast
+class TestQuantizedNetwork:
+    """Test suite for QuantizedNetwork"""
+
+    @pytest.mark.parametrize("mode, tolerance", [("float32", 1e-4), ("int8", 0.05)])
+    def test_matches_network(self, network, mode, tolerance):
+        """Test that quantized predictions stay close to the float64 network"""
+        X_test, _ = smooth_data(500, seed=1)
+        quantized = QuantizedNetwork(network, mode)
+        np.testing.assert_allclose(quantized.predict(X_test), network.predict(X_test), atol=tolerance)
+
+    def test_weight_sizes(self, network):
+        """Test that float32 halves the weights, and that int8 stores one byte per weight but holds a float32 kernel"""
+        float32, int8 = QuantizedNetwork(network, "float32"), QuantizedNetwork(network, "int8")
+        assert float32.weight_bytes * 2 == float32.source_weight_bytes_
+        assert float32.kernel_bytes == 0 and float32.stored_weight_bytes == float32.weight_bytes
+        assert all(weights.dtype == np.int8 for weights in int8.weights_)
+        assert int8.stored_weight_bytes < float32.weight_bytes / 2
+
+        int8.predict(np.zeros((1, 5)))
+        assert int8.kernel_bytes == sum(weights.nbytes for weights in int8._kernel_weights)
+        assert int8.weight_bytes == int8.stored_weight_bytes + int8.kernel_bytes > float32.weight_bytes
+
+    def test_chunking_and_multi_target(self):
+        """Test that chunked prediction matches, and that 2D y keeps its shape"""
+        X, y = smooth_data(500)
+        model = FastNeuralNetwork(hidden_layers=(16,), max_iterations=50).fit(X, np.column_stack([y, -y]))
+        quantized = QuantizedNetwork(model, "int8")
+        chunked = QuantizedNetwork(model, "int8", chunk_rows=7)
+
+        predictions = quantized.predict(X[:50])
+        assert predictions.shape == (50, 2)
+        np.testing.assert_allclose(chunked.predict(X[:50]), predictions, rtol=1e-6)
+
+    def test_interface_and_pickling(self, network):
+        """Test the attributes the API relies on, and that pickles leave out the kernel cache"""
+        quantized = QuantizedNetwork(network, "int8")
+        X_test, _ = smooth_data(10, seed=1)
+        predictions = quantized.predict(X_test)
+
+        restored = pickle.loads(pickle.dumps(quantized))
+        assert restored._kernel_weights is None
+        np.testing.assert_allclose(restored.predict(X_test), predictions)
+        params = quantized.get_params()
+        assert params['engine'] == 'mlp' and params['quantization'] == 'int8'
+        assert params['hidden_layers'] == (32, 16)
+        assert quantized.n_features_ == 5 and quantized.n_targets_ == 1
+
+    def test_invalid_inputs(self, network):
+        """Test mode, engine and dimension checks"""
+        with pytest.raises(ValueError, match="Unknown quantization mode"):
+            QuantizedNetwork(network, "int4")
+        X, y = smooth_data(100)
+        with pytest.raises(ValueError, match="Only a fitted neural network"):
+            QuantizedNetwork(KNNInterpolator().fit(X, y))
+        with pytest.raises(ValueError, match="Expected X with 5 features"):
+            QuantizedNetwork(network).predict(np.zeros((1, 3)))
+
+
+@pytest.mark.unit
+@pytest.mark.model
+class TestQuantizeNetwork:
+    """Test quantize_network and quantized training"""
+
+    @pytest.mark.fast
+    def test_accuracy_report(self, network):
+        """Test that the report compares both models on the test split"""
+        X_test, y_test = smooth_data(500, seed=1)
+        report = quantize_network(network, "int8", X_test, y_test).quantization_
+
+        assert report["r2_before"] == pytest.approx(network.evaluate(X_test, y_test)["r2"])
+        assert report["r2_delta"] == pytest.approx(report["r2_after"] - report["r2_before"])
+        assert abs(report["r2_delta"]) < 0.01
+        assert report["compression"] > 4 and report["memory_compression"] < 2
+        assert report["weight_bytes_after"] > report["stored_bytes_after"]
+        assert "r2_before" not in quantize_network(network, "float32").quantization_
+
+    @pytest.mark.slow
+    def test_benchmark_training_speed_with_quantization(self, temp_dataset_file_medium):
+        """Test that the quantized network is returned and evaluated"""
+        model, metrics = benchmark_training_speed(temp_dataset_file_medium, max_iterations=100, quantization="float32")
+
+        assert isinstance(model, QuantizedNetwork)
+        assert metrics['r2'] == pytest.approx(model.quantization_['r2_after'])
+        with pytest.raises(ValueError, match="Quantization applies to the 'mlp' engine"):
+            benchmark_training_speed(temp_dataset_file_medium, engine="knn", quantization="int8")
@@ -0,0 +1,131 @@
+"""
+Unit tests for coverage-aware subsampling
+"""
+
+import numpy as np
+import pytest
+from fivedreg.data_hand.reduction import allocate_budget, coverage_subsample, grid_strata
+
+
+def make_table(n_samples=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_samples, 5))
+    y = np.sum(X**2, axis=1)
+    return X, y
+
+
+@pytest.mark.unit
+@pytest.mark.data
+@pytest.mark.fast
+class TestAllocateBudget:
+    """Test suite for allocate_budget"""
+
+    def test_sums_to_budget(self):
+        """Test that the allocation uses exactly the budget"""
+        allocation = allocate_budget([50, 50, 50], [1, 1, 1], 100)
+        assert allocation.sum() == 100
+        assert allocation.max() - allocation.min() <= 1
+
+    def test_small_strata_are_capped(self):
+        """Test that the surplus of strata smaller than their share goes to the others"""
+        allocation = allocate_budget([5, 100, 100, 0], [1, 1, 1, 1], 60)
+        assert allocation.tolist()[0] == 5
+        assert allocation.tolist()[3] == 0
+        assert allocation.sum() == 60
+
+    def test_proportional_to_weights(self):
+        """Test that larger weights receive more rows"""
+        allocation = allocate_budget([1000, 1000], [3, 1], 400)
+        assert allocation.tolist() == [300, 100]
+
+    def test_budget_larger_than_data(self):
+        """Test that every row is taken when the budget exceeds the data"""
+        assert allocate_budget([5, 100], [1, 1], 300).tolist() == [5, 100]
+
+
+@pytest.mark.unit
+@pytest.mark.data
+@pytest.mark.fast
+class TestCoverageSubsample:
+    """Test suite for coverage_subsample"""
+
+    @pytest.mark.parametrize("method", ["grid", "kmeans", "random"])
+    def test_hits_budget(self, method):
+        """Test that every method returns exactly the budget of distinct, sorted rows"""
+        X, y = make_table()
+        indices, report = coverage_subsample(X, y, 1000, method=method)
+
+        assert len(indices) == 1000
+        assert len(np.unique(indices)) == 1000
+        assert np.all(np.diff(indices) > 0)
+        assert report["rows_before"] == 20000
+        assert report["rows_after"] == 1000
+        assert report["reduction_ratio"] == 20.0
+
+    def test_grid_in_high_dimensions(self):
+        """Test that grid strata stay distinct when bins ** n_features overflows int64"""
+        rng = np.random.default_rng(0)
+        X = np.vstack([rng.random((1000, 80)), np.zeros((1000, 80))])
+        labels = grid_strata(X, 100)
+
+        assert len(np.unique(labels[1000:])) == 1
+        assert labels[0] not in labels[1000:]
+        indices, _ = coverage_subsample(X, X.sum(axis=1), 200)
+        assert len(indices) == 200
+
+    def test_budget_above_size_keeps_everything(self):
+        """Test that nothing is dropped when the budget is not smaller than the data"""
+        X, y = make_table(500)
+        indices, report = coverage_subsample(X, y, 1000)
+        assert len(indices) == 500
+        assert report["strata"] is None
+
+    def test_grid_covers_sparse_regions(self):
+        """Test that the grid keeps more of the tails than a uniform sample"""
+        X, y = make_table()
+        grid, _ = coverage_subsample(X, y, 1000, method="grid", variation_weight=0.0)
+        uniform, _ = coverage_subsample(X, y, 1000, method="random")
+
+        def tail_fraction(indices):
+            return np.mean(np.abs(X[indices]).max(axis=1) > 2)
+
+        assert tail_fraction(grid) > 1.5 * tail_fraction(uniform)
+
+    def test_oversamples_where_y_varies(self):
+        """Test that the variation share of the budget goes to where y changes most"""
+        rng = np.random.default_rng(0)
+        X = rng.uniform(-1, 1, (20000, 5))
+        varying = X[:, 0] > 1 / 3  # the last of three grid bins along the first feature
+        y = np.where(varying, 10 * np.sin(20 * X[:, 1]), 0.0)
+        indices, _ = coverage_subsample(X, y, 1000, method="grid", variation_weight=1.0)
+        assert np.mean(varying[indices]) > 0.9
+
+    def test_multi_target(self):
+        """Test that a 2D y is accepted and the budget is still met"""
+        X, y = make_table()
+        indices, _ = coverage_subsample(X, np.column_stack([y, X[:, 0]]), 1000)
+        assert len(indices) == 1000
+
+    def test_deterministic_for_seed(self):
+        """Test that the same seed selects the same rows"""
+        X, y = make_table()
+        first, _ = coverage_subsample(X, y, 1000, seed=3)
+        second, _ = coverage_subsample(X, y, 1000, seed=3)
+        np.testing.assert_array_equal(first, second)
+
+    def test_invalid_arguments(self):
+        """Test that invalid methods, budgets and weights are rejected"""
+        X, y = make_table(100)
+        with pytest.raises(ValueError, match="Unknown reduction method"):
+            coverage_subsample(X, y, 10, method="median")
+        with pytest.raises(ValueError, match="budget"):
+            coverage_subsample(X, y, 0)
+        with pytest.raises(ValueError, match="variation_weight"):
+            coverage_subsample(X, y, 10, variation_weight=2.0)
+
+    def test_grid_strata_constant_feature(self):
+        """Test that a constant feature does not break the grid"""
+        X = np.zeros((100, 2))
+        X[:, 0] = np.linspace(0, 1, 100)
+        labels = grid_strata(X, 16)
+        assert len(np.unique(labels)) == 4
@@ -0,0 +1,127 @@
+"""
+Unit tests for the sharded on-disk dataset, the prefetching loader and shard training
+"""
+
+import threading
+import numpy as np
+import pytest
+from fivedreg.base_fivedreg import FastNeuralNetwork
+from fivedreg.data_hand.shards import PrefetchingLoader, ShardedDataset
+from fivedreg.data_hand.streaming import ingest_dataset
+
+
+@pytest.fixture
+def shard_dir(tmp_path):
+    """Ingest a small synthetic dataset into shards of 500 rows"""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-1, 1, (6000, 5))
+    X[:, 0] = np.arange(6000)  # row id, to check coverage and order
+    y = np.sum(X[:, 1:]**2, axis=1)
+    np.save(tmp_path / "data.npy", np.column_stack([X, y]))
+    ingest_dataset(str(tmp_path / "data.npy"), str(tmp_path / "shards"), shard_rows=500)
+    return str(tmp_path / "shards")
+
+
+def row_ids(dataset, batches):
+    scaler_X, _ = dataset.scalers()
+    return np.concatenate([scaler_X.inverse_transform(X)[:, 0] for X, _ in batches]).round().astype(int)
+
+
+@pytest.mark.unit
+@pytest.mark.data
+class TestShardedDataset:
+    """Test suite for ShardedDataset"""
+
+    def test_batches_cover_split_once(self, shard_dir):
+        """Test that one pass yields every row of the split exactly once"""
+        dataset = ShardedDataset(shard_dir, "train")
+        batches = list(dataset.iter_batches(batch_size=256, seed=0))
+
+        ids = row_ids(dataset, batches)
+        assert len(ids) == len(dataset) == len(np.unique(ids))
+        assert max(len(X) for X, _ in batches) == 256
+
+    def test_shuffle_depends_on_seed(self, shard_dir):
+        """Test that different seeds give different orders and the same seed the same order"""
+        dataset = ShardedDataset(shard_dir, "train")
+        first = row_ids(dataset, dataset.iter_batches(seed=1))
+        again = row_ids(dataset, dataset.iter_batches(seed=1))
+        other = row_ids(dataset, dataset.iter_batches(seed=2))
+
+        np.testing.assert_array_equal(first, again)
+        assert not np.array_equal(first, other)
+
+    def test_load_and_unknown_split(self, shard_dir):
+        """Test loading a split into memory and rejecting unknown splits"""
+        X, y = ShardedDataset(shard_dir, "test").load()
+        assert X.shape == (len(ShardedDataset(shard_dir, "test")), 5)
+        assert y.shape == (X.shape[0],)
+
+        with pytest.raises(ValueError):
+            ShardedDataset(shard_dir, "holdout")
+
+
+@pytest.mark.unit
+@pytest.mark.data
+class TestPrefetchingLoader:
+    """Test suite for PrefetchingLoader"""
+
+    def test_epochs_reshuffle(self, shard_dir):
+        """Test that each iteration is a full epoch with a new order"""
+        dataset = ShardedDataset(shard_dir, "train")
+        loader = PrefetchingLoader(dataset, batch_size=300, seed=0)
+
+        epoch_1 = row_ids(dataset, loader)
+        epoch_2 = row_ids(dataset, loader)
+
+        assert sorted(epoch_1) == sorted(epoch_2)
+        assert not np.array_equal(epoch_1, epoch_2)
+        assert len(loader) == int(np.ceil(len(dataset) / 300))
+
+    def test_early_exit_stops_thread(self, shard_dir):
+        """Test that abandoning an epoch stops the background thread"""
+        loader = PrefetchingLoader(ShardedDataset(shard_dir, "train"), batch_size=10, prefetch=2)
+
+        for i, _ in enumerate(loader):
+            if i == 3:
+                break
+
+        assert not [thread for thread in threading.enumerate() if thread.name == "shard-prefetcher"]
+
+    def test_errors_reach_consumer(self, shard_dir, monkeypatch):
+        """Test that an error in the reader thread is raised in the consumer"""
+        dataset = ShardedDataset(shard_dir, "train")
+
+        def broken(*args, **kwargs):
+            yield next(iter(ShardedDataset.iter_batches(dataset, 10)))
+            raise OSError("disk gone")
+
+        monkeypatch.setattr(dataset, "iter_batches", broken)
+        with pytest.raises(OSError, match="disk gone"):
+            list(PrefetchingLoader(dataset))
+
+
+@pytest.mark.unit
+@pytest.mark.model
+class TestShardTraining:
+    """Test suite for FastNeuralNetwork.fit_shards"""
+
+    def test_fit_shards_learns(self, shard_dir):
+        """Test that training from shards reaches a good fit"""
+        train, test = ShardedDataset(shard_dir, "train"), ShardedDataset(shard_dir, "test")
+        model = FastNeuralNetwork(hidden_layers=(32, 16), max_iterations=40, early_stopping=False)
+        model.fit_shards(train, batch_size=1000)
+
+        X_test, y_test = test.load()
+        assert model.evaluate(X_test, y_test)["r2"] > 0.8
+        assert model.n_iterations_ == 40
+
+    def test_fit_shards_early_stopping(self, shard_dir):
+        """Test validation-based early stopping and that the estimator setting is restored"""
+        train, val = ShardedDataset(shard_dir, "train"), ShardedDataset(shard_dir, "val")
+        model = FastNeuralNetwork(hidden_layers=(8,), max_iterations=500, early_stopping=True)
+        model.fit_shards(train, val, n_iter_no_change=2)
+
+        assert model.n_iterations_ < 500
+        assert len(model.validation_scores_) == model.n_iterations_
+        assert model.model.early_stopping is True
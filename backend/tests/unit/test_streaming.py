@@ -0,0 +1,183 @@
+"""
+Unit tests for running statistics and streaming dataset ingestion
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from fivedreg.data_hand.stats import RunningStats
+from fivedreg.data_hand.streaming import (
+    assign_splits, hash_uniform, ingest_dataset, iter_chunks, load_manifest, manifest_scalers)
+
+
+def make_table(n_samples=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_samples, 5)) * [1, 2, 3, 4, 5] + [1, 0, -1, 2, 3]
+    y = X.sum(axis=1) + 0.1 * rng.standard_normal(n_samples)
+    return X, y
+
+
+def read_split(output_dir, manifest, split):
+    shards = manifest["splits"][split]["shards"]
+    X = np.concatenate([np.load(os.path.join(output_dir, shard["X"])) for shard in shards])
+    y = np.concatenate([np.load(os.path.join(output_dir, shard["y"])) for shard in shards])
+    return X, y
+
+
+@pytest.mark.unit
+@pytest.mark.data
+@pytest.mark.fast
+class TestRunningStats:
+    """Test suite for RunningStats"""
+
+    def test_chunked_updates_match_numpy(self):
+        """Test that chunk-by-chunk statistics equal the full-array statistics"""
+        X, _ = make_table(1000)
+        stats = RunningStats(5)
+        for start in range(0, 1000, 137):
+            stats.update(X[start:start + 137])
+
+        assert stats.count == 1000
+        np.testing.assert_allclose(stats.mean, X.mean(axis=0))
+        np.testing.assert_allclose(stats.variance, X.var(axis=0))
+
+    def test_merge(self):
+        """Test that merging partial statistics equals computing them at once"""
+        X, _ = make_table(1000)
+        left, right = RunningStats(5).update(X[:300]), RunningStats(5).update(X[300:])
+        left.merge(right)
+
+        np.testing.assert_allclose(left.mean, X.mean(axis=0))
+        np.testing.assert_allclose(left.variance, X.var(axis=0))
+
+    def test_stable_with_large_offset(self):
+        """Test that the variance stays accurate for values far from zero"""
+        values = 1e9 + np.random.default_rng(0).standard_normal(10000)
+        stats = RunningStats(1)
+        for chunk in np.array_split(values, 50):
+            stats.update(chunk)
+
+        np.testing.assert_allclose(stats.variance[0], values.var(), rtol=1e-6)
+
+    def test_to_scaler_and_round_trip(self):
+        """Test the StandardScaler and dictionary conversions"""
+        X, _ = make_table(500)
+        stats = RunningStats(5).update(X)
+        scaler = stats.to_scaler()
+
+        np.testing.assert_allclose(scaler.transform(X).mean(axis=0), 0, atol=1e-10)
+        restored = RunningStats.from_dict(json.loads(json.dumps(stats.to_dict())))
+        np.testing.assert_allclose(restored.variance, stats.variance)
+        assert restored.count == 500
+
+    def test_wrong_width(self):
+        """Test that a batch with the wrong number of columns is rejected"""
+        with pytest.raises(ValueError):
+            RunningStats(5).update(np.zeros((3, 4)))
+
+
+@pytest.mark.unit
+@pytest.mark.data
+class TestStreamingIngestion:
+    """Test suite for ingest_dataset"""
+
+    def test_hash_split_is_deterministic(self):
+        """Test that split assignment depends only on the row index"""
+        rows = np.arange(100000)
+        labels = assign_splits(rows)
+
+        np.testing.assert_array_equal(labels[500:600], assign_splits(rows[500:600]))
+        fractions = np.bincount(labels) / len(rows)
+        np.testing.assert_allclose(fractions, [0.6, 0.2, 0.2], atol=0.01)
+        assert 0 <= hash_uniform(rows).min() and hash_uniform(rows).max() < 1
+
+    def test_csv_and_npy_give_same_result(self, tmp_path):
+        """Test that CSV and NPY sources with different chunking produce the same splits"""
+        X, y = make_table()
+        pd.DataFrame(np.column_stack([X, y]), columns=["a", "b", "c", "d", "e", "target"]).to_csv(
+            tmp_path / "data.csv", index=False)
+        np.save(tmp_path / "data.npy", np.column_stack([X, y]))
+
+        csv_manifest = ingest_dataset(str(tmp_path / "data.csv"), str(tmp_path / "csv"), chunk_rows=700, shard_rows=1000)
+        npy_manifest = ingest_dataset(str(tmp_path / "data.npy"), str(tmp_path / "npy"), chunk_rows=1900, shard_rows=1000)
+
+        for split in ("train", "val", "test"):
+            assert csv_manifest["splits"][split]["rows"] == npy_manifest["splits"][split]["rows"]
+        np.testing.assert_allclose(csv_manifest["scaler_X"]["mean"], npy_manifest["scaler_X"]["mean"])
+        assert sum(csv_manifest["splits"][split]["rows"] for split in ("train", "val", "test")) == len(X)
+
+    def test_shards_are_standardized_and_bounded(self, tmp_path):
+        """Test that training shards are standardized and no larger than needed"""
+        X, y = make_table()
+        np.save(tmp_path / "data.npy", np.column_stack([X, y]))
+        manifest = ingest_dataset(str(tmp_path / "data.npy"), str(tmp_path / "out"), chunk_rows=1000, shard_rows=800)
+
+        X_train, y_train = read_split(str(tmp_path / "out"), manifest, "train")
+        np.testing.assert_allclose(X_train.mean(axis=0), 0, atol=1e-10)
+        np.testing.assert_allclose(X_train.std(axis=0), 1, atol=1e-10)
+        np.testing.assert_allclose(y_train.mean(), 0, atol=1e-10)
+        assert len(manifest["splits"]["train"]["shards"]) == int(np.ceil(len(X_train) / 800))
+        assert max(shard["rows"] for shard in manifest["splits"]["train"]["shards"]) < 1.5 * 800
+
+        # Scalers rebuilt from the manifest invert the standardization
+        scaler_X, scaler_y = manifest_scalers(load_manifest(str(tmp_path / "out")))
+        original = scaler_X.inverse_transform(X_train)
+        assert np.isin(np.round(original[:, 0], 10), np.round(X[:, 0], 10)).all()
+
+    def test_rows_are_shuffled(self, tmp_path):
+        """Test that shards do not keep the source order"""
+        X, y = make_table()
+        X[:, 0] = np.arange(len(X))
+        np.save(tmp_path / "data.npy", np.column_stack([X, y]))
+        manifest = ingest_dataset(str(tmp_path / "data.npy"), str(tmp_path / "out"), shard_rows=10000)
+
+        X_train, _ = read_split(str(tmp_path / "out"), manifest, "train")
+        assert not np.all(np.diff(X_train[:, 0]) > 0)
+
+    def test_nan_rows_dropped(self, tmp_path):
+        """Test that rows with NaN values are counted and left out"""
+        X, y = make_table(1000)
+        X[10:15, 2] = np.nan
+        y[20] = np.nan
+        np.save(tmp_path / "data.npy", np.column_stack([X, y]))
+        manifest = ingest_dataset(str(tmp_path / "data.npy"), str(tmp_path / "out"))
+
+        assert manifest["rows_dropped"] == 6
+        X_train, _ = read_split(str(tmp_path / "out"), manifest, "train")
+        assert not np.isnan(X_train).any()
+
+    def test_reingest_replaces_shards(self, tmp_path):
+        """Test that ingesting again into the same directory removes the old shards"""
+        X, y = make_table()
+        np.save(tmp_path / "data.npy", np.column_stack([X, y]))
+        ingest_dataset(str(tmp_path / "data.npy"), str(tmp_path / "out"), shard_rows=500)
+        manifest = ingest_dataset(str(tmp_path / "data.npy"), str(tmp_path / "out"), shard_rows=5000)
+
+        n_shards = sum(len(split["shards"]) for split in manifest["splits"].values())
+        assert len(os.listdir(tmp_path / "out")) == 2 * n_shards + 1
+
+    def test_column_selection(self, tmp_path):
+        """Test selecting the target and features by name"""
+        X, y = make_table(100)
+        frame = pd.DataFrame(np.column_stack([y, X]), columns=["target", "a", "b", "c", "d", "e"])
+        frame.to_csv(tmp_path / "data.csv", index=False)
+
+        chunk_X, chunk_y = next(iter_chunks(str(tmp_path / "data.csv"), target_column="target"))
+        np.testing.assert_allclose(chunk_X, X)
+        np.testing.assert_allclose(chunk_y, y)
+
+    def test_parquet(self, tmp_path):
+        """Test reading a Parquet source"""
+        pytest.importorskip("pyarrow")
+        X, y = make_table(1000)
+        pd.DataFrame(np.column_stack([X, y]), columns=["a", "b", "c", "d", "e", "y"]).to_parquet(tmp_path / "data.parquet")
+
+        manifest = ingest_dataset(str(tmp_path / "data.parquet"), str(tmp_path / "out"), chunk_rows=300)
+        assert manifest["rows_read"] == 1000
+
+    def test_unsupported_format(self, tmp_path):
+        """Test that unknown file types are rejected"""
+        with pytest.raises(ValueError, match="Unsupported file type"):
+            next(iter_chunks(str(tmp_path / "data.txt")))
@@ -0,0 +1,142 @@
+"""
+Unit tests for the ThreadScheduler class
+"""
+
+import threading
+
+import numpy as np
+import pytest
+from threadpoolctl import threadpool_info, threadpool_limits
+from fivedreg.thread_scheduler import ThreadScheduler, current_job_threads, default_thread_budget
+
+
+@pytest.fixture(autouse=True)
+def restore_thread_limits():
+    """Give the BLAS libraries back their thread limits after each test"""
+    np.ones(1)  # make sure the BLAS library is loaded before the limits are recorded
+    with threadpool_limits(limits=None):
+        yield
+
+
+@pytest.mark.unit
+@pytest.mark.fast
+class TestThreadScheduler:
+    """Test suite for ThreadScheduler"""
+
+    def test_split_pools(self):
+        """Test that the split policy reserves a share of the cores for training"""
+        assert ThreadScheduler("split", cores=8).stats()["pool_threads"] == {"training": 4, "inference": 4}
+        assert ThreadScheduler("split", cores=8, training_share=0.25).pool_threads("inference") == 6
+        assert ThreadScheduler("split", cores=2, training_share=0.9).pool_threads("inference") == 1
+        assert ThreadScheduler("split", cores=1).stats()["pool_threads"] == {"training": 1, "inference": 1}
+
+    def test_concurrent_jobs_divide_their_pool(self):
+        """Test that jobs of one kind share its pool and leave the other kind's pool alone"""
+        scheduler = ThreadScheduler("split", cores=8)
+        with scheduler.job("training") as first:
+            with scheduler.job("training") as second, scheduler.job("inference") as inference:
+                assert (first, second, inference) == (4, 2, 4)
+                assert scheduler.stats()["active_jobs"] == {"training": 2, "inference": 1}
+        assert scheduler.stats()["active_jobs"] == {"training": 0, "inference": 0}
+        assert scheduler.stats()["jobs_total"] == {"training": 2, "inference": 1}
+
+    def test_fair_and_single_policies(self):
+        """Test that 'fair' divides the whole budget between all jobs and 'single' gives one thread"""
+        fair = ThreadScheduler("fair", cores=6)
+        with fair.job("training") as training, fair.job("inference") as inference:
+            assert (training, inference) == (6, 3)
+        with ThreadScheduler("single", cores=6).job("training") as threads:
+            assert threads == 1
+
+    def test_applied_limit(self):
+        """Test that the smallest share of the running jobs is applied and the budget restored after"""
+        scheduler = ThreadScheduler("fair", cores=4)
+        with scheduler.job("training"):
+            assert scheduler.stats()["applied_threads"] == 4
+            with scheduler.job("inference"):
+                assert scheduler.stats()["applied_threads"] == 2
+            assert scheduler.stats()["applied_threads"] == 4
+
+        with ThreadScheduler("single", cores=4).job("inference"):
+            blas = [info for info in threadpool_info() if info["user_api"] == "blas"]
+            assert blas and all(info["num_threads"] == 1 for info in blas)
+
+    def test_thread_safety(self):
+        """Test that jobs started from many threads are all accounted for"""
+        scheduler = ThreadScheduler("fair", cores=4)
+        barrier = threading.Barrier(8)
+        assigned = []
+
+        def run():
+            with scheduler.job("inference") as threads:
+                assigned.append(threads)
+                barrier.wait()
+
+        workers = [threading.Thread(target=run) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert len(assigned) == 8 and min(assigned) == 1
+        assert scheduler.stats()["active_jobs"]["inference"] == 0
+        assert scheduler.stats()["applied_threads"] == 4
+
+    def test_invalid_settings(self):
+        """Test that unknown policies, shares and job kinds are rejected"""
+        with pytest.raises(ValueError, match="Unknown thread policy"):
+            ThreadScheduler("greedy")
+        with pytest.raises(ValueError, match="training_share"):
+            ThreadScheduler(training_share=1.0)
+        with pytest.raises(ValueError, match="Unknown job kind"):
+            with ThreadScheduler().job("upload"):
+                pass
+
+    def test_default_budget(self):
+        """Test that the cores are divided between worker processes, with at least one each"""
+        assert default_thread_budget(1) >= 1
+        assert default_thread_budget(10_000) == 1
+
+    def test_current_job_threads(self):
+        """Test that code running in a job sees its allowance, and the default outside"""
+        scheduler = ThreadScheduler("split", cores=8)
+        assert current_job_threads(-1) == -1
+        with scheduler.job("training"):
+            assert current_job_threads() == 4
+            with scheduler.job("training"):
+                assert current_job_threads() == 2
+            assert current_job_threads() == 4
+        assert current_job_threads() is None
+
+    def test_engines_and_profiling_use_the_allowance(self, monkeypatch):
+        """Test that k-NN tree queries and dataset profiling start the job's threads, not one per core"""
+        import fivedreg.data_hand.dataset_profile as dataset_profile
+        from fivedreg.data_hand.dataset_profile import profile_dataset
+        from fivedreg.engines import KNNInterpolator
+
+        X = np.random.default_rng(0).uniform(size=(200, 5))
+        model = KNNInterpolator().fit(X, X.sum(axis=1))
+        query, workers = model.tree_.query, []
+
+        class RecordingTree:
+            def query(self, *args, **kwargs):
+                workers.append(kwargs["workers"])
+                return query(*args, **kwargs)
+
+        model.tree_ = RecordingTree()
+        pool_sizes = []
+        executor = dataset_profile.ThreadPoolExecutor
+
+        def recording_executor(max_workers):
+            pool_sizes.append(max_workers)
+            return executor(max_workers=max_workers)
+
+        monkeypatch.setattr(dataset_profile, "ThreadPoolExecutor", recording_executor)
+        with ThreadScheduler("split", cores=6, training_share=0.5).job("inference"):
+            model.predict(X[:10])
+            profile_dataset(X, X.sum(axis=1))
+        model.predict(X[:10])
+
+        assert workers == [3, -1]
+        assert pool_sizes == [3]
+        assert KNNInterpolator(workers=2).workers == 2
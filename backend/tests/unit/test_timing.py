@@ -0,0 +1,41 @@
+"""
+Unit tests for the shared prediction timing helpers
+"""
+
+import numpy as np
+import pytest
+from fivedreg.timing import predict_rows_per_second, single_row_latency_ms
+
+
+class RecordingModel:
+    """Model recording the batch size of every predict call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        return np.zeros(len(X))
+
+
+@pytest.mark.unit
+@pytest.mark.fast
+class TestTiming:
+    """Test suite for predict_rows_per_second and single_row_latency_ms"""
+
+    def test_rows_per_second_returns_predictions(self):
+        """Test that the throughput comes with the predictions of one call"""
+        model = RecordingModel()
+        predictions, rows_per_second = predict_rows_per_second(model, np.ones((50, 5)))
+
+        assert predictions.shape == (50,)
+        assert rows_per_second > 0
+        assert model.calls == [50]
+
+    def test_latency_predicts_single_rows(self):
+        """Test that the latency is measured on single rows after one warm-up call"""
+        model = RecordingModel()
+        latency = single_row_latency_ms(model, np.ones((3, 5)), repeats=10)
+
+        assert latency >= 0
+        assert model.calls == [1] * 11
@@ -9,11 +9,9 @@ export default function PredictPage() {
 
   // Single prediction input fields
   const [predictionMode, setPredictionMode] = useState<PredictionMode>("single");
-  const [feature1, setFeature1] = useState("");
-  const [feature2, setFeature2] = useState("");
-  const [feature3, setFeature3] = useState("");
-  const [feature4, setFeature4] = useState("");
-  const [feature5, setFeature5] = useState("");
+  // One field per input feature of the trained model (5 until /status reports otherwise)
+  const [inputDim, setInputDim] = useState(5);
+  const [featureValues, setFeatureValues] = useState<string[]>(Array(5).fill(""));
 
     //Batch prediction input field
 
@@ -36,6 +34,10 @@ export default function PredictPage() {
         const data = await response.json();
         setModelTrained(data.model_trained);
         setPredictionDataUploaded(data.prediction_data_uploaded);
+        if (data.input_dim) {
+          setInputDim(data.input_dim);
+          setFeatureValues(Array(data.input_dim).fill(""));
+        }
       } catch (err) {
         console.error("Failed to check status:", err);
       } finally {
@@ -47,9 +49,9 @@ export default function PredictPage() {
 
   const handleSinglePrediction = async () => {
     // Validate inputs
-    const features = [feature1, feature2, feature3, feature4, feature5];
+    const features = featureValues;
     if (features.some(f => f === "" || isNaN(parseFloat(f)))) {
-      setError("All 5 feature fields must be filled with valid numbers");
+      setError(`All ${inputDim} feature fields must be filled with valid numbers`);
       return;
     }
 
@@ -181,61 +183,19 @@ export default function PredictPage() {
                   <div className="p-4 bg-gray-50 dark:bg-gray-800 rounded-lg border border-gray-200 dark:border-gray-700">
                     <h4 className="font-bold text-base text-gray-900 dark:text-white mb-3">Input Features</h4>
                     <div className="grid grid-cols-5 gap-3">
-                      <div>
-                        <label className="block text-sm font-semibold text-gray-700 dark:text-gray-300 mb-1">Feature 1</label>
-                        <input
-                          type="number"
-                          step="any"
-                          value={feature1}
-                          onChange={(e) => setFeature1(e.target.value)}
-                          placeholder="0.0"
-                          className="w-full px-3 py-2 bg-white dark:bg-gray-900 border border-gray-300 dark:border-gray-700 rounded-lg text-gray-900 dark:text-white text-sm focus:ring-2 focus:ring-teal-600 focus:border-transparent"
-                        />
-                      </div>
-                      <div>
-                        <label className="block text-sm font-semibold text-gray-700 dark:text-gray-300 mb-1">Feature 2</label>
-                        <input
-                          type="number"
-                          step="any"
-                          value={feature2}
-                          onChange={(e) => setFeature2(e.target.value)}
-                          placeholder="0.0"
-                          className="w-full px-3 py-2 bg-white dark:bg-gray-900 border border-gray-300 dark:border-gray-700 rounded-lg text-gray-900 dark:text-white text-sm focus:ring-2 focus:ring-teal-600 focus:border-transparent"
-                        />
-                      </div>
-                      <div>
-                        <label className="block text-sm font-semibold text-gray-700 dark:text-gray-300 mb-1">Feature 3</label>
-                        <input
-                          type="number"
-                          step="any"
-                          value={feature3}
-                          onChange={(e) => setFeature3(e.target.value)}
-                          placeholder="0.0"
-                          className="w-full px-3 py-2 bg-white dark:bg-gray-900 border border-gray-300 dark:border-gray-700 rounded-lg text-gray-900 dark:text-white text-sm focus:ring-2 focus:ring-teal-600 focus:border-transparent"
-                        />
-                      </div>
-                      <div>
-                        <label className="block text-sm font-semibold text-gray-700 dark:text-gray-300 mb-1">Feature 4</label>
-                        <input
-                          type="number"
-                          step="any"
-                          value={feature4}
-                          onChange={(e) => setFeature4(e.target.value)}
-                          placeholder="0.0"
-                          className="w-full px-3 py-2 bg-white dark:bg-gray-900 border border-gray-300 dark:border-gray-700 rounded-lg text-gray-900 dark:text-white text-sm focus:ring-2 focus:ring-teal-600 focus:border-transparent"
-                        />
-                      </div>
-                      <div>
-                        <label className="block text-sm font-semibold text-gray-700 dark:text-gray-300 mb-1">Feature 5</label>
-                        <input
-                          type="number"
-                          step="any"
-                          value={feature5}
-                          onChange={(e) => setFeature5(e.target.value)}
-                          placeholder="0.0"
-                          className="w-full px-3 py-2 bg-white dark:bg-gray-900 border border-gray-300 dark:border-gray-700 rounded-lg text-gray-900 dark:text-white text-sm focus:ring-2 focus:ring-teal-600 focus:border-transparent"
-                        />
-                      </div>
+                      {featureValues.map((value, i) => (
+                        <div key={i}>
+                          <label className="block text-sm font-semibold text-gray-700 dark:text-gray-300 mb-1">Feature {i + 1}</label>
+                          <input
+                            type="number"
+                            step="any"
+                            value={value}
+                            onChange={(e) => setFeatureValues(featureValues.map((v, j) => (j === i ? e.target.value : v)))}
+                            placeholder="0.0"
+                            className="w-full px-3 py-2 bg-white dark:bg-gray-900 border border-gray-300 dark:border-gray-700 rounded-lg text-gray-900 dark:text-white text-sm focus:ring-2 focus:ring-teal-600 focus:border-transparent"
+                          />
+                        </div>
+                      ))}
                     </div>
                   </div>
                 )}
@@ -372,7 +332,9 @@ export default function PredictPage() {
                             <h4 className="font-bold text-sm text-gray-900 dark:text-white mb-2">Prediction Result</h4>
                             <div className="bg-teal-50 dark:bg-teal-900/20 rounded p-4 border-2 border-teal-600 flex items-center justify-center">
                               <div className="text-center">
-                                <div className="text-2xl font-bold text-teal-600">{predictionResult.prediction.toFixed(6)}</div>
+                                <div className="text-2xl font-bold text-teal-600">{Array.isArray(predictionResult.prediction)
+                                  ? predictionResult.prediction.map((value: number) => value.toFixed(6)).join(", ")
+                                  : predictionResult.prediction.toFixed(6)}</div>
                               </div>
                             </div>
                           </div>
@@ -444,10 +406,10 @@ export default function PredictPage() {
                     {predictionMode === "batch" ? (
                       <>
                         <li>• Dataset uploaded</li>
-                        <li>• 5D feature vectors</li>
+                        <li>• {inputDim}D feature vectors</li>
                       </>
                     ) : (
-                      <li>• 5 input features</li>
+                      <li>• {inputDim} input features</li>
                     )}
                   </ul>
                 </div>
@@ -466,7 +428,7 @@ export default function PredictPage() {
                         <svg className="w-3 h-3 text-blue-600 flex-shrink-0 mt-0.5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                           <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M5 13l4 4L19 7" />
                         </svg>
-                        <span>Array shape (n,5)</span>
+                        <span>Array shape (n,{inputDim})</span>
                       </li>
                       <li className="flex items-start gap-1">
                         <svg className="w-3 h-3 text-blue-600 flex-shrink-0 mt-0.5" fill="none" stroke="currentColor" viewBox="0 0 24 24">